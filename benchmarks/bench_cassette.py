@@ -0,0 +1,116 @@
+"""
+Benchmark: recording and replaying the module3 agent with a cassette.
+
+Records one long module3 conversation (``--turns`` user turns cycling through
+the scenario prompts) against the fake model with ``--latency`` seconds per
+call, then replays it:
+
+- at recorded speed, which should take about as long as the recording
+- as fast as possible, ``--repeat`` times, where the time left is our own
+  code (the loop, the tools and the cassette lookup)
+- with a naive lookup that hashes the whole JSON request every call, for
+  comparison with the chained per-message digests of ``RequestHasher``
+
+Every replayed answer is checked against the recorded one.
+
+Usage:
+    python benchmarks/bench_cassette.py [--turns 40] [--latency 0.05] [--repeat 20]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from scenarios import PROMPTS, run_turn, weather_config, weather_model
+
+from agentkit.cassette import CassetteModels
+from agentkit.fake import FakeModels
+
+
+class NaiveReplay:
+    """Looks responses up by a hash of the fully serialized request."""
+
+    def __init__(self):
+        self.responses = {}
+        self.recording = None
+
+    @staticmethod
+    def key(model, contents, config):
+        request = {
+            "model": model,
+            "contents": [c.model_dump(mode="json", exclude_none=True) for c in contents],
+            "config": config.model_dump(mode="json", exclude_none=True),
+        }
+        return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def generate_content(self, *, model, contents, config=None):
+        key = self.key(model, contents, config)
+        if self.recording is not None:
+            response = self.recording.generate_content(model=model, contents=contents, config=config)
+            self.responses[key] = response
+            return response
+        return self.responses[key].model_copy()
+
+
+def conversation(models, turns):
+    config = weather_config()
+    contents = []
+    answers = []
+    requests = 0
+    for i in range(turns):
+        answer, round_trips = run_turn(models, contents, config, PROMPTS[i % len(PROMPTS)])
+        answers.append(answer)
+        requests += round_trips
+    return answers, requests
+
+
+def timed(models, turns, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        answers, requests = conversation(models, turns)
+    return answers, requests * repeat, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "module3.jsonl.gz")
+        recorder = CassetteModels(FakeModels(weather_model, latency=args.latency), path, "record")
+        recorded, requests, seconds = timed(recorder, args.turns)
+        recorder.close()
+        size = os.path.getsize(path)
+        print(f"{args.turns} turns, {requests} requests, {args.latency * 1000:.0f} ms per call")
+        print(f"{'record':<22} {seconds * 1000:8.0f} ms  cassette {size:,} B "
+              f"({size / requests:.0f} B per interaction)")
+
+        paced = CassetteModels(None, path, latency_scale=1.0)
+        answers, _, seconds = timed(paced, args.turns)
+        assert answers == recorded
+        print(f"{'replay, recorded pace':<22} {seconds * 1000:8.0f} ms")
+
+        fast = CassetteModels(None, path)
+        answers, total, seconds = timed(fast, args.turns, args.repeat)
+        assert answers == recorded
+        print(f"{'replay, no latency':<22} {seconds * 1000:8.0f} ms  "
+              f"{seconds / total * 1e6:6.0f} us per request  ({fast.summary()})")
+
+        naive = NaiveReplay()
+        naive.recording = FakeModels(weather_model)
+        conversation(naive, args.turns)
+        naive.recording = None
+        answers, total, seconds = timed(naive, args.turns, args.repeat)
+        assert answers == recorded
+        print(f"{'naive hashed replay':<22} {seconds * 1000:8.0f} ms  "
+              f"{seconds / total * 1e6:6.0f} us per request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark: CompactHistory vs a plain List[Content].
+
+Reports memory per turn (tracemalloc) and what building one request body
+from the whole history costs, per transport:
+
+- **SDK** (``client.models``): a list is dumped as it is; a ``CompactHistory``
+  has to be ``materialize()``d into ``Content`` objects first, then dumped
+- **PrefixCachingModels** (``AGENT_PREFIX_CACHE=1``): a list reuses the
+  encodings of the messages it sent before; a ``CompactHistory`` is joined
+  from the encodings it keeps
+
+Usage:
+    python benchmarks/bench_compact_history.py [--turns 2000]
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+from bench_session_store import make_turn
+
+from agentkit.compact_history import CompactHistory
+from agentkit.transport import PrefixEncoder
+
+
+def measure(build):
+    """Return (object, bytes allocated) for building a history."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    obj = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, after - before
+
+
+def best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=2000)
+    args = parser.parse_args()
+
+    contents, list_bytes = measure(
+        lambda: [m for i in range(args.turns) for m in make_turn(i)]
+    )
+    history, compact_bytes = measure(lambda: CompactHistory(contents))
+
+    print(f"messages: {len(contents)} ({args.turns} turns)")
+    print(f"memory/turn: list {list_bytes / args.turns:,.0f} B, "
+          f"compact {compact_bytes / args.turns:,.0f} B")
+
+    def dump(items):
+        json.dumps(
+            [c.model_dump(mode="json", exclude_none=True, by_alias=True) for c in items]
+        ).encode("utf-8")
+
+    # Warm encoders: every message but none of the config was sent before
+    list_encoder, compact_encoder = PrefixEncoder(), PrefixEncoder()
+    list_encoder.encode(contents, None)
+    compact_encoder.encode(history, None)
+
+    print(f"\n{'request body':<28} {'list':>10} {'compact':>10}")
+    rows = [
+        ("SDK", lambda: dump(contents), lambda: dump(history.materialize())),
+        ("PrefixCachingModels", lambda: list_encoder.encode(contents, None),
+         lambda: compact_encoder.encode(history, None)),
+    ]
+    for label, plain, compact in rows:
+        plain_time, compact_time = best_of(plain, repeat=3), best_of(compact, repeat=3)
+        print(f"{label:<28} {plain_time * 1000:7.2f} ms {compact_time * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: input tokens saved by context caching in a module3 session.
+
+Runs the module3 chaining loop against a fake model twice, once sending the
+system prompt and tools on every request and once through
+``ContextCachingModels``. Halfway through, the fake clock jumps past the cache
+TTL to check the cache is re-created transparently.
+
+``FakeCaches`` enforces the API's minimum cacheable size like the real one.
+The module3 prompt and tools are far below it, so they are not cached; the
+same session with a ~8,000-token reference section in the system prompt is.
+
+Usage:
+    python benchmarks/bench_context_cache.py [--rounds 4]
+"""
+
+import argparse
+
+from scenarios import PROMPTS, run_turn, weather_config, weather_model
+
+from agentkit.agents import DEFAULT_MODEL
+from agentkit.context_cache import ContextCachingModels, min_cache_tokens
+from agentkit.fake import FakeCaches, FakeModels, estimate_tokens
+
+# A system prompt worth caching: module3's plus reference notes per city
+REFERENCE = "\n".join(
+    f"- City {i}: temperate oceanic climate, rain most likely in winter, summer highs "
+    f"around {18 + i % 12}°C, prefer Celsius unless the user asks for Fahrenheit."
+    for i in range(220)
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def large_config():
+    config = weather_config()
+    return config.model_copy(
+        update={"system_instruction": f"{config.system_instruction}\n\nReference:\n{REFERENCE}"}
+    )
+
+
+def run_session(models, rounds, make_config, clock=None, ttl=None):
+    contents, answers, trips = [], [], 0
+    config = make_config()
+    prompts = PROMPTS * rounds
+    for i, prompt in enumerate(prompts):
+        if clock is not None and i == len(prompts) // 2:
+            clock.now += ttl + 1
+        answer, round_trips = run_turn(models, contents, config, prompt)
+        answers.append(answer)
+        trips += round_trips
+    return answers, trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rounds", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{DEFAULT_MODEL}: contexts below {min_cache_tokens(DEFAULT_MODEL)} tokens "
+          f"are not cached\n")
+    print(f"{'system prompt':<22} {'prefix':>8} {'requests':>8} {'caches':>6} "
+          f"{'from cache':>10} {'of input':>8}")
+    for label, make_config, expected_caches in (
+        ("module3", weather_config, 0),
+        ("module3 + reference", large_config, 2),
+    ):
+        plain = FakeModels(weather_model)
+        expected, trips = run_session(plain, args.rounds, make_config)
+
+        clock = Clock()
+        caches = FakeCaches(clock=clock)
+        fake = FakeModels(weather_model, caches=caches)
+        cached = ContextCachingModels(fake, caches, ttl_seconds=600, clock=clock)
+        answers, _ = run_session(cached, args.rounds, make_config, clock=clock, ttl=600)
+
+        assert answers == expected, "context caching changed the conversation"
+        # Two for the large prompt: the cache is re-created after it expires
+        assert cached.caches_created == expected_caches, cached.stats()
+
+        config = make_config()
+        static = estimate_tokens(config.system_instruction) + estimate_tokens(config.tools)
+        stats = cached.stats()
+        print(f"{label:<22} {static:8d} {trips:8d} {stats['caches_created']:6d} "
+              f"{stats['cached_tokens']:10d} {stats['cached_tokens'] / plain.prompt_tokens:8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Benchmark: resolving the locations the model passes to get_weather.
+
+Queries are made from the bundled cities in the forms models write them:
+
+- **exact**: "auckland"
+- **no accents**: "sao paulo", "zurich"
+- **city, country**: "Kraków, Poland"
+- **misspelled**: one random typo (a letter dropped, added, replaced or two
+  swapped) in names of five letters or more
+- **misspelled, country**: the same with ", <country>"
+
+For each form: how often the old lookup (``location.lower()`` in a dict of
+names) found the city, how often ``Gazetteer.resolve`` picked the right one,
+how often it was among the first three candidates, and the p50/p99 time per
+lookup. Runs against the bundled list and against a GeoNames-sized index
+(``--cities`` made-up names plus the bundled ones, loaded through
+``Gazetteer.from_geonames``), and reports build time and memory of each.
+
+Usage:
+    python benchmarks/bench_gazetteer.py [--cities 26000] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from agentkit.gazetteer import DATA_DIR, Gazetteer, normalize
+
+SYLLABLES = [
+    "ka", "lo", "mar", "ten", "vi", "san", "ber", "gu", "ro", "dan", "el", "ho", "ni", "port",
+    "ville", "burg", "ton", "sk", "ova", "ri", "sa", "an", "to", "mi", "la", "do", "ne", "es",
+]
+
+
+def bundled_rows():
+    with open(DATA_DIR / "cities.tsv", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            row = line.rstrip("\n").split("\t")
+            yield row[0], row[1], int(row[2]), row[3].split(";") if len(row) > 3 else []
+
+
+def write_geonames(path, extra, rng):
+    """A GeoNames-format dump of the bundled cities plus ``extra`` made-up ones."""
+    countries = sorted({row[1] for row in bundled_rows()})
+    with open(path, "w", encoding="utf-8") as f:
+        rows = list(bundled_rows())
+        for i in range(extra):
+            name = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+            rows.append((name, rng.choice(countries), rng.randint(15000, 500000), []))
+        for i, (name, country, population, alternates) in enumerate(rows):
+            columns = [str(i), name, normalize(name), ",".join(alternates), "0", "0", "P",
+                       "PPL", country] + [""] * 5 + [str(population)] + [""] * 4
+            f.write("\t".join(columns) + "\n")
+
+
+def typo(name, rng):
+    letters = list(name)
+    i = rng.randrange(1, len(letters) - 1)
+    edit = rng.choice(["drop", "add", "replace", "swap"])
+    if edit == "drop":
+        del letters[i]
+    elif edit == "add":
+        letters.insert(i, rng.choice("aeiourstnl"))
+    elif edit == "replace":
+        letters[i] = rng.choice([c for c in "aeiourstnl" if c != letters[i]])
+    else:
+        letters[i], letters[i + 1] = letters[i + 1], letters[i]
+    return "".join(letters)
+
+
+def queries(gazetteer, count, rng):
+    """(form, query, expected city name, expected country or None)"""
+    cities = list(bundled_rows())
+    out = []
+    while len(out) < count:
+        name, country, _, _ = rng.choice(cities)
+        country_name = gazetteer.country_names[country]
+        plain = normalize(name)
+        out.append(("exact", name.lower(), name, None))
+        if plain != name.lower():
+            out.append(("no accents", plain, name, None))
+        out.append(("city, country", f"{name}, {country_name}", name, country))
+        if len(name) >= 5:
+            misspelled = typo(name.lower(), rng)
+            out.append(("misspelled", misspelled, name, None))
+            out.append(("misspelled, country", f"{misspelled}, {country_name}", name, country))
+    return out
+
+
+def measure(gazetteer, workload):
+    known = {name.lower() for name, _, _, _ in bundled_rows()}
+    stats = {}
+    for form, query, name, country in workload:
+        s = stats.setdefault(form, {"n": 0, "old": 0, "top1": 0, "top3": 0, "times": []})
+        start = time.perf_counter()
+        resolution = gazetteer.resolve(query)
+        s["times"].append(time.perf_counter() - start)
+        s["n"] += 1
+        s["old"] += query.lower() in known
+        place = resolution.place
+        if place is not None and place.name == name and country in (None, place.country):
+            s["top1"] += 1
+        top3 = gazetteer.search(query, 3)
+        if any(p.name == name and country in (None, p.country) for p, _ in top3):
+            s["top3"] += 1
+    return stats
+
+
+def report(label, gazetteer, build_seconds, memory, workload):
+    print(f"\n{label}: {len(gazetteer)} cities, built in {build_seconds * 1000:.0f} ms, "
+          f"{memory / (1 << 20):.1f} MB")
+    print(f"{'form':<22} {'queries':>7} {'old':>6} {'top 1':>6} {'top 3':>6} "
+          f"{'p50':>8} {'p99':>8}")
+    for form, s in measure(gazetteer, workload).items():
+        times = sorted(s["times"])
+        n = s["n"]
+        print(f"{form:<22} {n:7d} {s['old'] / n:6.0%} {s['top1'] / n:6.0%} {s['top3'] / n:6.0%} "
+              f"{times[n // 2] * 1e6:5.0f} us {times[int(n * 0.99)] * 1e6:5.0f} us")
+
+
+def build(factory):
+    tracemalloc.start()
+    start = time.perf_counter()
+    gazetteer = factory()
+    seconds = time.perf_counter() - start
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return gazetteer, seconds, memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cities", type=int, default=26000)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    bundled, seconds, memory = build(Gazetteer.bundled)
+    workload = queries(bundled, args.queries, rng)
+    report("bundled", bundled, seconds, memory, workload)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cities.txt")
+        write_geonames(path, args.cities, rng)
+        large, seconds, memory = build(lambda: Gazetteer.from_geonames(path))
+    report("GeoNames-sized", large, seconds, memory, workload)
+
+
+if __name__ == "__main__":
+    main()
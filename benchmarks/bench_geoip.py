@@ -0,0 +1,194 @@
+"""
+Benchmark: IP geolocation lookups for get_current_location.
+
+Writes a CSV of ``--ipv4`` random IPv4 ranges and ``--ipv6`` IPv6 ones over
+``--locations`` locations (about the size of a city-level database), then:
+
+- **build**: ``agentkit.geoip.build`` time and file size
+- **open**: ``GeoIPDatabase`` (memory-mapped, nothing parsed) against reading
+  the CSV into sorted Python lists, the obvious alternative, and the Python
+  heap each takes
+- **lookups**: single-thread lookups per second and p50/p99 per lookup for
+  IPv4, IPv6 and a mix, against ``bisect`` over those lists with addresses
+  parsed by ``ipaddress``; answers are checked to agree
+
+Usage:
+    python benchmarks/bench_geoip.py [--ipv4 500000] [--ipv6 100000] [--lookups 200000]
+"""
+
+import argparse
+import bisect
+import csv
+import ipaddress
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from agentkit.geoip import GeoIPDatabase, build
+
+
+def sample(count, low, high, rng):
+    starts = set()
+    while len(starts) < count:
+        starts.add(rng.randrange(low, high))
+    return starts
+
+
+def ranges(starts, high, rng):
+    """Sorted, non-overlapping (start, end) ranges from ``starts`` up to ``high``, with gaps."""
+    starts = sorted(starts)
+    out = []
+    for start, following in zip(starts, starts[1:] + [high]):
+        # Most ranges run up to the next one; some leave a hole
+        end = following - 1 if rng.random() < 0.9 else start + (following - start) // 2
+        out.append((start, end))
+    return out
+
+
+def write_csv(path, args, rng):
+    v4 = ranges(sample(args.ipv4, 1 << 24, 224 << 24, rng), 224 << 24, rng)
+    # Mostly whole /64s and up; a fifth split a /64, so starts share their high half
+    prefixes = sample(args.ipv6 - args.ipv6 // 5, 0x2000 << 48, 0x2C00 << 48, rng)
+    starts = {prefix << 64 for prefix in prefixes}
+    chosen = rng.sample(sorted(prefixes), args.ipv6 // 5)
+    starts |= {prefix << 64 | rng.randrange(1, 1 << 64) for prefix in chosen}
+    v6 = ranges(starts, 0x2C00 << 112, rng)
+    places = [(f"C{i % 200}", f"Country {i % 200}", f"Region {i % 3000}", f"City {i}",
+               f"{rng.uniform(-90, 90):.4f}", f"{rng.uniform(-180, 180):.4f}")
+              for i in range(args.locations)]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["start", "end", "country_code", "country", "region", "city",
+                         "latitude", "longitude"])
+        for start, end in v4:
+            writer.writerow([ipaddress.IPv4Address(start), ipaddress.IPv4Address(end),
+                             *rng.choice(places)])
+        for start, end in v6:
+            # Integers, as IP2Location files have them
+            writer.writerow([start, end, *rng.choice(places)])
+    return v4, v6
+
+
+class ListDatabase:
+    """The CSV read into sorted Python lists, looked up with ``ipaddress`` and ``bisect``."""
+
+    def __init__(self, path):
+        tables = {4: [], 6: []}
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = csv.reader(f)
+            next(rows)
+            for row in rows:
+                start = int(row[0]) if row[0].isdigit() else int(ipaddress.ip_address(row[0]))
+                end = int(row[1]) if row[1].isdigit() else int(ipaddress.ip_address(row[1]))
+                version = 4 if end <= 0xFFFFFFFF else 6
+                tables[version].append((start, end, {"country": row[3], "city": row[5]}))
+        self.tables = {}
+        for version, table in tables.items():
+            table.sort(key=lambda r: r[0])
+            self.tables[version] = ([r[0] for r in table], [r[1] for r in table],
+                                    [r[2] for r in table])
+
+    def lookup(self, ip):
+        address = ipaddress.ip_address(ip)
+        starts, ends, locations = self.tables[address.version]
+        value = int(address)
+        i = bisect.bisect_right(starts, value) - 1
+        if i < 0 or value > ends[i]:
+            return None
+        return locations[i]
+
+
+def addresses(table, count, version, rng):
+    out = []
+    for _ in range(count):
+        start, end = rng.choice(table)
+        # Mostly inside a range, sometimes in the hole after one
+        value = rng.randint(start, end) if rng.random() < 0.95 else end + 1
+        out.append(str(ipaddress.ip_address(value if version == 6 else value & 0xFFFFFFFF)))
+    return out
+
+
+def timed_open(factory):
+    start = time.perf_counter()
+    database = factory()
+    seconds = time.perf_counter() - start
+    # Memory from a second, traced open: tracing slows the first down
+    tracemalloc.start()
+    traced = factory()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+    return database, seconds, memory
+
+
+def measure(lookup, ips):
+    times = []
+    found = 0
+    for ip in ips:
+        start = time.perf_counter()
+        found += lookup(ip) is not None
+        times.append(time.perf_counter() - start)
+    total = sum(times)
+    times.sort()
+    return len(ips) / total, times[len(times) // 2], times[int(len(times) * 0.99)], found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ipv4", type=int, default=500000)
+    parser.add_argument("--ipv6", type=int, default=100000)
+    parser.add_argument("--locations", type=int, default=50000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+    rng = random.Random(7)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "ranges.csv")
+        db_path = os.path.join(tmp, "geoip.bin")
+        v4, v6 = write_csv(csv_path, args, rng)
+
+        start = time.perf_counter()
+        counts = build(csv_path, db_path)
+        print(f"build: {counts['rows']} rows -> {counts['ipv4_ranges']} IPv4 + "
+              f"{counts['ipv6_ranges']} IPv6 ranges, {counts['locations']} locations in "
+              f"{time.perf_counter() - start:.1f} s; "
+              f"{os.path.getsize(db_path) / (1 << 20):.1f} MB "
+              f"(CSV {os.path.getsize(csv_path) / (1 << 20):.1f} MB)\n")
+
+        mapped, mapped_seconds, mapped_memory = timed_open(lambda: GeoIPDatabase(db_path))
+        lists, list_seconds, list_memory = timed_open(lambda: ListDatabase(csv_path))
+        # Python heap: the mapped file is page cache, shared between processes
+        print(f"{'open':<22} {'time':>10} {'heap':>10}")
+        print(f"{'GeoIPDatabase (mmap)':<22} {mapped_seconds * 1000:7.2f} ms "
+              f"{mapped_memory / (1 << 20):7.2f} MB")
+        print(f"{'CSV into lists':<22} {list_seconds * 1000:7.0f} ms "
+              f"{list_memory / (1 << 20):7.1f} MB\n")
+
+        workloads = {
+            "IPv4": addresses(v4, args.lookups, 4, rng),
+            "IPv6": addresses(v6, args.lookups, 6, rng),
+        }
+        workloads["mixed (80% IPv4)"] = [
+            rng.choice(workloads["IPv4"] if rng.random() < 0.8 else workloads["IPv6"])
+            for _ in range(args.lookups)
+        ]
+
+        for ip in workloads["mixed (80% IPv4)"][:5000]:
+            expected = lists.lookup(ip)
+            got = mapped.lookup(ip)
+            assert (got is None) == (expected is None), ip
+            assert got is None or got["city"] == expected["city"], ip
+
+        print(f"{'lookups':<36} {'per second':>12} {'p50':>9} {'p99':>9} {'found':>6}")
+        for label, ips in workloads.items():
+            for name, lookup in (("mmap", mapped.lookup), ("lists + ipaddress", lists.lookup)):
+                rate, p50, p99, found = measure(lookup, ips)
+                print(f"{label + ', ' + name:<36} {rate:12,.0f} {p50 * 1e6:6.2f} us "
+                      f"{p99 * 1e6:6.2f} us {found / len(ips):6.0%}")
+        mapped.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+"""
+Benchmark: hedged requests and latency-based model fallback.
+
+The fake model draws each request's latency from a distribution per model:
+
+- ``gemini-2.0-flash``: usually ``--base`` seconds, but ``--tail`` of the
+  requests take ``--slow`` seconds (a queue, a cold replica)
+- ``gemini-2.0-flash-lite``: a little faster and no tail
+
+Three scenarios, each run from ``--threads`` concurrent users:
+
+- **tail**: the flash model as above; ``HedgedModels`` sends a second request
+  once the first one is over the model's p90
+- **degraded**: halfway through, flash slows down for every request;
+  with ``latency_target`` the chain moves to the lite model
+- **errors**: ``--error-rate`` of the flash requests fail with a 503;
+  without a fallback those turns fail
+- **simple**: as **tail**, but every other request is a long prompt; with
+  ``simple_model`` the short ones go to the lite model first
+
+Reports latency percentiles, failed requests and the extra requests sent.
+
+Usage:
+    python benchmarks/bench_hedging.py [--requests 400] [--threads 8] [--tail 0.05]
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai import errors
+from google.genai.types import Content, Part
+
+from agentkit.fake import FakeModels, text_response
+from agentkit.hedging import HedgedModels
+
+PRIMARY = "gemini-2.0-flash"
+LITE = "gemini-2.0-flash-lite"
+
+
+class Distribution:
+    """Latency per model, with a switch to degrade the primary model."""
+
+    def __init__(self, args, scenario, seed=7):
+        self.args = args
+        self.scenario = scenario
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.degraded = False
+
+    def __call__(self, model):
+        with self.lock:
+            jitter = self.random.uniform(0.8, 1.2)
+            slow = self.random.random() < self.args.tail
+        if model == LITE:
+            return self.args.base * 0.8 * jitter
+        if self.degraded or slow:
+            return self.args.slow * jitter
+        return self.args.base * jitter
+
+
+class FlakyModels:
+    """Fails a fraction of the primary model's requests with a 503."""
+
+    def __init__(self, models, error_rate, seed=11):
+        self.models = models
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def generate_content(self, *, model, contents, config=None):
+        with self.lock:
+            self.calls += 1
+            fail = model == PRIMARY and self.random.random() < self.error_rate
+        if fail:
+            time.sleep(0.01)
+            raise errors.ServerError(503, {"error": {"message": "overloaded"}})
+        return self.models.generate_content(model=model, contents=contents, config=config)
+
+
+SHORT = [Content(role="user", parts=[Part(text="What's the weather in Tokyo?")])]
+LONG = [Content(role="user", parts=[Part(text="Plan a week in Japan around the weather: " * 8)])]
+
+
+def run(models, distribution, requests, threads):
+    """Send ``requests`` requests from ``threads`` users; return latencies and failures."""
+    latencies = []
+    failures = [0]
+
+    def one(i):
+        if i == requests // 2 and distribution.scenario == "degraded":
+            distribution.degraded = True
+        contents = LONG if distribution.scenario == "simple" and i % 2 else SHORT
+        start = time.perf_counter()
+        try:
+            models.generate_content(model=PRIMARY, contents=contents, config=None)
+        except errors.APIError:
+            failures[0] += 1
+            return
+        latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(one, range(requests)))
+    return sorted(latencies), failures[0]
+
+
+def percentile(latencies, p):
+    return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--base", type=float, default=0.05)
+    parser.add_argument("--slow", type=float, default=0.6)
+    parser.add_argument("--tail", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    print(f"{args.requests} requests from {args.threads} threads; flash {args.base * 1000:.0f} ms, "
+          f"{args.tail:.0%} at {args.slow * 1000:.0f} ms\n")
+    print(f"{'scenario':<10} {'models':<22} {'p50':>7} {'p95':>7} {'p99':>7} "
+          f"{'failed':>7} {'extra':>6}")
+    for scenario in ("tail", "degraded", "errors", "simple"):
+        for label in ("plain", "hedged + fallback"):
+            distribution = Distribution(args, scenario)
+            fake = FakeModels(lambda contents, config: text_response("Sunny"), latency=distribution)
+            models = fake
+            if scenario == "errors":
+                models = FlakyModels(fake, args.error_rate)
+            hedged = None
+            if label != "plain":
+                hedged = models = HedgedModels(
+                    models,
+                    fallbacks=[LITE],
+                    hedge_percentile=0.9,
+                    latency_target=args.base * 4,
+                    initial_delay=args.base * 3,
+                    max_workers=args.threads * 2,
+                    simple_model=LITE if scenario == "simple" else None,
+                )
+            latencies, failed = run(models, distribution, args.requests, args.threads)
+            extra = (models.models if hedged else models).calls / args.requests - 1
+            print(f"{scenario:<10} {label:<22} {percentile(latencies, 0.5) * 1000:4.0f} ms "
+                  f"{percentile(latencies, 0.95) * 1000:4.0f} ms "
+                  f"{percentile(latencies, 0.99) * 1000:4.0f} ms {failed:7d} {extra:6.0%}")
+            if hedged is not None:
+                print(f"{'':<10} {hedged.summary()}")
+                hedged.shutdown()
+
+
+if __name__ == "__main__":
+    main()
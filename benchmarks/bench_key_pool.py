@@ -0,0 +1,127 @@
+"""
+Benchmark: spreading requests over a pool of API keys.
+
+Each fake key has its own rate limit (a token bucket of ``--rate`` requests
+per second) and answers a 429 with a ``retryDelay`` once the bucket is empty,
+like the Gemini API. One of the keys is slower than the others (a project in a
+busier region). ``--threads`` users send requests for ``--seconds``, backing
+off for 100 ms when they get a 429.
+
+Compares one key with a pool of ``--keys`` keys, round robin and least
+loaded, by successful requests per second, 429s seen by the users and p95
+latency.
+
+Usage:
+    python benchmarks/bench_key_pool.py [--keys 4] [--rate 60] [--threads 16] [--seconds 3]
+"""
+
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai import errors
+from google.genai.types import Content, Part
+
+from agentkit.fake import FakeModels, text_response
+from agentkit.key_pool import KeyPoolModels, key_label
+
+
+class RateLimitedKey:
+    """A fake API key: ``rate`` requests per second, then 429s."""
+
+    def __init__(self, rate, latency):
+        self.rate = rate
+        self.models = FakeModels(lambda contents, config: text_response("Sunny"), latency=latency)
+        self.tokens = float(rate) / 4
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def generate_content(self, *, model, contents, config=None):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate / 4, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            allowed = self.tokens >= 1
+            if allowed:
+                self.tokens -= 1
+        if not allowed:
+            raise errors.ClientError(
+                429,
+                {
+                    "error": {
+                        "code": 429,
+                        "status": "RESOURCE_EXHAUSTED",
+                        "details": [{"@type": "RetryInfo", "retryDelay": "0.25s"}],
+                    }
+                },
+            )
+        return self.models.generate_content(model=model, contents=contents, config=config)
+
+
+def run(models, threads, seconds):
+    contents = [Content(role="user", parts=[Part(text="What's the weather in Tokyo?")])]
+    latencies = []
+    rate_limited = [0]
+    deadline = time.monotonic() + seconds
+
+    def user():
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                models.generate_content(model="gemini-2.0-flash", contents=contents)
+            except errors.APIError as e:
+                assert e.code == 429
+                rate_limited[0] += 1
+                time.sleep(0.1)
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(threads):
+            pool.submit(user)
+    latencies.sort()
+    p95 = latencies[int(0.95 * len(latencies))] if latencies else 0.0
+    return len(latencies) / seconds, rate_limited[0], p95
+
+
+def fake_keys(args):
+    # The last key is slower than the others
+    return [
+        RateLimitedKey(args.rate, args.latency * (4 if i == args.keys - 1 else 1))
+        for i in range(args.keys)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--keys", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=60)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    print(f"{args.threads} users for {args.seconds:.0f}s; each key allows {args.rate:.0f} req/s, "
+          f"{args.latency * 1000:.0f} ms per request (last key x4)\n")
+    print(f"{'setup':<26} {'ok req/s':>9} {'429s':>6} {'p95':>8}")
+    single = fake_keys(args)[0]
+    throughput, limited, p95 = run(single, args.threads, args.seconds)
+    print(f"{'one key':<26} {throughput:9.1f} {limited:6d} {p95 * 1000:5.0f} ms")
+
+    for strategy in ("round-robin", "least-loaded"):
+        keys = fake_keys(args)
+        pool = KeyPoolModels(
+            [(key_label(i, f"fake-key-{i}"), key) for i, key in enumerate(keys)],
+            strategy=strategy,
+        )
+        throughput, limited, p95 = run(pool, args.threads, args.seconds)
+        label = f"{args.keys} keys, {strategy}"
+        print(f"{label:<26} {throughput:9.1f} {limited:6d} {p95 * 1000:5.0f} ms")
+        for stats in pool.key_stats():
+            print(f"{'':<4}{stats['key']:<18} {stats['requests']:5d} requests "
+                  f"{stats['rate_limited']:4d} x 429  rpm {stats['rpm']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Benchmark: orchestrated CodeAgent workers vs the single-agent loop.
+
+A scripted fake model builds a small Flask app (one file per tool call, with
+``--latency`` seconds per model call). The single agent writes the files one
+round trip after another in one conversation; the orchestrator spends one
+call on the plan and then runs a worker per file concurrently. Both use the
+real ``CodeAgent`` tools and write into a temporary directory.
+
+Usage:
+    python benchmarks/bench_orchestrator.py [--latency 0.3] [--workers 6]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from google.genai.types import FunctionCall
+
+CODE_AGENT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "extra-for-experts",
+    "code-agent",
+    "solution",
+)
+sys.path.insert(0, CODE_AGENT_DIR)
+
+from code_agent import CodeAgent  # noqa: E402
+
+from agentkit.fake import FakeModels, function_call_response, text_response  # noqa: E402
+from agentkit.loop import chain_turn  # noqa: E402
+from agentkit.orchestrator import PLANNER_PROMPT, Orchestrator  # noqa: E402
+from agentkit.transport import LazyModels  # noqa: E402
+
+TASK = "Create a Flask app with a home page and an about page, sharing a base template and a stylesheet"
+
+FILES = {
+    "app.py": "from flask import Flask, render_template\n\napp = Flask(__name__)\n",
+    "templates/base.html": "<html><body>{% block content %}{% endblock %}</body></html>\n",
+    "templates/index.html": "{% extends 'base.html' %}{% block content %}Home{% endblock %}\n",
+    "templates/about.html": "{% extends 'base.html' %}{% block content %}About{% endblock %}\n",
+    "static/style.css": "body { font-family: sans-serif; }\n",
+    "requirements.txt": "flask\n",
+}
+
+PLAN = {
+    "subtasks": [
+        {"title": f"Write {path}", "instructions": f"Create {path} for the app", "files": [path]}
+        for path in FILES
+    ]
+}
+
+
+def write_call(path):
+    return function_call_response(
+        FunctionCall(name="write_file", args={"file_path": path, "content": FILES[path]})
+    )
+
+
+def responder(contents, config):
+    """Plans when asked to, otherwise writes the files the prompt is about, one per call."""
+    if config is not None and config.system_instruction == PLANNER_PROMPT:
+        return text_response(json.dumps(PLAN))
+
+    prompt = next(c.parts[0].text for c in contents if c.role == "user" and c.parts[0].text)
+    written = sum(1 for c in contents if c.parts[0].function_response is not None)
+    if "Only create or modify these files:" in prompt:
+        todo = [prompt.rsplit(": ", 1)[1].strip()]
+    else:
+        todo = list(FILES)
+    if written < len(todo):
+        return write_call(todo[written])
+    return text_response(f"Created {', '.join(todo)}.")
+
+
+def check_files(root):
+    for path, content in FILES.items():
+        with open(os.path.join(root, path)) as file:
+            assert file.read() == content, path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--workers", type=int, default=len(FILES))
+    args = parser.parse_args()
+
+    agent = CodeAgent(api_key="unused")
+    write_args = {
+        name: tool["writes"] for name, tool in agent.tools.items() if "writes" in tool
+    }
+    cwd = os.getcwd()
+    print(f"{len(FILES)} files, {args.latency * 1000:.0f} ms per model call\n")
+
+    for label in ("single agent", "orchestrated"):
+        fake = FakeModels(responder, latency=args.latency)
+        models = LazyModels(lambda: fake)
+        with tempfile.TemporaryDirectory() as root:
+            os.chdir(root)
+            try:
+                start = time.perf_counter()
+                if label == "single agent":
+                    for _ in chain_turn(
+                        models, agent.model_name, [], agent.config, TASK,
+                        agent.process_function_call,
+                    ):
+                        pass
+                else:
+                    orchestrator = Orchestrator(
+                        models, agent.model_name, agent.config,
+                        agent.process_function_call, write_args, max_workers=args.workers,
+                    )
+                    outcome = orchestrator.run(TASK)
+                    assert not outcome.conflicts
+                elapsed = time.perf_counter() - start
+                check_files(root)
+            finally:
+                os.chdir(cwd)
+        print(f"{label:<14} {elapsed * 1000:6.0f} ms  {fake.calls:2d} model calls")
+
+    agent.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark: starting function calls while the response is still streaming.
+
+A fake streaming model answers multi-city weather prompts the way Gemini
+often does, with function calls interleaved with text ("Let me check Tokyo"
+-> call -> "and Sydney" -> call -> ...). Each part takes ``--part-latency``
+seconds to generate after ``--latency`` to the first one, and every tool call
+takes ``--tool-latency`` seconds (a weather API request).
+
+The module3 loop waits for the whole response and then runs the calls one by
+one; with ``ToolPipeline`` each call starts when its chunk arrives and runs
+alongside the rest of the stream and the other calls.
+
+Usage:
+    python benchmarks/bench_pipelining.py [--latency 0.3] [--part-latency 0.1] [--tool-latency 0.15]
+"""
+
+import argparse
+import time
+
+from google.genai.types import Content, FunctionCall, Part
+from scenarios import CITIES, add_function_result, process_function_call, weather_config
+
+from agentkit.fake import FakeModels, parts_response, text_response
+from agentkit.pipelining import ToolPipeline
+from agentkit.transport import LazyModels
+
+PROMPTS = [
+    "Compare the weather in Tokyo and Sydney",
+    "What's the weather in Auckland, Wellington and London?",
+    "Is it warmer in London or Tokyo?",
+]
+
+
+def streaming_model(contents, config):
+    """Interleaves a sentence of text with each get_weather call, then answers."""
+    if contents[-1].parts[0].function_response is not None:
+        return text_response("Here is the weather you asked for.")
+    prompt = contents[-1].parts[0].text.lower()
+    parts = []
+    for city in [city for city in CITIES if city in prompt]:
+        parts.append(Part(text=f"Let me check {city.title()}. "))
+        parts.append(Part(function_call=FunctionCall(name="get_weather", args={"location": city})))
+    parts.append(Part(text="I'll compare them once the results are in."))
+    return parts_response(*parts)
+
+
+def slow_tool(tool_latency):
+    def dispatch(function_call):
+        time.sleep(tool_latency)
+        return process_function_call(function_call)
+
+    return dispatch
+
+
+def sequential_turn(models, contents, config, prompt, dispatch):
+    """The module3 loop: whole response first, then the calls in order."""
+    contents.append(Content(role="user", parts=[Part(text=prompt)]))
+    while True:
+        response = models.generate_content(
+            model="gemini-2.0-flash", contents=contents, config=config
+        )
+        if not response.function_calls:
+            return response.text
+        for function_call in response.function_calls:
+            add_function_result(contents, function_call, dispatch(function_call))
+
+
+def pipelined_turn(models, contents, config, prompt, pipeline):
+    """The module3 loop with AGENT_PIPELINE_TOOLS=1."""
+    contents.append(Content(role="user", parts=[Part(text=prompt)]))
+    while True:
+        response, pending = pipeline.generate_content(
+            models, model="gemini-2.0-flash", contents=contents, config=config
+        )
+        if not response.function_calls:
+            return response.text
+        for function_call, future in zip(response.function_calls, pending):
+            add_function_result(contents, function_call, future.result())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--part-latency", type=float, default=0.1)
+    parser.add_argument("--tool-latency", type=float, default=0.15)
+    args = parser.parse_args()
+
+    fake = FakeModels(streaming_model, latency=args.latency, part_latency=args.part_latency)
+    models = LazyModels(lambda: fake)
+    config = weather_config()
+    dispatch = slow_tool(args.tool_latency)
+    pipeline = ToolPipeline(dispatch)
+
+    print(f"first part {args.latency * 1000:.0f} ms, then {args.part_latency * 1000:.0f} ms "
+          f"per part; tools {args.tool_latency * 1000:.0f} ms\n")
+    print(f"{'prompt':<56} {'sequential':>11} {'pipelined':>10} {'saved':>7}")
+    totals = [0.0, 0.0]
+    for prompt in PROMPTS:
+        histories = ([], [])
+        start = time.perf_counter()
+        expected = sequential_turn(models, histories[0], config, prompt, dispatch)
+        sequential = time.perf_counter() - start
+
+        start = time.perf_counter()
+        answer = pipelined_turn(models, histories[1], config, prompt, pipeline)
+        pipelined = time.perf_counter() - start
+
+        assert answer == expected
+        assert [c.model_dump() for c in histories[0]] == [c.model_dump() for c in histories[1]]
+        totals[0] += sequential
+        totals[1] += pipelined
+        print(f"{prompt:<56} {sequential * 1000:8.0f} ms {pipelined * 1000:7.0f} ms "
+              f"{1 - pipelined / sequential:6.0%}")
+
+    print(f"{'per turn (mean)':<56} {totals[0] / len(PROMPTS) * 1000:8.0f} ms "
+          f"{totals[1] / len(PROMPTS) * 1000:7.0f} ms {1 - totals[1] / totals[0]:6.0%}")
+    print(f"\npipeline: {pipeline.summary()}")
+    pipeline.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: per-request serialization CPU time, full re-encode vs PrefixEncoder.
+
+Simulates a chaining loop where each request appends one new message to a
+history of 50, 500 and 5000 messages, and times only the encoding step.
+
+Usage:
+    python benchmarks/bench_prefix_encoder.py [--requests 20]
+"""
+
+import argparse
+import json
+import time
+
+from google.genai.types import GenerateContentConfig, Tool
+
+from bench_session_store import make_turn
+
+from agentkit.transport import PrefixEncoder, encode_config
+
+CONFIG = GenerateContentConfig(
+    system_instruction="You are a helpful weather assistant.",
+    tools=[
+        Tool(
+            function_declarations=[
+                {
+                    "name": "get_weather",
+                    "description": "Gets the current weather for a location",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {"location": {"type": "string"}},
+                        "required": ["location"],
+                    },
+                }
+            ]
+        )
+    ],
+)
+
+
+def full_encode(contents, config):
+    """What happens today: every message is dumped again for every request."""
+    body = {
+        "contents": [
+            c.model_dump(mode="json", exclude_none=True, by_alias=True) for c in contents
+        ]
+    }
+    return json.dumps(body).encode("utf-8") + encode_config(config)
+
+
+def run(size, requests):
+    messages = [m for i in range(size // 4 + requests) for m in make_turn(i)]
+    base, extra = messages[:size], messages[size : size + requests]
+
+    contents = list(base)
+    start = time.perf_counter()
+    for message in extra:
+        contents.append(message)
+        full_encode(contents, CONFIG)
+    full = (time.perf_counter() - start) / requests
+
+    encoder = PrefixEncoder()
+    contents = list(base)
+    encoder.encode(contents, CONFIG)  # first request pays for the whole prefix
+    start = time.perf_counter()
+    for message in extra:
+        contents.append(message)
+        encoder.encode(contents, CONFIG)
+    incremental = (time.perf_counter() - start) / requests
+
+    print(f"{size:>5} messages: full {full * 1000:8.2f} ms/request, "
+          f"incremental {incremental * 1000:6.2f} ms/request "
+          f"({full / incremental:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=20)
+    args = parser.parse_args()
+
+    for size in (50, 500, 5000):
+        run(size, args.requests)
+
+
+if __name__ == "__main__":
+    main()
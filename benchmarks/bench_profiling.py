@@ -0,0 +1,79 @@
+"""
+Benchmark: cost of the ``--profile`` session mode.
+
+Runs the module3 scenario prompts on the fake model without profiling, with
+cProfile only, and with cProfile plus tracemalloc snapshots every
+``--every`` turns, the way ``profiled_input`` drives ``SessionProfiler``.
+Reports time per turn and checks that the collapsed stacks account for the
+profiled time.
+
+Usage:
+    python benchmarks/bench_profiling.py [--turns 40] [--every 10]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import pstats
+import tempfile
+import time
+
+from scenarios import PROMPTS, run_turn, weather_config, weather_model
+
+from agentkit.fake import FakeModels
+from agentkit.profiling import SessionProfiler, collapsed_stacks
+
+
+def session(turns, profiler=None):
+    models = FakeModels(weather_model)
+    config = weather_config()
+    contents = []
+    start = time.perf_counter()
+    for i in range(turns):
+        if profiler is not None:
+            profiler.resume()
+        run_turn(models, contents, config, PROMPTS[i % len(PROMPTS)])
+        if profiler is not None:
+            profiler.end_turn(contents)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--every", type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = session(args.turns)
+    print(f"{args.turns} turns, tracemalloc snapshot every {args.every}\n")
+    print(f"{'no profiling':<28} {baseline / args.turns * 1000:7.2f} ms per turn")
+
+    with tempfile.TemporaryDirectory() as root:
+        # Never started, so no tracemalloc; snapshots are never due
+        cprofile_only = SessionProfiler(os.path.join(root, "cprofile"), snapshot_every=10**9)
+        elapsed = session(args.turns, cprofile_only)
+        print(f"{'cProfile':<28} {elapsed / args.turns * 1000:7.2f} ms per turn "
+              f"({elapsed / baseline:.1f}x)")
+
+        output = os.path.join(root, "full")
+        profiler = SessionProfiler(output, snapshot_every=args.every)
+        profiler.start()
+        elapsed = session(args.turns, profiler)
+        with contextlib.redirect_stdout(io.StringIO()):
+            profiler.stop()
+        print(f"{'cProfile + tracemalloc':<28} {elapsed / args.turns * 1000:7.2f} ms per turn "
+              f"({elapsed / baseline:.1f}x)")
+
+        stats = pstats.Stats(os.path.join(output, "profile.pstats"))
+        stacks = collapsed_stacks(stats, min_us=0)
+        profiled_us = sum(entry[2] for entry in stats.stats.values()) * 1e6
+        print(f"\ncollapsed stacks: {len(stacks)} stacks, "
+              f"{sum(stacks.values()) / profiled_us:.0%} of the profiled self time")
+        with open(os.path.join(output, "allocations.txt")) as file:
+            reports = file.read().count("== turn")
+        print(f"allocation reports: {reports}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Benchmark: share of module3 traffic answered by the fast-path router and the
+latency it saves.
+
+Mixes the chained module3 prompts with plain conversions and single-city
+lookups, sends the traffic through the router (rules only, then rules plus
+classifier) and falls back to the chaining loop on a fake model with
+simulated latency for everything else.
+
+Usage:
+    python benchmarks/bench_router.py [--model-latency 0.2]
+"""
+
+import argparse
+import time
+
+from scenarios import PROMPTS, process_function_call, run_turn, weather_config, weather_model
+
+from agentkit.fake import FakeModels
+from agentkit.router import (
+    WEATHER_INTENT_EXAMPLES,
+    WEATHER_ROUTES,
+    FastPathRouter,
+    IntentClassifier,
+)
+
+SIMPLE_PROMPTS = [
+    "Convert 30 celsius to fahrenheit",
+    "what is 86°F in C?",
+    "100 f to c please",
+    "What's the weather in Tokyo?",
+    "weather in Wellington",
+    "can you check the current weather conditions in London",
+    "I need 25 c in fahrenheit for my recipe",
+]
+
+TRAFFIC = SIMPLE_PROMPTS + PROMPTS
+
+
+def run(label, models, router=None):
+    config = weather_config()
+    calls_before = models.calls
+    start = time.perf_counter()
+    for prompt in TRAFFIC:
+        if router is not None and router.route(prompt) is not None:
+            continue
+        run_turn(models, [], config, prompt)
+    elapsed = time.perf_counter() - start
+
+    line = f"{label:<22} {elapsed * 1000:7.0f} ms  {models.calls - calls_before:3} model calls"
+    if router is not None:
+        stats = router.stats()
+        line += f"  routed {stats['routed_fraction']:.0%} ({stats['route_ms']:.2f} ms in router)"
+    print(line)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    models = FakeModels(weather_model, latency=args.model_latency)
+    print(f"{len(TRAFFIC)} prompts, {args.model_latency * 1000:.0f} ms per model call\n")
+
+    base = run("model only", models)
+    rules = run(
+        "rules", models, FastPathRouter(WEATHER_ROUTES, process_function_call)
+    )
+    classifier = run(
+        "rules + classifier",
+        models,
+        FastPathRouter(
+            WEATHER_ROUTES,
+            process_function_call,
+            classifier=IntentClassifier(WEATHER_INTENT_EXAMPLES),
+        ),
+    )
+
+    print(f"\nlatency saved: rules {(base - rules) * 1000:.0f} ms, "
+          f"rules + classifier {(base - classifier) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
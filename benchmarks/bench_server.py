@@ -0,0 +1,119 @@
+"""
+Load generator for the HTTP/SSE agent server.
+
+Starts ``AgentServer`` in-process with the module3 weather agent on a fake
+model, then drives it with concurrent clients. Each client opens a session and
+sends a series of messages, reading every SSE stream to the ``done`` event.
+Reports requests/sec and latency percentiles.
+
+With ``--memory-budget-kb`` the server keeps histories in a temporary
+``SessionManager`` directory under that budget, and the run reports how many
+sessions were evicted to disk and rehydrated.
+
+Usage:
+    python benchmarks/bench_server.py [--clients 50] [--messages 5] [--model-latency 0.05]
+                                      [--memory-budget-kb 64]
+"""
+
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+
+from scenarios import PROMPTS, process_function_call, weather_config, weather_model
+
+from agentkit.agents import AgentSpec
+from agentkit.fake import FakeModels
+from agentkit.server import AgentServer
+from agentkit.session_manager import SessionManager
+
+
+async def request(port, method, path, body=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+        f"Content-Length: {len(payload)}\r\n\r\n".encode("latin-1")
+        + payload
+    )
+    await writer.drain()
+    data = await reader.read()
+    writer.close()
+    head, _, body = data.partition(b"\r\n\r\n")
+    return int(head.split(b" ")[1]), body
+
+
+async def client(port, messages, latencies, failures):
+    status, body = await request(port, "POST", "/v1/weather/sessions")
+    if status != 201:
+        failures.append(status)
+        return
+    session_id = json.loads(body)["session_id"]
+    for i in range(messages):
+        start = time.perf_counter()
+        status, body = await request(
+            port,
+            "POST",
+            f"/v1/weather/sessions/{session_id}/messages",
+            {"message": PROMPTS[i % len(PROMPTS)]},
+        )
+        if status != 200 or b"event: done" not in body:
+            failures.append(status)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+async def run(args):
+    models = FakeModels(weather_model, latency=args.model_latency)
+    agents = {"weather": AgentSpec("weather", weather_config(), process_function_call)}
+    session_manager = None
+    if args.memory_budget_kb:
+        session_manager = SessionManager(
+            tempfile.mkdtemp(prefix="bench-sessions-"),
+            memory_budget_bytes=int(args.memory_budget_kb * 1024),
+        )
+    server = AgentServer(
+        models,
+        agents,
+        max_concurrent_turns=args.workers,
+        queue_timeout=60.0,
+        session_manager=session_manager,
+    )
+    port = await server.start(port=0)
+
+    latencies, failures = [], []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[client(port, args.messages, latencies, failures) for _ in range(args.clients)]
+    )
+    elapsed = time.perf_counter() - start
+    stats = server.stats()
+    await server.close()
+
+    print(f"{args.clients} clients x {args.messages} messages, "
+          f"{args.workers} workers, {args.model_latency * 1000:.0f} ms per model call")
+    print(f"throughput: {len(latencies) / elapsed:,.1f} requests/s "
+          f"({models.calls} model calls in {elapsed:.2f}s)")
+    print(f"latency:    p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    print(f"failures:   {len(failures)}; server metrics: {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=32)
+    parser.add_argument("--model-latency", type=float, default=0.05)
+    parser.add_argument("--memory-budget-kb", type=float, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
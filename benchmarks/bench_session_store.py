@@ -0,0 +1,91 @@
+"""
+Benchmark: SessionStore append throughput and resume time.
+
+Writes a 10k-turn session (user text, model function call, function response,
+model text per turn) and then measures how long it takes to load it back.
+
+Usage:
+    python benchmarks/bench_session_store.py [--turns 10000]
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from google.genai.types import Content, FunctionCall, Part
+
+from agentkit.session_store import SessionStore
+
+
+def make_turn(i: int):
+    """Build the four messages of one function-calling turn."""
+    return [
+        Content(role="user", parts=[Part(text=f"What's the weather in city {i}?")]),
+        Content(
+            role="model",
+            parts=[
+                Part(
+                    function_call=FunctionCall(
+                        name="get_weather", args={"location": f"city {i}"}
+                    )
+                )
+            ],
+        ),
+        Content(
+            role="user",
+            parts=[
+                Part.from_function_response(
+                    name="get_weather",
+                    response={"result": {"temperature": 20, "unit": "celsius"}},
+                )
+            ],
+        ),
+        Content(role="model", parts=[Part(text=f"It is 20°C in city {i}.")]),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=10_000)
+    parser.add_argument("--snapshot-every", type=int, default=1000)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="session-bench-")
+    try:
+        messages = [m for i in range(args.turns) for m in make_turn(i)]
+
+        store = SessionStore(
+            "bench", directory=directory, snapshot_every=args.snapshot_every
+        )
+        start = time.perf_counter()
+        for message in messages:
+            store.append(message)
+        store.close()
+        elapsed = time.perf_counter() - start
+        print(
+            f"append:  {len(messages)} messages in {elapsed:.2f}s "
+            f"({len(messages) / elapsed:,.0f} appends/s)"
+        )
+
+        log_size = os.path.getsize(store.log_path)
+        snapshot_size = os.path.getsize(store.snapshot_path)
+        print(f"on disk: snapshot {snapshot_size:,} B, log tail {log_size:,} B")
+
+        start = time.perf_counter()
+        records = SessionStore("bench", directory=directory).load_records()
+        raw = time.perf_counter() - start
+
+        start = time.perf_counter()
+        loaded = SessionStore("bench", directory=directory).load()
+        full = time.perf_counter() - start
+
+        assert len(records) == len(loaded) == len(messages)
+        print(f"resume:  {raw * 1000:.1f} ms (records), {full * 1000:.1f} ms (Content)")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
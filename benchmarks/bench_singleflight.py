@@ -0,0 +1,128 @@
+"""
+Benchmark: coalescing identical tool calls across concurrent sessions.
+
+``--sessions`` sessions ask for the weather at the same moment, each for one
+of a handful of cities, ``--rounds`` times. The weather backend takes
+``--tool-latency`` seconds per request and serves ``--backend-concurrency``
+requests at a time. Without coalescing every session runs its own request;
+with ``CoalescingDispatch`` the sessions asking for the same city share one.
+
+Run with worker threads (the server's turns) and with asyncio tasks calling
+an async tool through ``acall``. Reports backend requests and wall time.
+
+Usage:
+    python benchmarks/bench_singleflight.py [--sessions 64] [--rounds 10] [--tool-latency 0.05]
+"""
+
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai.types import FunctionCall
+from scenarios import CITIES
+
+from agentkit.singleflight import CoalescingDispatch, SingleFlight
+
+
+class Backend:
+    """Counts requests; answers after ``latency`` seconds, ``concurrency`` at a time."""
+
+    def __init__(self, latency, concurrency):
+        self.latency = latency
+        self.concurrency = concurrency
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.slots = threading.Semaphore(concurrency)
+        self.async_slots = None
+
+    def _count(self):
+        with self.lock:
+            self.requests += 1
+
+    def dispatch(self, function_call):
+        self._count()
+        with self.slots:
+            time.sleep(self.latency)
+        return {"location": function_call.args["location"], "temperature": 18}
+
+    async def adispatch(self, function_call):
+        self._count()
+        if self.async_slots is None:
+            self.async_slots = asyncio.Semaphore(self.concurrency)
+        async with self.async_slots:
+            await asyncio.sleep(self.latency)
+        return {"location": function_call.args["location"], "temperature": 18}
+
+
+def calls(args):
+    """One burst: session i asks for city i mod len(CITIES)."""
+    return [
+        FunctionCall(name="get_weather", args={"location": CITIES[i % len(CITIES)]})
+        for i in range(args.sessions)
+    ]
+
+
+def threaded(dispatch, args):
+    burst = calls(args)
+    barrier = threading.Barrier(args.sessions)
+
+    def session(function_call):
+        for _ in range(args.rounds):
+            barrier.wait()
+            assert dispatch(function_call)["location"] == function_call.args["location"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(session, burst))
+    return time.perf_counter() - start
+
+
+def with_asyncio(dispatch, args):
+    async def main():
+        start = time.perf_counter()
+        for _ in range(args.rounds):
+            results = await asyncio.gather(*(dispatch(call) for call in calls(args)))
+            assert len(results) == args.sessions
+        return time.perf_counter() - start
+
+    return asyncio.run(main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--tool-latency", type=float, default=0.05)
+    parser.add_argument("--backend-concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    total = args.sessions * args.rounds
+    print(f"{args.sessions} sessions x {args.rounds} bursts over {len(CITIES)} cities, "
+          f"{args.tool_latency * 1000:.0f} ms per backend request, "
+          f"{args.backend_concurrency} at a time\n")
+    print(f"{'executor':<10} {'dispatch':<12} {'backend requests':>17} {'wall time':>10}")
+    for executor in ("threads", "asyncio"):
+        for label in ("plain", "coalesced"):
+            backend = Backend(args.tool_latency, args.backend_concurrency)
+            flight = SingleFlight()
+            if executor == "threads":
+                dispatch = backend.dispatch
+                if label == "coalesced":
+                    dispatch = CoalescingDispatch(dispatch, flight, ["get_weather"])
+                elapsed = threaded(dispatch, args)
+            else:
+                dispatch = backend.adispatch
+                if label == "coalesced":
+                    dispatch = CoalescingDispatch(dispatch, flight, ["get_weather"]).acall
+                elapsed = with_asyncio(dispatch, args)
+            print(f"{executor:<10} {label:<12} {backend.requests:10d} / {total:<5d} "
+                  f"{elapsed * 1000:7.0f} ms")
+            if label == "coalesced":
+                assert flight.metrics["executions"] == backend.requests
+                print(f"{'':<10} {flight.stats()}")
+
+
+if __name__ == "__main__":
+    main()
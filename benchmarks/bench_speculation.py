@@ -0,0 +1,74 @@
+"""
+Benchmark: round trips and wall-clock saved by speculative tool execution.
+
+Runs the module3 prompts through the chaining loop on a fake model with
+simulated network latency, without speculation, in prefetch mode and in
+attach mode. Tools get a simulated latency too, since prefetching only hides
+tool time.
+
+Usage:
+    python benchmarks/bench_speculation.py [--model-latency 0.2] [--tool-latency 0.05]
+"""
+
+import argparse
+import time
+
+from scenarios import PROMPTS, process_function_call, run_turn, weather_config, weather_model
+
+from agentkit.fake import FakeModels
+from agentkit.speculation import WEATHER_RULES, Rule, SpeculativeExecutor
+
+
+def slow_dispatch(latency):
+    def dispatch(function_call):
+        time.sleep(latency)
+        return process_function_call(function_call)
+
+    return dispatch
+
+
+def fresh_rules():
+    return [Rule(rule.name, rule.calls, after=rule.after) for rule in WEATHER_RULES]
+
+
+def run(label, models, dispatch, mode=None):
+    speculator = SpeculativeExecutor(dispatch, fresh_rules(), mode=mode) if mode else None
+    config = weather_config()
+    print(f"\n{label}")
+    totals = [0, 0.0]
+    for prompt in PROMPTS:
+        contents = []
+        start = time.perf_counter()
+        _, trips = run_turn(
+            models, contents, config, prompt, dispatch=dispatch, speculator=speculator
+        )
+        elapsed = time.perf_counter() - start
+        totals[0] += trips
+        totals[1] += elapsed
+        print(f"  {prompt:<45} {trips} round trips  {elapsed * 1000:6.0f} ms")
+    print(f"  {'total':<45} {totals[0]} round trips  {totals[1] * 1000:6.0f} ms")
+    if speculator is not None:
+        speculator.close()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model-latency", type=float, default=0.2)
+    parser.add_argument("--tool-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    models = FakeModels(weather_model, latency=args.model_latency)
+    dispatch = slow_dispatch(args.tool_latency)
+
+    base = run("no speculation", models, dispatch)
+    prefetch = run("prefetch", models, dispatch, mode="prefetch")
+    attach = run("attach", models, dispatch, mode="attach")
+
+    for label, totals in (("prefetch", prefetch), ("attach", attach)):
+        print(f"\n{label}: {base[0] - totals[0]} round trips and "
+              f"{(base[1] - totals[1]) * 1000:.0f} ms saved over {len(PROMPTS)} queries")
+
+
+if __name__ == "__main__":
+    main()
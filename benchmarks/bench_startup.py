@@ -0,0 +1,73 @@
+"""
+Cold-start budget check for the agent entry points.
+
+Starts every entry point several times, stopping each run where it would wait
+for input (the same mechanism as ``--profile-startup``), and reports the
+median time to prompt. Exits with status 1 if any entry point is over
+``--budget-ms`` or imports the Gemini SDK during start-up, so it can be run
+as a regression check before shipping start-up changes.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--budget-ms 300]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+
+from agentkit.startup import DEFERRED_MODULES, measure_startup
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = [
+    "src/main.py",
+    "workshop/module1/solution/main.py",
+    "workshop/module2/solution/main.py",
+    "workshop/module3/solution/main.py",
+    "extra-for-experts/code-agent/solution/code_agent.py",
+]
+
+
+def check(path, runs, budget_ms):
+    script = os.path.join(REPO_ROOT, path)
+    # Entry points import their tool modules relative to their own directory
+    cwd = os.getcwd()
+    os.chdir(os.path.dirname(script))
+    try:
+        profiles = [measure_startup(script) for _ in range(runs)]
+    finally:
+        os.chdir(cwd)
+
+    failures = []
+    if any(profile["returncode"] != 0 for profile in profiles):
+        failures.append("exited with an error:\n" + profiles[-1]["stderr"])
+    loaded = {entry[0] for entry in profiles[-1]["imports"]}
+    eager = [module for module in DEFERRED_MODULES if module in loaded]
+    if eager:
+        failures.append(f"imports {', '.join(eager)} during start-up")
+
+    median = statistics.median(profile["wall_ms"] for profile in profiles)
+    if median > budget_ms:
+        failures.append(f"median {median:.0f} ms is over the {budget_ms:.0f} ms budget")
+
+    status = "ok  " if not failures else "FAIL"
+    print(f"{status} {median:6.0f} ms  {path}")
+    for failure in failures:
+        print(f"       {failure}")
+    return not failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=300.0)
+    args = parser.parse_args()
+
+    print(f"Median time to prompt over {args.runs} runs (budget {args.budget_ms:.0f} ms)\n")
+    results = [check(path, args.runs, args.budget_ms) for path in ENTRY_POINTS]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark: CPU-bound CodeAgent tools inline vs in the process pool.
+
+Builds a synthetic source tree, then runs concurrent ``search_files`` and
+``hash_tree`` calls the way concurrent sessions on the server would: from
+several threads at once. Inline, the calls serialize on the GIL and a
+heartbeat thread (standing in for the event loop) stalls; in the pool they
+run in parallel and the heartbeat keeps ticking.
+
+Usage:
+    python benchmarks/bench_tool_pool.py [--files 2000] [--calls 8] [--workers 4]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CODE_AGENT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "extra-for-experts",
+    "code-agent",
+    "solution",
+)
+sys.path.insert(0, CODE_AGENT_DIR)
+
+from file_operations import hash_tree, search_files  # noqa: E402
+
+from agentkit.tool_pool import ToolProcessPool  # noqa: E402
+
+
+def build_tree(root, files):
+    line = "def handler_{i}(request):  # TODO: validate input {i}\n"
+    for i in range(files):
+        directory = os.path.join(root, f"pkg{i % 20}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"module{i}.py"), "w") as file:
+            file.write("".join(line.format(i=i * 100 + j) for j in range(100)))
+
+
+class Heartbeat(threading.Thread):
+    """Ticks every millisecond and records the longest gap between ticks."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.max_gap = 0.0
+        self.running = True
+
+    def run(self):
+        last = time.perf_counter()
+        while self.running:
+            time.sleep(0.001)
+            now = time.perf_counter()
+            self.max_gap = max(self.max_gap, now - last)
+            last = now
+
+
+def run(label, call, root, calls):
+    jobs = [
+        (search_files, {"pattern": r"handler_\d+5\(", "directory": root, "max_matches": 100000}),
+        (hash_tree, {"directory": root}),
+    ] * (calls // 2)
+    heartbeat = Heartbeat()
+    heartbeat.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(jobs)) as threads:
+        results = list(threads.map(lambda job: call(job[0], **job[1]), jobs))
+    elapsed = time.perf_counter() - start
+    heartbeat.running = False
+    heartbeat.join()
+    print(f"{label:<8} {elapsed * 1000:7.0f} ms for {len(jobs)} calls, "
+          f"longest heartbeat stall {heartbeat.max_gap * 1000:5.0f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_tree(root, args.files)
+        print(f"{args.files} files, {args.calls} concurrent calls, {args.workers} workers\n")
+
+        inline = run("inline", lambda func, **kwargs: func(**kwargs), root, args.calls)
+
+        start = time.perf_counter()
+        pool = ToolProcessPool(max_workers=args.workers, preload=("file_operations",))
+        pool.wait_ready()
+        print(f"warm start: {(time.perf_counter() - start) * 1000:.0f} ms")
+        pooled = run("pool", pool.run, root, args.calls)
+        pool.shutdown()
+
+        assert pooled == inline
+        print(f"pool metrics: {pool.metrics}")
+
+
+if __name__ == "__main__":
+    main()
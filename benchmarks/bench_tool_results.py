@@ -0,0 +1,125 @@
+"""
+Benchmark: request size over a code agent session with and without result limits.
+
+Builds a project with a large ``node_modules``, a big source file and a log
+full of repeated lines, then replays a session of tool calls the way
+``CodeAgent`` appends them, sending (measuring) the whole history before
+every call. Reports total bytes and estimated tokens sent for the raw
+history, with per-tool budgets, and with budgets plus old results elided.
+
+Usage:
+    python benchmarks/bench_tool_results.py [--small-reads 10] [--keep-recent 3]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from google.genai.types import Content, FunctionCall, Part
+
+CODE_AGENT_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "extra-for-experts",
+    "code-agent",
+    "solution",
+)
+sys.path.insert(0, CODE_AGENT_DIR)
+
+from file_operations import TOOL_REGISTRY  # noqa: E402
+
+from agentkit.tool_results import CHARS_PER_TOKEN, ResultLimiter  # noqa: E402
+
+TOOLS = {tool["declaration"]["name"]: tool for tool in TOOL_REGISTRY}
+BUDGETS = {name: tool["result_budget"] for name, tool in TOOLS.items() if "result_budget" in tool}
+
+
+def build_project(root):
+    modules = os.path.join(root, "node_modules")
+    os.makedirs(modules)
+    for i in range(3000):
+        os.makedirs(os.path.join(modules, f"package-{i:04d}"))
+    with open(os.path.join(root, "big.py"), "w") as file:
+        file.write("".join(f"def handler_{i}(request):\n    return {i}\n\n" for i in range(2000)))
+    with open(os.path.join(root, "app.log"), "w") as file:
+        for i in range(50):
+            file.write(f"starting worker {i}\n")
+            file.write("WARN connection refused, retrying\n" * 40)
+    for i in range(20):
+        with open(os.path.join(root, f"small{i}.py"), "w") as file:
+            file.write(f"VALUE = {i}\n")
+
+
+def session(root, small_reads):
+    calls = [
+        ("list_files", {"directory": os.path.join(root, "node_modules")}),
+        ("read_file", {"file_path": os.path.join(root, "big.py")}),
+        ("read_file", {"file_path": os.path.join(root, "app.log")}),
+        ("hash_tree", {"directory": os.path.join(root, "node_modules")}),
+    ]
+    calls += [
+        ("read_file", {"file_path": os.path.join(root, f"small{i % 20}.py")})
+        for i in range(small_reads)
+    ]
+    return calls
+
+
+def request_bytes(contents):
+    return len(
+        json.dumps(
+            [c.model_dump(mode="json", exclude_none=True, by_alias=True) for c in contents]
+        ).encode("utf-8")
+    )
+
+
+def replay(calls, limiter):
+    contents = [Content(role="user", parts=[Part(text="Tidy up this project")])]
+    sent = request_bytes(contents)
+    for name, args in calls:
+        call = FunctionCall(name=name, args=args)
+        result = TOOLS[name]["function"](**args)
+        if limiter is not None:
+            result = limiter.limit(name, result)
+        contents.append(Content(role="model", parts=[Part(function_call=call)]))
+        contents.append(
+            Content(
+                role="user",
+                parts=[Part.from_function_response(name=name, response={"result": result})],
+            )
+        )
+        if limiter is not None:
+            limiter.track(contents, call, result)
+            limiter.on_request()
+        sent += request_bytes(contents)
+    return sent, request_bytes(contents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--small-reads", type=int, default=10)
+    parser.add_argument("--keep-recent", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        build_project(root)
+        calls = session(root, args.small_reads)
+        print(f"{len(calls)} tool calls, {len(calls) + 1} requests\n")
+        print(f"{'history':<22} {'sent':>12} {'~tokens':>10} {'final history':>14}")
+
+        baseline = None
+        for label, limiter in [
+            ("raw", None),
+            ("budgets", ResultLimiter(BUDGETS)),
+            (f"budgets + elide>{args.keep_recent}", ResultLimiter(BUDGETS, keep_recent=args.keep_recent)),
+        ]:
+            sent, final = replay(calls, limiter)
+            baseline = baseline or sent
+            print(f"{label:<22} {sent:>10,} B {sent // CHARS_PER_TOKEN:>10,} {final:>12,} B"
+                  f"  ({1 - sent / baseline:.0%} less)")
+            if limiter is not None:
+                print(f"{'':<22} limiter: {limiter.summary()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Benchmark: per-call cost of checking tool arguments.
+
+Compares the compiled ``ToolValidator`` with a generic JSON Schema validator
+on module3's declarations, for valid calls, calls that need coercion
+("22", "Celsius") and invalid calls. The generic baseline is ``jsonschema``
+(both a prebuilt ``Draft7Validator`` and the one-shot ``jsonschema.validate``)
+when it is installed, otherwise a small interpreter that walks the schema
+dict on every call, which is what such validators do at heart.
+
+``jsonschema`` only validates, so it reports the coercible calls as errors
+where ``ToolValidator`` fixes them.
+
+Usage:
+    python benchmarks/bench_tool_schema.py [--calls 100000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(
+    0,
+    os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        "workshop",
+        "module3",
+        "solution",
+    ),
+)
+
+from tools import (  # noqa: E402
+    convert_temperature_declaration,
+    get_current_location_declaration,
+    get_weather_declaration,
+)
+
+from agentkit.tool_schema import ToolArgumentError, ToolValidator  # noqa: E402
+
+DECLARATIONS = [
+    get_weather_declaration,
+    get_current_location_declaration,
+    convert_temperature_declaration,
+]
+
+CASES = {
+    "valid": [
+        ("get_weather", {"location": "Tokyo"}),
+        ("get_current_location", {}),
+        ("convert_temperature", {"temperature": 22, "from_unit": "celsius", "to_unit": "fahrenheit"}),
+    ],
+    "coercible": [
+        ("convert_temperature", {"temperature": "22", "from_unit": "Celsius", "to_unit": "F"}),
+        ("convert_temperature", {"temperature": 71.6, "from_unit": " fahrenheit", "to_unit": "c"}),
+    ],
+    "invalid": [
+        ("convert_temperature", {"temperature": "hot", "from_unit": "kelvin"}),
+        ("get_weather", {"city": "Tokyo"}),
+    ],
+}
+
+_TYPES = {
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+    "object": dict,
+    "array": list,
+}
+
+
+def generic_errors(schema, value, path=""):
+    """Interpret ``schema`` against ``value``, re-reading the schema every call."""
+    errors = []
+    expected = _TYPES.get(schema.get("type"))
+    if expected is not None and not isinstance(value, expected):
+        return [f"{path}: expected {schema['type']}"]
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: not in enum")
+    if schema.get("type") == "object":
+        properties = schema.get("properties", {})
+        for name in schema.get("required", []):
+            if name not in value:
+                errors.append(f"{path}.{name}: required")
+        for name, item in value.items():
+            if name in properties:
+                errors.extend(generic_errors(properties[name], item, f"{path}.{name}"))
+            elif schema.get("additionalProperties") is False:
+                errors.append(f"{path}.{name}: unexpected")
+    elif schema.get("type") == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(generic_errors(schema["items"], item, f"{path}[{i}]"))
+    return errors
+
+
+def strict(schema):
+    """The declaration schema with unknown arguments disallowed, as the tools require."""
+    if schema is None:
+        return {"type": "object", "properties": {}, "additionalProperties": False}
+    return {**schema, "additionalProperties": False}
+
+
+def approaches():
+    schemas = {d["name"]: strict(d.get("parameters")) for d in DECLARATIONS}
+    validator = ToolValidator(DECLARATIONS)
+
+    def compiled(name, args):
+        try:
+            validator.validate(name, args)
+            return True
+        except ToolArgumentError:
+            return False
+
+    yield "compiled ToolValidator", compiled
+
+    try:
+        import jsonschema
+    except ImportError:
+        yield "generic interpreter", lambda name, args: not generic_errors(schemas[name], args)
+        return
+
+    prebuilt = {name: jsonschema.Draft7Validator(schema) for name, schema in schemas.items()}
+    yield "jsonschema (prebuilt)", lambda name, args: not list(prebuilt[name].iter_errors(args))
+
+    def one_shot(name, args):
+        try:
+            jsonschema.validate(args, schemas[name])
+            return True
+        except jsonschema.ValidationError:
+            return False
+
+    yield "jsonschema.validate", one_shot
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'approach':<24} {'case':<10} {'us/call':>8}  accepted")
+    for label, check in approaches():
+        calls = args.calls if "validate" not in label else max(1, args.calls // 100)
+        for case, pairs in CASES.items():
+            accepted = sum(check(name, call_args) for name, call_args in pairs)
+            start = time.perf_counter()
+            for i in range(calls):
+                name, call_args = pairs[i % len(pairs)]
+                check(name, call_args)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<24} {case:<10} {elapsed / calls * 1e6:8.2f}  {accepted}/{len(pairs)}")
+
+
+if __name__ == "__main__":
+    main()
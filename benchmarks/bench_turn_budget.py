@@ -0,0 +1,87 @@
+"""
+Benchmark: per-turn budgets against a runaway function calling loop.
+
+The fake model here never stops asking for ``get_weather``. Each budget is
+run on its own (plus a cancellation from another thread), and the script
+reports how long the turn ran, how many model and tool calls it made, which
+budget tripped and whether the history is still valid: every function call
+answered and the turn closed by a model message. A normal module3 turn is
+run through the same guard afterwards to show it is not affected.
+
+Usage:
+    python benchmarks/bench_turn_budget.py [--latency 0.05]
+"""
+
+import argparse
+import threading
+import time
+
+from google.genai.types import FunctionCall
+from scenarios import process_function_call, weather_config, weather_model
+
+from agentkit.fake import FakeModels, function_call_response
+from agentkit.loop import chain_turn
+from agentkit.turn_budget import TurnBudget
+
+
+def runaway_model(contents, config):
+    return function_call_response(FunctionCall(name="get_weather", args={"location": "tokyo"}))
+
+
+def history_is_valid(contents):
+    """Every function call is answered by the next message and the turn ends with the model."""
+    for i, content in enumerate(contents):
+        if any(part.function_call for part in content.parts):
+            following = contents[i + 1] if i + 1 < len(contents) else None
+            if following is None or not all(part.function_response for part in following.parts):
+                return False
+    return contents[-1].role == "model"
+
+
+def run(label, budget, responder, latency, cancel_after=None):
+    models = FakeModels(responder, latency=latency)
+    contents = []
+    guard = budget.start()
+    if cancel_after is not None:
+        threading.Timer(cancel_after, guard.cancel).start()
+
+    start = time.perf_counter()
+    events = list(
+        chain_turn(
+            models, "gemini-2.0-flash", contents, weather_config(),
+            "What's the weather in Tokyo?", process_function_call, guard,
+        )
+    )
+    elapsed = time.perf_counter() - start
+    kind, value = events[-1]
+    outcome = value["reason"] if kind == "stopped" else "answered"
+    valid = "valid" if history_is_valid(contents) else "BROKEN"
+    print(f"{label:<22} {elapsed * 1000:6.0f} ms {models.calls:4d} calls "
+          f"{guard.tool_calls:4d} tools {guard.tokens:7,d} tok  {outcome:<12} {valid}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    budgets = [
+        ("max_round_trips=10", TurnBudget(max_round_trips=10)),
+        ("deadline=0.3s", TurnBudget(max_round_trips=None, deadline_seconds=0.3)),
+        ("max_tool_calls=5", TurnBudget(max_round_trips=None, max_tool_calls=5)),
+        ("max_tokens=2000", TurnBudget(max_round_trips=None, max_tokens=2000)),
+    ]
+    print(f"runaway model, {args.latency * 1000:.0f} ms per call\n")
+    for label, budget in budgets:
+        run(label, budget, runaway_model, args.latency)
+
+    cancelling = TurnBudget(max_round_trips=None)
+    run("cancel after 0.2s", cancelling, runaway_model, args.latency, cancel_after=0.2)
+
+    default = TurnBudget()
+    run("normal turn, default", default, weather_model, args.latency)
+    print(f"\ndefault budget metrics: {default.metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Benchmark: get_weather against an HTTP weather service.
+
+``--sessions`` threads (the server's turns) each look up ``--lookups``
+random cities out of 40 against ``agentkit.weather_stub``, which answers
+after ``--latency`` seconds plus ``--per-city`` per city and charges ``--handshake``
+seconds for every new connection. Compares:
+
+- **per call**: one request per lookup on an ``httpx.Client`` without
+  keep-alive, so every lookup opens a new connection
+- **pooled**: ``HttpWeatherProvider`` with ``fresh_for=stale_for=0``, so every
+  lookup goes upstream; they share kept-alive connections and concurrent ones
+  share a request
+- **pooled + SWR**: the same with a stale-while-revalidate cache (answers are
+  fresh for ``--fresh`` seconds and served while refreshed for a minute more)
+
+then an outage, where the service takes 5 s and every request times out after
+0.5 s: the SWR provider answers at once from its cache, the pooled one falls
+back to its last answers after the timeout, per call fails.
+
+Reports lookups that got weather, upstream requests and connections, and
+p50/p95 latency per lookup. Batching trades a little latency per lookup (the
+batch window, and ``--per-city`` for every city in the batch) for far fewer
+requests.
+
+Usage:
+    python benchmarks/bench_weather.py [--sessions 32] [--lookups 20] [--latency 0.05]
+"""
+
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from scenarios import CITIES
+
+from agentkit.weather import HttpWeatherProvider
+from agentkit.weather_stub import StubWeatherServer
+
+MORE_CITIES = [
+    "paris", "berlin", "madrid", "rome", "vienna", "oslo", "stockholm", "helsinki",
+    "dublin", "lisbon", "athens", "cairo", "nairobi", "lagos", "johannesburg",
+    "mumbai", "delhi", "bangkok", "singapore", "jakarta", "manila", "seoul",
+    "beijing", "shanghai", "hong kong", "taipei", "melbourne", "brisbane",
+    "christchurch", "vancouver", "toronto", "new york", "chicago", "mexico city",
+    "lima",
+]
+ALL_CITIES = CITIES + MORE_CITIES
+TIMEOUT = 0.5
+
+
+def per_call(url):
+    client = httpx.Client(timeout=TIMEOUT, limits=httpx.Limits(max_keepalive_connections=0))
+
+    def get(city):
+        response = client.get(f"{url}/v1/current", params={"city": city})
+        response.raise_for_status()
+        return response.json()["weather"][city]
+
+    return get
+
+
+def run(get, args, seed):
+    rng = random.Random(seed)
+    plans = [[rng.choice(ALL_CITIES) for _ in range(args.lookups)] for _ in range(args.sessions)]
+    latencies = []
+    failed = [0]
+    lock = threading.Lock()
+
+    def session(cities):
+        for city in cities:
+            start = time.perf_counter()
+            try:
+                assert "temperature" in get(city)
+            except Exception:
+                with lock:
+                    failed[0] += 1
+                continue
+            finally:
+                elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+            # The model thinks before the next call
+            time.sleep(0.01)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        list(pool.map(session, plans))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else 0.0
+    p95 = latencies[int(0.95 * len(latencies))] if latencies else 0.0
+    return len(latencies), failed[0], p50, p95, wall
+
+
+def report(label, stub, result):
+    ok, failed, p50, p95, wall = result
+    print(f"{label:<26} {ok:5d} ok {failed:5d} failed {stub.metrics['requests']:8d} "
+          f"{stub.metrics['connections']:6d} {p50 * 1000:7.1f} {p95 * 1000:7.1f} ms "
+          f"{wall:6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=32)
+    parser.add_argument("--lookups", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-city", type=float, default=0.001)
+    parser.add_argument("--handshake", type=float, default=0.03)
+    parser.add_argument("--fresh", type=float, default=0.5)
+    args = parser.parse_args()
+
+    print(f"{args.sessions} sessions x {args.lookups} lookups over {len(ALL_CITIES)} cities, "
+          f"{args.latency * 1000:.0f} ms per request + {args.per_city * 1000:g} ms per city, "
+          f"{args.handshake * 1000:.0f} ms per "
+          f"new connection\n")
+    print(f"{'client':<26} {'lookups':>17} {'requests':>8} {'conns':>6} "
+          f"{'p50':>7} {'p95':>10} {'wall':>8}")
+
+    stubs = {}
+    providers = {}
+    for label in ("per call", "pooled", "pooled + SWR"):
+        stub = stubs[label] = StubWeatherServer(args.latency, args.per_city, args.handshake)
+        url = stub.start_in_thread()
+        if label == "per call":
+            get = per_call(url)
+        else:
+            cached = label == "pooled + SWR"
+            provider = providers[label] = HttpWeatherProvider(
+                url,
+                timeout=TIMEOUT,
+                fresh_for=args.fresh if cached else 0.0,
+                stale_for=60.0 if cached else 0.0,
+            )
+            get = provider.get
+        # Not measured: importing httpx and the first connection
+        get("auckland")
+        stub.metrics.update(requests=0, connections=0)
+        report(label, stub, run(get, args, seed=1))
+
+    print(f"\noutage: the service takes 5 s to answer, requests time out after {TIMEOUT:g} s")
+    for label, stub in stubs.items():
+        stub.latency = 5.0
+        stub.metrics.update(requests=0, connections=0)
+        get = per_call(stub_url(stub)) if label == "per call" else providers[label].get
+        report(label, stub, run(get, args, seed=2))
+
+    for label, provider in providers.items():
+        print(f"\n{label}: {provider.summary()}")
+        provider.close()
+    for stub in stubs.values():
+        stub.stop()
+
+
+def stub_url(stub):
+    host, port = stub._server.sockets[0].getsockname()[:2]
+    return f"http://{host}:{port}"
+
+
+if __name__ == "__main__":
+    main()
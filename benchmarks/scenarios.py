@@ -0,0 +1,147 @@
+"""
+Shared fixtures for the benchmarks: the module3 weather agent on a fake model.
+
+``weather_model`` is a responder for ``agentkit.fake.FakeModels`` that follows
+the module3 system prompt the way Gemini does (location -> weather ->
+conversion), and ``run_turn`` is the module3 function chaining loop, so the
+benchmarks exercise the same request pattern as the real agent.
+"""
+
+import os
+import sys
+
+from google.genai.types import Content, FunctionCall, GenerateContentConfig, Part, Tool
+
+from agentkit.fake import function_call_response, text_response
+
+MODULE3_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "workshop",
+    "module3",
+    "solution",
+)
+sys.path.insert(0, MODULE3_DIR)
+
+from main import (  # noqa: E402
+    FUNCTION_DECLARATIONS,
+    SYSTEM_PROMPT,
+    add_function_result,
+    process_function_call,
+)
+
+CITIES = ["auckland", "wellington", "sydney", "london", "tokyo"]
+
+# Typical module3 traffic: direct lookups, "my location" and unit conversions
+PROMPTS = [
+    "What's the weather in Tokyo?",
+    "How hot is it in my location?",
+    "What's the weather in London in fahrenheit?",
+    "Compare the weather in Sydney and Wellington",
+    "What's the weather here in fahrenheit?",
+]
+
+
+def weather_config() -> GenerateContentConfig:
+    """The module3 config: chaining system prompt plus all three tools."""
+    return GenerateContentConfig(
+        tools=[Tool(function_declarations=FUNCTION_DECLARATIONS)],
+        system_instruction=SYSTEM_PROMPT,
+    )
+
+
+def _turn_state(contents):
+    """Return the current user prompt and the function results since it."""
+    results = []
+    for content in reversed(contents):
+        part = content.parts[0]
+        if part.function_response is not None:
+            results.append(part.function_response)
+        elif content.role == "user" and part.text:
+            return part.text, list(reversed(results))
+    return "", list(reversed(results))
+
+
+def weather_model(contents, config):
+    """Fake Gemini that chains the module3 tools like the real model does."""
+    prompt, results = _turn_state(contents)
+    text = prompt.lower()
+    done = {}
+    for result in results:
+        done.setdefault(result.name, []).append(result.response.get("result", {}))
+
+    here = "my location" in text or " here" in text
+    if here and "get_current_location" not in done:
+        return function_call_response(FunctionCall(name="get_current_location", args={}))
+
+    if here:
+        cities = [done["get_current_location"][0]["city"]]
+    else:
+        cities = [city for city in CITIES if city in text]
+
+    if cities and "get_weather" not in done:
+        return function_call_response(
+            *[FunctionCall(name="get_weather", args={"location": city}) for city in cities]
+        )
+
+    if "fahrenheit" in text and "convert_temperature" not in done:
+        return function_call_response(
+            *[
+                FunctionCall(
+                    name="convert_temperature",
+                    args={
+                        "temperature": weather["temperature"],
+                        "from_unit": "celsius",
+                        "to_unit": "fahrenheit",
+                    },
+                )
+                for weather in done.get("get_weather", [])
+            ]
+        )
+
+    facts = [f"{name}: {values}" for name, values in done.items()]
+    return text_response("Here is what I found. " + "; ".join(facts))
+
+
+def run_turn(
+    models,
+    contents,
+    config,
+    user_input,
+    model_name="gemini-2.0-flash",
+    dispatch=process_function_call,
+    speculator=None,
+):
+    """
+    The module3 function chaining loop without the terminal I/O.
+
+    Returns:
+        Tuple[str, int]: The final answer and the number of model round trips
+    """
+    contents.append(Content(role="user", parts=[Part(text=user_input)]))
+    if speculator is not None:
+        for function_call, result in speculator.on_prompt(user_input):
+            add_function_result(contents, function_call, result)
+
+    round_trips = 0
+    while True:
+        response = models.generate_content(
+            model=model_name, contents=contents, config=config
+        )
+        round_trips += 1
+        if not response.function_calls:
+            contents.append(Content(role="model", parts=[Part(text=response.text)]))
+            if speculator is not None:
+                speculator.finish_turn()
+            return response.text, round_trips
+
+        for function_call in response.function_calls:
+            if speculator is not None:
+                result = speculator.call(function_call)
+            else:
+                result = dispatch(function_call)
+            add_function_result(contents, function_call, result)
+            if speculator is not None:
+                for follow_up, follow_up_result in speculator.follow_ups(
+                    function_call, result
+                ):
+                    add_function_result(contents, follow_up, follow_up_result)
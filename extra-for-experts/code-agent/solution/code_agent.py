@@ -5,25 +5,29 @@ This script implements an autonomous code agent that can interact with the file
 based on natural language instructions, using Google's Gemini API with function calling.
 """
 
+from __future__ import annotations
+
 import os
 import sys
-from google import genai
-from google.genai.types import Content, Part, FunctionCall, GenerateContentConfig, Tool
-from typing import List, Any
+from agentkit.env import model_name_for
+from agentkit.orchestrator import orchestrator_for
+from agentkit.pipelining import tool_pipeline_for
+from agentkit.profiling import profiled_input, session_profiler_for
+from agentkit.session_store import open_history
+from agentkit.startup import handle_startup_flags, lazy_import, stop_after_startup
+from agentkit.tool_pool import tool_pool_for
+from agentkit.tool_results import result_limiter_for
+from agentkit.tool_schema import ToolArgumentError, ToolValidator
+from agentkit.transport import lazy_models
+from agentkit.turn_budget import TurnStopped, end_stopped_turn, turn_budget_for
+from typing import List, Any, Optional
 from dotenv import load_dotenv
 
 # Import our file operation functions and declarations
-from file_operations import (
-    list_files,
-    read_file,
-    write_file,
-    list_files_declaration,
-    read_file_declaration,
-    write_file_declaration,
-)
+from file_operations import TOOL_REGISTRY
 
-# Load environment variables
-load_dotenv()
+# The SDK is imported on first use, so the agent starts without waiting for it
+types = lazy_import("google.genai.types")
 
 
 class CodeAgent:
@@ -34,7 +38,8 @@ class CodeAgent:
     1. List files in directories
     2. Read file contents
     3. Write or create files with specified content
-    4. Chain these operations together to accomplish complex tasks
+    4. Search, hash and format files (in worker processes if AGENT_TOOL_WORKERS is set)
+    5. Chain these operations together to accomplish complex tasks
     """
 
     # System prompt to guide the model's behavior
@@ -44,6 +49,9 @@ class CodeAgent:
     - list_files: Lists files in a directory
     - read_file: Reads the content of a file
     - write_file: Creates or modifies a file with specified content
+    - search_files: Searches all files under a directory for a regular expression
+    - hash_tree: Computes the SHA-256 of every file under a directory
+    - format_file: Formats a Python file with black
     
     When helping users with coding tasks:
     1. Use list_files to understand what's in the current directory
@@ -66,33 +74,58 @@ class CodeAgent:
     4. Explain how to run the application
     """
 
-    def __init__(self, api_key: str, model_name: str = "gemini-2.0-flash"):
+    def __init__(self, api_key: str, model_name: Optional[str] = None):
         """
         Initialize the Code Agent.
 
         Args:
             api_key (str): Google Cloud API key
-            model_name (str): Gemini model to use
+            model_name (Optional[str]): Gemini model to use (default: ``AGENT_MODEL``
+                or gemini-2.0-flash)
         """
-        self.client = genai.Client(api_key=api_key)
-        self.model_name = model_name
+        # The Gemini client is created when the first message is sent
+        self.models = lazy_models(api_key)
+        self.model_name = model_name or model_name_for("gemini-2.0-flash")
+
+        # Tools by name; CPU-bound ones go to the process pool when enabled
+        self.tools = {tool["declaration"]["name"]: tool for tool in TOOL_REGISTRY}
+        self.tool_pool = tool_pool_for(preload=("file_operations",))
+
+        # Arguments are checked against the declarations before a tool runs
+        self.validator = ToolValidator(tool["declaration"] for tool in TOOL_REGISTRY)
+
+        # Optional size limits for results kept in the history (AGENT_LIMIT_RESULTS)
+        self.result_limiter = result_limiter_for(
+            {
+                name: tool["result_budget"]
+                for name, tool in self.tools.items()
+                if "result_budget" in tool
+            }
+        )
 
         # Initialize the configuration with our function declarations
-        self.config = GenerateContentConfig(
-            tools=[
-                Tool(
-                    function_declarations=[
-                        list_files_declaration,
-                        read_file_declaration,
-                        write_file_declaration,
-                    ]
-                )
+        # (a plain dict, so building it needs no SDK types)
+        self.config = {
+            "tools": [
+                {"function_declarations": [tool["declaration"] for tool in TOOL_REGISTRY]}
             ],
-            system_instruction=self.SYSTEM_PROMPT,
-            temperature=0.2,  # Lower temperature for more precise coding
+            "system_instruction": self.SYSTEM_PROMPT,
+            "temperature": 0.2,  # Lower temperature for more precise coding
+        }
+
+        # Per-turn limits on model calls, time, tool calls and tokens (AGENT_MAX_*)
+        self.turn_budget = turn_budget_for()
+
+        # Optional streaming that starts the tool as soon as its call arrives
+        # (AGENT_PIPELINE_TOOLS); the loop runs one call per round trip
+        self.pipeline = tool_pipeline_for(self.process_function_call, max_calls=1)
+
+        # Optional planner + concurrent workers for multi-file tasks (AGENT_ORCHESTRATE)
+        self.orchestrator = orchestrator_for(
+            self, {name: tool["writes"] for name, tool in self.tools.items() if "writes" in tool}
         )
 
-    def process_function_call(self, tool_call: FunctionCall) -> Any:
+    def process_function_call(self, tool_call: types.FunctionCall) -> Any:
         """
         Process a function call from Gemini and return the result.
 
@@ -106,22 +139,20 @@ class CodeAgent:
             ValueError: If the function name is unknown
         """
         function_name = tool_call.name
-        args = tool_call.args
 
         try:
-            match function_name:
-                case "list_files":
-                    directory = args.get("directory", ".")
-                    return list_files(directory)
-                case "read_file":
-                    file_path = args.get("file_path")
-                    return read_file(file_path)
-                case "write_file":
-                    file_path = args.get("file_path")
-                    content = args.get("content")
-                    return write_file(file_path, content)
-                case _:
-                    raise ValueError(f"Unknown function: {function_name}")
+            args = self.validator.validate(function_name, tool_call.args)
+        except ToolArgumentError as e:
+            # Structured, so the model can fix every argument in one retry
+            return e.to_response()
+
+        try:
+            tool = self.tools.get(function_name)
+            if tool is None:
+                raise ValueError(f"Unknown function: {function_name}")
+            if tool.get("process_pool") and self.tool_pool is not None:
+                return self.tool_pool.run(tool["function"], **args)
+            return tool["function"](**args)
         except Exception as e:
             return f"Calling {function_name} failed: {str(e)}"
 
@@ -133,76 +164,138 @@ class CodeAgent:
         print("-" * 80)
 
         # Initialize conversation history
-        contents: List[Content] = []
+        contents: List[types.Content] = open_history()
+        if stop_after_startup():
+            self.close()
+            return
+
+        # --profile (or AGENT_PROFILE=1) records cProfile and tracemalloc data per turn
+        profiler = session_profiler_for(__file__)
 
         while True:
             try:
                 # Get user input
-                user_input = input("\n👤 You: ").strip()
+                user_input = profiled_input("\n👤 You: ", profiler, contents).strip()
 
                 # Check for exit command
                 if user_input.lower() in ["exit", "quit"]:
+                    if self.turn_budget.metrics["completed"] < self.turn_budget.metrics["turns"]:
+                        print(f"\n⏱️  Turn budgets: {self.turn_budget.summary()}")
                     print("\n👋 Goodbye!")
                     break
                 if not user_input:
                     continue
 
-                # Add user message to conversation
-                contents.append(Content(role="user", parts=[Part(text=user_input)]))
-
-                # Function calling loop - continue until no more function calls
-                while True:
-                    # Get Gemini's response
-                    response = self.client.models.generate_content(
-                        model=self.model_name, contents=contents, config=self.config
+                # Split the task into parts that separate workers do at the same time
+                if self.orchestrator is not None:
+                    try:
+                        outcome = self.orchestrator.run(user_input)
+                    except KeyboardInterrupt:
+                        print("\n⏹️  Cancelled; files already written are kept.")
+                        continue
+                    contents.append(
+                        types.Content(role="user", parts=[types.Part(text=user_input)])
                     )
+                    contents.append(
+                        types.Content(role="model", parts=[types.Part(text=outcome.text)])
+                    )
+                    print(
+                        f"\n🧩 {len(outcome.subtasks)} subtasks finished in "
+                        f"{outcome.seconds:.1f}s, {len(outcome.files_written)} files written"
+                    )
+                    print(f"\n\033[92mAgent\033[0m: {outcome.text}")
+                    continue
 
-                    # Check if Gemini wants to call a function
-                    if response.function_calls:
-                        tool_call = response.function_calls[0]
-                        print(
-                            f"\n🔧 Executing function: {tool_call.name} with args: {tool_call.args}"
-                        )
-
-                        try:
-                            # Process the function call
-                            result = self.process_function_call(tool_call)
+                # Add user message to conversation
+                contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
+
+                # Stops the turn when it runs over budget or on Ctrl-C
+                guard = self.turn_budget.start()
+                try:
+                    # Function calling loop - continue until no more function calls
+                    while True:
+                        # Get Gemini's response
+                        guard.before_request()
+                        if self.result_limiter is not None:
+                            self.result_limiter.on_request()
+                        if self.pipeline is not None:
+                            # The tool starts while the rest of the response streams
+                            response, pending = self.pipeline.generate_content(
+                                self.models,
+                                model=self.model_name,
+                                contents=contents,
+                                config=self.config,
+                                guard=guard,
+                            )
+                        else:
+                            response = self.models.generate_content(
+                                model=self.model_name, contents=contents, config=self.config
+                            )
+                            pending = None
+                        guard.after_response(response)
+
+                        # Check if Gemini wants to call a function
+                        if response.function_calls:
+                            tool_call = response.function_calls[0]
+                            if pending is None:
+                                guard.before_tool_call()
+                            print(
+                                f"\n🔧 Executing function: {tool_call.name} "
+                                f"with args: {tool_call.args}"
+                            )
 
-                            # Add function call to conversation history
-                            contents.append(
-                                Content(
-                                    role="model", parts=[Part(function_call=tool_call)]
+                            try:
+                                # Process the function call
+                                if pending is not None:
+                                    result = pending[0].result()
+                                else:
+                                    result = self.process_function_call(tool_call)
+                                if self.result_limiter is not None:
+                                    result = self.result_limiter.limit(tool_call.name, result)
+
+                                # Add function call to conversation history
+                                contents.append(
+                                    types.Content(
+                                        role="model", parts=[types.Part(function_call=tool_call)]
+                                    )
                                 )
-                            )
 
-                            # Add function result to conversation history
-                            contents.append(
-                                Content(
-                                    role="user",
-                                    parts=[
-                                        Part.from_function_response(
-                                            name=tool_call.name,
-                                            response={"result": result},
-                                        )
-                                    ],
+                                # Add function result to conversation history
+                                contents.append(
+                                    types.Content(
+                                        role="user",
+                                        parts=[
+                                            types.Part.from_function_response(
+                                                name=tool_call.name,
+                                                response={"result": result},
+                                            )
+                                        ],
+                                    )
                                 )
-                            )
+                                if self.result_limiter is not None:
+                                    self.result_limiter.track(contents, tool_call, result)
 
-                            # Continue the loop to check for more function calls
-                            continue
+                                # Continue the loop to check for more function calls
+                                continue
 
-                        except Exception as e:
-                            print(f"\n❌ Error executing function: {str(e)}")
-                            break
+                            except Exception as e:
+                                print(f"\n❌ Error executing function: {str(e)}")
+                                guard.finish()
+                                break
 
-                    # No more function calls, add response to conversation history
-                    contents.append(
-                        Content(role="model", parts=[Part(text=response.text)])
-                    )
+                        # No more function calls, add response to conversation history
+                        contents.append(
+                            types.Content(role="model", parts=[types.Part(text=response.text)])
+                        )
 
-                    # Print the final response
-                    print(f"\n\033[92mAgent\033[0m: {response.text.strip()}")
-                    break  # Exit the function calling loop
+                        # Print the final response
+                        print(f"\n\033[92mAgent\033[0m: {response.text.strip()}")
+                        guard.finish()
+                        break  # Exit the function calling loop
+                except (TurnStopped, KeyboardInterrupt) as e:
+                    stopped = e if isinstance(e, TurnStopped) else guard.interrupted()
+                    # Close the turn so the history stays valid for the next request
+                    print(f"\n⏹️  {end_stopped_turn(contents, stopped)}")
 
             except KeyboardInterrupt:
                 print("\n\n👋 Goodbye!")
@@ -210,9 +303,29 @@ class CodeAgent:
             except Exception as e:
                 print(f"\n❌ Error: {str(e)}")
 
+        self.close()
+
+    def close(self):
+        """Stop the tool workers, if any, and report tool-result savings."""
+        if self.tool_pool is not None:
+            self.tool_pool.shutdown()
+        if self.pipeline is not None:
+            self.pipeline.shutdown()
+            if self.pipeline.metrics["responses"]:
+                print(f"\n🚰 Tool pipeline: {self.pipeline.summary()}")
+        if self.result_limiter is not None and self.result_limiter.metrics["requests"]:
+            print(f"\n📉 Tool results: {self.result_limiter.summary()}")
+
 
 def main():
     """Main entry point for the code agent."""
+    # --profile-startup prints an import-time breakdown instead of running
+    if handle_startup_flags(__file__):
+        return
+
+    # Load environment variables
+    load_dotenv()
+
     # Get the Google Cloud API key from environment variables
     api_key = os.getenv("API_KEY")
 
@@ -3,8 +3,10 @@ This module contains function declarations and implementations for file system o
 Each function has both an implementation and a corresponding declaration that tells Gemini how to use it.
 """
 
+import hashlib
 import os
-from typing import List, Optional
+import re
+from typing import Dict, List, Optional
 
 # Function declaration for listing files
 list_files_declaration = {
@@ -52,6 +54,65 @@ write_file_declaration = {
     },
 }
 
+# Function declaration for searching file contents
+search_files_declaration = {
+    "name": "search_files",
+    "description": "Search all text files under a directory for a regular expression",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "pattern": {
+                "type": "string",
+                "description": "Python regular expression to search for",
+            },
+            "directory": {
+                "type": "string",
+                "description": "The directory to search (default: current directory)",
+            },
+        },
+        "required": ["pattern"],
+    },
+}
+
+# Function declaration for hashing a directory tree
+hash_tree_declaration = {
+    "name": "hash_tree",
+    "description": "Compute the SHA-256 hash of every file under a directory",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "directory": {
+                "type": "string",
+                "description": "The directory to hash (default: current directory)",
+            }
+        },
+        "required": [],
+    },
+}
+
+# Function declaration for formatting Python files
+format_file_declaration = {
+    "name": "format_file",
+    "description": "Format a Python file in place with black",
+    "parameters": {
+        "type": "object",
+        "properties": {
+            "file_path": {"type": "string", "description": "Path to the Python file"}
+        },
+        "required": ["file_path"],
+    },
+}
+
+# Directories skipped when walking a tree
+SKIPPED_DIRECTORIES = {".git", ".venv", "venv", "node_modules", "__pycache__"}
+
+
+def _walk_files(directory: str):
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if d not in SKIPPED_DIRECTORIES)
+        for name in sorted(files):
+            yield os.path.join(root, name)
+
 
 def list_files(directory: str = ".") -> List[str]:
     """
@@ -110,3 +171,122 @@ def write_file(file_path: str, content: str) -> bool:
     with open(file_path, "w") as file:
         file.write(content)
     return True
+
+
+def search_files(pattern: str, directory: str = ".", max_matches: int = 200) -> List[str]:
+    """
+    Search all text files under a directory for a regular expression.
+
+    Args:
+        pattern (str): Python regular expression to search for
+        directory (str): The directory to search (default: current directory)
+        max_matches (int): Stop after this many matching lines
+
+    Returns:
+        List[str]: Matches formatted as "path:line: text"
+
+    Raises:
+        re.error: If the pattern is not a valid regular expression
+    """
+    regex = re.compile(pattern)
+    matches = []
+    for file_path in _walk_files(directory):
+        try:
+            with open(file_path, "r", encoding="utf-8") as file:
+                for number, line in enumerate(file, 1):
+                    if regex.search(line):
+                        matches.append(f"{file_path}:{number}: {line.rstrip()}")
+                        if len(matches) >= max_matches:
+                            return matches
+        except (UnicodeDecodeError, OSError):
+            # Binary or unreadable file
+            continue
+    return matches
+
+
+def hash_tree(directory: str = ".") -> Dict[str, str]:
+    """
+    Compute the SHA-256 hash of every file under a directory.
+
+    Args:
+        directory (str): The directory to hash (default: current directory)
+
+    Returns:
+        Dict[str, str]: File path -> hex digest
+    """
+    digests = {}
+    for file_path in _walk_files(directory):
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        digests[file_path] = digest.hexdigest()
+    return digests
+
+
+def format_file(file_path: str) -> str:
+    """
+    Format a Python file in place with black.
+
+    Args:
+        file_path (str): Path to the Python file
+
+    Returns:
+        str: "reformatted" or "unchanged"
+
+    Raises:
+        black.InvalidInput: If the file is not valid Python
+    """
+    import black
+
+    with open(file_path, "r", encoding="utf-8") as file:
+        source = file.read()
+    try:
+        formatted = black.format_file_contents(source, fast=False, mode=black.Mode())
+    except black.NothingChanged:
+        return "unchanged"
+
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(formatted)
+    return "reformatted"
+
+
+# Every tool the agent can call. Tools flagged with "process_pool" are
+# CPU-bound and run in a worker process when AGENT_TOOL_WORKERS is set.
+# "result_budget" caps the bytes of a result kept in the history when
+# AGENT_LIMIT_RESULTS is set (default: AGENT_RESULT_BUDGET). "writes" names
+# the argument holding the path a tool writes, which concurrent workers lock.
+TOOL_REGISTRY = [
+    {
+        "function": list_files,
+        "declaration": list_files_declaration,
+        "result_budget": 4 * 1024,
+    },
+    {
+        "function": read_file,
+        "declaration": read_file_declaration,
+        "result_budget": 16 * 1024,
+    },
+    {
+        "function": write_file,
+        "declaration": write_file_declaration,
+        "writes": "file_path",
+    },
+    {
+        "function": search_files,
+        "declaration": search_files_declaration,
+        "process_pool": True,
+    },
+    {
+        "function": hash_tree,
+        "declaration": hash_tree_declaration,
+        "process_pool": True,
+        "result_budget": 4 * 1024,
+    },
+    {
+        "function": format_file,
+        "declaration": format_file_declaration,
+        "process_pool": True,
+        "writes": "file_path",
+    },
+]
@@ -0,0 +1,8 @@
+"""
+Shared building blocks for the workshop agents.
+
+The workshop scripts stay small on purpose; anything that needs to be reused
+across module1-3, ``src/main.py`` and the code agent lives in this package.
+Submodules are imported explicitly (e.g. ``from agentkit.session_store import
+SessionStore``) so that importing the package itself stays cheap.
+"""
@@ -0,0 +1,100 @@
+"""
+Registry of the workshop agents for code that hosts them outside the terminal.
+
+Each agent is loaded straight from its solution script, so the server and
+benchmarks always use the same system prompt, tool declarations and
+``process_function_call`` as the interactive version:
+
+- ``chat``: module1 chat agent (no tools)
+- ``weather``: module3 function chaining agent
+- ``code``: the extra-for-experts ``CodeAgent`` (works on the server's
+  current directory, so only expose it to trusted users)
+"""
+
+import importlib.util
+import os
+import sys
+from typing import Any, Callable, Dict, Optional, Union
+
+from google.genai.types import GenerateContentConfig, Tool
+
+from agentkit.env import model_name_for
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AGENT_SOURCES = {
+    "chat": os.path.join(REPO_ROOT, "workshop", "module1", "solution", "main.py"),
+    "weather": os.path.join(REPO_ROOT, "workshop", "module3", "solution", "main.py"),
+    "code": os.path.join(
+        REPO_ROOT, "extra-for-experts", "code-agent", "solution", "code_agent.py"
+    ),
+}
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+class AgentSpec:
+    """Everything needed to run turns for one agent."""
+
+    __slots__ = ("name", "model_name", "config", "dispatch")
+
+    def __init__(
+        self,
+        name: str,
+        config: Union[GenerateContentConfig, dict],
+        dispatch: Optional[Callable[[Any], Any]] = None,
+        model_name: Optional[str] = None,
+    ):
+        self.name = name
+        self.config = config
+        self.dispatch = dispatch
+        self.model_name = model_name or model_name_for(DEFAULT_MODEL)
+
+
+def _load_script(name: str, path: str):
+    """Import a solution script by path, with its directory importable."""
+    directory = os.path.dirname(path)
+    sys.path.insert(0, directory)
+    try:
+        spec = importlib.util.spec_from_file_location(f"agentkit_{name}_agent", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+    return module
+
+
+def load_agent(name: str, api_key: Optional[str] = None) -> AgentSpec:
+    """
+    Load one of the workshop agents.
+
+    Args:
+        name (str): "chat", "weather" or "code"
+        api_key (Optional[str]): Needed by ``CodeAgent``'s constructor
+
+    Returns:
+        AgentSpec: Config and tool dispatch for the agent
+
+    Raises:
+        ValueError: If the agent name is unknown
+    """
+    if name not in AGENT_SOURCES:
+        raise ValueError(f"Unknown agent: {name}")
+    module = _load_script(name, AGENT_SOURCES[name])
+
+    if name == "chat":
+        return AgentSpec(name, GenerateContentConfig(system_instruction=module.SYSTEM_PROMPT))
+    if name == "weather":
+        config = GenerateContentConfig(
+            tools=[Tool(function_declarations=module.FUNCTION_DECLARATIONS)],
+            system_instruction=module.SYSTEM_PROMPT,
+        )
+        return AgentSpec(name, config, module.process_function_call)
+
+    agent = module.CodeAgent(api_key=api_key or os.getenv("API_KEY") or "unused")
+    return AgentSpec(name, agent.config, agent.process_function_call, agent.model_name)
+
+
+def load_agents(names=tuple(AGENT_SOURCES), api_key: Optional[str] = None) -> Dict[str, AgentSpec]:
+    """Load several agents by name."""
+    return {name: load_agent(name, api_key) for name in names}
@@ -0,0 +1,390 @@
+"""
+Offline bulk prompts through the Gemini batch API.
+
+Nightly jobs send large numbers of independent, single-turn prompts with the
+module1 chat config. One ``generate_content`` call per prompt is slow and
+billed at the interactive price; the batch API takes many requests per job,
+runs them within hours and bills them at half price. ``BulkRunner``:
+
+- packs prompts into jobs of inline requests (``batch_size`` prompts or
+  ``max_job_bytes``, whichever comes first) and keeps up to ``max_jobs`` of
+  them submitted at once
+- polls every job with exponential backoff (``poll_interval`` growing by
+  ``backoff`` up to ``max_poll_interval``) and resubmits a job that failed or
+  expired, up to ``max_attempts`` times
+- writes one JSONL record per prompt to the sink, in input order, as soon as
+  all earlier jobs are done, so a long run can be followed with ``tail -f``
+
+Prompts are read lazily and only ``2 * max_jobs`` jobs are held in memory.
+Inline requests need google-genai 1.22.0 or later (``MIN_GENAI_VERSION``).
+``agentkit.fake.FakeBatches`` stands in for ``client.batches`` (``--fake``).
+
+Usage:
+    python -m agentkit.bulk prompts.txt results.jsonl [--batch-size 500] [--jobs 4] [--fake]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import BatchJob, GenerateContentConfig
+
+types = lazy_import("google.genai.types")
+errors = lazy_import("google.genai.errors")
+
+DEFAULT_BATCH_SIZE = 500
+# Inline requests are limited to 20 MB per job
+DEFAULT_MAX_JOB_BYTES = 16 << 20
+DEFAULT_MAX_JOBS = 4
+DEFAULT_POLL_INTERVAL = 5.0
+DEFAULT_MAX_POLL_INTERVAL = 60.0
+# Per-request JSON around the prompt text, for the job size estimate
+_REQUEST_OVERHEAD = 96
+
+SUCCEEDED = "JOB_STATE_SUCCEEDED"
+FAILED_STATES = {"JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+_RETRYABLE_CODES = {429, 500, 502, 503, 504}
+# Inline batch requests arrived in this release, the project's google-genai floor
+MIN_GENAI_VERSION = "1.22.0"
+
+
+def job_state(job: BatchJob) -> str:
+    """The job's state name, e.g. "JOB_STATE_RUNNING"."""
+    return getattr(job.state, "name", None) or str(job.state)
+
+
+class _Chunk:
+    """One job's worth of prompts and where it is in its life."""
+
+    __slots__ = ("index", "prompts", "job_name", "attempts", "due", "delay", "records")
+
+    def __init__(self, index: int, prompts: List[tuple], poll_interval: float):
+        self.index = index
+        self.prompts = prompts  # [(input index, prompt)]
+        self.job_name: Optional[str] = None
+        self.attempts = 0
+        self.due = 0.0
+        self.delay = poll_interval
+        self.records: Optional[List[Dict[str, Any]]] = None
+
+
+class BulkRunner:
+    """
+    Runs prompts through batch jobs and writes the answers in input order.
+
+    Example:
+        runner = BulkRunner(client.batches, "gemini-2.0-flash", config)
+        with open("results.jsonl", "w") as sink:
+            runner.run(prompts, sink)
+    """
+
+    def __init__(
+        self,
+        batches: Any,
+        model: str,
+        config: Any = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        max_job_bytes: int = DEFAULT_MAX_JOB_BYTES,
+        max_jobs: int = DEFAULT_MAX_JOBS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        max_poll_interval: float = DEFAULT_MAX_POLL_INTERVAL,
+        backoff: float = 1.5,
+        max_attempts: int = 2,
+        display_name: str = "agentkit-bulk",
+        sleep: Callable[[float], None] = time.sleep,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            batches: ``client.batches`` (or ``FakeBatches``)
+            model (str): Model for every request
+            config: Generation config of every request (dict or ``GenerateContentConfig``)
+            batch_size (int): Prompts per job
+            max_job_bytes (int): Approximate request bytes per job
+            max_jobs (int): Jobs submitted and not yet finished at once
+            poll_interval (float): Seconds before a job is first polled
+            max_poll_interval (float): Upper bound of the polling backoff
+            backoff (float): Factor the poll interval grows by after each poll
+            max_attempts (int): Submissions per job before its prompts are
+                written as errors
+            display_name (str): Prefix of the jobs' display names
+            sleep: Waits between polls (injectable for tests)
+            clock: Time source matching ``sleep``
+
+        Raises:
+            RuntimeError: If an older google-genai than the project requires is
+                installed (no inline batch requests)
+        """
+        if not hasattr(types, "InlinedRequest"):
+            raise RuntimeError(
+                f"Bulk mode needs google-genai>={MIN_GENAI_VERSION} (inline batch requests)"
+            )
+        self.batches = batches
+        self.model = model
+        if isinstance(config, dict):
+            config = types.GenerateContentConfig.model_validate(config)
+        self.config: Optional[GenerateContentConfig] = config
+        self.batch_size = batch_size
+        self.max_job_bytes = max_job_bytes
+        self.max_jobs = max_jobs
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.backoff = backoff
+        self.max_attempts = max_attempts
+        self.display_name = display_name
+        self.sleep = sleep
+        self.clock = clock
+        self.metrics: Dict[str, int] = {
+            "prompts": 0,
+            "jobs": 0,
+            "submissions": 0,
+            "resubmissions": 0,
+            "polls": 0,
+            "errors": 0,
+            "tokens": 0,
+        }
+
+    def _chunks(self, prompts: Iterable[str]) -> Iterator[_Chunk]:
+        chunk: List[tuple] = []
+        size = 0
+        index = 0
+        for i, prompt in enumerate(prompts):
+            prompt_bytes = len(prompt.encode("utf-8")) + _REQUEST_OVERHEAD
+            full = len(chunk) >= self.batch_size or size + prompt_bytes > self.max_job_bytes
+            if chunk and full:
+                yield _Chunk(index, chunk, self.poll_interval)
+                index += 1
+                chunk, size = [], 0
+            chunk.append((i, prompt))
+            size += prompt_bytes
+        if chunk:
+            yield _Chunk(index, chunk, self.poll_interval)
+
+    def _submit(self, chunk: _Chunk) -> None:
+        src = [
+            types.InlinedRequest(
+                contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+                config=self.config,
+            )
+            for _, prompt in chunk.prompts
+        ]
+        chunk.attempts += 1
+        try:
+            job = self.batches.create(
+                model=self.model,
+                src=src,
+                config=types.CreateBatchJobConfig(
+                    display_name=f"{self.display_name}-{chunk.index}-{chunk.attempts}"
+                ),
+            )
+        except errors.APIError as e:
+            if e.code not in _RETRYABLE_CODES:
+                raise
+            # Rate limited or unavailable: try again later, without using an attempt
+            chunk.attempts -= 1
+            self._backoff(chunk)
+            return
+        self.metrics["submissions"] += 1
+        chunk.job_name = job.name
+        chunk.delay = self.poll_interval
+        self._backoff(chunk)
+
+    def _backoff(self, chunk: _Chunk) -> None:
+        chunk.due = self.clock() + chunk.delay
+        chunk.delay = min(self.max_poll_interval, chunk.delay * self.backoff)
+
+    def _poll(self, chunk: _Chunk) -> None:
+        self.metrics["polls"] += 1
+        try:
+            job = self.batches.get(name=chunk.job_name)
+        except errors.APIError as e:
+            if e.code not in _RETRYABLE_CODES:
+                raise
+            self._backoff(chunk)
+            return
+        state = job_state(job)
+        if state == SUCCEEDED:
+            chunk.records = self._records(chunk, job)
+        elif state in FAILED_STATES:
+            if chunk.attempts < self.max_attempts:
+                self.metrics["resubmissions"] += 1
+                chunk.job_name = None
+                chunk.due = self.clock()
+            else:
+                error = getattr(job.error, "message", None) or state
+                chunk.records = [
+                    self._record(i, prompt, error=error) for i, prompt in chunk.prompts
+                ]
+        else:
+            self._backoff(chunk)
+
+    def _record(
+        self, index: int, prompt: str, response: Any = None, error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"index": index, "prompt": prompt}
+        if error is not None or response is None:
+            self.metrics["errors"] += 1
+            record["error"] = error or "no response"
+            return record
+        record["text"] = response.text
+        usage = response.usage_metadata
+        if usage is not None and usage.total_token_count:
+            record["tokens"] = usage.total_token_count
+            self.metrics["tokens"] += usage.total_token_count
+        return record
+
+    def _records(self, chunk: _Chunk, job: BatchJob) -> List[Dict[str, Any]]:
+        # Inline responses come back in request order
+        responses = (job.dest.inlined_responses if job.dest is not None else None) or []
+        records = []
+        for n, (i, prompt) in enumerate(chunk.prompts):
+            inlined = responses[n] if n < len(responses) else None
+            if inlined is None:
+                records.append(self._record(i, prompt, error="missing from the job's results"))
+            elif inlined.error is not None:
+                message = inlined.error.message or f"error {inlined.error.code}"
+                records.append(self._record(i, prompt, error=message))
+            else:
+                records.append(self._record(i, prompt, inlined.response))
+        return records
+
+    def run(self, prompts: Iterable[str], sink: TextIO) -> Dict[str, int]:
+        """
+        Answer every prompt and write the records to ``sink`` in input order.
+
+        Args:
+            prompts (Iterable[str]): Prompts, read as jobs are filled
+            sink (TextIO): Gets one JSON object per line: ``index``, ``prompt``
+                and ``text`` (plus ``tokens``), or ``error``
+
+        Returns:
+            Dict[str, int]: The run's metrics
+        """
+        chunks = self._chunks(prompts)
+        active: List[_Chunk] = []
+        done: Dict[int, _Chunk] = {}
+        next_chunk = 0
+        next_write = 0
+        exhausted = False
+        while True:
+            # Start jobs while few are running and the ordered buffer is short
+            while (
+                not exhausted
+                and len(active) < self.max_jobs
+                and next_chunk - next_write < 2 * self.max_jobs
+            ):
+                chunk = next(chunks, None)
+                if chunk is None:
+                    exhausted = True
+                    break
+                self.metrics["jobs"] += 1
+                self.metrics["prompts"] += len(chunk.prompts)
+                active.append(chunk)
+                next_chunk += 1
+
+            if not active:
+                return self.metrics
+
+            now = self.clock()
+            for chunk in [c for c in active if c.due <= now]:
+                if chunk.job_name is None:
+                    self._submit(chunk)
+                else:
+                    self._poll(chunk)
+                if chunk.records is not None:
+                    active.remove(chunk)
+                    done[chunk.index] = chunk
+
+            while next_write in done:
+                for record in done.pop(next_write).records:
+                    sink.write(json.dumps(record, ensure_ascii=False) + "\n")
+                sink.flush()
+                next_write += 1
+
+            if active:
+                self.sleep(max(0.0, min(c.due for c in active) - self.clock()))
+
+    def summary(self) -> str:
+        m = self.metrics
+        return (
+            f"{m['prompts']} prompts in {m['jobs']} jobs ({m['submissions']} submissions, "
+            f"{m['resubmissions']} resubmitted), {m['polls']} polls, {m['errors']} errors, "
+            f"{m['tokens']} tokens"
+        )
+
+
+def read_prompts(path: str) -> Iterator[str]:
+    """Prompts from a text file (one per line) or JSONL (a ``prompt`` field per line)."""
+    jsonl = path.endswith(".jsonl")
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            yield json.loads(line)["prompt"] if jsonl else line.rstrip("\n")
+
+
+def main():
+    """Run a prompts file through the batch API with the module1 chat config."""
+    from dotenv import load_dotenv
+
+    from agentkit.agents import load_agent
+
+    parser = argparse.ArgumentParser(description="Answer a file of prompts with batch jobs")
+    parser.add_argument("prompts", help="one prompt per line, or .jsonl with a prompt field")
+    parser.add_argument("output", help="JSONL results in input order ('-' for stdout)")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--jobs", type=int, default=DEFAULT_MAX_JOBS)
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    parser.add_argument("--fake", action="store_true", help="use the local batch stand-in")
+    args = parser.parse_args()
+
+    load_dotenv()
+    # The module1 chat config; batch requests cannot run tools
+    spec = load_agent("chat")
+    model = args.model or spec.model_name
+    if args.fake:
+        from agentkit.fake import FakeBatches, FakeModels, text_response
+
+        def echo(contents, config):
+            return text_response(f"Echo: {contents[-1].parts[0].text}")
+
+        batches = FakeBatches(FakeModels(echo), duration=2 * args.poll_interval)
+    else:
+        api_key = os.getenv("API_KEY")
+        if not api_key:
+            print("Error: API key not found. Please add it to your .env file.")
+            raise SystemExit(1)
+        genai = lazy_import("google.genai")
+        batches = genai.Client(api_key=api_key).batches
+
+    runner = BulkRunner(
+        batches,
+        model,
+        spec.config,
+        batch_size=args.batch_size,
+        max_jobs=args.jobs,
+        poll_interval=args.poll_interval,
+    )
+    sink = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        runner.run(read_prompts(args.prompts), sink)
+    except KeyboardInterrupt:
+        print("\n👋 Stopped; submitted jobs keep running on the server", file=sys.stderr)
+        raise SystemExit(130)
+    finally:
+        if sink is not sys.stdout:
+            sink.close()
+    print(f"📦 {runner.summary()}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+"""
+Record and replay ``generate_content`` calls.
+
+Performance work on the chaining loops needs runs that are repeatable and do
+not depend on the network. ``CassetteModels`` wraps a ``models`` object: in
+``record`` mode every request is passed through and the response (function
+calls and ``usage_metadata`` included) is appended to a cassette file; in
+``replay`` mode responses come from the cassette and no request is sent.
+``auto`` replays what the cassette has and records the rest.
+
+A cassette is JSON Lines, gzip-compressed when the path ends in ``.gz``. Each
+interaction stores the request's key, not the request itself, so files stay
+small. Keys are chained hashes over the wire encoding of each message: a
+message's digest is computed once, when it first shows up in a request, so
+looking up the next round trip of a long conversation only hashes the new
+messages. Two keys are kept per request:
+
+- the exact key covers the whole request (model, config and every message)
+- the loose key leaves out the bodies of function responses, so a replay
+  still matches when a live tool returns something slightly different (the
+  current weather, a timestamp)
+
+``generate_content_stream`` passes recorded streams through chunk by chunk
+and stores them as one response, which is replayed as a single chunk.
+
+Identical requests recorded more than once are replayed in recording order,
+the last one repeating. Replays can sleep for the recorded time (scaled) or a
+fixed time to simulate the network.
+"""
+
+from __future__ import annotations
+
+import atexit
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from agentkit.compact_history import CompactHistory
+from agentkit.startup import lazy_import
+from agentkit.transport import encode_config, encode_content, join_chunks, stream_content
+
+if TYPE_CHECKING:
+    from google.genai.types import GenerateContentConfig, GenerateContentResponse
+
+types = lazy_import("google.genai.types")
+
+MODES = ("record", "replay", "auto")
+FORMAT_VERSION = 1
+_DIGEST_SIZE = 16
+# Left out of recorded responses: raw HTTP headers and SDK bookkeeping
+_UNRECORDED_FIELDS = ("sdkHttpResponse", "automaticFunctionCallingHistory")
+
+
+class CassetteMiss(LookupError):
+    """Raised in ``replay`` mode for a request the cassette has no response to."""
+
+
+def _digest(*chunks: bytes) -> bytes:
+    h = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    for chunk in chunks:
+        h.update(chunk)
+    return h.digest()
+
+
+def _loose_encoding(encoded: bytes) -> bytes:
+    """A message's encoding with the bodies of its function responses left out."""
+    if b'"functionResponse"' not in encoded:
+        return encoded
+    data = json.loads(encoded)
+    parts = [
+        {"functionResponse": {"name": (part.get("functionResponse") or {}).get("name")}}
+        if "functionResponse" in part
+        else part
+        for part in data.get("parts") or []
+    ]
+    return json.dumps({**data, "parts": parts}, separators=(",", ":")).encode("utf-8")
+
+
+class RequestHasher:
+    """
+    Incrementally computes the exact and loose keys of a growing ``contents``
+    list, matching messages by identity like ``transport.PrefixEncoder``.
+    """
+
+    def __init__(self):
+        # (message object, exact chain digest, loose chain digest)
+        self._prefix: List[Tuple[Any, bytes, bytes]] = []
+        self._config: Optional[Tuple[Any, bytes]] = None
+        self.hashed_messages = 0
+        self.reused_messages = 0
+
+    def _config_digest(self, config: Any) -> bytes:
+        if self._config is None or self._config[0] is not config:
+            self._config = (config, _digest(encode_config(config)))
+        return self._config[1]
+
+    def keys(
+        self, model: str, contents: Any, config: Optional[GenerateContentConfig]
+    ) -> Tuple[str, str]:
+        """
+        Returns:
+            Tuple[str, str]: The exact and the loose key of the request
+        """
+        if isinstance(contents, CompactHistory):
+            contents = list(contents)
+        elif not isinstance(contents, (list, tuple)):
+            contents = [contents]
+
+        prefix = self._prefix
+        keep = 0
+        limit = min(len(prefix), len(contents))
+        while keep < limit and prefix[keep][0] is contents[keep]:
+            keep += 1
+        del prefix[keep:]
+
+        exact, loose = (prefix[-1][1], prefix[-1][2]) if prefix else (b"", b"")
+        for content in contents[keep:]:
+            encoded = encode_content(content)
+            exact = _digest(exact, encoded)
+            loose = _digest(loose, _loose_encoding(encoded))
+            prefix.append((content, exact, loose))
+
+        self.reused_messages += keep
+        self.hashed_messages += len(contents) - keep
+        head = model.encode("utf-8") + b"\0" + self._config_digest(config)
+        return _digest(head, exact).hex(), _digest(head, loose).hex()
+
+
+class _Interaction:
+    __slots__ = ("data", "seconds", "response")
+
+    def __init__(self, data: dict, seconds: float):
+        self.data = data
+        self.seconds = seconds
+        self.response: Optional[GenerateContentResponse] = None
+
+
+class Cassette:
+    """
+    The interactions of one cassette file, indexed by exact and loose key.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Cassette file; created on the first recorded interaction
+        """
+        self.path = path
+        self._exact: Dict[str, Deque[_Interaction]] = {}
+        self._loose: Dict[str, Deque[_Interaction]] = {}
+        self._lock = threading.Lock()
+        self._file = None
+        if os.path.exists(path):
+            self._load()
+
+    def _open(self, mode: str):
+        if self.path.endswith(".gz"):
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self) -> None:
+        with self._open("r") as file:
+            for line in file:
+                record = json.loads(line)
+                if "version" in record:
+                    if record["version"] != FORMAT_VERSION:
+                        raise ValueError(
+                            f"{self.path}: unsupported cassette version {record['version']}"
+                        )
+                    continue
+                self._index(record)
+
+    def _index(self, record: dict) -> _Interaction:
+        interaction = _Interaction(record["response"], record.get("seconds", 0.0))
+        self._exact.setdefault(record["key"], deque()).append(interaction)
+        self._loose.setdefault(record["loose"], deque()).append(interaction)
+        return interaction
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._exact.values())
+
+    @staticmethod
+    def _take(queue: Optional[Deque[_Interaction]]) -> Optional[_Interaction]:
+        if not queue:
+            return None
+        # Repeat the last recording once the others have been replayed
+        return queue.popleft() if len(queue) > 1 else queue[0]
+
+    def find(self, key: str, loose: str) -> Tuple[Optional[_Interaction], bool]:
+        """
+        Look up the next recorded response for a request.
+
+        Returns:
+            Tuple[Optional[_Interaction], bool]: The interaction (None on a
+            miss) and whether it was found by the loose key only
+        """
+        with self._lock:
+            interaction = self._take(self._exact.get(key))
+            if interaction is not None:
+                return interaction, False
+            return self._take(self._loose.get(loose)), True
+
+    def record(
+        self, key: str, loose: str, model: str, response: GenerateContentResponse, seconds: float
+    ) -> None:
+        """Append an interaction to the file and the index."""
+        data = response.model_dump(mode="json", exclude_none=True, by_alias=True)
+        for field in _UNRECORDED_FIELDS:
+            data.pop(field, None)
+        record = {
+            "key": key,
+            "loose": loose,
+            "model": model,
+            "seconds": round(seconds, 4),
+            "response": data,
+        }
+        line = json.dumps(record, separators=(",", ":"), ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                new = not os.path.exists(self.path)
+                self._file = self._open("a")
+                # A gzip stream is only complete once it is closed
+                atexit.register(self.close)
+                if new:
+                    self._file.write(json.dumps({"version": FORMAT_VERSION}) + "\n")
+            self._file.write(line)
+            self._file.flush()
+            self._index(record)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class CassetteModels:
+    """
+    Wraps a ``models`` object and records its responses to, or replays them
+    from, a cassette file.
+
+    Example:
+        models = CassetteModels(client.models, "session.jsonl.gz", mode="record")
+        ...
+        models = CassetteModels(None, "session.jsonl.gz", latency_scale=1.0)
+    """
+
+    def __init__(
+        self,
+        models: Any,
+        path: str,
+        mode: str = "replay",
+        latency: Optional[float] = None,
+        latency_scale: float = 0.0,
+    ):
+        """
+        Args:
+            models: Object with ``generate_content``; may be None in ``replay`` mode
+            path (str): Cassette file (``.gz`` for gzip)
+            mode (str): "record", "replay" or "auto"
+            latency (Optional[float]): Fixed seconds to sleep per replayed response
+            latency_scale (float): Otherwise sleep the recorded time times this
+                (0 replays as fast as possible, 1 at recorded speed)
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {MODES}")
+        if models is None and mode != "replay":
+            raise ValueError(f"Cassette mode {mode!r} needs a models object to record from")
+        self.models = models
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self.cassette = Cassette(path)
+        self._hashers = threading.local()
+        self.metrics: Dict[str, int] = {"hits": 0, "loose_hits": 0, "misses": 0, "recorded": 0}
+
+    def _hasher(self) -> RequestHasher:
+        # One prefix per thread: concurrent conversations must not share it
+        hasher = getattr(self._hashers, "hasher", None)
+        if hasher is None:
+            hasher = self._hashers.hasher = RequestHasher()
+        return hasher
+
+    def generate_content(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> GenerateContentResponse:
+        key, loose = self._hasher().keys(model, contents, config)
+
+        if self.mode != "record":
+            interaction, by_loose = self.cassette.find(key, loose)
+            if interaction is not None:
+                self.metrics["loose_hits" if by_loose else "hits"] += 1
+                return self._replay(interaction)
+            self.metrics["misses"] += 1
+            if self.mode == "replay":
+                raise self._miss(key, model)
+
+        start = time.perf_counter()
+        response = self.models.generate_content(model=model, contents=contents, config=config)
+        self.cassette.record(key, loose, model, response, time.perf_counter() - start)
+        self.metrics["recorded"] += 1
+        return response
+
+    def generate_content_stream(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> Iterator[GenerateContentResponse]:
+        """
+        Like ``generate_content``. Recorded streams pass through chunk by chunk
+        and are stored as one response, so a replay is a single chunk.
+        """
+        key, loose = self._hasher().keys(model, contents, config)
+
+        if self.mode != "record":
+            interaction, by_loose = self.cassette.find(key, loose)
+            if interaction is not None:
+                self.metrics["loose_hits" if by_loose else "hits"] += 1
+                yield self._replay(interaction)
+                return
+            self.metrics["misses"] += 1
+            if self.mode == "replay":
+                raise self._miss(key, model)
+
+        start = time.perf_counter()
+        chunks: List[GenerateContentResponse] = []
+        for chunk in stream_content(self.models, model=model, contents=contents, config=config):
+            chunks.append(chunk)
+            yield chunk
+        response = join_chunks(chunks)
+        self.cassette.record(key, loose, model, response, time.perf_counter() - start)
+        self.metrics["recorded"] += 1
+
+    def _miss(self, key: str, model: str) -> CassetteMiss:
+        return CassetteMiss(
+            f"No recorded response in {self.cassette.path} for request {key[:12]} "
+            f"({model}); record it with AGENT_CASSETTE_MODE=record or auto"
+        )
+
+    def _replay(self, interaction: _Interaction) -> GenerateContentResponse:
+        if interaction.response is None:
+            interaction.response = types.GenerateContentResponse.model_validate(
+                interaction.data
+            )
+        delay = self.latency
+        if delay is None:
+            delay = interaction.seconds * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        return interaction.response.model_copy()
+
+    def close(self) -> None:
+        self.cassette.close()
+
+    def summary(self) -> str:
+        m = self.metrics
+        return (
+            f"{m['hits']} replayed, {m['loose_hits']} replayed by loose match, "
+            f"{m['misses']} missed, {m['recorded']} recorded ({self.cassette.path})"
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # e.g. stats() of the wrapped layers
+        if self.models is None:
+            raise AttributeError(name)
+        return getattr(self.models, name)
+
+
+def cassette_mode() -> Optional[str]:
+    """The cassette mode set by the environment, or None if no cassette is used."""
+    if not os.getenv("AGENT_CASSETTE"):
+        return None
+    return os.getenv("AGENT_CASSETTE_MODE", "replay").lower()
+
+
+def cassette_for(models: Any) -> Any:
+    """
+    Wrap ``models`` in a ``CassetteModels`` from environment variables.
+
+    - ``AGENT_CASSETTE``: cassette file (``.gz`` for gzip)
+    - ``AGENT_CASSETTE_MODE``: "replay" (default), "record" or "auto"
+    - ``AGENT_CASSETTE_LATENCY``: "recorded" to sleep the recorded time per
+      replayed response, or a number of seconds
+
+    Returns:
+        ``models`` unchanged when ``AGENT_CASSETTE`` is not set
+    """
+    mode = cassette_mode()
+    if mode is None:
+        return models
+    latency, scale = None, 0.0
+    setting = os.getenv("AGENT_CASSETTE_LATENCY", "")
+    if setting == "recorded":
+        scale = 1.0
+    elif setting:
+        latency = float(setting)
+    return CassetteModels(
+        models, os.environ["AGENT_CASSETTE"], mode=mode, latency=latency, latency_scale=scale
+    )
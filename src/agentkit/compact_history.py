@@ -0,0 +1,140 @@
+"""
+Compact in-memory representation of a conversation history.
+
+A ``List[Content]`` keeps a full pydantic object graph per message (the
+``Content``, a list of ``Part`` objects and every nested model), and the SDK
+dumps the whole graph to JSON again on every request. ``CompactHistory`` stores
+each message as a ``__slots__`` record holding an interned role string and the
+message's JSON encoding, so:
+
+- memory per turn is roughly the size of the JSON text,
+- each message is serialized exactly once, when it is added (or replaced),
+- ``Content`` objects are only built when a request is actually sent.
+
+It is not a drop-in for the ``contents`` list of ``client.models``: the SDK
+rejects it, and ``materialize()`` on every request costs more than keeping
+the plain list. ``PrefixCachingModels`` and ``CassetteModels`` accept it
+directly and send the cached encodings.
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, List, Union, overload
+
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import Content
+
+types = lazy_import("google.genai.types")
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+class Message:
+    """A single immutable history entry: interned role plus the JSON-encoded message."""
+
+    __slots__ = ("role", "data")
+
+    def __init__(self, role: str, data: bytes):
+        """
+        Args:
+            role (str): "user" or "model"; interned so all messages share it
+            data (bytes): The JSON encoding of the whole message
+        """
+        self.role = sys.intern(role)
+        self.data = data
+
+    @classmethod
+    def from_content(cls, content: Union[Content, dict]) -> "Message":
+        """Encode a ``Content`` (or equivalent dict) into a compact record."""
+        if not isinstance(content, dict):
+            # camelCase aliases make ``data`` the exact wire format of the API
+            content = content.model_dump(mode="json", exclude_none=True, by_alias=True)
+        return cls(content.get("role") or "user", _dumps(content))
+
+    def to_dict(self) -> dict:
+        return json.loads(self.data)
+
+    def to_content(self) -> Content:
+        """Materialize the pydantic ``Content`` for this message."""
+        return types.Content.model_validate_json(self.data)
+
+    def __repr__(self) -> str:
+        return f"Message(role={self.role!r}, {len(self.data)} bytes)"
+
+
+class CompactHistory:
+    """
+    A list-like conversation history backed by ``Message`` records.
+
+    It accepts ``Content`` objects wherever the agents used a plain list
+    (``append``, ``extend``, ``del history[:-10]``) and exposes
+    ``materialize()`` for the ``contents=`` argument of ``generate_content``
+    and ``encode()`` for the pre-serialized JSON array.
+    """
+
+    __slots__ = ("_messages",)
+
+    def __init__(self, contents: Iterable[Union[Content, Message, dict]] = ()):
+        self._messages: List[Message] = []
+        self.extend(contents)
+
+    @staticmethod
+    def _coerce(item: Union[Content, Message, dict]) -> Message:
+        return item if isinstance(item, Message) else Message.from_content(item)
+
+    def append(self, content: Union[Content, Message, dict]) -> None:
+        self._messages.append(self._coerce(content))
+
+    def extend(self, contents: Iterable[Union[Content, Message, dict]]) -> None:
+        self._messages.extend(self._coerce(content) for content in contents)
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    @overload
+    def __getitem__(self, index: int) -> Message: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> "CompactHistory": ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            history = CompactHistory()
+            history._messages = self._messages[index]
+            return history
+        return self._messages[index]
+
+    def __setitem__(self, index: int, content: Union[Content, Message, dict]) -> None:
+        # Only the replaced message is re-encoded
+        self._messages[index] = self._coerce(content)
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        del self._messages[index]
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+
+    def messages(self) -> List[Message]:
+        """Return the underlying records (not a copy)."""
+        return self._messages
+
+    def materialize(self) -> List[Content]:
+        """Build the ``Content`` list to pass to ``generate_content``."""
+        return [message.to_content() for message in self._messages]
+
+    def encode(self) -> bytes:
+        """Return the JSON array of all messages, reusing each cached encoding."""
+        return b"[" + b",".join(message.data for message in self._messages) + b"]"
+
+    def nbytes(self) -> int:
+        """Approximate memory used by the records and their encodings."""
+        return sys.getsizeof(self._messages) + sum(
+            sys.getsizeof(message) + sys.getsizeof(message.data)
+            for message in self._messages
+        )
@@ -0,0 +1,271 @@
+"""
+Context caching for the static part of every request.
+
+The system prompt and tool declarations are identical on every round trip,
+and in the function chaining loops there can be many round trips per user
+turn. ``ContextCachingModels`` registers them once as a cached context
+(``client.caches.create``), sends only ``cached_content=<name>`` afterwards,
+and transparently re-creates the cache when it expires.
+
+The API only caches contexts of at least ``min_cache_tokens(model)`` tokens;
+smaller ones (the workshop prompts and tools are far below it) are sent
+unchanged without trying. A config whose cache is rejected with a client
+error is not tried again; rate limiting and server errors are retried with
+exponential backoff, sending requests uncached meanwhile.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, Optional, Tuple
+
+from agentkit.startup import lazy_import
+from agentkit.transport import stream_content
+
+if TYPE_CHECKING:
+    from google.genai.types import GenerateContentConfig
+
+errors = lazy_import("google.genai.errors")
+types = lazy_import("google.genai.types")
+
+# Smallest context the API caches, by model family (tokens); ``caches.create``
+# answers 400 "Cached content is too small" below it
+MIN_CACHE_TOKENS = {"gemini-2.5-flash": 1024, "gemini-2.5-pro": 4096}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+# Worth another try later: timeouts, rate limiting and server errors
+_TRANSIENT_CODES = {408, 429}
+
+
+def estimate_tokens(value: Any) -> int:
+    """Rough token count (~4 characters per token) of a request fragment."""
+    if value is None:
+        return 0
+    if hasattr(value, "model_dump"):
+        value = value.model_dump(mode="json", exclude_none=True)
+    if not isinstance(value, str):
+        value = json.dumps(value, default=str)
+    return max(1, len(value) // 4)
+
+
+def min_cache_tokens(model: str) -> int:
+    """The minimum cacheable context size of ``model`` ("models/" prefix optional)."""
+    name = model.rsplit("/", 1)[-1]
+    for prefix, tokens in MIN_CACHE_TOKENS.items():
+        if name.startswith(prefix):
+            return tokens
+    return DEFAULT_MIN_CACHE_TOKENS
+
+
+class _CacheEntry:
+    __slots__ = ("config", "name", "expires", "derived")
+
+    def __init__(self, config, name, expires, derived):
+        self.config = config
+        self.name = name
+        self.expires = expires
+        self.derived = derived
+
+
+class ContextCachingModels:
+    """
+    Wraps a ``models`` object and moves the system instruction and tools of
+    each config into a cached context.
+
+    Requests whose config has no cache (below the minimum size, rejected, or
+    waiting to retry after a transient error) are sent unchanged.
+    """
+
+    def __init__(
+        self,
+        models: Any,
+        caches: Any,
+        ttl_seconds: int = 3600,
+        refresh_margin: float = 30.0,
+        min_tokens: Optional[int] = None,
+        retry_delay: float = 1.0,
+        max_retry_delay: float = 300.0,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            models: Object with ``generate_content`` (e.g. ``client.models``)
+            caches: Object with ``create`` (e.g. ``client.caches``)
+            ttl_seconds (int): Lifetime requested for each cached context
+            refresh_margin (float): Re-create this many seconds before expiry
+            min_tokens (Optional[int]): Smallest context worth caching; defaults to
+                ``min_cache_tokens(model)``
+            retry_delay (float): Seconds before retrying after a transient error,
+                doubling on each further one
+            max_retry_delay (float): Upper bound of that delay
+            clock: Time source, replaceable in benchmarks
+        """
+        self.models = models
+        self.caches = caches
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.min_tokens = min_tokens
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.clock = clock
+
+        self._entries: Dict[Tuple[str, int], _CacheEntry] = {}
+        # Values keep a reference to the config so its id() key cannot be reused
+        self._uncacheable: Dict[Tuple[str, int], Any] = {}
+        # (retry at, current delay, config) after a transient error
+        self._retry: Dict[Tuple[str, int], Tuple[float, float, Any]] = {}
+        self.caches_created = 0
+        self.create_errors = 0
+        self.requests = 0
+        self.cached_tokens = 0
+        self.last_error: Optional[Exception] = None
+
+    def _create(self, model: str, config: GenerateContentConfig) -> _CacheEntry:
+        cached = self.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                system_instruction=config.system_instruction,
+                tools=config.tools,
+                tool_config=config.tool_config,
+                ttl=f"{self.ttl_seconds}s",
+            ),
+        )
+        self.caches_created += 1
+
+        expires = self.clock() + self.ttl_seconds
+        if cached.expire_time is not None:
+            expires = cached.expire_time.timestamp()
+
+        derived = config.model_copy(
+            update={
+                "system_instruction": None,
+                "tools": None,
+                "tool_config": None,
+                "cached_content": cached.name,
+            }
+        )
+        return _CacheEntry(config, cached.name, expires, derived)
+
+    def _cached_config(
+        self, model: str, config: GenerateContentConfig, force: bool = False
+    ) -> Optional[GenerateContentConfig]:
+        """Return the config referring to a live cache, creating one if needed."""
+        key = (model, id(config))
+        if key in self._uncacheable:
+            return None
+        retry = self._retry.get(key)
+        if retry is not None and self.clock() < retry[0]:
+            return None
+        if key not in self._entries:
+            size = estimate_tokens(config.system_instruction) + estimate_tokens(config.tools)
+            minimum = self.min_tokens if self.min_tokens is not None else min_cache_tokens(model)
+            if size < minimum:
+                self._uncacheable[key] = config
+                return None
+
+        entry = self._entries.get(key)
+        if (
+            force
+            or entry is None
+            or entry.config is not config
+            or self.clock() >= entry.expires - self.refresh_margin
+        ):
+            try:
+                entry = self._create(model, config)
+            except errors.APIError as e:
+                self.create_errors += 1
+                self.last_error = e
+                if 400 <= e.code < 500 and e.code not in _TRANSIENT_CODES:
+                    # Too small, unsupported model, bad request: it will not work later
+                    self._uncacheable[key] = config
+                else:
+                    delay = self.retry_delay if retry is None else retry[1] * 2
+                    delay = min(delay, self.max_retry_delay)
+                    self._retry[key] = (self.clock() + delay, delay, config)
+                return None
+            self._retry.pop(key, None)
+            self._entries[key] = entry
+        return entry.derived
+
+    def _derived(self, model: str, config: Optional[GenerateContentConfig]) -> Any:
+        """The config to send ``config`` as: through its cache, or None to send it as is."""
+        self.requests += 1
+        if config is None or config.cached_content or not (
+            config.system_instruction or config.tools
+        ):
+            return None
+        return self._cached_config(model, config)
+
+    def _count(self, response: Any) -> None:
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and usage.cached_content_token_count:
+            self.cached_tokens += usage.cached_content_token_count
+
+    def generate_content(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> Any:
+        derived = self._derived(model, config)
+        if derived is None:
+            return self.models.generate_content(
+                model=model, contents=contents, config=config
+            )
+
+        try:
+            response = self.models.generate_content(
+                model=model, contents=contents, config=derived
+            )
+        except errors.APIError as e:
+            # The cache expired or was deleted server-side; re-create it once
+            if e.code != 404:
+                raise
+            derived = self._cached_config(model, config, force=True) or config
+            response = self.models.generate_content(
+                model=model, contents=contents, config=derived
+            )
+        self._count(response)
+        return response
+
+    def generate_content_stream(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> Iterator[Any]:
+        """Like ``generate_content``, streaming from the layer below."""
+        derived = self._derived(model, config)
+        if derived is None:
+            yield from stream_content(self.models, model=model, contents=contents, config=config)
+            return
+
+        # A missing cache is reported before the first chunk
+        chunks = stream_content(self.models, model=model, contents=contents, config=derived)
+        try:
+            last = next(chunks, None)
+        except errors.APIError as e:
+            if e.code != 404:
+                raise
+            derived = self._cached_config(model, config, force=True) or config
+            chunks = stream_content(self.models, model=model, contents=contents, config=derived)
+            last = next(chunks, None)
+        if last is None:
+            return
+        yield last
+        for last in chunks:
+            yield last
+        # Usage is reported with the last chunk
+        self._count(last)
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for this session; ``cached_tokens`` is input not re-sent."""
+        return {
+            "requests": self.requests,
+            "caches_created": self.caches_created,
+            "create_errors": self.create_errors,
+            "uncached_configs": len(self._uncacheable),
+            "cached_tokens": self.cached_tokens,
+        }
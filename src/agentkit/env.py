@@ -0,0 +1,17 @@
+"""
+Environment-variable helpers shared by the agentkit factories.
+
+Kept free of third-party imports so checking a flag never pulls in the SDK.
+"""
+
+import os
+
+
+def env_flag(name: str) -> bool:
+    """Return True if the environment variable is set to a truthy value."""
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+def model_name_for(default: str) -> str:
+    """Return the model an entry point should call: ``AGENT_MODEL`` if set, else ``default``."""
+    return os.getenv("AGENT_MODEL") or default
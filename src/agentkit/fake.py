@@ -0,0 +1,332 @@
+"""
+An in-process stand-in for the Gemini API, for benchmarks and demos.
+
+``FakeModels`` has the same ``generate_content(model=, contents=, config=)``
+interface as ``client.models`` and returns real ``GenerateContentResponse``
+objects, so the agent loops cannot tell it apart from the SDK. What it answers
+is decided by a *responder*: a callable that receives the request and returns
+a response (see ``text_response`` and ``function_call_response``).
+
+``FakeCaches`` mirrors ``client.caches`` closely enough for context caching.
+``generate_content_stream`` streams each part of the response as its own
+chunk, ``part_latency`` seconds apart. ``FakeBatches`` runs ``client.batches``
+jobs of inline requests through a ``FakeModels``.
+"""
+
+import datetime
+import itertools
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from google.genai import errors
+from google.genai.types import (
+    BatchJob,
+    BatchJobDestination,
+    CachedContent,
+    Candidate,
+    Content,
+    FunctionCall,
+    GenerateContentConfig,
+    GenerateContentResponse,
+    GenerateContentResponseUsageMetadata,
+    InlinedRequest,
+    InlinedResponse,
+    JobError,
+    JobState,
+    Part,
+)
+
+from agentkit.context_cache import estimate_tokens, min_cache_tokens
+
+Responder = Callable[[List[Content], Optional[GenerateContentConfig]], GenerateContentResponse]
+
+
+def text_response(text: str) -> GenerateContentResponse:
+    """Build a model response containing only text."""
+    return _response([Part(text=text)])
+
+
+def function_call_response(*calls: FunctionCall) -> GenerateContentResponse:
+    """Build a model response that asks for one or more function calls."""
+    return _response([Part(function_call=call) for call in calls])
+
+
+def parts_response(*parts: Part) -> GenerateContentResponse:
+    """Build a model response from any parts, e.g. text interleaved with function calls."""
+    return _response(list(parts))
+
+
+def _response(parts: List[Part]) -> GenerateContentResponse:
+    return GenerateContentResponse(
+        candidates=[
+            Candidate(content=Content(role="model", parts=parts), finish_reason="STOP")
+        ]
+    )
+
+
+def scripted(responses: Iterable[GenerateContentResponse]) -> Responder:
+    """A responder that returns the given responses in order, then repeats the last."""
+    responses = list(responses)
+    counter = itertools.count()
+
+    def respond(contents, config):
+        return responses[min(next(counter), len(responses) - 1)]
+
+    return respond
+
+
+class FakeCaches:
+    """
+    Minimal in-memory version of ``client.caches``.
+
+    Like the API it rejects contexts below the model's minimum cacheable size
+    (``min_cache_tokens``, or ``min_tokens`` if given) with a 400.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time, min_tokens: Optional[int] = None):
+        self.clock = clock
+        self.min_tokens = min_tokens
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._ids = itertools.count(1)
+
+    def create(self, *, model: str, config: Any) -> CachedContent:
+        ttl = float(str(getattr(config, "ttl", None) or "3600s").rstrip("s"))
+        tokens = estimate_tokens(config.system_instruction) + estimate_tokens(config.tools)
+        minimum = self.min_tokens if self.min_tokens is not None else min_cache_tokens(model)
+        if tokens < minimum:
+            message = (
+                f"Cached content is too small. total_token_count={tokens}, "
+                f"min_total_token_count={minimum}"
+            )
+            raise errors.ClientError(
+                400, {"error": {"code": 400, "message": message, "status": "INVALID_ARGUMENT"}}
+            )
+        name = f"cachedContents/fake-{next(self._ids)}"
+        expires = self.clock() + ttl
+        self.entries[name] = {"model": model, "tokens": tokens, "expires": expires}
+        return CachedContent(
+            name=name,
+            model=model,
+            expire_time=datetime.datetime.fromtimestamp(expires, datetime.timezone.utc),
+        )
+
+    def lookup(self, name: str) -> Dict[str, Any]:
+        """Return a live cache entry or raise the 404 the real API would."""
+        entry = self.entries.get(name)
+        if entry is None or entry["expires"] <= self.clock():
+            self.entries.pop(name, None)
+            raise errors.ClientError(
+                404,
+                {"error": {"code": 404, "message": f"{name} not found", "status": "NOT_FOUND"}},
+            )
+        return entry
+
+    def delete(self, *, name: str) -> None:
+        self.entries.pop(name, None)
+
+
+class FakeModels:
+    """
+    Drop-in for ``client.models`` driven by a responder function.
+
+    Every response gets ``usage_metadata`` estimated from the request, with
+    ``cached_content_token_count`` set when the request refers to a
+    ``FakeCaches`` entry.
+    """
+
+    def __init__(
+        self,
+        responder: Responder,
+        latency: Union[float, Callable[[str], float]] = 0.0,
+        caches: Optional[FakeCaches] = None,
+        part_latency: float = 0.0,
+    ):
+        """
+        Args:
+            responder: Callable returning the response for (contents, config)
+            latency: Seconds to sleep per call (to the first part when
+                streaming), to simulate the network; or a callable drawing them
+                for the requested model, e.g. from a latency distribution
+            caches (Optional[FakeCaches]): Backing store for ``cached_content``
+            part_latency (float): Seconds to generate each further part
+        """
+        self.responder = responder
+        self.latency = latency
+        self.part_latency = part_latency
+        self.caches = caches or FakeCaches()
+        self.calls = 0
+        self.prompt_tokens = 0
+
+    def _latency(self, model: str) -> float:
+        return self.latency(model) if callable(self.latency) else self.latency
+
+    def _respond(
+        self, contents: Any, config: Optional[GenerateContentConfig]
+    ) -> GenerateContentResponse:
+        self.calls += 1
+        contents = contents if isinstance(contents, list) else list(contents)
+        cached_tokens = 0
+        prompt_tokens = estimate_tokens(contents)
+        if config is not None:
+            if config.cached_content:
+                cached_tokens = self.caches.lookup(config.cached_content)["tokens"]
+            prompt_tokens += estimate_tokens(config.system_instruction)
+            prompt_tokens += estimate_tokens(config.tools)
+        prompt_tokens += cached_tokens
+        self.prompt_tokens += prompt_tokens
+
+        response = self.responder(contents, config).model_copy()
+        response.usage_metadata = GenerateContentResponseUsageMetadata(
+            prompt_token_count=prompt_tokens,
+            cached_content_token_count=cached_tokens or None,
+            candidates_token_count=estimate_tokens(response.candidates),
+            total_token_count=prompt_tokens + estimate_tokens(response.candidates),
+        )
+        return response
+
+    def generate_content(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> GenerateContentResponse:
+        response = self._respond(contents, config)
+        parts = response.candidates[0].content.parts if response.candidates else []
+        delay = self._latency(model) + self.part_latency * max(0, len(parts or []) - 1)
+        if delay:
+            time.sleep(delay)
+        return response
+
+    def generate_content_stream(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> Iterator[GenerateContentResponse]:
+        response = self._respond(contents, config)
+        latency = self._latency(model)
+        if latency:
+            time.sleep(latency)
+        candidate = response.candidates[0]
+        parts = candidate.content.parts or []
+        for i, part in enumerate(parts):
+            if i and self.part_latency:
+                time.sleep(self.part_latency)
+            last = i == len(parts) - 1
+            yield GenerateContentResponse(
+                candidates=[
+                    Candidate(
+                        content=Content(role="model", parts=[part]),
+                        finish_reason=candidate.finish_reason if last else None,
+                    )
+                ],
+                usage_metadata=response.usage_metadata if last else None,
+            )
+
+
+class FakeBatches:
+    """
+    Minimal in-memory version of ``client.batches`` for inline requests.
+
+    A job is ``JOB_STATE_PENDING`` when created, ``JOB_STATE_RUNNING`` once
+    polled, and finishes ``duration`` seconds after it was created. Its
+    requests are answered by ``models`` then, in order, as the real API does.
+    The first ``fail_jobs`` jobs end ``JOB_STATE_FAILED`` instead.
+    """
+
+    def __init__(
+        self,
+        models: FakeModels,
+        duration: Union[float, Callable[[], float]] = 0.0,
+        fail_jobs: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            models (FakeModels): Answers each inline request
+            duration: Seconds from creation until a job is done, or a callable
+                drawing them per job
+            fail_jobs (int): Number of jobs, from the first one, that fail
+            clock: Time source (injectable to fast-forward jobs)
+        """
+        self.models = models
+        self.duration = duration
+        self.fail_jobs = fail_jobs
+        self.clock = clock
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.created = 0
+        self.polls = 0
+        self._ids = itertools.count(1)
+
+    def create(self, *, model: str, src: Any, config: Any = None) -> BatchJob:
+        if not isinstance(src, list):
+            raise errors.ClientError(
+                400,
+                {
+                    "error": {
+                        "code": 400,
+                        "message": "FakeBatches only supports inline requests",
+                        "status": "INVALID_ARGUMENT",
+                    }
+                },
+            )
+        self.created += 1
+        name = f"batches/fake-{next(self._ids)}"
+        self.jobs[name] = {
+            "model": model,
+            "requests": list(src),
+            "display_name": getattr(config, "display_name", None)
+            if not isinstance(config, dict)
+            else config.get("display_name"),
+            "done_at": self.clock()
+            + (self.duration() if callable(self.duration) else self.duration),
+            "fail": self.created <= self.fail_jobs,
+            "state": JobState.JOB_STATE_PENDING,
+            "dest": None,
+        }
+        return self._job(name)
+
+    def get(self, *, name: str) -> BatchJob:
+        job = self.jobs.get(name)
+        if job is None:
+            raise errors.ClientError(
+                404,
+                {"error": {"code": 404, "message": f"{name} not found", "status": "NOT_FOUND"}},
+            )
+        self.polls += 1
+        if job["state"] == JobState.JOB_STATE_PENDING:
+            job["state"] = JobState.JOB_STATE_RUNNING
+        if job["state"] == JobState.JOB_STATE_RUNNING and self.clock() >= job["done_at"]:
+            self._finish(job)
+        return self._job(name)
+
+    def _finish(self, job: Dict[str, Any]) -> None:
+        if job["fail"]:
+            job["state"] = JobState.JOB_STATE_FAILED
+            return
+        responses = []
+        for request in job["requests"]:
+            if isinstance(request, dict):
+                request = InlinedRequest(**request)
+            try:
+                response = self.models.generate_content(
+                    model=job["model"], contents=request.contents, config=request.config
+                )
+                responses.append(InlinedResponse(response=response))
+            except errors.APIError as e:
+                error = JobError(code=e.code, message=str(e))
+                responses.append(InlinedResponse(error=error))
+        job["dest"] = BatchJobDestination(inlined_responses=responses)
+        job["state"] = JobState.JOB_STATE_SUCCEEDED
+
+    def _job(self, name: str) -> BatchJob:
+        job = self.jobs[name]
+        return BatchJob(
+            name=name,
+            display_name=job["display_name"],
+            model=job["model"],
+            state=job["state"],
+            dest=job["dest"],
+        )
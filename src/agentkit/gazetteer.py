@@ -0,0 +1,427 @@
+"""
+Resolve free-form place names to cities for ``get_weather``.
+
+``get_weather`` looked the location up verbatim, so "Aukland", "Zürich,
+Switzerland" or "sao paulo" all got the default weather, and the model often
+retried with other spellings. ``Gazetteer`` indexes a city list once and
+answers in microseconds:
+
+- names and alternate names are normalized: case folded, diacritics and
+  punctuation dropped ("Zürich" and "zurich" are the same key)
+- an exact-name dict answers the common case
+- for misspellings, a trigram index (an ``array`` of key ids per trigram)
+  shortlists the keys sharing the most trigrams with the query, which are
+  then ranked by trigram overlap plus edit distance (adjacent transpositions
+  count as one edit). Equal scores go to the bigger city
+- "City, Country", or a trailing country name ("Paris France"), restricts the
+  match to that country; the country may be a name, an alias or an ISO code.
+  A comma qualifier that is not a country ("Paris, Texas") is not dropped:
+  ``resolve`` then lists the cities of that name instead of picking one
+
+``resolve`` picks a city when the best match is good enough, and lists the
+close runners-up, so the model can correct an ambiguous pick ("London" is
+London, United Kingdom, with London, Canada as an alternative) without
+another guess. A name it does not know confidently is left to the caller to
+use as given: the list is far from complete, and a weak match ("Springfield"
+for Sheffield) is worse than none.
+
+The bundled list (``data/cities.tsv``) has some 450 cities. Set
+``GAZETTEER_PATH`` to a GeoNames dump (e.g. ``cities15000.txt`` from
+download.geonames.org, ~26,000 cities) for the complete one.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+import unicodedata
+from array import array
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+DATA_DIR = Path(__file__).with_name("data")
+
+# Letters NFKD does not decompose into a base letter plus accents
+_FOLD = str.maketrans(
+    {
+        "ł": "l",
+        "ø": "o",
+        "æ": "ae",
+        "œ": "oe",
+        "đ": "d",
+        "ð": "d",
+        "þ": "th",
+        "ı": "i",
+        "'": None,
+        "’": None,
+    }
+)
+
+
+def normalize(text: str) -> str:
+    """
+    Index key of a place name: case folded, without diacritics or punctuation.
+
+    Args:
+        text (str): A place name, e.g. "Łódź" or "Xi'an"
+
+    Returns:
+        str: e.g. "lodz" or "xian"
+    """
+    folded = unicodedata.normalize("NFKD", text.casefold().translate(_FOLD))
+    chars = (c if c.isalnum() else " " for c in folded if not unicodedata.combining(c))
+    return " ".join("".join(chars).split())
+
+
+def _trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def _edit_similarity(a: str, b: str) -> float:
+    """
+    1 - optimal string alignment distance / length of the longer string.
+
+    The distance (Levenshtein plus adjacent transpositions) is computed with
+    Hyyrö's bit-vector algorithm: one pass over ``b`` with ``a`` as bit masks.
+    """
+    if a == b:
+        return 1.0
+    m = len(a)
+    if not m or not b:
+        return 0.0
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(a):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    vp, vn, d0, pm_previous, distance = mask, 0, 0, 0, m
+    for c in b:
+        pm = peq.get(c, 0)
+        transposed = (((~d0) & pm) << 1) & pm_previous
+        d0 = ((((pm & vp) + vp) ^ vp) | pm | vn | transposed) & mask
+        hp = vn | ~(d0 | vp)
+        hn = d0 & vp
+        if hp & last:
+            distance += 1
+        elif hn & last:
+            distance -= 1
+        hp = (hp << 1) | 1
+        hn <<= 1
+        vp = (hn | ~(d0 | hp)) & mask
+        vn = d0 & hp
+        pm_previous = pm
+    return 1.0 - distance / max(m, len(b))
+
+
+class Place:
+    __slots__ = ("name", "country", "country_name", "population", "key")
+
+    def __init__(self, name: str, country: str, country_name: str, population: int):
+        self.name = name
+        self.country = country
+        self.country_name = country_name
+        self.population = population
+        self.key = normalize(name)
+
+    def __str__(self) -> str:
+        return f"{self.name}, {self.country_name}"
+
+    def __repr__(self) -> str:
+        return f"Place({self.name!r}, {self.country!r})"
+
+
+class Resolution:
+    __slots__ = ("place", "candidates")
+
+    def __init__(self, place: Optional[Place], candidates: List[str]):
+        # The city to use (None when nothing matched well enough) and close runners-up
+        self.place = place
+        self.candidates = candidates
+
+    def annotate(self, weather: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Name the resolved city in a tool result, and the other cities it could have been.
+
+        Args:
+            weather (Dict[str, Any]): The result for ``place``
+
+        Returns:
+            Dict[str, Any]: ``{"location": "London, United Kingdom", **weather,
+            "other_matches": ["London, Canada"]}``; when nothing resolved, ``weather``
+            with any close candidates as ``did_you_mean``
+        """
+        if self.place is None:
+            return {**weather, "did_you_mean": self.candidates} if self.candidates else weather
+        annotated = {"location": str(self.place), **weather}
+        if self.candidates:
+            annotated["other_matches"] = self.candidates
+        return annotated
+
+
+class Gazetteer:
+    """
+    Fuzzy index from place names to cities.
+
+    Example:
+        gazetteer = Gazetteer.bundled()
+        gazetteer.search("zurich, switzerland")  # [(Place('Zurich', 'CH'), 1.0)]
+        gazetteer.resolve("Aukland").place       # Place('Auckland', 'NZ')
+    """
+
+    def __init__(
+        self,
+        places: Iterable[Tuple[str, str, int, Sequence[str]]],
+        countries: Iterable[Tuple[str, str, Sequence[str]]] = (),
+        min_score: float = 0.5,
+        accept_score: float = 0.7,
+        suggest_score: float = 0.65,
+        shortlist: int = 12,
+        posting_budget: int = 2000,
+    ):
+        """
+        Args:
+            places: (name, ISO country code, population, alternate names) per city
+            countries: (ISO code, name, other names) per country
+            min_score (float): Matches scoring lower are dropped
+            accept_score (float): ``resolve`` picks the best match from this score on
+            suggest_score (float): ``resolve`` lists other matches from this score on
+            shortlist (int): Keys re-ranked by edit distance per fuzzy search
+            posting_budget (int): Postings counted per fuzzy search beyond the rarer half
+        """
+        self.min_score = min_score
+        self.accept_score = accept_score
+        self.suggest_score = suggest_score
+        self.shortlist = shortlist
+        self.posting_budget = posting_budget
+
+        self.country_names: Dict[str, str] = {}
+        self._countries: Dict[str, str] = {}
+        for code, name, aliases in countries:
+            self.country_names[code] = name
+            for alias in (code, name, *aliases):
+                self._countries.setdefault(normalize(alias), code)
+
+        self.places: List[Place] = []
+        self._keys: List[str] = []
+        self._key_ids: Dict[str, int] = {}
+        self._key_places: List[List[int]] = []
+        self._key_grams = array("H")
+        postings: Dict[str, List[int]] = {}
+        for name, country, population, alternates in places:
+            place_id = len(self.places)
+            self.places.append(
+                Place(name, country, self.country_names.get(country, country), population)
+            )
+            self._countries.setdefault(country.lower(), country)
+            for key in {normalize(n) for n in (name, *alternates)} - {""}:
+                key_id = self._key_ids.get(key)
+                if key_id is None:
+                    key_id = self._key_ids[key] = len(self._keys)
+                    self._keys.append(key)
+                    self._key_places.append([])
+                    grams = _trigrams(key)
+                    self._key_grams.append(min(len(grams), 0xFFFF))
+                    for gram in grams:
+                        postings.setdefault(gram, []).append(key_id)
+                self._key_places[key_id].append(place_id)
+        self._postings: Dict[str, array] = {g: array("I", ids) for g, ids in postings.items()}
+
+    @classmethod
+    def bundled(cls, **options) -> Gazetteer:
+        """The cities in ``data/cities.tsv``."""
+        return cls(
+            (
+                (row[0], row[1], int(row[2]), row[3].split(";") if len(row) > 3 else ())
+                for row in _read_tsv(DATA_DIR / "cities.tsv")
+            ),
+            _bundled_countries(),
+            **options,
+        )
+
+    @classmethod
+    def from_geonames(cls, path: str, **options) -> Gazetteer:
+        """
+        The cities in a GeoNames dump such as ``cities15000.txt``.
+
+        Of the alternate names only Latin-script ones are kept (exonyms like
+        "Munich"): the others are many and no query in the workshop uses them.
+        """
+
+        def places() -> Iterator[Tuple[str, str, int, Sequence[str]]]:
+            for row in _read_tsv(Path(path)):
+                alternates = [row[2]]
+                alternates += [a for a in row[3].split(",") if a and normalize(a).isascii()]
+                yield row[1], row[8], int(row[14] or 0), alternates
+
+        return cls(places(), _bundled_countries(), **options)
+
+    def country(self, text: str) -> Optional[str]:
+        """ISO code of a country name, alias or code, or None."""
+        return self._countries.get(normalize(text))
+
+    def _split(self, query: str) -> Tuple[str, Optional[str], bool]:
+        """Query -> (normalized city, ISO country code or None, unknown qualifier)."""
+        parts = [normalize(part) for part in query.split(",")]
+        parts = [part for part in parts if part]
+        if not parts:
+            return "", None, False
+        if len(parts) > 1:
+            # "Portland, Oregon, USA": the country is last
+            code = self._countries.get(parts[-1])
+            return parts[0], code, code is None
+        city = parts[0]
+        words = city.split()
+        if city not in self._key_ids:
+            for n in range(min(3, len(words) - 1), 0, -1):
+                code = self._countries.get(" ".join(words[-n:]))
+                if code is not None:
+                    return " ".join(words[:-n]), code, False
+        return city, None, False
+
+    def search(self, query: str, limit: int = 5) -> List[Tuple[Place, float]]:
+        """
+        Rank cities matching ``query``.
+
+        Args:
+            query (str): e.g. "Aukland", "sao paulo" or "London, Canada"
+            limit (int): Most matches returned
+
+        Returns:
+            List[Tuple[Place, float]]: Matches with scores from 0 to 1, best first
+        """
+        city, country, _ = self._split(query)
+        return self._search(city, country, limit)
+
+    def _search(self, city: str, country: Optional[str], limit: int) -> List[Tuple[Place, float]]:
+        if not city:
+            return []
+        scores: Dict[int, float] = {}
+        key_id = self._key_ids.get(city)
+        if key_id is not None:
+            for place_id in self._key_places[key_id]:
+                if country is None or self.places[place_id].country == country:
+                    scores[place_id] = 1.0
+        if not scores:
+            scores = self._fuzzy(city, country, limit)
+        matches = [(self.places[place_id], score) for place_id, score in scores.items()]
+        matches.sort(key=lambda match: (-match[1], -match[0].population))
+        return matches[:limit]
+
+    def _fuzzy(self, city: str, country: Optional[str], limit: int) -> Dict[int, float]:
+        grams = _trigrams(city)
+        postings = [self._postings[g] for g in grams if g in self._postings]
+        if not postings:
+            return {}
+        # Rarest trigrams first; once half of them are in, the common ones (e.g. "  s",
+        # thousands of keys) are skipped when counting: they hardly tell keys apart
+        postings.sort(key=len)
+        used = (len(postings) + 1) // 2
+        total = sum(len(p) for p in postings[:used])
+        while used < len(postings) and total + len(postings[used]) <= self.posting_budget:
+            total += len(postings[used])
+            used += 1
+        shared = Counter(chain.from_iterable(postings[:used]))
+        # Of the keys sharing at least half as many as the best one, the true trigram
+        # overlap (Dice coefficient) of those sharing the most; edit distance for the best
+        floor = (max(shared.values()) + 1) // 2
+        ranked = heapq.nlargest(
+            self.shortlist,
+            (key_id for key_id, n in shared.items() if n >= floor),
+            key=shared.__getitem__,
+        )
+        size = len(grams)
+        dice = []
+        for key_id in ranked:
+            common = len(grams & _trigrams(self._keys[key_id]))
+            dice.append((2 * common / (size + self._key_grams[key_id]), key_id))
+        dice.sort(reverse=True)
+        scores: Dict[int, float] = {}
+        best: List[float] = []  # scores of the matching keys so far, best first
+        for overlap, key_id in dice:
+            key = self._keys[key_id]
+            # The edit distance is at least the difference in length
+            longest = max(len(city), len(key))
+            bound = 0.3 * overlap + 0.7 * (1 - abs(len(city) - len(key)) / longest)
+            if bound < self.min_score or (len(best) >= limit and bound <= best[limit - 1]):
+                continue
+            score = 0.3 * overlap + 0.7 * _edit_similarity(city, key)
+            if score < self.min_score:
+                continue
+            matched = False
+            for place_id in self._key_places[key_id]:
+                if country is not None and self.places[place_id].country != country:
+                    continue
+                matched = True
+                if score > scores.get(place_id, 0.0):
+                    scores[place_id] = score
+            if matched:
+                best.append(score)
+                best.sort(reverse=True)
+        return scores
+
+    def resolve(self, query: str, limit: int = 3) -> Resolution:
+        """
+        The city ``query`` most likely means, and the runners-up.
+
+        Args:
+            query (str): A place name as the model wrote it
+            limit (int): Most runners-up listed
+
+        Returns:
+            Resolution: ``place`` is None when no match scores ``accept_score``,
+            or when a comma qualifier is not a country ("Paris, Texas": a city
+            of that name may be missing from the list); candidates are the
+            others scoring ``suggest_score``
+        """
+        city, country, unknown = self._split(query)
+        matches = [
+            m for m in self._search(city, country, limit + 1) if m[1] >= self.suggest_score
+        ]
+        if matches and matches[0][1] >= self.accept_score and not unknown:
+            return Resolution(matches[0][0], [str(place) for place, _ in matches[1:]])
+        return Resolution(None, [str(place) for place, _ in matches[:limit]])
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+
+def _read_tsv(path: Path) -> Iterator[List[str]]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            yield line.rstrip("\n").split("\t")
+
+
+def _bundled_countries() -> List[Tuple[str, str, Sequence[str]]]:
+    return [
+        (row[0], row[1], row[2].split(";") if len(row) > 2 else ())
+        for row in _read_tsv(DATA_DIR / "countries.tsv")
+    ]
+
+
+_default_lock = threading.Lock()
+_default: Optional[Gazetteer] = None
+
+
+def default_gazetteer() -> Gazetteer:
+    """
+    The shared gazetteer: the GeoNames dump at ``GAZETTEER_PATH``, or the bundled list.
+
+    Built on first use (the bundled list in a few milliseconds).
+    """
+    global _default
+    with _default_lock:
+        if _default is None:
+            path = os.getenv("GAZETTEER_PATH", "").strip()
+            _default = Gazetteer.from_geonames(path) if path else Gazetteer.bundled()
+        return _default
+
+
+def resolve_location(location: str) -> Resolution:
+    """``default_gazetteer().resolve(location)``."""
+    return default_gazetteer().resolve(location)
@@ -0,0 +1,407 @@
+"""
+IP geolocation from a memory-mapped range table, for ``get_current_location``.
+
+``get_current_location`` returns a fixed city. Served to many users it should
+say where each client is, without a database round trip per call.
+``GeoIPDatabase`` answers from a binary file of sorted, non-overlapping IP
+ranges, so a lookup is one binary search over the range starts and a compare
+with the end.
+
+File format (little-endian, sections 16-byte aligned; ``build`` writes it
+from a CSV)::
+
+    header      "AKGEOIP1", u32 version, u32 counts and u64 offsets (_HEADER)
+    IPv4        starts u32[n4], ends u32[n4], locations u32[n4]
+    IPv6        starts u64[n6] high and u64[n6] low halves, ends likewise,
+                locations u32[n6]
+    locations   u32[m + 1] offsets into the strings
+    strings     per location "country_code\\x1fcountry\\x1fregion\\x1fcity\\x1flat\\x1flon"
+
+Opening maps the file and checks the header; nothing is parsed or copied, so
+start-up costs the same for ten ranges or ten million, and worker processes
+share the pages. Lookups bisect ``memoryview`` casts of the mapped arrays in
+C; an IPv6 address is split into two 64-bit halves for that.
+
+CSV input has one range per row: ``start,end,country_code,country,region,city``
+plus optional ``latitude,longitude``. Start and end are addresses
+("1.0.0.0", "2001:db8::") or integers (as in IP2Location files);
+IPv4-mapped IPv6 ranges count as IPv4. A header row is skipped, and adjacent
+ranges with the same location are merged.
+
+In the server, ``client_ip`` holds the address of the client whose turn is
+running (the peer address; a proxy in front hides it). ``GEOIP_DB`` names the
+database file; unset, ``get_current_location`` keeps its fixed answer.
+
+Usage:
+    python -m agentkit.geoip build ranges.csv geoip.bin
+    python -m agentkit.geoip lookup geoip.bin 203.0.113.7 2001:db8::1
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextvars
+import csv
+import ipaddress
+import mmap
+import os
+import socket
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"AKGEOIP1"
+VERSION = 1
+# magic, version, IPv4 ranges, IPv6 ranges, locations, then section offsets:
+# IPv4, IPv6, location offsets, strings, and the size of the strings
+_HEADER = struct.Struct("<8sIIII5Q")
+_SEPARATOR = "\x1f"
+_FIELDS = ("country_code", "country", "region", "city", "latitude", "longitude")
+_LOW = (1 << 64) - 1
+_MAPPED = b"\0" * 10 + b"\xff\xff"
+
+# Address of the client whose request is being served, set by ``AgentServer``
+client_ip: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "client_ip", default=None
+)
+
+
+def _parse_address(ip: str) -> Tuple[int, int]:
+    """``ip`` as (4 or 6, integer); IPv4-mapped IPv6 addresses count as IPv4."""
+    ip = ip.split("%", 1)[0]
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), "big")
+    except OSError:
+        pass
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, ip)
+    except OSError:
+        raise ValueError(f"Not an IP address: {ip!r}") from None
+    if packed[:12] == _MAPPED:
+        return 4, int.from_bytes(packed[12:], "big")
+    return 6, int.from_bytes(packed, "big")
+
+
+def _parse_bound(text: str) -> Tuple[int, int]:
+    """A CSV range bound: an address or an integer."""
+    text = text.strip()
+    if text.isdigit():
+        value = int(text)
+        if value <= 0xFFFFFFFF:
+            return 4, value
+        if value >> 32 == 0xFFFF:
+            return 4, value & 0xFFFFFFFF
+        return 6, value
+    address = ipaddress.ip_address(text)
+    if address.version == 6 and address.ipv4_mapped is not None:
+        return 4, int(address.ipv4_mapped)
+    return address.version, int(address)
+
+
+def _align(offset: int) -> int:
+    return (offset + 15) & ~15
+
+
+def _u32(values: List[int]) -> bytes:
+    data = array("I", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def _u64(values: List[int]) -> bytes:
+    data = array("Q", values)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return data.tobytes()
+
+
+def build(csv_path: str, out_path: str) -> Dict[str, int]:
+    """
+    Compile a CSV of IP ranges into the binary format.
+
+    Args:
+        csv_path (str): One range per row (see the module docstring)
+        out_path (str): The database file to write
+
+    Returns:
+        Dict[str, int]: Counts of rows read, IPv4 and IPv6 ranges written, and locations
+
+    Raises:
+        ValueError: If a row is malformed or ranges overlap
+    """
+    ranges: Dict[int, List[Tuple[int, int, int]]] = {4: [], 6: []}
+    locations: Dict[Tuple[str, ...], int] = {}
+    rows = 0
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for line, row in enumerate(csv.reader(f), 1):
+            if not row or row[0].startswith("#"):
+                continue
+            try:
+                (version, start), (end_version, end) = _parse_bound(row[0]), _parse_bound(row[1])
+            except (ValueError, IndexError):
+                if line == 1:
+                    continue  # header
+                raise ValueError(f"{csv_path}:{line}: expected start,end,... got {row[:2]}")
+            if version != end_version or start > end:
+                raise ValueError(f"{csv_path}:{line}: bad range {row[0]} - {row[1]}")
+            fields = tuple(field.strip() for field in row[2:8])
+            fields += ("",) * (len(_FIELDS) - len(fields))
+            location = locations.setdefault(fields, len(locations))
+            ranges[version].append((start, end, location))
+            rows += 1
+
+    for version, table in ranges.items():
+        table.sort()
+        merged: List[Tuple[int, int, int]] = []
+        for start, end, location in table:
+            if merged:
+                previous_start, previous_end, previous_location = merged[-1]
+                if start <= previous_end:
+                    raise ValueError(f"IPv{version} ranges overlap at {ipaddress.ip_address(start)}")
+                if start == previous_end + 1 and location == previous_location:
+                    merged[-1] = (previous_start, end, location)
+                    continue
+            merged.append((start, end, location))
+        ranges[version] = merged
+
+    strings = bytearray()
+    offsets = []
+    for fields in locations:
+        offsets.append(len(strings))
+        strings += _SEPARATOR.join(fields).encode("utf-8")
+    offsets.append(len(strings))
+
+    v4, v6 = ranges[4], ranges[6]
+    sections = [
+        _u32([r[0] for r in v4]) + _u32([r[1] for r in v4]) + _u32([r[2] for r in v4]),
+        _u64([r[0] >> 64 for r in v6])
+        + _u64([r[0] & _LOW for r in v6])
+        + _u64([r[1] >> 64 for r in v6])
+        + _u64([r[1] & _LOW for r in v6])
+        + _u32([r[2] for r in v6]),
+        _u32(offsets),
+        bytes(strings),
+    ]
+    positions = []
+    position = _align(_HEADER.size)
+    for section in sections:
+        positions.append(position)
+        position = _align(position + len(section))
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(v4), len(v6), len(locations), *positions,
+                             len(strings)))
+        for section, position in zip(sections, positions):
+            f.write(b"\0" * (position - f.tell()))
+            f.write(section)
+    # Readers that have the old file mapped keep it; new ones get the complete new one
+    os.replace(tmp_path, out_path)
+    return {"rows": rows, "ipv4_ranges": len(v4), "ipv6_ranges": len(v6),
+            "locations": len(locations)}
+
+
+class GeoIPDatabase:
+    """
+    Read-only, memory-mapped IP range table; safe to share between threads.
+
+    Example:
+        with GeoIPDatabase("geoip.bin") as db:
+            db.lookup("203.0.113.7")  # {"city": "Auckland", "country": "New Zealand", ...}
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): A file written by ``build``
+
+        Raises:
+            ValueError: If the file is not a database of this version
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = _HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            self._map.close()
+            raise ValueError(f"{path} is not a GeoIP database")
+        magic, version, n4, n6, locations, v4, v6, offsets, strings, size = header
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} GeoIP database")
+        self.ipv4_ranges, self.ipv6_ranges, self.locations = n4, n6, locations
+
+        view = memoryview(self._map)
+        self._views = [view]
+        self._v4_starts = self._array(view, v4, n4, "I")
+        self._v4_ends = self._array(view, v4 + 4 * n4, n4, "I")
+        self._v4_locations = self._array(view, v4 + 8 * n4, n4, "I")
+        self._v6_starts_high = self._array(view, v6, n6, "Q")
+        self._v6_starts_low = self._array(view, v6 + 8 * n6, n6, "Q")
+        self._v6_ends_high = self._array(view, v6 + 16 * n6, n6, "Q")
+        self._v6_ends_low = self._array(view, v6 + 24 * n6, n6, "Q")
+        self._v6_locations = self._array(view, v6 + 32 * n6, n6, "I")
+        self._offsets = self._array(view, offsets, locations + 1, "I")
+        self._strings = view[strings : strings + size]
+        self._views.append(self._strings)
+        # Decoded locations by index: at most ``locations`` of them, and far fewer
+        # addresses' worth are ever looked up in one process
+        self._decoded: Dict[int, Dict[str, Any]] = {}
+
+    def _array(self, view: memoryview, offset: int, count: int, code: str) -> Any:
+        size = struct.calcsize(code)
+        section = view[offset : offset + count * size]
+        self._views.append(section)
+        if sys.byteorder == "big":
+            # The file is little-endian: a copy is the price on big-endian machines
+            data = array(code, section.tobytes())
+            data.byteswap()
+            return data
+        typed = section.cast(code)
+        self._views.append(typed)
+        return typed
+
+    def lookup(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        Where ``ip`` is.
+
+        Args:
+            ip (str): An IPv4 or IPv6 address
+
+        Returns:
+            Optional[Dict[str, Any]]: The location's non-empty fields (country_code,
+            country, region, city, latitude, longitude), or None when no range has it
+
+        Raises:
+            ValueError: If ``ip`` is not an address
+        """
+        location = self.location_index(ip)
+        return None if location is None else self.location(location)
+
+    def location_index(self, ip: str) -> Optional[int]:
+        """The index of ``ip``'s location, or None; ``lookup`` without decoding it."""
+        version, value = _parse_address(ip)
+        if version == 4:
+            i = bisect_right(self._v4_starts, value) - 1
+            if i < 0 or value > self._v4_ends[i]:
+                return None
+            return self._v4_locations[i]
+
+        high, low = value >> 64, value & _LOW
+        starts_high = self._v6_starts_high
+        # The last range starting at or before (high, low): among those whose start
+        # shares ``high``, bisect the low halves; otherwise the one before them
+        first = bisect_left(starts_high, high)
+        last = bisect_right(starts_high, high, first)
+        i = bisect_right(self._v6_starts_low, low, first, last) - 1
+        if i < first:
+            i = first - 1
+        if i < 0:
+            return None
+        end_high = self._v6_ends_high[i]
+        if high > end_high or (high == end_high and low > self._v6_ends_low[i]):
+            return None
+        return self._v6_locations[i]
+
+    def location(self, index: int) -> Dict[str, Any]:
+        """The fields of location ``index``; empty ones are left out."""
+        record = self._decoded.get(index)
+        if record is None:
+            record = self._decoded[index] = self._decode(index)
+        return dict(record)
+
+    def _decode(self, index: int) -> Dict[str, Any]:
+        start, end = self._offsets[index], self._offsets[index + 1]
+        values = str(self._strings[start:end], "utf-8").split(_SEPARATOR)
+        record: Dict[str, Any] = {}
+        for field, value in zip(_FIELDS, values):
+            if value:
+                record[field] = float(value) if field in ("latitude", "longitude") else value
+        return record
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._decoded.clear()
+        self._map.close()
+
+    def __enter__(self) -> GeoIPDatabase:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+_databases_lock = threading.Lock()
+_databases: Dict[str, GeoIPDatabase] = {}
+
+
+def geoip_database_for() -> Optional[GeoIPDatabase]:
+    """
+    The ``GeoIPDatabase`` at ``GEOIP_DB``, opened once and shared.
+
+    Returns:
+        Optional[GeoIPDatabase]: None when ``GEOIP_DB`` is unset
+    """
+    path = os.getenv("GEOIP_DB", "").strip()
+    if not path:
+        return None
+    with _databases_lock:
+        database = _databases.get(path)
+        if database is None:
+            database = _databases[path] = GeoIPDatabase(path)
+        return database
+
+
+def locate_client() -> Optional[Dict[str, Any]]:
+    """
+    Where the client being served is, from ``client_ip`` and ``GEOIP_DB``.
+
+    Returns:
+        Optional[Dict[str, Any]]: The location, or None without a client address,
+        a database, or a range with a city for the address (e.g. a private one)
+    """
+    ip = client_ip.get()
+    database = geoip_database_for() if ip else None
+    if database is None:
+        return None
+    try:
+        location = database.lookup(ip)
+    except ValueError:
+        return None
+    return location if location and "city" in location else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query a GeoIP range database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_command = commands.add_parser("build", help="compile a CSV of ranges")
+    build_command.add_argument("csv")
+    build_command.add_argument("database")
+    lookup_command = commands.add_parser("lookup", help="look addresses up")
+    lookup_command.add_argument("database")
+    lookup_command.add_argument("ips", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        counts = build(args.csv, args.database)
+        print(f"🗺️  Wrote {args.database}: {counts['ipv4_ranges']} IPv4 and "
+              f"{counts['ipv6_ranges']} IPv6 ranges, {counts['locations']} locations "
+              f"from {counts['rows']} rows")
+        return
+    with GeoIPDatabase(args.database) as database:
+        for ip in args.ips:
+            try:
+                print(f"{ip}: {database.lookup(ip)}")
+            except ValueError as e:
+                print(f"{ip}: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,431 @@
+"""
+Hedged requests and latency-based model fallback for ``generate_content``.
+
+Most responses arrive in a second or two, but now and then one takes ten,
+and the user waits for the slowest request of the turn. ``HedgedModels``
+wraps a ``models`` object and keeps a live latency histogram per model:
+
+- **hedging**: if a request has not answered by the ``hedge_percentile`` of
+  its model's recent latencies, an identical request is sent and whichever
+  answers first is used; the other one is left to finish in the background
+  (its latency still goes into the histogram)
+- **fallback chain**: the requested model is followed by ``fallbacks`` (e.g.
+  a lite model). The first model in the chain whose ``choice_percentile``
+  latency is within ``latency_target`` gets the request, and a request that
+  fails with a rate limit, server or connection error moves on to the next
+  model
+- **simple turns**: with a ``simple_model``, a request whose last message is
+  a short text from the user (``simple_turn``) puts that model in front of
+  the chain, so the requested model is its fallback. Round trips that carry
+  function responses keep the requested model
+
+``generate_content_stream`` hedges and falls back the same way on the first
+chunk of the stream.
+
+Histograms decay (every ``window`` samples the counts are halved), so a model
+that was slow an hour ago gets traffic again once it recovers. Until a model
+has ``min_samples`` latencies, hedges fire after ``initial_delay`` seconds.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import os
+import threading
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from agentkit.compact_history import Message
+from agentkit.startup import lazy_import
+from agentkit.transport import stream_content
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from google.genai.types import GenerateContentConfig, GenerateContentResponse
+
+futures = lazy_import("concurrent.futures")
+errors = lazy_import("google.genai.errors")
+httpx = lazy_import("httpx")
+
+DEFAULT_HEDGE_PERCENTILE = 0.95
+DEFAULT_CHOICE_PERCENTILE = 0.9
+DEFAULT_INITIAL_DELAY = 2.0
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_WINDOW = 500
+DEFAULT_SIMPLE_MAX_CHARS = 120
+# Bucket bounds from 10 ms to ~120 s, 10% apart
+_BOUNDS = [0.01 * 1.1**i for i in range(100)]
+_RETRYABLE_CODES = {429, 500, 502, 503, 504}
+
+
+class LatencyHistogram:
+    """Log-bucketed latencies of one model, decayed so they follow recent traffic."""
+
+    def __init__(self, window: int = DEFAULT_WINDOW):
+        """
+        Args:
+            window (int): Samples after which all counts are halved
+        """
+        self.window = window
+        self.counts = [0.0] * (len(_BOUNDS) + 1)
+        self.count = 0.0
+        self.samples = 0
+        self._since_decay = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        index = bisect.bisect_left(_BOUNDS, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.samples += 1
+            self._since_decay += 1
+            if self._since_decay >= self.window:
+                self.counts = [count / 2 for count in self.counts]
+                self.count /= 2
+                self._since_decay = 0
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        Latency below which a fraction ``p`` of recent requests finished.
+
+        Returns:
+            Optional[float]: Upper bound of the bucket in seconds, None if empty
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            target = p * self.count
+            seen = 0.0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= target and count:
+                    return _BOUNDS[index] if index < len(_BOUNDS) else math.inf
+        return math.inf
+
+
+def simple_turn(contents: Any, max_chars: int = DEFAULT_SIMPLE_MAX_CHARS) -> bool:
+    """
+    Whether a request opens a turn with a short question: its last message is
+    the user's, only text, and at most ``max_chars`` characters long.
+    """
+    if isinstance(contents, str):
+        return len(contents) <= max_chars
+    if not contents:
+        return False
+    last = contents[-1]
+    if isinstance(last, Message):
+        last = last.to_dict()
+    if isinstance(last, dict):
+        role = last.get("role")
+        texts = [part.get("text") for part in last.get("parts") or []]
+    else:
+        role = last.role
+        texts = [part.text for part in last.parts or []]
+    if role not in (None, "user") or not texts or None in texts:
+        return False
+    return sum(len(text) for text in texts) <= max_chars
+
+
+def _retryable(error: BaseException) -> bool:
+    """Whether another model (or a later attempt) could succeed."""
+    if isinstance(error, errors.APIError):
+        return error.code in _RETRYABLE_CODES
+    return isinstance(error, (httpx.TransportError, TimeoutError, ConnectionError))
+
+
+def _close_stream(future: Future) -> None:
+    """Stop reading a stream that lost the race (closes its connection)."""
+    if not future.cancelled() and future.exception() is None:
+        future.result()[2].close()
+
+
+class HedgedModels:
+    """
+    Wraps a ``models`` object with hedged requests and a model fallback chain.
+
+    Example:
+        models = HedgedModels(client.models, fallbacks=["gemini-2.0-flash-lite"],
+                              latency_target=3.0)
+
+    ``metrics`` is updated from the callers' and the pool's threads under a lock.
+    """
+
+    def __init__(
+        self,
+        models: Any,
+        fallbacks: Sequence[str] = (),
+        hedge_percentile: Optional[float] = DEFAULT_HEDGE_PERCENTILE,
+        choice_percentile: float = DEFAULT_CHOICE_PERCENTILE,
+        latency_target: Optional[float] = None,
+        initial_delay: float = DEFAULT_INITIAL_DELAY,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        max_workers: int = 16,
+        window: int = DEFAULT_WINDOW,
+        simple_model: Optional[str] = None,
+        is_simple: Callable[[Any], bool] = simple_turn,
+    ):
+        """
+        Args:
+            models: Object with ``generate_content``; called from worker threads
+            fallbacks (Sequence[str]): Models to try after the requested one, in order
+            hedge_percentile (Optional[float]): Hedge after this percentile of
+                the model's latency (0-1); None disables hedging
+            choice_percentile (float): Percentile compared with ``latency_target``
+            latency_target (Optional[float]): Seconds; a model slower than this
+                at ``choice_percentile`` is skipped for the next one in the chain
+            initial_delay (float): Hedge delay while a model has few samples
+            min_samples (int): Samples before a histogram is trusted
+            max_workers (int): Requests in flight at once, hedges included
+            window (int): Histogram decay window (see ``LatencyHistogram``)
+            simple_model (Optional[str]): Model tried first for simple turns
+            is_simple: Takes ``contents`` and tells whether the request is a
+                simple turn (default ``simple_turn``)
+        """
+        self.models = models
+        self.fallbacks = list(fallbacks)
+        self.hedge_percentile = hedge_percentile
+        self.choice_percentile = choice_percentile
+        self.latency_target = latency_target
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.window = window
+        self.simple_model = simple_model
+        self.is_simple = is_simple
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._pool = None
+        self._lock = threading.Lock()
+        self.metrics: Dict[str, int] = {
+            "requests": 0,
+            "hedges": 0,
+            "hedges_won": 0,
+            "fallbacks": 0,
+            "slow_model_skips": 0,
+            "simple_turns": 0,
+        }
+
+    @property
+    def pool(self) -> Any:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = futures.ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="hedged-request"
+                    )
+        return self._pool
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.metrics[name] += 1
+
+    def histogram(self, model: str) -> LatencyHistogram:
+        histogram = self.histograms.get(model)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(model, LatencyHistogram(self.window))
+        return histogram
+
+    def _trusted_percentile(self, model: str, p: float) -> Optional[float]:
+        histogram = self.histogram(model)
+        if histogram.samples < self.min_samples:
+            return None
+        return histogram.percentile(p)
+
+    def chain(self, model: str, contents: Any = None) -> List[str]:
+        """
+        Order in which models are tried for a request to ``model``.
+
+        Args:
+            model (str): The requested model
+            contents: The request's messages; a simple turn starts at ``simple_model``
+
+        Returns:
+            List[str]: The chosen model first, then the rest of the chain
+        """
+        chain = [model] + self.fallbacks
+        if self.simple_model is not None and contents is not None and self.is_simple(contents):
+            self._count("simple_turns")
+            chain.insert(0, self.simple_model)
+        chain = list(dict.fromkeys(chain))
+        if self.latency_target is None or len(chain) == 1:
+            return chain
+        for i, name in enumerate(chain):
+            latency = self._trusted_percentile(name, self.choice_percentile)
+            if latency is None or latency <= self.latency_target:
+                if i:
+                    self._count("slow_model_skips")
+                return chain[i:] + chain[:i]
+        # Every model is over target: take the fastest
+        fastest = min(chain, key=lambda name: self._trusted_percentile(name, self.choice_percentile))
+        return [fastest] + [name for name in chain if name != fastest]
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging a request to ``model`` (None: never)."""
+        if self.hedge_percentile is None:
+            return None
+        latency = self._trusted_percentile(model, self.hedge_percentile)
+        return self.initial_delay if latency is None else latency
+
+    def _submit(self, model: str, contents: Any, config: Any) -> Future:
+        histogram = self.histogram(model)
+        start = time.perf_counter()
+
+        def call() -> GenerateContentResponse:
+            response = self.models.generate_content(model=model, contents=contents, config=config)
+            histogram.record(time.perf_counter() - start)
+            return response
+
+        return self.pool.submit(call)
+
+    def _open(self, model: str, contents: Any, config: Any) -> Future:
+        """Start a stream; the future holds its start time, first chunk and the rest."""
+        start = time.perf_counter()
+
+        def call() -> Tuple[float, Optional[GenerateContentResponse], Iterator]:
+            chunks = iter(
+                stream_content(self.models, model=model, contents=contents, config=config)
+            )
+            return start, next(chunks, None), chunks
+
+        return self.pool.submit(call)
+
+    def _attempt(
+        self, model: str, submit: Callable[[], Future], discard: Optional[Callable] = None
+    ) -> Any:
+        """
+        One model: the request plus, if it is slow, a hedge; first answer wins.
+
+        Args:
+            model (str): Model the request goes to
+            submit: Starts the request and returns its future
+            discard: Called with the loser's future once it is done
+        """
+        primary = submit()
+        delay = self.hedge_delay(model)
+        if delay is None:
+            return primary.result()
+        done, _ = futures.wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count("hedges")
+        hedge = submit()
+        running = {primary, hedge}
+        error: Optional[BaseException] = None
+        while running:
+            done, running = futures.wait(running, return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedges_won")
+                    loser = primary if future is hedge else hedge
+                    if discard is not None:
+                        loser.add_done_callback(discard)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def generate_content(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> GenerateContentResponse:
+        self._count("requests")
+        chain = self.chain(model, contents)
+        for i, name in enumerate(chain):
+            try:
+                return self._attempt(name, partial(self._submit, name, contents, config))
+            except Exception as e:
+                if i == len(chain) - 1 or not _retryable(e):
+                    raise
+                self._count("fallbacks")
+
+    def generate_content_stream(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> Iterator[GenerateContentResponse]:
+        """
+        Like ``generate_content``, hedging and falling back on the first chunk:
+        once a stream has answered, the rest of it comes from the same request
+        and an error in the middle is raised as is.
+        """
+        self._count("requests")
+        chain = self.chain(model, contents)
+        for i, name in enumerate(chain):
+            try:
+                start, first, chunks = self._attempt(
+                    name, partial(self._open, name, contents, config), _close_stream
+                )
+                break
+            except Exception as e:
+                if i == len(chain) - 1 or not _retryable(e):
+                    raise
+                self._count("fallbacks")
+        if first is not None:
+            yield first
+            yield from chunks
+        self.histogram(name).record(time.perf_counter() - start)
+
+    def summary(self) -> str:
+        m = self.metrics
+        latencies = ", ".join(
+            f"{name} p50 {self.histograms[name].percentile(0.5) or 0:.2f}s "
+            f"p95 {self.histograms[name].percentile(0.95) or 0:.2f}s"
+            for name in self.histograms
+        )
+        simple = f"{m['simple_turns']} simple turns, " if self.simple_model else ""
+        return (
+            f"{m['requests']} requests, {simple}{m['hedges']} hedged ({m['hedges_won']} won), "
+            f"{m['slow_model_skips']} sent past a slow model, {m['fallbacks']} fell back; "
+            f"{latencies}"
+        )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+    def __getattr__(self, name: str) -> Any:
+        # e.g. stats() of the wrapped layers
+        if name == "models":
+            raise AttributeError(name)
+        return getattr(self.models, name)
+
+
+def hedged_models_for(models: Any) -> Any:
+    """
+    Wrap ``models`` in a ``HedgedModels`` from environment variables.
+
+    - ``AGENT_MODEL_FALLBACKS``: comma-separated models to fall back to
+    - ``AGENT_HEDGE_PERCENTILE``: hedge after this latency percentile (e.g. 95)
+    - ``AGENT_LATENCY_TARGET``: seconds; skip a model slower than this at p90
+    - ``AGENT_SIMPLE_MODEL``: model to try first for simple turns (e.g. a lite model)
+    - ``AGENT_SIMPLE_MAX_CHARS``: longest user message that is a simple turn (default 120)
+
+    Returns:
+        ``models`` unchanged when none of them is set
+    """
+    fallbacks = [name.strip() for name in os.getenv("AGENT_MODEL_FALLBACKS", "").split(",")]
+    fallbacks = [name for name in fallbacks if name]
+    hedge = os.getenv("AGENT_HEDGE_PERCENTILE")
+    target = os.getenv("AGENT_LATENCY_TARGET")
+    simple = os.getenv("AGENT_SIMPLE_MODEL") or None
+    if not (fallbacks or hedge or target or simple):
+        return models
+    max_chars = int(os.getenv("AGENT_SIMPLE_MAX_CHARS", str(DEFAULT_SIMPLE_MAX_CHARS)))
+    return HedgedModels(
+        models,
+        fallbacks=fallbacks,
+        hedge_percentile=float(hedge) / 100 if hedge else None,
+        latency_target=float(target) if target else None,
+        simple_model=simple,
+        is_simple=partial(simple_turn, max_chars=max_chars),
+    )
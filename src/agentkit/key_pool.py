@@ -0,0 +1,353 @@
+"""
+Spread requests over several Gemini API keys.
+
+One key's rate limits (requests and tokens per minute) cap the whole agent,
+or the whole server. ``KeyPoolModels`` keeps a models stack per key and sends
+each request to one of them:
+
+- ``least-loaded`` (default): the key with the fewest requests in flight,
+  then the lowest share of its per-minute quota; ties go round robin
+- ``round-robin``: the keys in turn
+
+Usage is counted per key over a sliding minute: requests when they are sent,
+tokens from the response's ``usage_metadata``. A key at its ``rpm_limit`` or
+``tpm_limit`` is only used when every key is. A key that gets a 429 is taken
+out of rotation for the ``retryDelay`` the API asks for (or ``cooldown``
+seconds, doubling while it keeps failing) and the request is retried on
+another key. When every key is cooling down, the caller gets the 429.
+"""
+
+from __future__ import annotations
+
+import collections
+import os
+import re
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from agentkit.startup import lazy_import
+from agentkit.transport import stream_content
+
+if TYPE_CHECKING:
+    from google.genai.types import (
+        GenerateContentConfig,
+        GenerateContentResponse,
+        GenerateContentResponseUsageMetadata,
+    )
+
+errors = lazy_import("google.genai.errors")
+
+STRATEGIES = ("least-loaded", "round-robin")
+DEFAULT_COOLDOWN = 10.0
+MAX_COOLDOWN = 300.0
+WINDOW = 60.0
+
+
+def _retry_delay(error: BaseException) -> Optional[float]:
+    """The ``RetryInfo.retryDelay`` of a 429 response (e.g. "37s"), in seconds."""
+    details = getattr(error, "details", None)
+    if not isinstance(details, dict):
+        return None
+    for detail in details.get("error", {}).get("details", None) or []:
+        match = re.fullmatch(r"([\d.]+)s", str(detail.get("retryDelay", "")))
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _rate_limited(error: BaseException) -> bool:
+    return isinstance(error, errors.APIError) and error.code == 429
+
+
+class KeyState:
+    """One key's models stack and its usage over the last minute."""
+
+    def __init__(self, label: str, models: Any):
+        self.label = label
+        self.models = models
+        self.in_flight = 0
+        self.sent: Deque[float] = collections.deque()
+        self.used: Deque[Tuple[float, int]] = collections.deque()
+        self.window_tokens = 0
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.metrics: Dict[str, int] = {
+            "requests": 0,
+            "tokens": 0,
+            "rate_limited": 0,
+            "errors": 0,
+        }
+
+    def expire(self, now: float) -> None:
+        while self.sent and self.sent[0] <= now - WINDOW:
+            self.sent.popleft()
+        while self.used and self.used[0][0] <= now - WINDOW:
+            self.window_tokens -= self.used.popleft()[1]
+
+
+class KeyPoolModels:
+    """
+    Sends ``generate_content`` calls through a pool of API keys.
+
+    Example:
+        pool = KeyPoolModels(
+            [(key_label(i, key), genai.Client(api_key=key).models)
+             for i, key in enumerate(keys)],
+            rpm_limit=15,
+        )
+    """
+
+    def __init__(
+        self,
+        members: Sequence[Tuple[str, Any]],
+        strategy: str = "least-loaded",
+        rpm_limit: Optional[int] = None,
+        tpm_limit: Optional[int] = None,
+        cooldown: float = DEFAULT_COOLDOWN,
+        max_cooldown: float = MAX_COOLDOWN,
+    ):
+        """
+        Args:
+            members (Sequence[Tuple[str, Any]]): (label, models) per key; the
+                label is shown in metrics, so it should not be the key itself
+            strategy (str): "least-loaded" or "round-robin"
+            rpm_limit (Optional[int]): Requests per minute allowed per key
+            tpm_limit (Optional[int]): Tokens per minute allowed per key
+            cooldown (float): Seconds a key rests after a 429 without ``retryDelay``
+            max_cooldown (float): Upper bound for the doubling cooldown
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown key strategy {strategy!r}; use one of {STRATEGIES}")
+        if not members:
+            raise ValueError("A key pool needs at least one key")
+        self.keys = [KeyState(label, models) for label, models in members]
+        self.strategy = strategy
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _utilization(self, key: KeyState) -> float:
+        """Largest share of a per-minute quota the key has used (0 without limits)."""
+        shares = [0.0]
+        if self.rpm_limit:
+            shares.append(len(key.sent) / self.rpm_limit)
+        if self.tpm_limit:
+            shares.append(key.window_tokens / self.tpm_limit)
+        return max(shares)
+
+    def _acquire(self, exclude: List[KeyState]) -> Optional[KeyState]:
+        """Pick a key for a request and count the request; None if none is usable."""
+        with self._lock:
+            now = time.monotonic()
+            count = len(self.keys)
+            # Round-robin order starting after the last key used
+            ordered = [self.keys[(self._next + i) % count] for i in range(count)]
+            ready = [k for k in ordered if k not in exclude and k.cooldown_until <= now]
+            if not ready:
+                return None
+            for key in ready:
+                key.expire(now)
+            with_room = [k for k in ready if self._utilization(k) < 1.0] or ready
+            if self.strategy == "round-robin":
+                key = with_room[0]
+            else:
+                key = min(with_room, key=lambda k: (k.in_flight, self._utilization(k)))
+            self._next = (self.keys.index(key) + 1) % count
+            key.in_flight += 1
+            key.sent.append(now)
+            key.metrics["requests"] += 1
+            return key
+
+    def _release(
+        self,
+        key: KeyState,
+        usage: Optional[GenerateContentResponseUsageMetadata] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self._lock:
+            now = time.monotonic()
+            key.in_flight -= 1
+            if usage is not None:
+                tokens = usage.total_token_count or (
+                    (usage.prompt_token_count or 0) + (usage.candidates_token_count or 0)
+                )
+                key.used.append((now, tokens))
+                key.window_tokens += tokens
+                key.metrics["tokens"] += tokens
+            if error is None:
+                key.strikes = 0
+            elif _rate_limited(error):
+                key.metrics["rate_limited"] += 1
+                key.strikes += 1
+                delay = _retry_delay(error)
+                if delay is None:
+                    delay = min(self.max_cooldown, self.cooldown * 2 ** (key.strikes - 1))
+                key.cooldown_until = max(key.cooldown_until, now + delay)
+            else:
+                key.metrics["errors"] += 1
+
+    def _exhausted(self, error: Optional[BaseException]) -> BaseException:
+        if error is not None:
+            return error
+        return errors.ClientError(
+            429,
+            {
+                "error": {
+                    "code": 429,
+                    "message": "Every API key in the pool is cooling down after a 429",
+                    "status": "RESOURCE_EXHAUSTED",
+                }
+            },
+        )
+
+    def generate_content(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> GenerateContentResponse:
+        tried: List[KeyState] = []
+        error: Optional[BaseException] = None
+        while True:
+            key = self._acquire(tried)
+            if key is None:
+                raise self._exhausted(error)
+            try:
+                response = key.models.generate_content(
+                    model=model, contents=contents, config=config
+                )
+            except Exception as e:
+                self._release(key, error=e)
+                if not _rate_limited(e):
+                    raise
+                tried.append(key)
+                error = e
+                continue
+            self._release(key, usage=response.usage_metadata)
+            return response
+
+    def generate_content_stream(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> Iterator[GenerateContentResponse]:
+        """Like ``generate_content``; a 429 is retried on another key until a chunk arrived."""
+        tried: List[KeyState] = []
+        error: Optional[BaseException] = None
+        while True:
+            key = self._acquire(tried)
+            if key is None:
+                raise self._exhausted(error)
+            usage = None
+            started = released = False
+            try:
+                for chunk in stream_content(
+                    key.models, model=model, contents=contents, config=config
+                ):
+                    started = True
+                    if chunk.usage_metadata is not None:
+                        usage = chunk.usage_metadata
+                    yield chunk
+            except Exception as e:
+                released = True
+                self._release(key, usage=usage, error=e)
+                if started or not _rate_limited(e):
+                    raise
+                tried.append(key)
+                error = e
+                continue
+            finally:
+                # Also when the caller stops reading early
+                if not released:
+                    self._release(key, usage=usage)
+            return
+
+    def key_stats(self) -> List[Dict[str, Any]]:
+        """
+        Per-key counters and utilization of the last minute.
+
+        Returns:
+            List[Dict[str, Any]]: One dict per key, in pool order
+        """
+        with self._lock:
+            now = time.monotonic()
+            stats = []
+            for key in self.keys:
+                key.expire(now)
+                stats.append(
+                    {
+                        "key": key.label,
+                        **key.metrics,
+                        "in_flight": key.in_flight,
+                        "rpm": len(key.sent),
+                        "tpm": key.window_tokens,
+                        "utilization": round(self._utilization(key), 3),
+                        "cooling_down_s": round(max(0.0, key.cooldown_until - now), 1),
+                    }
+                )
+            return stats
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{s['key']}: {s['requests']} requests, {s['tokens']} tokens, "
+            f"{s['rate_limited']} rate limited"
+            for s in self.key_stats()
+        )
+
+
+def key_label(index: int, key: str) -> str:
+    """A name for a key in metrics and logs that does not give the key away."""
+    return f"key{index + 1} (…{key[-4:]})"
+
+
+def key_pool_for(api_key: str, models: Any, build: Callable[[str], Any]) -> Any:
+    """
+    Put ``models`` into a ``KeyPoolModels`` if more keys are configured.
+
+    - ``API_KEYS``: comma-separated keys used next to ``API_KEY``
+    - ``AGENT_KEY_STRATEGY``: "least-loaded" (default) or "round-robin"
+    - ``AGENT_KEY_RPM`` / ``AGENT_KEY_TPM``: per-key quotas per minute
+    - ``AGENT_KEY_COOLDOWN``: seconds a key rests after a 429 (default 10)
+
+    Args:
+        api_key (str): The entry point's key, already served by ``models``
+        models: The models stack for ``api_key``
+        build: Returns the models stack for another key
+
+    Returns:
+        ``models`` unchanged when ``API_KEYS`` adds no other key
+    """
+    keys = [api_key]
+    for key in os.getenv("API_KEYS", "").split(","):
+        key = key.strip()
+        if key and key not in keys:
+            keys.append(key)
+    if len(keys) == 1:
+        return models
+    rpm = os.getenv("AGENT_KEY_RPM")
+    tpm = os.getenv("AGENT_KEY_TPM")
+    return KeyPoolModels(
+        [(key_label(i, key), models if i == 0 else build(key)) for i, key in enumerate(keys)],
+        strategy=os.getenv("AGENT_KEY_STRATEGY", "least-loaded"),
+        rpm_limit=int(rpm) if rpm else None,
+        tpm_limit=int(tpm) if tpm else None,
+        cooldown=float(os.getenv("AGENT_KEY_COOLDOWN", str(DEFAULT_COOLDOWN))),
+    )
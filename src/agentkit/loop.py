@@ -0,0 +1,113 @@
+"""
+The function chaining loop as a reusable generator.
+
+The workshop scripts keep their loops inline so they are easy to follow. Code
+that drives an agent without a terminal (the HTTP server, the orchestrator,
+benchmarks) uses ``chain_turn`` instead: it runs one user turn to completion
+and yields an event for every step so callers can stream progress.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Iterator, Optional, Tuple, Union
+
+from agentkit.startup import lazy_import
+from agentkit.tool_schema import ToolArgumentError
+from agentkit.turn_budget import TurnStopped, end_stopped_turn
+
+if TYPE_CHECKING:
+    from google.genai.types import Content, FunctionCall, GenerateContentConfig
+
+    from agentkit.turn_budget import TurnGuard
+
+types = lazy_import("google.genai.types")
+
+Dispatch = Callable[["FunctionCall"], Any]
+Event = Tuple[str, Any]
+
+
+def function_result_contents(function_call: FunctionCall, response: dict) -> Tuple[Content, Content]:
+    """
+    Build the history entries for a function call and its response.
+
+    Returns:
+        Tuple[Content, Content]: The model's call and the user's function response
+    """
+    return (
+        types.Content(role="model", parts=[types.Part(function_call=function_call)]),
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_function_response(name=function_call.name, response=response)
+            ],
+        ),
+    )
+
+
+def chain_turn(
+    models: Any,
+    model_name: str,
+    contents: list,
+    config: Optional[Union[GenerateContentConfig, dict]],
+    user_input: str,
+    dispatch: Optional[Dispatch] = None,
+    guard: Optional[TurnGuard] = None,
+) -> Iterator[Event]:
+    """
+    Run one user turn, calling tools until the model answers with text.
+
+    Events yielded, in order of occurrence:
+        ("function_call", {"name": ..., "args": ...})
+        ("function_result", {"name": ..., "result": ...} or {"name": ..., "error": ...})
+        ("text", final_answer)
+        ("stopped", {"reason": ..., "message": ...}) instead of "text" when the
+        turn's ``guard`` stops it; the history is closed with ``message``
+
+    A tool that raises is reported back to the model as ``{"error": ...}`` so
+    it can recover, the same way ``CodeAgent`` handles failing tools. Calls
+    rejected by a ``ToolValidator`` also list their ``invalid_arguments``.
+
+    Args:
+        models: Object with ``generate_content`` (see ``agentkit.transport``)
+        model_name (str): Model to call
+        contents (list): Conversation history; updated in place
+        config: Generation config with system prompt and tools
+        user_input (str): The user's message
+        dispatch: Executes a ``FunctionCall``; None for agents without tools
+        guard: Budget and cancellation for this turn (see ``agentkit.turn_budget``)
+    """
+    contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
+
+    try:
+        while True:
+            if guard is not None:
+                guard.before_request()
+            response = models.generate_content(
+                model=model_name, contents=contents, config=config
+            )
+            if guard is not None:
+                guard.after_response(response)
+
+            if not response.function_calls or dispatch is None:
+                text = response.text or ""
+                contents.append(types.Content(role="model", parts=[types.Part(text=text)]))
+                if guard is not None:
+                    guard.finish()
+                yield "text", text
+                return
+
+            for function_call in response.function_calls:
+                if guard is not None:
+                    guard.before_tool_call()
+                yield "function_call", {"name": function_call.name, "args": function_call.args}
+                try:
+                    payload = {"result": dispatch(function_call)}
+                except ToolArgumentError as e:
+                    payload = e.to_response()
+                except Exception as e:
+                    payload = {"error": str(e)}
+                contents.extend(function_result_contents(function_call, payload))
+                yield "function_result", {"name": function_call.name, **payload}
+    except TurnStopped as e:
+        message = end_stopped_turn(contents, e)
+        yield "stopped", {"reason": e.reason, "message": message}
@@ -0,0 +1,361 @@
+"""
+Planner plus concurrent workers for multi-file coding tasks.
+
+``CodeAgent`` works through a task one tool call at a time in a single
+conversation, so a Flask app with five files costs five or more sequential
+round trips. ``Orchestrator`` asks the model for a plan first (one call that
+splits the task into independent subtasks, each naming the files it owns),
+then runs every subtask in its own conversation on a thread pool and merges
+the answers:
+
+- subtasks that name the same file are put in one lane and run in order, so
+  they never race on that file
+- every write goes through a per-file lock as well, which covers files the
+  plan did not mention; a file written by more than one subtask is reported
+  as a conflict in the result
+- a plan that cannot be parsed falls back to running the task as a single
+  subtask, i.e. the normal agent loop
+- with a ``TurnBudget`` every subtask gets its own ``TurnGuard``;
+  ``cancel()`` (or Ctrl-C during ``run``) stops all running subtasks
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Union
+
+from agentkit.env import env_flag
+from agentkit.loop import chain_turn
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import FunctionCall, GenerateContentConfig
+
+    from agentkit.turn_budget import TurnBudget, TurnGuard
+
+types = lazy_import("google.genai.types")
+futures = lazy_import("concurrent.futures")
+
+Dispatch = Callable[["FunctionCall"], Any]
+
+DEFAULT_MAX_WORKERS = 4
+MAX_SUBTASKS = 8
+
+PLANNER_PROMPT = """You split coding tasks into independent subtasks that separate developers can do at the same time.
+
+    Reply with JSON only, in this form:
+    {"subtasks": [{"title": "...", "instructions": "...", "files": ["path/one.py"]}]}
+
+    Rules:
+    - Each subtask lists every file it will create or modify in "files"
+    - Prefer one subtask per file; two subtasks should not share a file
+    - Instructions must be self-contained: include names, routes and interfaces
+      the other subtasks rely on
+    - Use at most 8 subtasks; a task that cannot be split is a single subtask
+    """
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+class Subtask:
+    """One unit of a plan."""
+
+    __slots__ = ("title", "instructions", "files")
+
+    def __init__(self, title: str, instructions: str, files: List[str]):
+        self.title = title
+        self.instructions = instructions
+        self.files = files
+
+    def __repr__(self) -> str:
+        return f"Subtask({self.title!r}, files={self.files})"
+
+
+class SubtaskResult:
+    __slots__ = ("subtask", "text", "files_written", "tool_calls", "error", "seconds")
+
+    def __init__(self, subtask: Subtask):
+        self.subtask = subtask
+        self.text = ""
+        self.files_written: List[str] = []
+        self.tool_calls = 0
+        self.error: Optional[str] = None
+        self.seconds = 0.0
+
+
+class OrchestrationResult:
+    """Merged outcome of an orchestrated task."""
+
+    def __init__(
+        self, subtasks: List[SubtaskResult], conflicts: Dict[str, List[str]], seconds: float
+    ):
+        self.subtasks = subtasks
+        self.conflicts = conflicts
+        self.seconds = seconds
+
+    @property
+    def files_written(self) -> List[str]:
+        return sorted({path for result in self.subtasks for path in result.files_written})
+
+    @property
+    def text(self) -> str:
+        """One answer for the user, with a section per subtask."""
+        sections = []
+        for result in self.subtasks:
+            body = result.text.strip() if result.error is None else f"❌ {result.error}"
+            sections.append(f"## {result.subtask.title}\n{body}")
+        if self.conflicts:
+            lines = [f"- {path}: {', '.join(titles)}" for path, titles in self.conflicts.items()]
+            sections.append("## ⚠️ Files written by more than one subtask\n" + "\n".join(lines))
+        return "\n\n".join(sections)
+
+
+class FileLocks:
+    """A lock per file path, created on first use."""
+
+    def __init__(self):
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    @staticmethod
+    def key(path: str) -> str:
+        return os.path.normcase(os.path.abspath(path))
+
+    @contextmanager
+    def hold(self, path: str) -> Iterator[None]:
+        key = self.key(path)
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            yield
+
+
+def parse_plan(text: str, task: str) -> List[Subtask]:
+    """
+    Read the planner's JSON reply.
+
+    Returns:
+        List[Subtask]: The subtasks, or the whole task as one subtask if the
+        reply is not a usable plan
+    """
+    try:
+        data = json.loads(_FENCE.sub("", (text or "").strip()))
+        subtasks = [
+            Subtask(
+                str(item.get("title") or f"Subtask {i + 1}"),
+                str(item["instructions"]),
+                [str(path) for path in item.get("files") or []],
+            )
+            for i, item in enumerate(data["subtasks"])
+        ]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        subtasks = []
+    if not subtasks:
+        return [Subtask("Task", task, [])]
+    return subtasks[:MAX_SUBTASKS]
+
+
+def lanes(subtasks: List[Subtask]) -> List[List[Subtask]]:
+    """
+    Group subtasks that share a file; each group runs sequentially.
+
+    Returns:
+        List[List[Subtask]]: Groups in plan order
+    """
+    owner: Dict[str, int] = {}
+    parent = list(range(len(subtasks)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, subtask in enumerate(subtasks):
+        for path in subtask.files:
+            key = FileLocks.key(path)
+            if key in owner:
+                parent[find(i)] = find(owner[key])
+            else:
+                owner[key] = i
+
+    groups: Dict[int, List[Subtask]] = {}
+    for i, subtask in enumerate(subtasks):
+        groups.setdefault(find(i), []).append(subtask)
+    return list(groups.values())
+
+
+class Orchestrator:
+    """
+    Runs a coding task as planned, concurrent subtasks.
+
+    Example:
+        orchestrator = Orchestrator(agent.models, agent.model_name, agent.config,
+                                    agent.process_function_call, {"write_file": "file_path"})
+        print(orchestrator.run("Create a Flask app with a home and an about page").text)
+    """
+
+    def __init__(
+        self,
+        models: Any,
+        model_name: str,
+        config: Union[GenerateContentConfig, dict],
+        dispatch: Dispatch,
+        write_args: Dict[str, str],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        turn_budget: Optional[TurnBudget] = None,
+    ):
+        """
+        Args:
+            models: Object with ``generate_content`` (see ``agentkit.transport``)
+            model_name (str): Model for the planner and the workers
+            config: The worker agent's config (system prompt and tools)
+            dispatch: Executes a ``FunctionCall`` for the workers
+            write_args (Dict[str, str]): Tool name -> argument holding the path
+                it writes; those calls take the file's lock
+            max_workers (int): Subtask lanes run at the same time
+            turn_budget (Optional[TurnBudget]): Limits applied to each subtask
+        """
+        self.models = models
+        self.model_name = model_name
+        self.config = config
+        self.dispatch = dispatch
+        self.write_args = write_args
+        self.max_workers = max_workers
+        self.planner_config = {
+            "system_instruction": PLANNER_PROMPT,
+            "response_mime_type": "application/json",
+            "temperature": 0,
+        }
+        self.turn_budget = turn_budget
+        self.locks = FileLocks()
+        self._guards: List[TurnGuard] = []
+        self.metrics: Dict[str, int] = {"tasks": 0, "subtasks": 0, "fallbacks": 0, "conflicts": 0}
+
+    def plan(self, task: str) -> List[Subtask]:
+        """Ask the model to split ``task`` into subtasks."""
+        response = self.models.generate_content(
+            model=self.model_name,
+            contents=[types.Content(role="user", parts=[types.Part(text=task)])],
+            config=self.planner_config,
+        )
+        subtasks = parse_plan(response.text, task)
+        if len(subtasks) == 1 and subtasks[0].instructions == task:
+            self.metrics["fallbacks"] += 1
+        return subtasks
+
+    def _prompt(self, task: str, subtask: Subtask) -> str:
+        if not subtask.files or subtask.instructions == task:
+            return subtask.instructions
+        return (
+            f"{subtask.instructions}\n\n"
+            f"This is one part of a larger task that other agents are working on "
+            f"at the same time: {task}\n"
+            f"Only create or modify these files: {', '.join(subtask.files)}"
+        )
+
+    def _run_subtask(
+        self, task: str, subtask: Subtask, writers: Dict[str, List[str]]
+    ) -> SubtaskResult:
+        result = SubtaskResult(subtask)
+        start = time.perf_counter()
+
+        def dispatch(function_call: FunctionCall) -> Any:
+            result.tool_calls += 1
+            arg = self.write_args.get(function_call.name)
+            path = (function_call.args or {}).get(arg) if arg else None
+            if not path:
+                return self.dispatch(function_call)
+            with self.locks.hold(path):
+                titles = writers.setdefault(FileLocks.key(path), [])
+                if subtask.title not in titles:
+                    titles.append(subtask.title)
+                result.files_written.append(path)
+                return self.dispatch(function_call)
+
+        prompt = self._prompt(task, subtask)
+        guard = self.turn_budget.start() if self.turn_budget is not None else None
+        if guard is not None:
+            self._guards.append(guard)
+        try:
+            events = chain_turn(
+                self.models, self.model_name, [], self.config, prompt, dispatch, guard
+            )
+            for kind, value in events:
+                if kind == "text":
+                    result.text = value
+                elif kind == "stopped":
+                    result.error = value["message"]
+        except Exception as e:
+            result.error = str(e)
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def _run_lane(
+        self, task: str, lane: List[Subtask], writers: Dict[str, List[str]]
+    ) -> List[SubtaskResult]:
+        return [self._run_subtask(task, subtask, writers) for subtask in lane]
+
+    def run(self, task: str) -> OrchestrationResult:
+        """
+        Plan ``task``, run the subtasks concurrently and merge the results.
+
+        Returns:
+            OrchestrationResult: Per-subtask answers, files written and conflicts
+        """
+        start = time.perf_counter()
+        subtasks = self.plan(task)
+        writers: Dict[str, List[str]] = {}
+
+        groups = lanes(subtasks)
+        pool = futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups)))
+        try:
+            finished = list(pool.map(lambda lane: self._run_lane(task, lane, writers), groups))
+        except KeyboardInterrupt:
+            # Let running subtasks close their conversations, then give up
+            self.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            self._guards.clear()
+        by_subtask = {id(r.subtask): r for lane in finished for r in lane}
+        results = [by_subtask[id(subtask)] for subtask in subtasks]
+
+        conflicts = {path: titles for path, titles in writers.items() if len(titles) > 1}
+        self.metrics["tasks"] += 1
+        self.metrics["subtasks"] += len(subtasks)
+        self.metrics["conflicts"] += len(conflicts)
+        return OrchestrationResult(results, conflicts, time.perf_counter() - start)
+
+    def cancel(self) -> None:
+        """Stop every running subtask at its next step."""
+        for guard in list(self._guards):
+            guard.cancel()
+
+
+def orchestrator_for(agent: Any, write_args: Dict[str, str]) -> Optional[Orchestrator]:
+    """
+    Build an ``Orchestrator`` for a ``CodeAgent`` from environment variables.
+
+    - ``AGENT_ORCHESTRATE=1`` plans every request and runs the parts concurrently
+    - ``AGENT_ORCHESTRATE_WORKERS`` sets how many run at once (default 4)
+
+    Returns:
+        Optional[Orchestrator]: None when orchestration is disabled
+    """
+    if not env_flag("AGENT_ORCHESTRATE"):
+        return None
+    return Orchestrator(
+        agent.models,
+        agent.model_name,
+        agent.config,
+        agent.process_function_call,
+        write_args,
+        max_workers=int(os.getenv("AGENT_ORCHESTRATE_WORKERS", str(DEFAULT_MAX_WORKERS))),
+        turn_budget=getattr(agent, "turn_budget", None),
+    )
@@ -0,0 +1,187 @@
+"""
+Run function calls while the model is still streaming its response.
+
+The chaining loops wait for the whole response before they look at
+``response.function_calls``, so a response that asks for a tool early and
+then keeps generating (more calls, a sentence of explanation) leaves the tool
+idle until the last token. ``ToolPipeline`` reads ``generate_content_stream``
+instead and hands every function call to a thread pool as soon as the chunk
+carrying it arrives (the API never splits one call across chunks). When the
+stream ends, the loop gets a normal ``GenerateContentResponse`` (the parts
+in streamed order, the pieces of each text joined) plus one future per call,
+and appends the results to the history in call order, so the history is the
+same as without pipelining.
+
+Every ``models`` layer streams (``HedgedModels`` hedges and falls back on the
+first chunk). Any other models object without ``generate_content_stream`` is
+read as a single chunk, which is just the normal loop, with a warning.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from agentkit.env import env_flag
+from agentkit.startup import lazy_import
+from agentkit.transport import join_chunks, stream_content
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from google.genai.types import FunctionCall, GenerateContentResponse
+
+    from agentkit.turn_budget import TurnGuard
+
+futures = lazy_import("concurrent.futures")
+
+Dispatch = Callable[["FunctionCall"], Any]
+
+DEFAULT_MAX_WORKERS = 4
+
+
+class ToolPipeline:
+    """
+    Streams responses and starts their function calls as they arrive.
+
+    Example:
+        pipeline = ToolPipeline(process_function_call)
+        response, pending = pipeline.generate_content(
+            models, model=model_name, contents=contents, config=config
+        )
+        for function_call, future in zip(response.function_calls or [], pending):
+            result = future.result()
+    """
+
+    def __init__(
+        self,
+        dispatch: Dispatch,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_calls: Optional[int] = None,
+    ):
+        """
+        Args:
+            dispatch: Executes a ``FunctionCall`` and returns its result
+            max_workers (int): Tools running at the same time; 1 keeps them in
+                call order, e.g. for the speculator's bookkeeping
+            max_calls (Optional[int]): Start only the first calls of each
+                response (``CodeAgent`` runs one per round trip)
+        """
+        self.dispatch = dispatch
+        self.max_workers = max_workers
+        self.max_calls = max_calls
+        self._pool = None
+        self.metrics: Dict[str, float] = {
+            "responses": 0,
+            "calls_started": 0,
+            "calls_started_early": 0,
+            "seconds_overlapped": 0.0,
+        }
+
+    @property
+    def pool(self) -> Any:
+        if self._pool is None:
+            self._pool = futures.ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="tool-pipeline"
+            )
+        return self._pool
+
+    def generate_content(
+        self,
+        models: Any,
+        *,
+        model: str,
+        contents: Any,
+        config: Any = None,
+        guard: Optional[TurnGuard] = None,
+    ) -> Tuple[GenerateContentResponse, List[Future]]:
+        """
+        Stream one response, starting each function call as soon as it arrives.
+
+        Args:
+            models: Object with ``generate_content`` (and ideally ``generate_content_stream``)
+            model (str): Model to call
+            contents: Conversation history
+            config: Generation config
+            guard (Optional[TurnGuard]): Checked before each call is started;
+                the loop must not check it again for these calls
+
+        Returns:
+            Tuple[GenerateContentResponse, List[Future]]: The whole response and
+            a future per started call, in the order of ``response.function_calls``
+
+        Raises:
+            TurnStopped: If ``guard`` stops the turn before a call is started
+        """
+        received: List[GenerateContentResponse] = []
+        pending: List[Future] = []
+        # (chunk index, time) at which each call was started
+        started: List[Tuple[int, float]] = []
+        try:
+            for chunk in stream_content(models, model=model, contents=contents, config=config):
+                received.append(chunk)
+                candidate = chunk.candidates[0] if chunk.candidates else None
+                content = candidate.content if candidate is not None else None
+                for part in (content.parts if content is not None else None) or []:
+                    if not part.function_call:
+                        continue
+                    if self.max_calls is None or len(pending) < self.max_calls:
+                        if guard is not None:
+                            guard.before_tool_call()
+                        pending.append(self.pool.submit(self.dispatch, part.function_call))
+                        started.append((len(received), time.perf_counter()))
+        except BaseException:
+            # Calls already running finish; the ones still queued are dropped
+            for future in pending:
+                future.cancel()
+            futures.wait(pending)
+            raise
+        finished = time.perf_counter()
+
+        self.metrics["responses"] += 1
+        self.metrics["calls_started"] += len(pending)
+        for chunk_index, start in started:
+            if chunk_index < len(received):
+                self.metrics["calls_started_early"] += 1
+                self.metrics["seconds_overlapped"] += finished - start
+
+        response = join_chunks(received)
+        return response, pending
+
+    def summary(self) -> str:
+        m = self.metrics
+        return (
+            f"{m['calls_started']} calls over {m['responses']} responses, "
+            f"{m['calls_started_early']} started before the stream ended "
+            f"({m['seconds_overlapped']:.1f}s overlapped)"
+        )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def tool_pipeline_for(
+    dispatch: Dispatch, max_workers: Optional[int] = None, max_calls: Optional[int] = None
+) -> Optional[ToolPipeline]:
+    """
+    Build a ``ToolPipeline`` from environment variables.
+
+    - ``AGENT_PIPELINE_TOOLS=1`` streams responses and starts calls early
+    - ``AGENT_PIPELINE_WORKERS`` sets how many tools run at once (default 4)
+
+    Args:
+        dispatch: Executes a ``FunctionCall``
+        max_workers (Optional[int]): Overrides ``AGENT_PIPELINE_WORKERS``
+        max_calls (Optional[int]): Calls started per response (None for all)
+
+    Returns:
+        Optional[ToolPipeline]: None when pipelining is disabled
+    """
+    if not env_flag("AGENT_PIPELINE_TOOLS"):
+        return None
+    if max_workers is None:
+        max_workers = int(os.getenv("AGENT_PIPELINE_WORKERS", str(DEFAULT_MAX_WORKERS)))
+    return ToolPipeline(dispatch, max_workers=max_workers, max_calls=max_calls)
@@ -0,0 +1,362 @@
+"""
+cProfile and tracemalloc for whole agent sessions.
+
+When a session gets slow it is not obvious whether the time goes into the
+SDK's pydantic serialization, the growing history, tool code or printing to
+the terminal. Started with ``--profile`` (or ``AGENT_PROFILE=1``), an entry
+point runs its session under ``SessionProfiler``:
+
+- cProfile records every turn; the time spent waiting for the user's input is
+  left out. At exit it writes ``profile.pstats`` and ``profile.collapsed``
+  (one ``frame;frame;frame microseconds`` line per stack, for flamegraph.pl
+  or speedscope)
+- tracemalloc takes a snapshot every ``AGENT_PROFILE_EVERY`` turns, and
+  ``allocations.txt`` gets the allocations that grew most since the previous
+  snapshot, together with the size of ``contents``, so growth of the history
+  can be traced back to the line that keeps the memory
+
+cProfile only sees calls as caller/callee pairs, so the collapsed stacks are
+rebuilt from that graph: the time of a function is split between its callers
+in proportion to the time spent under each. Recursion is cut where a function
+calls back into one already on the stack.
+
+Files go to ``AGENT_PROFILE_DIR`` (default ``.profiles/<script>-<time>/``).
+The entry points only need ``session_profiler_for`` and ``profiled_input``;
+cProfile is imported only when profiling is on.
+"""
+
+from __future__ import annotations
+
+import atexit
+import io
+import os
+import pstats
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from agentkit.env import env_flag
+from agentkit.startup import lazy_import
+
+cProfile = lazy_import("cProfile")
+
+PROFILE_FLAG = "--profile"
+DEFAULT_PROFILE_DIR = ".profiles"
+DEFAULT_FRAMES = 8
+DEFAULT_TOP = 10
+# Collapsed stacks deeper than this are cut
+MAX_STACK_DEPTH = 64
+
+Func = Tuple[str, int, str]
+
+
+def frame_name(func: Func) -> str:
+    """A short, flamegraph-safe name for a pstats function key."""
+    filename, line, name = func
+    if filename == "~":
+        # Built-ins: name is e.g. "<built-in method builtins.print>"
+        label = name
+    else:
+        label = f"{os.path.basename(filename)}:{name}:{line}"
+    return label.replace(";", ",")
+
+
+def _cyclic(children: Dict[Func, List[Tuple[Func, float]]]) -> Set[Func]:
+    """Functions on a call cycle of more than one function (Tarjan's algorithm)."""
+    index: Dict[Func, int] = {}
+    low: Dict[Func, int] = {}
+    stack: List[Func] = []
+    on_stack: Set[Func] = set()
+    cyclic: Set[Func] = set()
+    # (function, callees not yet looked at): the depth-first walk without recursion
+    work: List[Tuple[Func, Any]] = []
+
+    def visit(func: Func) -> None:
+        index[func] = low[func] = len(index)
+        stack.append(func)
+        on_stack.add(func)
+        work.append((func, iter(children.get(func, ()))))
+
+    for start in children:
+        if start in index:
+            continue
+        visit(start)
+        while work:
+            func, callees = work[-1]
+            for child, _ in callees:
+                if child not in index:
+                    visit(child)
+                    break
+                if child in on_stack:
+                    low[func] = min(low[func], index[child])
+            else:
+                work.pop()
+                if work:
+                    caller = work[-1][0]
+                    low[caller] = min(low[caller], low[func])
+                if low[func] == index[func]:
+                    component = [stack.pop()]
+                    while component[-1] != func:
+                        component.append(stack.pop())
+                    on_stack.difference_update(component)
+                    if len(component) > 1:
+                        cyclic.update(component)
+    return cyclic
+
+
+def collapsed_stacks(stats: pstats.Stats, min_us: int = 1) -> Dict[str, int]:
+    """
+    Rebuild call stacks from a cProfile call graph.
+
+    Args:
+        stats (pstats.Stats): The profile
+        min_us (int): Stacks with less self time than this are dropped
+
+    Returns:
+        Dict[str, int]: ``"root;...;leaf"`` -> self time in microseconds
+    """
+    entries = stats.stats  # func -> (cc, nc, tt, ct, callers)
+    children: Dict[Func, List[Tuple[Func, float]]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            # edge = (cc, nc, tt, ct) of func when called from caller
+            children.setdefault(caller, []).append((func, edge[3]))
+
+    # (function, room) -> stacks below it, itself first and at most ``room`` deep,
+    # with their self seconds over all its calls. Callers share these, so a
+    # function reached along many paths is walked once per depth. Functions on a
+    # cycle are walked each time: where their recursion is cut depends on the path
+    cyclic = _cyclic(children)
+    below: Dict[Tuple[Func, int], Dict[Tuple[str, ...], float]] = {}
+    active: Set[Func] = set()
+
+    def walk(func: Func, room: int) -> Dict[Tuple[str, ...], float]:
+        if (func, room) in below:
+            return below[func, room]
+        active.add(func)
+        name = frame_name(func)
+        tt = entries[func][2]
+        found: Dict[Tuple[str, ...], float] = {}
+        if tt * 1e6 >= min_us:
+            found[(name,)] = tt
+        if room > 1:
+            for child, edge_ct in children.get(func, ()):
+                child_ct = entries[child][3]
+                if child in active or child_ct <= 0:
+                    continue
+                share = min(1.0, edge_ct / child_ct)
+                for stack, seconds in walk(child, room - 1).items():
+                    seconds *= share
+                    if seconds * 1e6 >= min_us:
+                        key = (name,) + stack
+                        found[key] = found.get(key, 0.0) + seconds
+        active.discard(func)
+        if func not in cyclic:
+            below[func, room] = found
+        return found
+
+    stacks: Dict[str, int] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            for stack, seconds in walk(func, MAX_STACK_DEPTH).items():
+                key = ";".join(stack)
+                stacks[key] = stacks.get(key, 0) + int(seconds * 1e6)
+    return stacks
+
+
+def _size(num: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if abs(num) < 1024:
+            return f"{num:.0f} {unit}" if unit == "B" else f"{num:.1f} {unit}"
+        num /= 1024
+    return f"{num:.1f} GiB"
+
+
+def history_size(contents: Any) -> Tuple[int, int]:
+    """
+    Returns:
+        Tuple[int, int]: Messages in ``contents`` and their encoded size in bytes
+    """
+    from agentkit.transport import encode_content
+
+    return len(contents), sum(len(encode_content(content)) for content in contents)
+
+
+class SessionProfiler:
+    """
+    Profiles an agent session turn by turn.
+
+    Example:
+        profiler = SessionProfiler(".profiles/chat")
+        profiler.start()
+        while True:
+            user_input = profiled_input("You: ", profiler, contents)
+            ...
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        snapshot_every: int = 1,
+        frames: int = DEFAULT_FRAMES,
+        top: int = DEFAULT_TOP,
+    ):
+        """
+        Args:
+            output_dir (str): Directory for the profile files
+            snapshot_every (int): Take a tracemalloc snapshot every this many turns
+            frames (int): Stack frames tracemalloc keeps per allocation
+            top (int): Allocations listed per snapshot
+        """
+        self.output_dir = output_dir
+        self.snapshot_every = max(1, snapshot_every)
+        self.frames = frames
+        self.top = top
+        self.turns = 0
+        self.profile = cProfile.Profile()
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._turn_started = 0.0
+        self._running = False
+        self._stopped = False
+        self._filters = [
+            tracemalloc.Filter(False, "*/tracemalloc.py"),
+            tracemalloc.Filter(False, __file__),
+        ]
+
+    def start(self) -> None:
+        """
+        Start tracing. The first turn is recorded from the next ``resume``;
+        ``stop`` runs at exit if it was not called before.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self._path("allocations.txt"), "w", encoding="utf-8") as file:
+            file.write(f"Allocations per turn (snapshot every {self.snapshot_every})\n")
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        self._snapshot = self._take_snapshot()
+        atexit.register(self.stop)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces(self._filters)
+
+    def resume(self) -> None:
+        """Start (or continue) recording a turn."""
+        if self._stopped or self._running:
+            return
+        self._turn_started = time.perf_counter()
+        self.profile.enable()
+        self._running = True
+
+    def pause(self) -> None:
+        if self._running:
+            self.profile.disable()
+            self._running = False
+
+    def end_turn(self, contents: Any = None) -> None:
+        """
+        Stop recording after a turn, e.g. while waiting for the next input.
+
+        Args:
+            contents: The conversation history, whose size goes into the report
+        """
+        if self._stopped or not self._running:
+            return
+        self.pause()
+        self.turns += 1
+        if self.turns % self.snapshot_every == 0:
+            self._report(contents, time.perf_counter() - self._turn_started)
+
+    def _report(self, contents: Any, seconds: float) -> None:
+        snapshot = self._take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        diffs = snapshot.compare_to(self._snapshot, "traceback")
+        self._snapshot = snapshot
+
+        lines = [f"\n== turn {self.turns} ({seconds * 1000:.0f} ms) =="]
+        lines.append(f"traced memory {_size(current)}, peak {_size(peak)}")
+        if contents is not None:
+            messages, size = history_size(contents)
+            lines.append(f"contents: {messages} messages, {_size(size)} encoded")
+        growth = [diff for diff in diffs if diff.size_diff > 0][: self.top]
+        for diff in growth:
+            lines.append(
+                f"{'+' + _size(diff.size_diff):>12} {diff.count_diff:+7d} blocks  "
+                f"(now {_size(diff.size)})"
+            )
+            for frame in reversed(diff.traceback):
+                lines.append(f"{'':>14}{frame.filename}:{frame.lineno}")
+        with open(self._path("allocations.txt"), "a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    def stop(self) -> None:
+        """Write the profile files and print where they are."""
+        if self._stopped:
+            return
+        self.pause()
+        self._stopped = True
+        tracemalloc.stop()
+
+        self.profile.dump_stats(self._path("profile.pstats"))
+        stats = pstats.Stats(self.profile, stream=io.StringIO())
+        stacks = collapsed_stacks(stats)
+        with open(self._path("profile.collapsed"), "w", encoding="utf-8") as file:
+            for stack, micros in sorted(stacks.items()):
+                file.write(f"{stack} {micros}\n")
+
+        print(f"\n📊 Profile of {self.turns} turns written to {self.output_dir}/")
+        print("   profile.pstats, profile.collapsed (flamegraph), allocations.txt")
+        totals = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:5]
+        for func, (_, calls, tottime, _, _) in totals:
+            print(f"   {tottime * 1000:8.1f} ms self  {calls:7d} calls  {frame_name(func)}")
+
+
+def profiled_input(prompt: str, profiler: Optional[SessionProfiler], contents: Any) -> str:
+    """
+    ``input(prompt)`` that closes the profiled turn while the user types.
+
+    Args:
+        prompt (str): Shown to the user
+        profiler (Optional[SessionProfiler]): The session's profiler, if any
+        contents: The conversation history, for the turn report
+    """
+    if profiler is None:
+        return input(prompt)
+    profiler.end_turn(contents)
+    try:
+        return input(prompt)
+    finally:
+        profiler.resume()
+
+
+def session_profiler_for(script: str) -> Optional[SessionProfiler]:
+    """
+    Start a ``SessionProfiler`` if ``--profile`` was passed or ``AGENT_PROFILE=1``.
+
+    - ``AGENT_PROFILE_DIR``: output directory (default ``.profiles/<script>-<time>``)
+    - ``AGENT_PROFILE_EVERY``: turns between tracemalloc snapshots (default 1)
+    - ``AGENT_PROFILE_FRAMES``: frames kept per allocation (default 8)
+
+    Args:
+        script (str): Path of the entry point (``__file__``)
+
+    Returns:
+        Optional[SessionProfiler]: The running profiler, or None when profiling is off
+    """
+    if PROFILE_FLAG not in sys.argv[1:] and not env_flag("AGENT_PROFILE"):
+        return None
+    name = os.path.splitext(os.path.basename(script))[0]
+    output_dir = os.getenv("AGENT_PROFILE_DIR") or os.path.join(
+        DEFAULT_PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}"
+    )
+    profiler = SessionProfiler(
+        output_dir,
+        snapshot_every=int(os.getenv("AGENT_PROFILE_EVERY", "1")),
+        frames=int(os.getenv("AGENT_PROFILE_FRAMES", str(DEFAULT_FRAMES))),
+    )
+    profiler.start()
+    print(f"📊 Profiling this session into {output_dir}/")
+    return profiler
@@ -0,0 +1,297 @@
+"""
+Response cache for repeated user prompts.
+
+Many users ask the same thing ("what's the weather in Auckland in
+Fahrenheit?"), and every time the agent runs the whole function calling chain.
+``ResponseCache`` sits in front of the chaining loop: a hit returns the
+previous final answer without calling the model at all.
+
+Prompts are matched exactly after normalization (case, unicode form,
+punctuation and whitespace), and optionally by embedding similarity through a
+small local vector index. Entries are namespaced by the system prompt and the
+tool declarations, so changing either invalidates the cache, and expire after
+a TTL.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from difflib import SequenceMatcher
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from agentkit.env import env_flag
+
+Embedder = Callable[[str], Sequence[float]]
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+# Words that never change what is being asked; everything else is a key term
+_STOPWORDS = frozenset(
+    "a an and are at be can could do does for how i in is it its me my of on "
+    "please right now tell the there to today what whats which will would you "
+    "your".split()
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Normalize a prompt for exact matching.
+
+    Example:
+        "  What's the weather in  AUCKLAND?" -> "whats the weather in auckland"
+    """
+    prompt = unicodedata.normalize("NFKC", prompt).casefold()
+    prompt = _PUNCTUATION.sub("", prompt)
+    return _WHITESPACE.sub(" ", prompt).strip()
+
+
+def cache_namespace(system_prompt: str, declarations: Sequence[dict]) -> str:
+    """
+    Version key for a system prompt plus tool set.
+
+    Args:
+        system_prompt (str): The agent's system instruction
+        declarations (Sequence[dict]): The function declarations it can call
+
+    Returns:
+        str: A short hex digest identifying this prompt/tool combination
+    """
+    payload = json.dumps([system_prompt, list(declarations)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def hashing_embedder(dimensions: int = 256) -> Embedder:
+    """
+    A dependency-free local embedder: hashed word and character-trigram counts.
+
+    Good enough to catch rephrasings such as "weather in auckland in fahrenheit"
+    vs "auckland weather in fahrenheit" without any model round trip.
+    """
+
+    def embed(text: str) -> List[float]:
+        vector = [0.0] * dimensions
+        words = normalize_prompt(text).split()
+        features = words + [
+            word[i : i + 3] for word in words for i in range(max(1, len(word) - 2))
+        ]
+        for feature in features:
+            vector[zlib.crc32(feature.encode("utf-8")) % dimensions] += 1.0
+        return vector
+
+    return embed
+
+
+def key_terms(prompt: str) -> frozenset:
+    """The words of a normalized prompt that carry its meaning (cities, units, ...)."""
+    return frozenset(word for word in prompt.split() if word not in _STOPWORDS)
+
+
+def _terms_match(query: frozenset, cached: frozenset) -> bool:
+    """Key terms must agree one-to-one, allowing for small typos."""
+    if len(query) != len(cached):
+        return False
+    return all(
+        term in cached
+        or any(SequenceMatcher(None, term, other).ratio() >= 0.85 for other in cached)
+        for term in query
+    )
+
+
+def _unit(vector: Sequence[float]) -> Tuple[float, ...]:
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return tuple(x / norm for x in vector)
+
+
+class _Entry:
+    __slots__ = ("answer", "expires", "vector", "terms")
+
+    def __init__(
+        self,
+        answer: str,
+        expires: float,
+        vector: Optional[Tuple[float, ...]],
+        terms: frozenset,
+    ):
+        self.answer = answer
+        self.expires = expires
+        self.vector = vector
+        self.terms = terms
+
+
+class ResponseCache:
+    """
+    Maps normalized prompts to final answers, with TTL and a hit-rate metric.
+
+    Example:
+        cache = ResponseCache(cache_namespace(SYSTEM_PROMPT, declarations))
+        answer = cache.get(user_input)
+        if answer is None:
+            answer = run_chain(...)
+            cache.put(user_input, answer)
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float = 600.0,
+        max_entries: int = 10_000,
+        embedder: Optional[Embedder] = None,
+        similarity: float = 0.75,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            namespace (str): Result of ``cache_namespace`` for the agent
+            ttl_seconds (float): How long an answer stays valid
+            max_entries (int): Oldest entries are evicted beyond this size
+            embedder (Optional[Embedder]): Enables near-duplicate matching
+            similarity (float): Minimum cosine similarity for a semantic hit;
+                candidates must also have the same key terms, so "auckland" never
+                matches "sydney" and "celsius" never matches "fahrenheit"
+            path (Optional[str]): JSONL file to share entries across sessions
+            clock: Time source, replaceable in benchmarks
+        """
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.embedder = embedder
+        self.similarity = similarity
+        self.path = path
+        self.clock = clock
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self._load(path)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, prompt: str) -> Optional[str]:
+        """
+        Return the cached answer for a prompt, or None on a miss.
+
+        Args:
+            prompt (str): The raw user input
+        """
+        key = normalize_prompt(prompt)
+        now = self.clock()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= now:
+            del self._entries[key]
+            entry = None
+
+        if entry is None and self.embedder is not None:
+            entry = self._nearest(_unit(self.embedder(key)), key_terms(key), now)
+            if entry is not None:
+                self.semantic_hits += 1
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.answer
+
+    def _nearest(
+        self, vector: Tuple[float, ...], terms: frozenset, now: float
+    ) -> Optional[_Entry]:
+        best, best_score = None, self.similarity
+        for entry in self._entries.values():
+            if entry.vector is None or entry.expires <= now:
+                continue
+            score = sum(a * b for a, b in zip(vector, entry.vector))
+            if score >= best_score and _terms_match(terms, entry.terms):
+                best, best_score = entry, score
+        return best
+
+    def put(self, prompt: str, answer: str) -> None:
+        """
+        Store the final answer for a prompt.
+
+        Args:
+            prompt (str): The raw user input
+            answer (str): The agent's final text response
+        """
+        key = normalize_prompt(prompt)
+        expires = self.clock() + self.ttl_seconds
+        self._insert(key, answer, expires)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as file:
+                record = {"ns": self.namespace, "key": key, "answer": answer, "expires": expires}
+                file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _insert(self, key: str, answer: str, expires: float) -> None:
+        vector = _unit(self.embedder(key)) if self.embedder is not None else None
+        self._entries.pop(key, None)
+        self._entries[key] = _Entry(answer, expires, vector, key_terms(key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _load(self, path: str) -> None:
+        now = self.clock()
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("ns") == self.namespace and record["expires"] > now:
+                    self._insert(record["key"], record["answer"], record["expires"])
+
+    def purge_expired(self) -> int:
+        """Drop expired entries; returns how many were removed."""
+        now = self.clock()
+        expired = [key for key, entry in self._entries.items() if entry.expires <= now]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hit_rate, 3),
+        }
+
+
+def response_cache_for(
+    system_prompt: str, declarations: Sequence[dict]
+) -> Optional[ResponseCache]:
+    """
+    Build the response cache for an entry point from environment variables.
+
+    - ``AGENT_RESPONSE_CACHE=1`` enables exact-match caching
+    - ``AGENT_RESPONSE_CACHE_SEMANTIC=1`` adds near-duplicate matching
+    - ``AGENT_RESPONSE_CACHE_TTL`` sets the TTL in seconds (default 600)
+    - ``AGENT_RESPONSE_CACHE_PATH`` shares entries across sessions via a file
+
+    Returns:
+        Optional[ResponseCache]: None when caching is disabled
+    """
+    if not env_flag("AGENT_RESPONSE_CACHE"):
+        return None
+    return ResponseCache(
+        cache_namespace(system_prompt, declarations),
+        ttl_seconds=float(os.getenv("AGENT_RESPONSE_CACHE_TTL", "600")),
+        embedder=hashing_embedder() if env_flag("AGENT_RESPONSE_CACHE_SEMANTIC") else None,
+        path=os.getenv("AGENT_RESPONSE_CACHE_PATH") or None,
+    )
@@ -0,0 +1,341 @@
+"""
+Local fast path for trivial tool queries.
+
+A large share of module3 traffic is plain unit conversions ("convert 30
+celsius to fahrenheit") and single-city lookups ("weather in Tokyo?"). Each of
+those costs at least two ``generate_content`` calls even though the tool can
+answer directly. ``FastPathRouter`` matches such prompts locally, calls the
+tool and fills in a response template; anything it is not confident about
+falls through to the model.
+
+Matching is done in two tiers:
+
+1. strict, fully anchored patterns - routed with confidence 1.0;
+2. looser patterns - only routed when the optional ``IntentClassifier``
+   (a tiny naive Bayes model trained on example utterances) agrees with
+   enough confidence.
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Pattern,
+    Tuple,
+)
+
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import FunctionCall
+
+types = lazy_import("google.genai.types")
+
+Dispatch = Callable[["FunctionCall"], Any]
+
+_TOKEN = re.compile(r"[a-z]+|\d+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+class IntentClassifier:
+    """
+    Multinomial naive Bayes over word tokens.
+
+    Small enough to train at startup from a handful of examples per intent.
+    """
+
+    def __init__(self, examples: Dict[str, Iterable[str]]):
+        """
+        Args:
+            examples: Intent name -> example utterances; include an "other"
+                intent with prompts that must go to the model
+        """
+        self.counts: Dict[str, Counter] = {}
+        self.totals: Dict[str, int] = {}
+        self.priors: Dict[str, float] = {}
+        vocabulary = set()
+        n_examples = sum(len(list(utterances)) for utterances in examples.values())
+
+        for intent, utterances in examples.items():
+            utterances = list(utterances)
+            counter = Counter(token for text in utterances for token in _tokens(text))
+            self.counts[intent] = counter
+            self.totals[intent] = sum(counter.values())
+            self.priors[intent] = math.log(len(utterances) / n_examples)
+            vocabulary.update(counter)
+        self.vocabulary_size = len(vocabulary) + 1
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        """
+        Returns:
+            Tuple[str, float]: The most likely intent and its posterior probability
+        """
+        tokens = _tokens(text)
+        scores = {}
+        for intent, counter in self.counts.items():
+            denominator = self.totals[intent] + self.vocabulary_size
+            scores[intent] = self.priors[intent] + sum(
+                math.log((counter[token] + 1) / denominator) for token in tokens
+            )
+        best = max(scores, key=scores.get)
+        normalizer = sum(math.exp(score - scores[best]) for score in scores.values())
+        return best, 1.0 / normalizer
+
+
+class Route:
+    """
+    One fast-path intent.
+
+    Args:
+        intent (str): Intent name (matches the classifier's labels)
+        strict (Pattern): Anchored pattern that is routed without a classifier
+        loose (Optional[Pattern]): Broader pattern that needs classifier agreement
+        call: Builds the ``FunctionCall`` from the match's named groups, or
+            returns None if the arguments are unusable
+        template: Formats the final answer from (match groups, tool result)
+    """
+
+    def __init__(
+        self,
+        intent: str,
+        strict: Pattern,
+        call: Callable[[Dict[str, str]], Optional[FunctionCall]],
+        template: Callable[[Dict[str, str], Any], str],
+        loose: Optional[Pattern] = None,
+    ):
+        self.intent = intent
+        self.strict = strict
+        self.loose = loose
+        self.call = call
+        self.template = template
+
+
+_UNITS = {"c": "celsius", "celsius": "celsius", "f": "fahrenheit", "fahrenheit": "fahrenheit"}
+
+
+def _unit(group: str) -> str:
+    """Pattern for a temperature unit ("°C", "degrees celsius", "f", ...)."""
+    return rf"(?:°\s*)?(?:degrees?\s+)?(?P<{group}>celsius|fahrenheit|c|f)"
+
+
+def _conversion_call(groups: Dict[str, str]) -> Optional[FunctionCall]:
+    from_unit, to_unit = _UNITS[groups["from"].lower()], _UNITS[groups["to"].lower()]
+    if from_unit == to_unit:
+        return None
+    return types.FunctionCall(
+        name="convert_temperature",
+        args={"temperature": float(groups["value"]), "from_unit": from_unit, "to_unit": to_unit},
+    )
+
+
+def _conversion_answer(groups: Dict[str, str], result: Dict[str, Any]) -> str:
+    from_unit = _UNITS[groups["from"].lower()]
+    return (
+        f"{groups['value']}° {from_unit.title()} is "
+        f"{result['temperature']}° {result['unit'].title()}."
+    )
+
+
+# Words that mean the prompt is more than a single-city lookup
+_NOT_A_CITY = frozenset(
+    "here my location city and or vs versus compared than with in fahrenheit celsius".split()
+)
+
+
+def _weather_call(groups: Dict[str, str]) -> Optional[FunctionCall]:
+    location = groups["location"].strip()
+    if _NOT_A_CITY.intersection(location.lower().split()):
+        return None
+    return types.FunctionCall(name="get_weather", args={"location": location})
+
+
+def _weather_answer(groups: Dict[str, str], result: Dict[str, Any]) -> str:
+    unit = "°C" if result.get("unit") == "celsius" else "°F"
+    # The city the lookup resolved ("Aukland" -> "Auckland, New Zealand"), if any
+    location = result.get("location") or groups["location"].strip().title()
+    return (
+        f"It's currently {result['temperature']}{unit} and {result['condition']} in "
+        f"{location}, with {result['humidity']}% humidity "
+        f"and wind at {result['wind_speed']} km/h."
+    )
+
+
+_CONVERT_STRICT = re.compile(
+    rf"^\s*(?:please\s+)?(?:convert\s+|what\s+is\s+|what's\s+|how\s+much\s+is\s+)?"
+    rf"(?P<value>-?\d+(?:\.\d+)?)\s*{_unit('from')}"
+    rf"\s+(?:in|to|into)\s+{_unit('to')}\s*\??\s*$",
+    re.IGNORECASE,
+)
+_CONVERT_LOOSE = re.compile(
+    rf"(?P<value>-?\d+(?:\.\d+)?)\s*{_unit('from')}"
+    rf"\b.*?\b(?:in|to|into)\s+{_unit('to')}\b",
+    re.IGNORECASE,
+)
+_WEATHER_STRICT = re.compile(
+    r"^\s*(?:what(?:'s| is)\s+the\s+)?(?:current\s+)?weather\s+(?:like\s+)?in\s+"
+    r"(?P<location>[a-z][a-z .'-]{1,40}?)\s*(?:right now|today|now)?\s*\??\s*$",
+    re.IGNORECASE,
+)
+_WEATHER_LOOSE = re.compile(
+    r"\b(?:weather|forecast|conditions)\b.*?\bin\s+(?P<location>[a-z][a-z'-]+(?:\s[a-z][a-z'-]+)?)\s*\??\s*$",
+    re.IGNORECASE,
+)
+
+# Fast-path routes for the module3 weather tools
+WEATHER_ROUTES = [
+    Route("convert", _CONVERT_STRICT, _conversion_call, _conversion_answer, _CONVERT_LOOSE),
+    Route("weather", _WEATHER_STRICT, _weather_call, _weather_answer, _WEATHER_LOOSE),
+]
+
+# Training utterances for the optional classifier
+WEATHER_INTENT_EXAMPLES = {
+    "convert": [
+        "convert 30 celsius to fahrenheit",
+        "what is 86 f in c",
+        "how much is 20 degrees celsius in fahrenheit",
+        "could you turn 70 fahrenheit into celsius",
+        "100 f to c please",
+        "i need 25 c in fahrenheit",
+    ],
+    "weather": [
+        "what's the weather in tokyo",
+        "weather in london",
+        "how is the weather in sydney today",
+        "tell me the current weather conditions in wellington",
+        "what's the forecast in auckland",
+        "can you check the weather in paris",
+    ],
+    "other": [
+        "how hot is it in my location",
+        "compare the weather in sydney and wellington",
+        "what's the weather here in fahrenheit",
+        "should i bring an umbrella in london tomorrow",
+        "why is it colder in wellington than in auckland",
+        "what's the weather in tokyo in fahrenheit",
+        "tell me a joke",
+        "what did i ask before",
+    ],
+}
+
+
+class FastPathRouter:
+    """
+    Answers high-confidence simple intents with a direct tool call.
+
+    Example:
+        answer = router.route(user_input)
+        if answer is None:
+            ...  # fall through to the chaining loop
+    """
+
+    def __init__(
+        self,
+        routes: List[Route],
+        dispatch: Dispatch,
+        classifier: Optional[IntentClassifier] = None,
+        min_confidence: float = 0.9,
+    ):
+        """
+        Args:
+            routes (List[Route]): Intents to try, in order
+            dispatch: Executes a ``FunctionCall`` (e.g. ``process_function_call``)
+            classifier (Optional[IntentClassifier]): Enables the loose patterns
+            min_confidence (float): Classifier probability needed for a loose match
+        """
+        self.routes = routes
+        self.dispatch = dispatch
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+
+        self.routed: Counter = Counter()
+        self.fallthrough = 0
+        self.route_seconds = 0.0
+
+    def _match(self, prompt: str) -> Optional[Tuple[Route, Dict[str, str]]]:
+        for route in self.routes:
+            match = route.strict.match(prompt)
+            if match:
+                return route, match.groupdict()
+
+        if self.classifier is None:
+            return None
+        intent, confidence = self.classifier.classify(prompt)
+        if confidence < self.min_confidence:
+            return None
+        for route in self.routes:
+            if route.intent == intent and route.loose is not None:
+                match = route.loose.search(prompt)
+                if match:
+                    return route, match.groupdict()
+        return None
+
+    def route(self, prompt: str) -> Optional[str]:
+        """
+        Try to answer a prompt locally.
+
+        Args:
+            prompt (str): The raw user input
+
+        Returns:
+            Optional[str]: The templated answer, or None to fall through to the model
+        """
+        start = time.perf_counter()
+        try:
+            matched = self._match(prompt)
+            call = matched[0].call(matched[1]) if matched else None
+            if call is None:
+                self.fallthrough += 1
+                return None
+            route, groups = matched
+            try:
+                result = self.dispatch(call)
+                answer = route.template(groups, result)
+            except Exception:
+                # Let the model deal with anything the tool or template rejects
+                self.fallthrough += 1
+                return None
+            self.routed[route.intent] += 1
+            return answer
+        finally:
+            self.route_seconds += time.perf_counter() - start
+
+    @property
+    def routed_fraction(self) -> float:
+        routed = sum(self.routed.values())
+        total = routed + self.fallthrough
+        return routed / total if total else 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "routed": dict(self.routed),
+            "fallthrough": self.fallthrough,
+            "routed_fraction": round(self.routed_fraction, 3),
+            "route_ms": round(self.route_seconds * 1000, 3),
+        }
+
+
+def router_for(dispatch: Dispatch) -> Optional[FastPathRouter]:
+    """
+    Build the module3 fast-path router from ``AGENT_FAST_PATH``: "rules" for
+    the strict patterns only, "classifier" to also use the local classifier.
+    Returns None when the variable is unset.
+    """
+    mode = os.getenv("AGENT_FAST_PATH", "").lower()
+    if not mode:
+        return None
+    classifier = IntentClassifier(WEATHER_INTENT_EXAMPLES) if mode == "classifier" else None
+    return FastPathRouter(WEATHER_ROUTES, dispatch, classifier=classifier)
@@ -0,0 +1,556 @@
+"""
+HTTP/SSE front-end that serves the workshop agents to many users at once.
+
+A stdlib-only asyncio HTTP/1.1 server. Each conversation is a session with
+its own history; a message to a session runs one turn of the function
+chaining loop (``agentkit.loop.chain_turn``) on a worker thread and streams
+every step back as server-sent events.
+
+Endpoints::
+
+    POST   /v1/<agent>/sessions                     -> 201 {"session_id": ...}
+    POST   /v1/<agent>/sessions/<id>/messages        {"message": "..."} -> SSE stream
+    POST   /v1/<agent>/sessions/<id>/cancel          -> 202 (stops the running turn)
+    DELETE /v1/<agent>/sessions/<id>                 -> 204 (409 while a turn runs)
+    GET    /healthz
+    GET    /metrics
+
+SSE events are ``function_call``, ``function_result``, ``text`` (or
+``stopped`` when the turn hit its ``TurnBudget`` or was cancelled), ``error``
+and finally ``done``.
+
+Load is bounded in three places: at most ``max_concurrent_turns`` turns run
+at once (others wait up to ``queue_timeout`` and then get 503), each stream
+has a bounded event queue so a slow reader pauses its worker instead of
+buffering, and at most ``max_sessions`` sessions exist (idle ones are evicted
+oldest-first, and every ``idle_timeout`` seconds anyway).
+
+With a ``SessionManager`` (``--session-dir``) histories are written through to
+disk and only kept in memory within ``--memory-budget-mb``; evicted sessions,
+including ones from before a restart, are rehydrated on their next message.
+
+With ``AGENT_COALESCE_TOOLS=get_weather`` (see ``agentkit.singleflight``),
+identical calls of those tools that run at the same time in different
+sessions share one execution.
+
+Turns run with ``agentkit.geoip.client_ip`` set to the client's address, so
+with ``GEOIP_DB`` set ``get_current_location`` answers where that client is.
+
+Usage:
+    python -m agentkit.server [--host 127.0.0.1] [--port 8080] [--agents chat,weather]
+"""
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from agentkit.agents import AgentSpec
+from agentkit.geoip import client_ip
+from agentkit.loop import chain_turn
+from agentkit.session_manager import DEFAULT_MEMORY_BUDGET, SessionManager
+from agentkit.singleflight import CoalescingDispatch, SingleFlight, coalescing_for
+from agentkit.turn_budget import TurnBudget, TurnGuard, turn_budget_for
+
+MAX_BODY_BYTES = 1 << 20
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    202: "Accepted",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    409: "Conflict",
+    413: "Payload Too Large",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class Session:
+    """One conversation hosted by the server."""
+
+    __slots__ = ("id", "agent", "contents", "last_used", "busy", "guard")
+
+    def __init__(self, session_id: str, agent: str, in_memory: bool = True):
+        self.id = session_id
+        self.agent = agent
+        # None when the history is held by the server's ``SessionManager``
+        self.contents: Optional[list] = [] if in_memory else None
+        self.last_used = time.monotonic()
+        self.busy = False
+        # Budget of the running turn, if any; cancelling it stops the turn
+        self.guard: Optional[TurnGuard] = None
+
+
+class AgentServer:
+    """
+    Serves ``AgentSpec`` agents over HTTP with per-session state.
+
+    Example:
+        server = AgentServer(models, load_agents())
+        asyncio.run(server.serve("127.0.0.1", 8080))
+    """
+
+    def __init__(
+        self,
+        models: Any,
+        agents: Dict[str, AgentSpec],
+        max_sessions: int = 1000,
+        max_concurrent_turns: int = 32,
+        queue_timeout: float = 10.0,
+        idle_timeout: float = 900.0,
+        event_queue_size: int = 16,
+        session_manager: Optional[SessionManager] = None,
+        turn_budget: Optional[TurnBudget] = None,
+    ):
+        """
+        Args:
+            models: Object with ``generate_content`` shared by all sessions
+            agents: Agent name -> ``AgentSpec`` (see ``agentkit.agents``)
+            max_sessions (int): Upper bound on live sessions
+            max_concurrent_turns (int): Turns running at the same time
+            queue_timeout (float): Seconds a turn may wait for a free slot
+            idle_timeout (float): Sessions unused this long are evicted
+            event_queue_size (int): Events buffered per stream before the worker waits
+            session_manager: Keeps histories on disk under a memory budget;
+                without one, histories live in memory and die with their session
+            turn_budget: Limits for every turn (default: ``TurnBudget()``)
+        """
+        self.models = models
+        self.agents = agents
+        self.max_sessions = max_sessions
+        self.max_concurrent_turns = max_concurrent_turns
+        self.queue_timeout = queue_timeout
+        self.idle_timeout = idle_timeout
+        self.event_queue_size = event_queue_size
+        self.session_manager = session_manager
+        self.turn_budget = turn_budget or TurnBudget()
+        # Identical tool calls running at once in different sessions share
+        # one execution (AGENT_COALESCE_TOOLS)
+        self.flight = SingleFlight()
+        self.dispatch = {
+            name: coalescing_for(spec.dispatch, self.flight, namespace=name)
+            for name, spec in agents.items()
+        }
+
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self.metrics: Dict[str, int] = {
+            "requests": 0,
+            "turns": 0,
+            "turns_rejected": 0,
+            "turn_errors": 0,
+            "sessions_created": 0,
+            "sessions_evicted": 0,
+            "sessions_restored": 0,
+            "client_disconnects": 0,
+        }
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent_turns)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+
+    # Session management -------------------------------------------------
+
+    @staticmethod
+    def _history_key(agent: str, session_id: str) -> str:
+        return f"{agent}-{session_id}"
+
+    def _evict(self, session_id: str) -> None:
+        session = self.sessions.pop(session_id, None)
+        if session is not None and self.session_manager is not None:
+            # Still on disk; rehydrated if the client comes back
+            self.session_manager.evict(self._history_key(session.agent, session_id))
+        self.metrics["sessions_evicted"] += 1
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Evict sessions idle for longer than ``idle_timeout``."""
+        now = time.monotonic() if now is None else now
+        idle = [
+            session.id
+            for session in self.sessions.values()
+            if not session.busy and now - session.last_used > self.idle_timeout
+        ]
+        for session_id in idle:
+            self._evict(session_id)
+        return len(idle)
+
+    def _make_room(self) -> None:
+        if len(self.sessions) >= self.max_sessions:
+            # Make room by evicting the least recently used idle session
+            for session in self.sessions.values():
+                if not session.busy:
+                    self._evict(session.id)
+                    break
+            else:
+                raise HTTPError(503, "Too many active sessions")
+
+    def create_session(self, agent: str) -> Session:
+        if agent not in self.agents:
+            raise HTTPError(404, f"Unknown agent: {agent}")
+        self._make_room()
+        session = Session(uuid.uuid4().hex, agent, self.session_manager is None)
+        self.sessions[session.id] = session
+        self.metrics["sessions_created"] += 1
+        return session
+
+    def get_session(self, agent: str, session_id: str) -> Session:
+        session = self.sessions.get(session_id)
+        if (
+            session is None
+            and agent in self.agents
+            and self.session_manager is not None
+            and self.session_manager.exists(self._history_key(agent, session_id))
+        ):
+            # Evicted (or from before a restart); its history is reloaded lazily
+            self._make_room()
+            session = Session(session_id, agent, in_memory=False)
+            self.sessions[session_id] = session
+            self.metrics["sessions_restored"] += 1
+        if session is None or session.agent != agent:
+            raise HTTPError(404, f"Unknown session: {session_id}")
+        self.sessions.move_to_end(session_id)
+        session.last_used = time.monotonic()
+        return session
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            **self.metrics,
+            "sessions": len(self.sessions),
+            "busy_sessions": sum(1 for s in self.sessions.values() if s.busy),
+        }
+        if self.session_manager is not None:
+            stats["memory"] = self.session_manager.stats()
+        stats["turn_budget"] = dict(self.turn_budget.metrics)
+        if any(isinstance(d, CoalescingDispatch) for d in self.dispatch.values()):
+            stats["coalescing"] = self.flight.stats()
+        key_stats = getattr(self.models, "key_stats", None)
+        if key_stats is not None:
+            # API_KEYS: per-key requests, tokens, 429s and quota use
+            stats["keys"] = key_stats()
+        return stats
+
+    # Turn execution -------------------------------------------------------
+
+    def _run_turn(self, session: Session, user_input: str, emit, cancelled) -> None:
+        """Worker-thread body: run the turn and push events to the stream."""
+        if self.session_manager is None:
+            return self._run_turn_with(session, session.contents, user_input, emit, cancelled)
+        key = self._history_key(session.agent, session.id)
+        with self.session_manager.checkout(key) as contents:
+            self._run_turn_with(session, contents, user_input, emit, cancelled)
+
+    def _run_turn_with(self, session: Session, contents: list, user_input: str, emit, cancelled) -> None:
+        spec = self.agents[session.agent]
+        guard = session.guard
+        events = chain_turn(
+            self.models,
+            spec.model_name,
+            contents,
+            spec.config,
+            user_input,
+            self.dispatch[session.agent],
+            guard,
+        )
+        try:
+            for event in events:
+                emit(event)
+                if cancelled():
+                    # Stop at the next step so the history is closed properly
+                    guard.cancel()
+        except Exception as e:
+            self.metrics["turn_errors"] += 1
+            emit(("error", str(e)))
+        finally:
+            events.close()
+
+    async def _stream_turn(
+        self, writer: asyncio.StreamWriter, session: Session, user_input: str
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.event_queue_size)
+        done = object()
+        disconnected = False
+
+        def emit(event):
+            # Blocks the worker while the queue is full: per-stream backpressure
+            asyncio.run_coroutine_threadsafe(queue.put(event), loop).result()
+
+        def work():
+            try:
+                self._run_turn(session, user_input, emit, lambda: disconnected)
+            finally:
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+
+        try:
+            await _write_head(
+                writer, 200, "text/event-stream", extra={"Cache-Control": "no-cache"}
+            )
+        except ConnectionError:
+            # Gone before the turn started; the session is released with no worker on it
+            self.metrics["client_disconnects"] += 1
+            return
+        # The worker sees this connection's context (client_ip) too
+        future = loop.run_in_executor(self._executor, contextvars.copy_context().run, work)
+        while True:
+            event = await queue.get()
+            if event is done:
+                break
+            if disconnected:
+                continue
+            try:
+                writer.write(_sse(*event))
+                await writer.drain()
+            except ConnectionError:
+                disconnected = True
+                self.metrics["client_disconnects"] += 1
+        await future
+        if not disconnected:
+            writer.write(_sse("done", {}))
+            await writer.drain()
+
+    async def _message(
+        self, writer: asyncio.StreamWriter, agent: str, session_id: str, body: bytes
+    ) -> None:
+        try:
+            user_input = str(json.loads(body or b"{}")["message"]).strip()
+        except (ValueError, KeyError, TypeError):
+            raise HTTPError(400, 'Body must be JSON like {"message": "..."}')
+        if not user_input:
+            raise HTTPError(400, "Empty message")
+
+        session = self.get_session(agent, session_id)
+        if session.busy:
+            raise HTTPError(409, "A turn is already running for this session")
+
+        # Claimed while waiting for a slot too: a second message must not start a
+        # turn on the same history, and eviction or DELETE must not drop the session
+        session.busy = True
+        acquired = False
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            acquired = True
+        except asyncio.TimeoutError:
+            self.metrics["turns_rejected"] += 1
+            raise HTTPError(503, "Server busy, retry later")
+        finally:
+            if not acquired:
+                session.busy = False
+
+        session.guard = self.turn_budget.start()
+        self.metrics["turns"] += 1
+        try:
+            await self._stream_turn(writer, session, user_input)
+        finally:
+            session.busy = False
+            session.guard = None
+            session.last_used = time.monotonic()
+            self._slots.release()
+
+    # HTTP plumbing ----------------------------------------------------------
+
+    async def _route(self, method: str, path: str, body: bytes, writer) -> None:
+        parts = [part for part in path.split("?")[0].split("/") if part]
+
+        if parts == ["healthz"] and method == "GET":
+            return await _write_json(writer, 200, {"status": "ok"})
+        if parts == ["metrics"] and method == "GET":
+            return await _write_json(writer, 200, self.stats())
+
+        if len(parts) >= 3 and parts[0] == "v1" and parts[2] == "sessions":
+            agent = parts[1]
+            if len(parts) == 3 and method == "POST":
+                session = self.create_session(agent)
+                return await _write_json(writer, 201, {"session_id": session.id})
+            if len(parts) == 4 and method == "DELETE":
+                if self.get_session(agent, parts[3]).busy:
+                    raise HTTPError(409, "A turn is running for this session; cancel it first")
+                self.sessions.pop(parts[3], None)
+                if self.session_manager is not None:
+                    self.session_manager.delete(self._history_key(agent, parts[3]))
+                return await _write_json(writer, 204, None)
+            if len(parts) == 5 and parts[4] == "messages" and method == "POST":
+                return await self._message(writer, agent, parts[3], body)
+            if len(parts) == 5 and parts[4] == "cancel" and method == "POST":
+                session = self.get_session(agent, parts[3])
+                if session.guard is None:
+                    raise HTTPError(409, "No turn is running for this session")
+                session.guard.cancel()
+                return await _write_json(writer, 202, {"status": "cancelling"})
+            raise HTTPError(405, f"{method} not allowed on {path}")
+
+        raise HTTPError(404, f"No route for {path}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.metrics["requests"] += 1
+        # Each connection is its own task, so this is only this client's
+        peer = writer.get_extra_info("peername")
+        client_ip.set(peer[0] if isinstance(peer, tuple) else None)
+        try:
+            method, path, body = await _read_request(reader)
+            await self._route(method, path, body, writer)
+        except HTTPError as e:
+            await _write_json(writer, e.status, {"error": e.message})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _reap(self) -> None:
+        while True:
+            await asyncio.sleep(max(1.0, self.idle_timeout / 4))
+            self.evict_idle()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8080) -> int:
+        """
+        Start listening; returns the bound port (useful with ``port=0``).
+        """
+        self._slots = asyncio.Semaphore(self.max_concurrent_turns)
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        self._reaper = asyncio.create_task(self._reap())
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._reaper is not None:
+            self._reaper.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080) -> None:
+        """Start and serve until cancelled."""
+        port = await self.start(host, port)
+        print(f"\n🌐 Serving agents {sorted(self.agents)} on http://{host}:{port}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.LimitOverrunError:
+        raise HTTPError(413, "Headers too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, path, _ = lines[0].split(" ", 2)
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+
+    value = headers.get("content-length") or "0"
+    # Digits only: int() also takes "-1", "+1" and "1_000"
+    if not (value.isascii() and value.isdigit()):
+        raise HTTPError(400, "Invalid Content-Length")
+    length = int(value)
+    if length > MAX_BODY_BYTES:
+        raise HTTPError(413, "Body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path, body
+
+
+async def _write_head(
+    writer: asyncio.StreamWriter,
+    status: int,
+    content_type: str,
+    length: Optional[int] = None,
+    extra: Optional[Dict[str, str]] = None,
+) -> None:
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", "Connection: close"]
+    if status != 204:
+        lines.append(f"Content-Type: {content_type}")
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    if status == 503:
+        lines.append("Retry-After: 1")
+    for key, value in (extra or {}).items():
+        lines.append(f"{key}: {value}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+    await writer.drain()
+
+
+async def _write_json(writer: asyncio.StreamWriter, status: int, payload: Any) -> None:
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    await _write_head(writer, status, "application/json", length=len(body))
+    writer.write(body)
+    await writer.drain()
+
+
+def _sse(event: str, data: Any) -> bytes:
+    payload = json.dumps(data, default=str, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n".encode("utf-8")
+
+
+def main():
+    """Serve the workshop agents against the real Gemini API."""
+    from dotenv import load_dotenv
+
+    from agentkit.agents import load_agents
+    from agentkit.transport import lazy_models
+
+    parser = argparse.ArgumentParser(description="Serve the workshop agents over HTTP/SSE")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--agents", default="chat,weather", help="comma separated: chat,weather,code")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument("--max-concurrent-turns", type=int, default=32)
+    parser.add_argument("--idle-timeout", type=float, default=900.0)
+    parser.add_argument("--session-dir", help="persist histories here and bound their memory use")
+    parser.add_argument("--memory-budget-mb", type=float, default=DEFAULT_MEMORY_BUDGET >> 20)
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("API_KEY")
+    if not api_key:
+        print("Error: API key not found. Please add it to your .env file.")
+        raise SystemExit(1)
+
+    session_manager = None
+    if args.session_dir:
+        session_manager = SessionManager(
+            args.session_dir, memory_budget_bytes=int(args.memory_budget_mb * (1 << 20))
+        )
+
+    server = AgentServer(
+        # Accepts the plain-dict config of the code agent, too
+        lazy_models(api_key),
+        load_agents(args.agents.split(","), api_key),
+        max_sessions=args.max_sessions,
+        max_concurrent_turns=args.max_concurrent_turns,
+        idle_timeout=args.idle_timeout,
+        session_manager=session_manager,
+        turn_budget=turn_budget_for(),
+    )
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("\n👋 Goodbye!")
+
+
+if __name__ == "__main__":
+    main()
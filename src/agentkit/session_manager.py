@@ -0,0 +1,222 @@
+"""
+Memory-bounded hosting of many conversations at once.
+
+A hosted agent keeps one ``contents`` list per conversation, and each of them
+grows with every turn. ``SessionManager`` keeps those lists in memory only
+while it can afford to: every session is written through to a
+``SessionStore`` as it grows, its footprint is tracked from the bytes written,
+and when the total goes over ``memory_budget_bytes`` the least recently used
+sessions that are not in the middle of a turn are dropped from memory.
+
+Dropping a session loses nothing, it is already on disk. The next time the
+session is checked out it is rehydrated from its snapshot and log.
+
+Example:
+    manager = SessionManager(".sessions", memory_budget_bytes=64 << 20)
+    with manager.checkout("user-42") as contents:
+        ...  # run one turn, appending to contents
+"""
+
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from agentkit.session_store import DEFAULT_SESSION_DIR, PersistentHistory, SessionStore
+
+# Python objects take several times the size of their compact JSON encoding
+DEFAULT_OVERHEAD = 4.0
+DEFAULT_MEMORY_BUDGET = 256 << 20
+
+
+class _TrackedHistory(PersistentHistory):
+    """``PersistentHistory`` that counts the bytes written for it."""
+
+    def __init__(self, store: SessionStore):
+        super().__init__(store)
+        self.nbytes = sum(
+            os.path.getsize(path)
+            for path in (store.snapshot_path, store.log_path)
+            if os.path.exists(path)
+        )
+
+    def append(self, content: Any) -> None:
+        self.nbytes += self.store.append(content)
+        list.append(self, content)
+
+    def _rewrite(self) -> None:
+        self.nbytes = self.store.rewrite(self)
+
+
+class _Entry:
+    __slots__ = ("history", "footprint", "pins")
+
+    def __init__(self, history: _TrackedHistory, footprint: int):
+        self.history = history
+        self.footprint = footprint
+        self.pins = 0
+
+
+class SessionManager:
+    """
+    LRU cache of conversation histories with a global memory budget.
+
+    All methods are thread-safe; turns run on worker threads while the event
+    loop creates, evicts and deletes sessions.
+    """
+
+    def __init__(
+        self,
+        directory: str = DEFAULT_SESSION_DIR,
+        memory_budget_bytes: int = DEFAULT_MEMORY_BUDGET,
+        overhead: float = DEFAULT_OVERHEAD,
+        snapshot_every: int = 1000,
+    ):
+        """
+        Args:
+            directory (str): Root directory for the per-session stores
+            memory_budget_bytes (int): Estimated bytes all resident sessions may use
+            overhead (float): In-memory size per byte of stored JSON
+            snapshot_every (int): Passed on to each ``SessionStore``
+        """
+        self.directory = directory
+        self.memory_budget_bytes = memory_budget_bytes
+        self.overhead = overhead
+        self.snapshot_every = snapshot_every
+
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._resident_bytes = 0
+        self.metrics: Dict[str, int] = {
+            "checkouts": 0,
+            "rehydrations": 0,
+            "evictions": 0,
+            "evicted_bytes": 0,
+            "over_budget": 0,
+        }
+
+    def _store(self, session_id: str) -> SessionStore:
+        return SessionStore(
+            session_id, directory=self.directory, snapshot_every=self.snapshot_every
+        )
+
+    def exists(self, session_id: str) -> bool:
+        """Return True if the session is in memory or on disk."""
+        with self._lock:
+            if session_id in self._entries:
+                return True
+        return self._store(session_id).exists()
+
+    def is_resident(self, session_id: str) -> bool:
+        with self._lock:
+            return session_id in self._entries
+
+    def _footprint(self, history: _TrackedHistory) -> int:
+        return int(history.nbytes * self.overhead)
+
+    def _pin(self, session_id: str) -> _Entry:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                self._entries.move_to_end(session_id)
+                entry.pins += 1
+                return entry
+
+        # Rehydrate outside the lock so other sessions are not held up by disk
+        history = _TrackedHistory(self._store(session_id))
+        history.store.close()
+
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                entry = _Entry(history, self._footprint(history))
+                self._entries[session_id] = entry
+                self._resident_bytes += entry.footprint
+                if history:
+                    self.metrics["rehydrations"] += 1
+            else:
+                # Another thread won the race; use its copy
+                self._entries.move_to_end(session_id)
+            entry.pins += 1
+            return entry
+
+    def _unpin(self, session_id: str, entry: _Entry) -> None:
+        with self._lock:
+            entry.pins -= 1
+            footprint = self._footprint(entry.history)
+            self._resident_bytes += footprint - entry.footprint
+            entry.footprint = footprint
+            if entry.pins == 0:
+                # Keep file handles bounded by the number of running turns
+                entry.history.store.close()
+            self._enforce_budget()
+
+    @contextmanager
+    def checkout(self, session_id: str) -> Iterator[List[Any]]:
+        """
+        Pin a session in memory for the duration of a turn.
+
+        Yields:
+            List[Any]: The session's ``contents``; appends are persisted
+        """
+        entry = self._pin(session_id)
+        self.metrics["checkouts"] += 1
+        try:
+            yield entry.history
+        finally:
+            self._unpin(session_id, entry)
+
+    def _drop(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id)
+        entry.history.store.close()
+        self._resident_bytes -= entry.footprint
+        self.metrics["evictions"] += 1
+        self.metrics["evicted_bytes"] += entry.footprint
+
+    def _enforce_budget(self) -> None:
+        """Evict LRU-first until under budget; caller holds the lock."""
+        if self._resident_bytes <= self.memory_budget_bytes:
+            return
+        for session_id in list(self._entries):
+            if self._resident_bytes <= self.memory_budget_bytes:
+                return
+            if self._entries[session_id].pins == 0:
+                self._drop(session_id)
+        if self._resident_bytes > self.memory_budget_bytes:
+            # Everything left is in the middle of a turn
+            self.metrics["over_budget"] += 1
+
+    def evict(self, session_id: str) -> bool:
+        """
+        Drop a session from memory; it stays on disk.
+
+        Returns:
+            bool: False if it was not resident or is in the middle of a turn
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry.pins:
+                return False
+            self._drop(session_id)
+            return True
+
+    def delete(self, session_id: str) -> None:
+        """Forget a session entirely, including its files."""
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                entry.history.store.close()
+                self._resident_bytes -= entry.footprint
+        shutil.rmtree(self._store(session_id).path, ignore_errors=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.metrics,
+                "resident_sessions": len(self._entries),
+                "resident_bytes": self._resident_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+            }
+
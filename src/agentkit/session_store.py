@@ -0,0 +1,352 @@
+"""
+Persistent conversation storage for the workshop agents.
+
+Every agent keeps its conversation in a plain ``contents`` list, which is lost
+as soon as the process exits. ``SessionStore`` writes each ``Content`` to an
+append-only JSONL log as soon as it is produced and periodically folds the log
+into a snapshot, so resuming a session only reads the last snapshot plus the
+short log tail written after it.
+
+On-disk layout for a session::
+
+    <directory>/<session_id>/snapshot.json   {"count": N, "generation": G, "contents": [...]}
+    <directory>/<session_id>/log.jsonl       [seq, content] per line, or
+                                             [seq, content, G] from generation 1
+
+Log records carry their sequence number, so a crash between writing a snapshot
+and truncating the log never duplicates messages on resume. Changes other than
+appends (trimming the history, replacing a message) are saved by ``rewrite``,
+which writes a snapshot of the new list under the next generation; log records
+of older generations are ignored, so a crash before the old log is emptied
+cannot bring trimmed messages back.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import Content
+
+types = lazy_import("google.genai.types")
+
+# Default location for session files, relative to the working directory
+DEFAULT_SESSION_DIR = ".sessions"
+
+SNAPSHOT_FILE = "snapshot.json"
+LOG_FILE = "log.jsonl"
+
+
+def content_to_record(content: Any) -> Dict[str, Any]:
+    """
+    Convert a ``Content`` (or an already-plain dict) into a JSON-safe dict.
+
+    Args:
+        content: A google.genai ``Content`` object or a dict in the same shape
+
+    Returns:
+        Dict[str, Any]: The JSON-serializable form of the message
+    """
+    if isinstance(content, dict):
+        return content
+    return content.model_dump(mode="json", exclude_none=True)
+
+
+def _encode(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+class SessionStore:
+    """
+    Append-only log plus snapshot storage for a single conversation.
+
+    Example:
+        store = SessionStore("my-session")
+        contents = store.load()
+        ...
+        store.append(Content(role="user", parts=[Part(text="hi")]))
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        directory: str = DEFAULT_SESSION_DIR,
+        snapshot_every: int = 1000,
+        durable: bool = False,
+    ):
+        """
+        Initialize the session store.
+
+        Args:
+            session_id (str): Name of the session; used as a directory name
+            directory (str): Root directory that holds all sessions
+            snapshot_every (int): Number of appended messages between snapshots
+            durable (bool): fsync after every append instead of only flushing
+        """
+        if not session_id or os.sep in session_id or session_id in (".", ".."):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+
+        self.session_id = session_id
+        self.path = os.path.join(directory, session_id)
+        self.snapshot_every = snapshot_every
+        self.durable = durable
+
+        # Number of stored messages; the messages themselves are not kept in
+        # memory, the caller's ``contents`` list already holds them
+        self._count: Optional[int] = None
+        self._generation = 0
+        self._since_snapshot = 0
+        self._log = None
+
+    @property
+    def snapshot_path(self) -> str:
+        return os.path.join(self.path, SNAPSHOT_FILE)
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(self.path, LOG_FILE)
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self.load_records()
+        return self._count
+
+    def exists(self) -> bool:
+        """Return True if anything has been stored for this session."""
+        return os.path.exists(self.snapshot_path) or os.path.exists(self.log_path)
+
+    def load_records(self) -> List[Dict[str, Any]]:
+        """
+        Load the stored messages as plain dicts (snapshot + log tail).
+
+        Returns:
+            List[Dict[str, Any]]: The messages in conversation order
+        """
+        records: List[Dict[str, Any]] = []
+        generation = 0
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as file:
+                snapshot = json.load(file)
+            records = snapshot["contents"]
+            generation = snapshot.get("generation", 0)
+
+        tail = 0
+        valid_bytes = 0
+        if os.path.exists(self.log_path):
+            with open(self.log_path, "rb") as file:
+                for line in file:
+                    # A crash mid-write leaves a partial last line; drop it
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        seq, record, *rest = json.loads(line)
+                    except ValueError:
+                        break
+                    valid_bytes += len(line)
+                    if (rest[0] if rest else 0) != generation:
+                        # Written before the snapshot was rewritten
+                        continue
+                    if seq < len(records):
+                        # Already folded into the snapshot
+                        continue
+                    if seq != len(records):
+                        raise ValueError(
+                            f"Session log for {self.session_id!r} has a gap at {seq}"
+                        )
+                    records.append(record)
+                    tail += 1
+
+            # Cut off any torn record so new appends start on a clean line
+            if valid_bytes != os.path.getsize(self.log_path):
+                with open(self.log_path, "r+b") as file:
+                    file.truncate(valid_bytes)
+
+        self._count = len(records)
+        self._generation = generation
+        self._since_snapshot = tail
+        return records
+
+    def load(self) -> List[Content]:
+        """
+        Load the stored conversation as ``Content`` objects.
+
+        Returns:
+            List[Content]: The conversation history, oldest first
+        """
+        return [types.Content.model_validate(record) for record in self.load_records()]
+
+    def append(self, content: Any) -> int:
+        """
+        Append a single message to the session log.
+
+        Args:
+            content: The ``Content`` (or equivalent dict) to persist
+
+        Returns:
+            int: Size of the encoded record in bytes
+        """
+        if self._count is None:
+            self.load_records()
+        entry = [self._count, content_to_record(content)]
+        if self._generation:
+            entry.append(self._generation)
+        line = _encode(entry) + "\n"
+
+        if self._log is None:
+            os.makedirs(self.path, exist_ok=True)
+            self._log = open(self.log_path, "a", encoding="utf-8")
+
+        self._log.write(line)
+        self._log.flush()
+        if self.durable:
+            os.fsync(self._log.fileno())
+
+        self._count += 1
+        self._since_snapshot += 1
+        if self.snapshot_every and self._since_snapshot >= self.snapshot_every:
+            self.snapshot()
+        return len(line)
+
+    def extend(self, contents: Iterable[Any]) -> None:
+        """Append several messages in order."""
+        for content in contents:
+            self.append(content)
+
+    def snapshot(self) -> None:
+        """Fold the log into a new snapshot and start an empty log."""
+        # Re-read from disk: O(snapshot + tail), and nothing is held in memory
+        self._write_snapshot(self.load_records(), self._generation)
+
+    def rewrite(self, contents: Iterable[Any]) -> int:
+        """
+        Replace the stored conversation with ``contents``.
+
+        For changes ``append`` cannot express, e.g. ``del contents[:-10]``.
+
+        Args:
+            contents: The whole conversation as it should be stored now
+
+        Returns:
+            int: Size of the new snapshot in bytes
+        """
+        if self._count is None:
+            self.load_records()
+        records = [content_to_record(content) for content in contents]
+        return self._write_snapshot(records, self._generation + 1)
+
+    def _write_snapshot(self, records: List[Dict[str, Any]], generation: int) -> int:
+        os.makedirs(self.path, exist_ok=True)
+        data = _encode({"count": len(records), "generation": generation, "contents": records})
+
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+
+        # Records in the old log are now covered by the snapshot
+        if self._log is not None:
+            self._log.close()
+        self._log = open(self.log_path, "w", encoding="utf-8")
+        self._count = len(records)
+        self._generation = generation
+        self._since_snapshot = 0
+        return len(data.encode("utf-8"))
+
+    def close(self) -> None:
+        """Close the log file handle."""
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def __enter__(self) -> "SessionStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class PersistentHistory(list):
+    """
+    A ``contents`` list that writes every appended message to a ``SessionStore``.
+
+    Appended messages go to the log; any other change (``del contents[:-10]``,
+    replacing a message) rewrites the snapshot with the whole list, which is
+    cheap for the short, trimmed histories it is used on.
+    """
+
+    def __init__(self, store: SessionStore):
+        super().__init__(store.load())
+        self.store = store
+
+    def append(self, content: Any) -> None:
+        self.store.append(content)
+        super().append(content)
+
+    def extend(self, contents: Iterable[Any]) -> None:
+        for content in contents:
+            self.append(content)
+
+    def __iadd__(self, contents: Iterable[Any]) -> "PersistentHistory":
+        self.extend(contents)
+        return self
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self._rewrite()
+
+    def __delitem__(self, index: Any) -> None:
+        super().__delitem__(index)
+        self._rewrite()
+
+    def insert(self, index: int, content: Any) -> None:
+        super().insert(index, content)
+        self._rewrite()
+
+    def pop(self, index: int = -1) -> Any:
+        content = super().pop(index)
+        self._rewrite()
+        return content
+
+    def remove(self, content: Any) -> None:
+        super().remove(content)
+        self._rewrite()
+
+    def clear(self) -> None:
+        super().clear()
+        self._rewrite()
+
+    def _rewrite(self) -> None:
+        self.store.rewrite(self)
+
+
+def open_history(
+    session_id: Optional[str] = None, directory: Optional[str] = None
+) -> List[Content]:
+    """
+    Return the conversation history list for an agent entry point.
+
+    If no session id is given (argument or ``AGENT_SESSION_ID`` environment
+    variable) this is a plain in-memory list, matching the original behavior.
+
+    Args:
+        session_id (Optional[str]): Session to resume or create
+        directory (Optional[str]): Root session directory (``AGENT_SESSION_DIR``)
+
+    Returns:
+        List[Content]: A list to use as ``contents``
+    """
+    session_id = session_id or os.getenv("AGENT_SESSION_ID")
+    if not session_id:
+        return []
+
+    directory = directory or os.getenv("AGENT_SESSION_DIR", DEFAULT_SESSION_DIR)
+    history = PersistentHistory(SessionStore(session_id, directory=directory))
+    if history:
+        print(f"\n💾 Resumed session '{session_id}' with {len(history)} messages.")
+    return history
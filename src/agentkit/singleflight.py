@@ -0,0 +1,218 @@
+"""
+Share one execution among concurrent identical tool calls (singleflight).
+
+On the server, many sessions ask for ``get_weather("Auckland")`` at the same
+moment, and each of them would run the tool against the weather backend.
+``SingleFlight`` keys a call by tool name plus canonical JSON args (see
+``agentkit.speculation.call_key``); a call that arrives while an identical
+one is running waits for it and gets the same result (or exception) instead
+of running again. Nothing is cached: once the running call finishes, the next
+identical call executes afresh.
+
+Threads use ``do``; coroutines use ``do_async``, which runs the shared
+execution as a task so one caller being cancelled does not cancel it for the
+others. The two kinds coalesce separately. Followers get a deep copy of the
+result, so a session that edits its tool result cannot change another's.
+
+Only tools listed by name in ``AGENT_COALESCE_TOOLS`` are coalesced: read-only
+lookups qualify, tools with side effects (``write_file``) or whose result
+depends on the client (``get_current_location`` with ``GEOIP_DB``) must not.
+Nothing records which tools those are, so there is no "all tools" setting.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import os
+import threading
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from agentkit.speculation import call_key
+
+if TYPE_CHECKING:
+    from google.genai.types import FunctionCall
+
+Dispatch = Callable[["FunctionCall"], Any]
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Runs at most one execution per key at a time and shares its outcome.
+
+    Example:
+        flight = SingleFlight()
+        weather = flight.do(call_key("get_weather", args), lambda: get_weather(**args))
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        # (id(loop), key) -> the task all callers on that loop await
+        self._tasks: Dict[Tuple[int, str], asyncio.Task] = {}
+        self.metrics: Dict[str, int] = {"executions": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Return ``fn()``, or the outcome of an identical call already running.
+
+        Args:
+            key (str): Identity of the call
+            fn: Runs the call; only executed when no call with ``key`` is running
+
+        Returns:
+            The result, deep-copied for callers that joined a running call
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self.metrics["executions"] += 1
+            else:
+                self.metrics["coalesced"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Like ``do`` for coroutines: await ``fn()`` or the identical call in flight.
+
+        Args:
+            key (str): Identity of the call
+            fn: Returns the awaitable that runs the call
+        """
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = loop.create_task(fn())
+                self._tasks[task_key] = task
+                task.add_done_callback(lambda done: self._forget(task_key, done))
+                self.metrics["executions"] += 1
+            else:
+                self.metrics["coalesced"] += 1
+        # Shielded: a cancelled caller stops waiting, the execution goes on
+        result = await asyncio.shield(task)
+        return result if leader else copy.deepcopy(result)
+
+    def _forget(self, task_key: Tuple[int, str], task: asyncio.Task) -> None:
+        with self._lock:
+            self._tasks.pop(task_key, None)
+        if not task.cancelled():
+            # Retrieved here in case every caller was cancelled before it finished
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        executions = self.metrics["executions"]
+        coalesced = self.metrics["coalesced"]
+        total = executions + coalesced
+        return {
+            **self.metrics,
+            "coalesced_fraction": round(coalesced / total, 3) if total else 0.0,
+        }
+
+
+class CoalescingDispatch:
+    """
+    A tool dispatch whose identical concurrent calls share one execution.
+
+    Calls to tools outside ``tools`` are passed straight through.
+    """
+
+    def __init__(
+        self,
+        dispatch: Dispatch,
+        flight: SingleFlight,
+        tools: Optional[Iterable[str]] = None,
+        namespace: str = "",
+    ):
+        """
+        Args:
+            dispatch: Executes a ``FunctionCall`` (a function or a coroutine function)
+            flight (SingleFlight): Shared by every dispatch whose calls may coalesce
+            tools (Optional[Iterable[str]]): Tools to coalesce; None for all
+            namespace (str): Keeps equal tool names of different agents apart
+        """
+        self.dispatch = dispatch
+        self.flight = flight
+        self.tools = None if tools is None else frozenset(tools)
+        self.namespace = namespace
+
+    def _key(self, function_call: FunctionCall) -> Optional[str]:
+        if self.tools is not None and function_call.name not in self.tools:
+            return None
+        return f"{self.namespace}:{call_key(function_call.name, function_call.args)}"
+
+    def __call__(self, function_call: FunctionCall) -> Any:
+        key = self._key(function_call)
+        if key is None:
+            return self.dispatch(function_call)
+        return self.flight.do(key, lambda: self.dispatch(function_call))
+
+    async def acall(self, function_call: FunctionCall) -> Any:
+        """Dispatch from a coroutine; a synchronous dispatch runs in the default executor."""
+
+        async def run() -> Any:
+            if asyncio.iscoroutinefunction(self.dispatch):
+                return await self.dispatch(function_call)
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self.dispatch, function_call
+            )
+
+        key = self._key(function_call)
+        if key is None:
+            return await run()
+        return await self.flight.do_async(key, run)
+
+
+def coalescing_for(
+    dispatch: Optional[Dispatch], flight: SingleFlight, namespace: str = ""
+) -> Optional[Dispatch]:
+    """
+    Wrap ``dispatch`` in a ``CoalescingDispatch`` from ``AGENT_COALESCE_TOOLS``.
+
+    ``AGENT_COALESCE_TOOLS`` is a comma-separated list of tools whose
+    concurrent identical calls share one execution (e.g.
+    ``get_weather,convert_temperature``). Each tool must be named: ``*`` is
+    ignored with a warning, as it would coalesce ``write_file`` and, with
+    ``GEOIP_DB`` set, ``get_current_location``.
+
+    Returns:
+        Optional[Dispatch]: ``dispatch`` unchanged when no tools are listed
+    """
+    names = [name.strip() for name in os.getenv("AGENT_COALESCE_TOOLS", "").split(",")]
+    if "*" in names:
+        print(
+            "⚠️  AGENT_COALESCE_TOOLS=* is not supported: list the tools without side "
+            "effects whose result doesn't depend on the client"
+        )
+    tools = [name for name in names if name and name != "*"]
+    if dispatch is None or not tools:
+        return dispatch
+    return CoalescingDispatch(dispatch, flight, tools, namespace)
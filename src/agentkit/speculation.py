@@ -0,0 +1,334 @@
+"""
+Speculative tool execution for function chaining loops.
+
+The module3 system prompt makes some follow-up calls completely predictable:
+"my location" queries always start with ``get_current_location`` followed by
+``get_weather`` for that city, and unit requests always end with
+``convert_temperature``. Each of those costs a model round trip just to be
+told what we already knew.
+
+``SpeculativeExecutor`` applies declared ``Rule`` objects to the user prompt
+and to each tool result, and runs the predicted calls ahead of time. Two modes:
+
+- ``attach``: the predicted call and its result are appended to the history
+  in the same turn, so the model sees them and skips that round trip. The
+  history then holds model ``function_call`` messages the model never
+  produced; it is opt-in (``AGENT_SPECULATE=attach``) for that reason.
+- ``prefetch``: the call runs in the background and its result is handed
+  over when the model actually asks for it (saves tool latency only).
+
+Rules keep a hit/miss record and are switched off automatically when their
+predictions are too often wrong. A prediction only counts once the model has
+answered it: in prefetch mode it is a hit when the model asks for that call
+and a miss when the turn ends without it; in attach mode it is a miss when
+the model calls the same tool with different arguments, and a hit when the
+model asks for that very call or answers the turn without doing so.
+
+In a pipelined loop ``call`` runs on the pipeline's worker thread while the
+loop calls ``follow_ups``, so the executor's bookkeeping is kept under a lock.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from google.genai.types import FunctionCall
+
+futures = lazy_import("concurrent.futures")
+types = lazy_import("google.genai.types")
+
+Dispatch = Callable[["FunctionCall"], Any]
+
+
+def call_key(name: str, args: Optional[dict]) -> str:
+    """Canonical identity of a function call: name plus sorted JSON args."""
+    return name + json.dumps(args or {}, sort_keys=True, default=str)
+
+
+class Rule:
+    """
+    A declared prediction: "when X happens, the model will call Y".
+
+    Args:
+        name (str): Label used in stats
+        calls: ``(prompt, result) -> List[FunctionCall]`` producing the predicted
+            calls, or an empty list when the rule does not apply
+        after (Optional[str]): Tool whose result triggers the rule; None means
+            the rule is applied to the user prompt before the first request
+    """
+
+    def __init__(
+        self,
+        name: str,
+        calls: Callable[[str, Any], List[FunctionCall]],
+        after: Optional[str] = None,
+    ):
+        self.name = name
+        self.calls = calls
+        self.after = after
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def precision(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 1.0
+
+
+_HERE = re.compile(r"\b(my location|here|where i am|my city)\b", re.IGNORECASE)
+_WEATHER = re.compile(r"\b(weather|hot|cold|warm|temperature|rain\w*|sunny)\b", re.IGNORECASE)
+_UNIT = re.compile(r"\b(fahrenheit|celsius)\b", re.IGNORECASE)
+
+
+def _location_first(prompt: str, result: Any) -> List[FunctionCall]:
+    if _HERE.search(prompt):
+        return [types.FunctionCall(name="get_current_location", args={})]
+    return []
+
+
+def _weather_for_location(prompt: str, result: Any) -> List[FunctionCall]:
+    if isinstance(result, dict) and result.get("city") and _WEATHER.search(prompt):
+        return [types.FunctionCall(name="get_weather", args={"location": result["city"]})]
+    return []
+
+
+def _convert_weather(prompt: str, result: Any) -> List[FunctionCall]:
+    match = _UNIT.search(prompt)
+    if not match or not isinstance(result, dict) or "temperature" not in result:
+        return []
+    to_unit = match.group(1).lower()
+    from_unit = str(result.get("unit", "celsius")).lower()
+    if to_unit == from_unit:
+        return []
+    return [
+        types.FunctionCall(
+            name="convert_temperature",
+            args={
+                "temperature": result["temperature"],
+                "from_unit": from_unit,
+                "to_unit": to_unit,
+            },
+        )
+    ]
+
+
+# The chaining rules from the module3 system prompt
+WEATHER_RULES = [
+    Rule("location-first", _location_first),
+    Rule("weather-after-location", _weather_for_location, after="get_current_location"),
+    Rule("convert-after-weather", _convert_weather, after="get_weather"),
+]
+
+
+class _Attached:
+    """
+    A prediction attached to the history, waiting for the model to confirm it.
+    ``result`` is a future: the model may ask for the call while it still runs.
+    """
+
+    __slots__ = ("rule", "result")
+
+    def __init__(self, rule: Rule):
+        self.rule = rule
+        self.result: Future = futures.Future()
+
+
+class SpeculativeExecutor:
+    """
+    Runs predicted tool calls ahead of the model.
+
+    Example (attach mode, inside the chaining loop):
+        for call, result in speculator.on_prompt(user_input):
+            append call + result to contents
+        ...
+        result = speculator.call(function_call)
+        append function_call + result to contents
+        for call, result in speculator.follow_ups(function_call, result):
+            append call + result to contents
+        ...
+        speculator.finish_turn()
+    """
+
+    def __init__(
+        self,
+        dispatch: Dispatch,
+        rules: List[Rule],
+        mode: str = "attach",
+        min_precision: float = 0.5,
+        warmup: int = 5,
+        max_workers: int = 4,
+    ):
+        """
+        Args:
+            dispatch: Executes a ``FunctionCall`` (e.g. ``process_function_call``)
+            rules (List[Rule]): Predictions to apply; only use read-only tools
+            mode (str): "attach" or "prefetch"
+            min_precision (float): Rules below this hit rate are disabled...
+            warmup (int): ...once they have made at least this many predictions
+            max_workers (int): Background threads for prefetching
+        """
+        if mode not in ("attach", "prefetch"):
+            raise ValueError(f"Unknown speculation mode: {mode}")
+        self.dispatch = dispatch
+        self.rules = rules
+        self.mode = mode
+        self.min_precision = min_precision
+        self.warmup = warmup
+        self._pool = futures.ThreadPoolExecutor(max_workers=max_workers) if mode == "prefetch" else None
+
+        self._prompt = ""
+        self._pending: Dict[str, Tuple[Rule, Future]] = {}
+        self._attached: Dict[str, _Attached] = {}
+        # Observed tool -> next tool transitions, for tuning the declared rules
+        self.transitions: Dict[Tuple[str, str], int] = {}
+        self._last_tool: Optional[str] = None
+        self.speculated = 0
+        self.prefetch_hits = 0
+        self._lock = threading.Lock()
+
+    def _enabled(self, rule: Rule) -> bool:
+        return rule.hits + rule.misses < self.warmup or rule.precision >= self.min_precision
+
+    def _predict(self, after: Optional[str], result: Any) -> List[Tuple[Rule, FunctionCall]]:
+        with self._lock:
+            rules = [rule for rule in self.rules if rule.after == after and self._enabled(rule)]
+        return [(rule, call) for rule in rules for call in rule.calls(self._prompt, result)]
+
+    def _run(self, predictions: List[Tuple[Rule, FunctionCall]]) -> List[Tuple[FunctionCall, Any]]:
+        attached = []
+        for rule, call in predictions:
+            key = call_key(call.name, call.args)
+            with self._lock:
+                if key in self._pending or key in self._attached:
+                    continue
+                self.speculated += 1
+                if self.mode == "prefetch":
+                    self._pending[key] = (rule, self._pool.submit(self.dispatch, call))
+                    continue
+                entry = self._attached[key] = _Attached(rule)
+
+            # Counted once the model has answered (see call and finish_turn)
+            try:
+                result = self.dispatch(call)
+            except BaseException as e:
+                with self._lock:
+                    self._attached.pop(key, None)
+                entry.result.set_exception(e)
+                raise
+            entry.result.set_result(result)
+            attached.append((call, result))
+            # Attached results can trigger further predictions in the same turn
+            attached.extend(self._run(self._predict(call.name, result)))
+        return attached
+
+    def on_prompt(self, prompt: str) -> List[Tuple[FunctionCall, Any]]:
+        """
+        Start a turn. Returns calls to attach before the first model request
+        (always empty in prefetch mode).
+        """
+        self._prompt = prompt
+        with self._lock:
+            self._last_tool = None
+        return self._run(self._predict(None, None))
+
+    def call(self, function_call: FunctionCall) -> Any:
+        """
+        Execute a call the model asked for, reusing a prefetched or attached
+        result for the same call if there is one.
+        """
+        name = function_call.name
+        key = call_key(name, function_call.args)
+        future: Optional[Future] = None
+        with self._lock:
+            if self._last_tool is not None:
+                pair = (self._last_tool, name)
+                self.transitions[pair] = self.transitions.get(pair, 0) + 1
+            self._last_tool = name
+
+            pending = self._pending.pop(key, None)
+            if pending is not None:
+                rule, future = pending
+                rule.hits += 1
+                self.prefetch_hits += 1
+            elif key in self._attached:
+                # Asked for exactly what was attached: right call, run (or running) already
+                entry = self._attached.pop(key)
+                entry.rule.hits += 1
+                future = entry.result
+            else:
+                # The model calling an attached tool with other args means we guessed wrong
+                for attached_key, entry in self._attached.items():
+                    if attached_key.startswith(name + "{"):
+                        entry.rule.misses += 1
+                        del self._attached[attached_key]
+                        break
+        if future is not None:
+            return future.result()
+        return self.dispatch(function_call)
+
+    def follow_ups(self, function_call: FunctionCall, result: Any) -> List[Tuple[FunctionCall, Any]]:
+        """Predict and run the calls likely to follow this result."""
+        return self._run(self._predict(function_call.name, result))
+
+    def finish_turn(self, answered: bool = True) -> None:
+        """
+        End the turn; unused prefetches count as misses.
+
+        Args:
+            answered (bool): Whether the model gave its final answer. Attached
+                predictions it did not contradict then count as hits; after an
+                error or a stopped turn they are dropped uncounted
+        """
+        with self._lock:
+            for rule, future in self._pending.values():
+                future.cancel()
+                rule.misses += 1
+            if answered:
+                for entry in self._attached.values():
+                    entry.rule.hits += 1
+            self._pending.clear()
+            self._attached.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "speculated": self.speculated,
+                "prefetch_hits": self.prefetch_hits,
+                "rules": {
+                    rule.name: {"hits": rule.hits, "misses": rule.misses}
+                    for rule in self.rules
+                },
+            }
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def speculation_for(dispatch: Dispatch, rules: List[Rule]) -> Optional[SpeculativeExecutor]:
+    """
+    Build a speculative executor from ``AGENT_SPECULATE`` ("prefetch", or
+    "attach" with a warning about the history); returns None when the variable
+    is unset. "1" means prefetch, which leaves the history as the model made it.
+    """
+    mode = os.getenv("AGENT_SPECULATE", "").lower()
+    if not mode:
+        return None
+    if mode in ("1", "true", "yes"):
+        mode = "prefetch"
+    if mode == "attach":
+        print(
+            "⚠️  AGENT_SPECULATE=attach: predicted function calls go into the history "
+            "as if the model had made them"
+        )
+    return SpeculativeExecutor(dispatch, rules, mode=mode)
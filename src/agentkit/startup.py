@@ -0,0 +1,196 @@
+"""
+Fast start-up for the agent entry points.
+
+Importing ``google.genai`` (pydantic models for the whole API surface, httpx
+and friends) dominates the cold start of every agent, yet nothing needs the
+SDK until the first message is sent. The entry points therefore:
+
+- import SDK modules with ``lazy_import``; the real import happens on first
+  attribute access, i.e. at the first ``types.Content(...)``
+- get ``models`` from ``agentkit.transport.lazy_models``, which creates the
+  ``genai.Client`` on the first ``generate_content`` call
+- pass plain-dict configs, which need no SDK types to build
+- call ``load_dotenv()`` only after handling their command-line flags
+
+Running any entry point with ``--profile-startup`` starts it again under
+``python -X importtime``, stops it where it would wait for input and prints
+where the start-up time went (see ``profile_startup``).
+
+Kept free of third-party imports, like ``agentkit.env``.
+"""
+
+import importlib
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from agentkit.env import env_flag
+
+PROFILE_FLAG = "--profile-startup"
+STOP_ENV = "AGENT_EXIT_AFTER_STARTUP"
+
+# Imported on the first message rather than at start-up
+DEFERRED_MODULES = ("google.genai", "google.genai.types")
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Each attribute is copied onto the proxy the first time it is read, so
+    later lookups cost the same as on the real module.
+    """
+
+    def __init__(self, name: str):
+        self._lazy_name = name
+
+    def __getattr__(self, attr: str) -> Any:
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        value = getattr(importlib.import_module(self._lazy_name), attr)
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self) -> str:
+        return f"<lazy module {self._lazy_name!r}>"
+
+
+def lazy_import(name: str) -> Any:
+    """
+    Return module ``name``, deferring the import until it is first used.
+
+    Args:
+        name (str): Fully qualified module name, e.g. "google.genai.types"
+
+    Returns:
+        The module itself if it is already imported, otherwise a ``LazyModule``
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
+
+
+def stop_after_startup() -> bool:
+    """
+    True when the process was started by ``profile_startup`` (or a start-up
+    benchmark) and should exit instead of waiting for input.
+    """
+    return env_flag(STOP_ENV)
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parse ``python -X importtime`` output.
+
+    Returns:
+        List[Tuple[str, int, int, int]]: (module, depth, self_us, cumulative_us)
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+            imports.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return imports
+
+
+def measure_startup(script: str, args: Sequence[str] = ()) -> Dict[str, Any]:
+    """
+    Start ``script`` under ``-X importtime`` and stop it at its input prompt.
+
+    Returns:
+        Dict[str, Any]: ``wall_ms``, ``imports`` (see ``parse_importtime``),
+        ``returncode`` and ``stderr`` tail for diagnostics
+    """
+    import subprocess  # only needed when profiling, keep it off the start-up path
+
+    env = dict(os.environ, **{STOP_ENV: "1"})
+    # Start-up must not depend on a real key: the client is created lazily
+    env.setdefault("API_KEY", "profile-startup")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", script, *args],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    imports = parse_importtime(result.stderr)
+    errors = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+    return {
+        "wall_ms": wall_ms,
+        "imports": imports,
+        "returncode": result.returncode,
+        "stderr": "\n".join(errors[-5:]),
+    }
+
+
+def deferred_import_ms(module: str) -> Optional[float]:
+    """Cumulative import time of ``module`` in a fresh interpreter, or None if missing."""
+    import subprocess
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        stdin=subprocess.DEVNULL,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    for name, _, _, cumulative_us in parse_importtime(result.stderr):
+        if name == module:
+            return cumulative_us / 1000
+    return 0.0
+
+
+def profile_startup(script: str, top: int = 15) -> None:
+    """
+    Print an import-time breakdown of an entry point's start-up.
+
+    Args:
+        script (str): Path of the entry point (``__file__``)
+        top (int): Number of top-level imports to list
+    """
+    args = [arg for arg in sys.argv[1:] if arg != PROFILE_FLAG]
+    profile = measure_startup(script, args)
+    imports = profile["imports"]
+    top_level = sorted(
+        (entry for entry in imports if entry[1] == 0), key=lambda entry: -entry[3]
+    )
+    import_ms = sum(entry[3] for entry in top_level) / 1000
+
+    print(f"\n⏱️  Start-up profile for {os.path.basename(script)}")
+    if profile["returncode"] != 0:
+        print(f"❌ Exited with status {profile['returncode']}:\n{profile['stderr']}")
+    print(f"   Time to prompt: {profile['wall_ms']:.0f} ms ({import_ms:.0f} ms in imports)")
+    print("\n   Slowest top-level imports (cumulative):")
+    for name, _, _, cumulative_us in top_level[:top]:
+        print(f"   {cumulative_us / 1000:8.1f} ms  {name}")
+
+    loaded = {entry[0] for entry in imports}
+    print("\n   Deferred until the first message:")
+    for module in DEFERRED_MODULES:
+        if module in loaded:
+            print(f"   ⚠️  {module} was imported during start-up")
+            continue
+        elapsed = deferred_import_ms(module)
+        cost = "not installed" if elapsed is None else f"{elapsed:8.1f} ms"
+        print(f"   {cost}  {module}")
+
+
+def handle_startup_flags(script: str) -> bool:
+    """
+    Handle ``--profile-startup`` for an entry point.
+
+    Returns:
+        bool: True if the flag was handled and the entry point should exit
+    """
+    if PROFILE_FLAG not in sys.argv[1:]:
+        return False
+    profile_startup(script)
+    return True
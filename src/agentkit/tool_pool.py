@@ -0,0 +1,241 @@
+"""
+Process-pool execution for CPU-bound tools.
+
+Tools normally run inline on the thread that drives the model loop, so a
+regex search over a large tree or a ``black`` run holds the GIL and stalls
+everything else in the process (other sessions on the server, Ctrl-C in the
+terminal). Tools registered with ``"process_pool": True`` are sent to a
+``ToolProcessPool`` instead.
+
+Large payloads do not go through the executor's result pipe: a worker writes
+a result of ``handoff_bytes`` or more into a ``SharedMemory`` block and
+returns only its name, and the parent copies it out once and unlinks it.
+Large string arguments (e.g. file contents) are handed over the same way in
+the other direction.
+
+Workers are started ahead of the first call (``warm=True``) and can preload
+modules, so the first heavy tool does not also pay for process start-up and
+imports.
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+# concurrent.futures and multiprocessing are only imported once a pool is used
+futures = lazy_import("concurrent.futures")
+resource_tracker = lazy_import("multiprocessing.resource_tracker")
+shared_memory = lazy_import("multiprocessing.shared_memory")
+
+DEFAULT_HANDOFF_BYTES = 64 * 1024
+
+
+class _Handoff:
+    """Reference to a payload left in shared memory."""
+
+    __slots__ = ("name", "size", "kind")
+
+    def __init__(self, name: str, size: int, kind: str):
+        self.name = name
+        self.size = size
+        self.kind = kind
+
+    def __reduce__(self):
+        return (_Handoff, (self.name, self.size, self.kind))
+
+
+class _Packed:
+    """A small result that was pickled in the worker."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def __reduce__(self):
+        return (_Packed, (self.data,))
+
+
+def _encode(value: Any) -> Tuple[str, bytes]:
+    if isinstance(value, str):
+        return "str", value.encode("utf-8")
+    if isinstance(value, bytes):
+        return "bytes", value
+    return "pickle", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _decode(kind: str, data: bytes) -> Any:
+    if kind == "str":
+        return data.decode("utf-8")
+    if kind == "bytes":
+        return data
+    return pickle.loads(data)
+
+
+def _share(kind: str, data: bytes) -> _Handoff:
+    block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    block.buf[: len(data)] = data
+    block.close()
+    return _Handoff(block.name, len(data), kind)
+
+
+def _take(handoff: _Handoff, unlink: bool) -> Any:
+    block = shared_memory.SharedMemory(name=handoff.name)
+    try:
+        data = bytes(block.buf[: handoff.size])
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+    return _decode(handoff.kind, data)
+
+
+def _init_worker(preload: Tuple[str, ...]) -> None:
+    for module in preload:
+        try:
+            __import__(module)
+        except ImportError:
+            pass
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def _run_in_worker(func: Callable[..., Any], kwargs: Dict[str, Any], handoff_bytes: int) -> Any:
+    """Worker-side wrapper: unpack shared arguments, run, share a large result."""
+    kwargs = {
+        key: _take(value, unlink=False) if isinstance(value, _Handoff) else value
+        for key, value in kwargs.items()
+    }
+    result = func(**kwargs)
+    if isinstance(result, (str, bytes)) and len(result) < handoff_bytes:
+        return result
+    kind, data = _encode(result)
+    if len(data) < handoff_bytes:
+        # Already pickled; send the bytes rather than pickling the object again
+        return _Packed(data) if kind == "pickle" else result
+    return _share(kind, data)
+
+
+class ToolProcessPool:
+    """
+    Runs tool functions in worker processes.
+
+    Example:
+        pool = ToolProcessPool(max_workers=4, preload=("file_operations",))
+        matches = pool.run(search_files, pattern="TODO", directory=".")
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        warm: bool = True,
+        preload: Iterable[str] = (),
+        handoff_bytes: int = DEFAULT_HANDOFF_BYTES,
+    ):
+        """
+        Args:
+            max_workers (Optional[int]): Worker processes (default: CPU count)
+            warm (bool): Start all workers now instead of on first use
+            preload (Iterable[str]): Modules each worker imports at start-up
+            handoff_bytes (int): Payloads this large go through shared memory
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.handoff_bytes = handoff_bytes
+        # Workers must share our resource tracker: blocks they create are
+        # unlinked here, and a tracker of their own would "clean up" (and
+        # warn about) those blocks again when the worker exits
+        resource_tracker.ensure_running()
+        self._executor = futures.ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(tuple(preload),),
+        )
+        self.metrics: Dict[str, int] = {"calls": 0, "shared_args": 0, "shared_results": 0}
+        self._warmup: List[Future] = []
+        if warm:
+            # Fire and forget: workers start in the background while the
+            # agent is still waiting for the user or the model
+            self._warmup = [self._executor.submit(_ready) for _ in range(self.max_workers)]
+
+    def submit(self, func: Callable[..., Any], **kwargs: Any) -> Future:
+        """
+        Schedule ``func(**kwargs)`` in a worker.
+
+        ``func`` must be importable by the workers (a module-level function).
+        The returned future resolves to the plain result.
+        """
+        shared = []
+        for key, value in kwargs.items():
+            if isinstance(value, str) and len(value) >= self.handoff_bytes:
+                shared.append(_share(*_encode(value)))
+                kwargs[key] = shared[-1]
+        self.metrics["calls"] += 1
+        self.metrics["shared_args"] += len(shared)
+
+        inner = self._executor.submit(_run_in_worker, func, kwargs, self.handoff_bytes)
+        outer = futures.Future()
+
+        def finish(done: Future) -> None:
+            for handoff in shared:
+                _unlink(handoff.name)
+            try:
+                result = done.result()
+                if isinstance(result, _Handoff):
+                    self.metrics["shared_results"] += 1
+                    result = _take(result, unlink=True)
+                elif isinstance(result, _Packed):
+                    result = pickle.loads(result.data)
+            except BaseException as e:
+                outer.set_exception(e)
+            else:
+                outer.set_result(result)
+
+        inner.add_done_callback(finish)
+        return outer
+
+    def run(self, func: Callable[..., Any], timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        """Run ``func(**kwargs)`` in a worker and wait for the result."""
+        return self.submit(func, **kwargs).result(timeout)
+
+    def wait_ready(self, timeout: Optional[float] = None) -> None:
+        """Block until the warm-up started in the constructor has finished."""
+        for future in self._warmup:
+            future.result(timeout)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _unlink(name: str) -> None:
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    block.close()
+    block.unlink()
+
+
+def tool_pool_for(preload: Iterable[str] = ()) -> Optional[ToolProcessPool]:
+    """
+    Build a ``ToolProcessPool`` from ``AGENT_TOOL_WORKERS`` (a worker count,
+    or "auto" for one per CPU); returns None when unset or 0 so tools run inline.
+
+    ``AGENT_TOOL_WARM=0`` starts workers on first use instead of right away.
+    """
+    workers = os.getenv("AGENT_TOOL_WORKERS", "").lower()
+    if not workers or workers == "0":
+        return None
+    return ToolProcessPool(
+        max_workers=None if workers == "auto" else int(workers),
+        warm=os.getenv("AGENT_TOOL_WARM", "1").lower() not in ("0", "false", "no"),
+        preload=preload,
+    )
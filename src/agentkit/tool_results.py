@@ -0,0 +1,335 @@
+"""
+Size limits for tool results before they go into the history.
+
+Every tool result stays in ``contents`` and is sent again on every following
+round trip, so a single ``read_file`` of a large file or ``list_files`` of
+``node_modules`` is paid for for the rest of the session. ``ResultLimiter``
+post-processes results before they are appended:
+
+- runs of identical lines are collapsed to one line and a repeat count
+- results over their tool's byte budget keep their head and tail, with a
+  marker saying how much was left out; lists and dicts are cut by entries
+- optionally, once a result is older than the last ``keep_recent`` results,
+  it is replaced in the history by a one-line reference to the call that
+  produced it. The full result is then gone for good: in a
+  ``PersistentHistory`` each elision is a replacement, which rewrites the
+  session's snapshot (and fsyncs it) with the reference in place
+
+It also counts the bytes each request no longer carries, so the savings over
+a session can be reported (``summary()``). Results trimmed from the history
+since no longer count.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from agentkit.env import env_flag
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import FunctionCall
+
+types = lazy_import("google.genai.types")
+
+DEFAULT_BUDGET_BYTES = 8 * 1024
+DEFAULT_ELIDE_MIN_BYTES = 1024
+
+# Rough size of a token for English text and code
+CHARS_PER_TOKEN = 4
+
+# Share of the budget kept from the start of a result; the rest is the end
+HEAD_SHARE = 2 / 3
+
+# Runs of identical lines at least this long are collapsed
+MIN_REPEAT = 3
+
+
+def result_size(result: Any) -> int:
+    """Bytes a result takes in the request, as the JSON the SDK sends."""
+    if isinstance(result, str):
+        return len(result.encode("utf-8")) + 2
+    return len(json.dumps(result, default=str, ensure_ascii=False).encode("utf-8"))
+
+
+def dedupe_lines(text: str) -> Tuple[str, int]:
+    """
+    Collapse runs of ``MIN_REPEAT`` or more identical lines.
+
+    Returns:
+        Tuple[str, int]: The text and the number of lines removed
+    """
+    lines = text.split("\n")
+    if len(lines) < MIN_REPEAT:
+        return text, 0
+    output: List[str] = []
+    removed = 0
+    i = 0
+    while i < len(lines):
+        j = i + 1
+        while j < len(lines) and lines[j] == lines[i]:
+            j += 1
+        run = j - i
+        if run >= MIN_REPEAT:
+            output.append(lines[i])
+            output.append(f"[previous line repeated {run - 1} more times]")
+            removed += run - 2
+        else:
+            output.extend(lines[i:j])
+        i = j
+    return "\n".join(output), removed
+
+
+def truncate_text(text: str, budget_bytes: int) -> str:
+    """Keep the head and tail of ``text`` within about ``budget_bytes``, on line boundaries."""
+    data = text.encode("utf-8")
+    if len(data) <= budget_bytes:
+        return text
+    head_bytes = int(budget_bytes * HEAD_SHARE)
+    head = data[:head_bytes]
+    tail = data[len(data) - (budget_bytes - head_bytes):]
+    # Cut on line boundaries when there are any, so no line is half shown
+    if b"\n" in head:
+        head = head[: head.rindex(b"\n") + 1]
+    if b"\n" in tail:
+        tail = tail[tail.index(b"\n") + 1:]
+    omitted = data[len(head): len(data) - len(tail)]
+    lines = omitted.count(b"\n") + 1
+    marker = (
+        f"[... {lines:,} lines ({len(omitted):,} bytes) omitted; "
+        "read a smaller part or search for what you need ...]\n"
+    )
+    return (
+        head.decode("utf-8", errors="ignore") + marker + tail.decode("utf-8", errors="ignore")
+    )
+
+
+def truncate_list(items: List[Any], budget_bytes: int) -> List[Any]:
+    """Keep the first and last entries of ``items`` within about ``budget_bytes``."""
+    sizes = [result_size(item) + 1 for item in items]
+    if sum(sizes) <= budget_bytes:
+        return items
+    head_end, used = 0, 0
+    while head_end < len(items) and used + sizes[head_end] <= budget_bytes * HEAD_SHARE:
+        used += sizes[head_end]
+        head_end += 1
+    tail_start = len(items)
+    while tail_start > head_end and used + sizes[tail_start - 1] <= budget_bytes:
+        tail_start -= 1
+        used += sizes[tail_start]
+    omitted = tail_start - head_end
+    return items[:head_end] + [f"[... {omitted:,} more entries omitted ...]"] + items[tail_start:]
+
+
+def truncate_dict(mapping: Dict[str, Any], budget_bytes: int) -> Dict[str, Any]:
+    """Keep the first entries of ``mapping`` within about ``budget_bytes``."""
+    kept: Dict[str, Any] = {}
+    used = 2
+    for key, value in mapping.items():
+        size = result_size(key) + result_size(value) + 2
+        if used + size > budget_bytes:
+            kept["[omitted]"] = f"{len(mapping) - len(kept):,} more entries"
+            return kept
+        kept[key] = value
+        used += size
+    return kept
+
+
+def _index_of(contents: list, message: Any) -> Optional[int]:
+    """Position of ``message`` itself (not an equal one) in ``contents``, newest first."""
+    for index in range(len(contents) - 1, -1, -1):
+        if contents[index] is message:
+            return index
+    return None
+
+
+class ResultLimiter:
+    """
+    Applies per-tool byte budgets to tool results and elides old ones.
+
+    Example:
+        limiter = ResultLimiter({"read_file": 16 * 1024}, keep_recent=4)
+        result = limiter.limit(tool_call.name, result)
+        contents.extend(...)  # the call and its (limited) result
+        limiter.track(contents, tool_call, result)
+    """
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, int]] = None,
+        default_budget_bytes: int = DEFAULT_BUDGET_BYTES,
+        keep_recent: Optional[int] = None,
+        elide_min_bytes: int = DEFAULT_ELIDE_MIN_BYTES,
+    ):
+        """
+        Args:
+            budgets (Optional[Dict[str, int]]): Byte budget per tool name
+            default_budget_bytes (int): Budget for tools not in ``budgets``
+            keep_recent (Optional[int]): Results kept in full; older ones of at
+                least ``elide_min_bytes`` are replaced by a reference. None
+                never elides
+            elide_min_bytes (int): Smaller results are never elided
+        """
+        self.budgets = dict(budgets or {})
+        self.default_budget_bytes = default_budget_bytes
+        self.keep_recent = keep_recent
+        self.elide_min_bytes = elide_min_bytes
+
+        # Function responses in the history: [message, call, size, saved, elided],
+        # where saved is the bytes the limiter took out of the message
+        self._tracked: List[List[Any]] = []
+        # The history they are in, and what the last limit() call took out
+        self._contents: Optional[list] = None
+        self._last_saved = 0
+        # Bytes the history currently does not carry thanks to the limiter
+        self._removed_bytes = 0
+        self.metrics: Dict[str, int] = {
+            "results": 0,
+            "truncated": 0,
+            "deduped_lines": 0,
+            "elided": 0,
+            "requests": 0,
+            "bytes_saved": 0,
+        }
+
+    def budget_for(self, name: str) -> int:
+        return self.budgets.get(name, self.default_budget_bytes)
+
+    def limit(self, name: str, result: Any) -> Any:
+        """
+        Dedupe and truncate a result to its tool's budget.
+
+        Args:
+            name (str): The tool that produced the result
+            result: The tool's return value
+
+        Returns:
+            The result, unchanged if it was already within budget
+        """
+        self.metrics["results"] += 1
+        self._last_saved = 0
+        before = result_size(result)
+        limited = result
+        if isinstance(result, str):
+            limited, removed = dedupe_lines(result)
+            self.metrics["deduped_lines"] += removed
+        budget = self.budget_for(name)
+        if result_size(limited) > budget:
+            if isinstance(limited, str):
+                limited = truncate_text(limited, budget)
+            elif isinstance(limited, list):
+                limited = truncate_list(limited, budget)
+            elif isinstance(limited, dict):
+                limited = truncate_dict(limited, budget)
+        if limited is not result:
+            after = result_size(limited)
+            if after < before:
+                self.metrics["truncated"] += 1
+                self._last_saved = before - after
+                self._removed_bytes += before - after
+            else:
+                limited = result
+        return limited
+
+    def track(self, contents: list, function_call: FunctionCall, result: Any) -> None:
+        """
+        Register the function response just appended to ``contents`` and
+        elide results that are now older than the last ``keep_recent``.
+
+        Responses are found again by identity, so trimming the history in
+        between (``del contents[:-10]``) cannot make the wrong message elided.
+        """
+        self._contents = contents
+        self._drop_trimmed()
+        saved, self._last_saved = self._last_saved, 0
+        self._tracked.append([contents[-1], function_call, result_size(result), saved, False])
+        if self.keep_recent is None:
+            return
+        old = max(0, len(self._tracked) - self.keep_recent)
+        for entry in self._tracked[:old]:
+            message, call, size, _, elided = entry
+            if elided or size < self.elide_min_bytes:
+                continue
+            index = _index_of(contents, message)
+            if index is None:
+                continue
+            reference = self._reference(call, size)
+            contents[index] = types.Content(
+                role="user",
+                parts=[
+                    types.Part.from_function_response(
+                        name=call.name, response={"result": reference}
+                    )
+                ],
+            )
+            # The history may store its own copy (CompactHistory keeps Messages)
+            entry[0] = contents[index]
+            entry[3] += size - result_size(reference)
+            entry[4] = True
+            self.metrics["elided"] += 1
+            self._removed_bytes += size - result_size(reference)
+
+    def _drop_trimmed(self) -> None:
+        # Results no longer in the history save nothing in the next request
+        present = {id(message) for message in self._contents or ()}
+        kept = []
+        for entry in self._tracked:
+            if id(entry[0]) in present:
+                kept.append(entry)
+            else:
+                self._removed_bytes -= entry[3]
+        self._tracked = kept
+
+    @staticmethod
+    def _reference(function_call: FunctionCall, size: int) -> str:
+        args = ", ".join(f"{key}={value!r}" for key, value in (function_call.args or {}).items())
+        return (
+            f"[{function_call.name}({args}) returned {size:,} bytes earlier in this "
+            "session; call it again if you need the content]"
+        )
+
+    def on_request(self) -> None:
+        """Count the bytes left out of the request about to be sent."""
+        self.metrics["requests"] += 1
+        self._drop_trimmed()
+        self.metrics["bytes_saved"] += self._removed_bytes
+
+    @property
+    def tokens_saved(self) -> int:
+        """Estimated input tokens saved over all requests so far."""
+        return self.metrics["bytes_saved"] // CHARS_PER_TOKEN
+
+    def summary(self) -> str:
+        m = self.metrics
+        return (
+            f"~{self.tokens_saved:,} input tokens saved over {m['requests']} requests "
+            f"({m['truncated']} results truncated, {m['elided']} elided)"
+        )
+
+
+def result_limiter_for(budgets: Optional[Dict[str, int]] = None) -> Optional[ResultLimiter]:
+    """
+    Build a ``ResultLimiter`` from environment variables.
+
+    - ``AGENT_LIMIT_RESULTS=1`` enables it
+    - ``AGENT_RESULT_BUDGET`` sets the default budget in bytes (default 8192)
+    - ``AGENT_KEEP_RECENT_RESULTS`` keeps only this many results in full and
+      replaces older large ones with references (default: keep all)
+
+    Args:
+        budgets (Optional[Dict[str, int]]): Per-tool budgets, e.g. from the
+            tool registry
+
+    Returns:
+        Optional[ResultLimiter]: None when limiting is disabled
+    """
+    if not env_flag("AGENT_LIMIT_RESULTS"):
+        return None
+    keep_recent = os.getenv("AGENT_KEEP_RECENT_RESULTS")
+    return ResultLimiter(
+        budgets,
+        default_budget_bytes=int(os.getenv("AGENT_RESULT_BUDGET", str(DEFAULT_BUDGET_BYTES))),
+        keep_recent=int(keep_recent) if keep_recent else None,
+    )
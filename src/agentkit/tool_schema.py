@@ -0,0 +1,392 @@
+"""
+Argument validation for tool calls, compiled from the function declarations.
+
+The model's ``tool_call.args`` normally go straight into ``get_weather(**args)``
+or ``convert_temperature(**args)``. When they are wrong (a missing argument,
+``"Kelvin"`` for a unit, ``"22"`` for a number) the tool raises a ``TypeError``
+or ``ValueError`` from deep inside and the model only sees a stack-trace-like
+string. ``ToolValidator`` checks the arguments against each declaration's
+``parameters`` schema before dispatch:
+
+- harmless mistakes are coerced: numeric strings become numbers, enum values
+  are matched ignoring case, surrounding whitespace and unique prefixes
+  ("F" -> "fahrenheit"), ``null`` optional arguments are dropped
+- anything else raises ``ToolArgumentError``, whose ``to_response()`` lists
+  every problem by argument so the model can fix them all in one retry
+
+Each schema is compiled once into nested closures, so checking a call does no
+schema lookups at all. Supports the subset of OpenAPI schema that Gemini
+function declarations use: type, properties, required, enum and items.
+
+Kept free of third-party imports, like ``agentkit.env``.
+"""
+
+import math
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+Problem = Tuple[str, str]
+Checker = Callable[[Any, str, "_Report"], Any]
+
+_TRUE = frozenset(("true", "yes", "1"))
+_FALSE = frozenset(("false", "no", "0"))
+
+
+class ToolArgumentError(ValueError):
+    """Raised when a tool call's arguments do not match its declaration."""
+
+    def __init__(self, function_name: str, problems: List[Problem]):
+        self.function_name = function_name
+        self.problems = problems
+        details = "; ".join(f"{path or 'args'}: {message}" for path, message in problems)
+        super().__init__(f"Invalid arguments for {function_name}: {details}")
+
+    def to_response(self) -> Dict[str, Any]:
+        """
+        Function response telling the model what to fix.
+
+        Returns:
+            Dict[str, Any]: ``{"error": ..., "invalid_arguments": [{"argument", "problem"}]}``
+        """
+        return {
+            "error": str(self),
+            "invalid_arguments": [
+                {"argument": path, "problem": message} for path, message in self.problems
+            ],
+        }
+
+
+class _Report:
+    __slots__ = ("problems", "coerced")
+
+    def __init__(self):
+        self.problems: List[Problem] = []
+        self.coerced = 0
+
+
+def _join(path: str, name: str) -> str:
+    return f"{path}.{name}" if path else name
+
+
+def _type_name(schema: Mapping[str, Any]) -> str:
+    # Dict declarations use "string", SDK Schema objects Type.STRING ("STRING")
+    kind = schema.get("type") or ""
+    return str(getattr(kind, "value", kind)).lower()
+
+
+def _is_mapping(value: Any) -> bool:
+    # Plain dicts skip the slower ABC check
+    return type(value) is dict or isinstance(value, Mapping)
+
+
+def _compile_enum(values: List[Any], base: Checker) -> Checker:
+    allowed = frozenset(values)
+    if not all(isinstance(value, str) for value in values):
+
+        def check_enum(value, path, report):
+            value = base(value, path, report)
+            if value not in values:
+                report.problems.append((path, f"must be one of {values}"))
+            return value
+
+        return check_enum
+
+    folded = {value.lower(): value for value in values}
+    expected = f"must be one of {values}"
+
+    def check_string_enum(value, path, report):
+        if type(value) is str and value in allowed:
+            return value
+        value = base(value, path, report)
+        if not isinstance(value, str):
+            return value
+        key = value.strip().lower()
+        match = folded.get(key)
+        if match is None and key:
+            prefixed = [name for folded_name, name in folded.items() if folded_name.startswith(key)]
+            if len(prefixed) == 1:
+                match = prefixed[0]
+        if match is None:
+            report.problems.append((path, f"{expected}, got {value!r}"))
+            return value
+        report.coerced += 1
+        return match
+
+    return check_string_enum
+
+
+def _check_string(value, path, report):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        report.coerced += 1
+        return str(int(value)) if isinstance(value, float) and value.is_integer() else str(value)
+    report.problems.append((path, f"expected a string, got {type(value).__name__}"))
+    return value
+
+
+def _check_number(value, path, report):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            pass
+        else:
+            if math.isfinite(number):
+                report.coerced += 1
+                return number
+    report.problems.append((path, f"expected a number, got {value!r}"))
+    return value
+
+
+def _check_integer(value, path, report):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    number = _check_number(value, path, _Report())
+    if isinstance(number, float) and number.is_integer():
+        report.coerced += 1
+        return int(number)
+    report.problems.append((path, f"expected an integer, got {value!r}"))
+    return value
+
+
+def _check_boolean(value, path, report):
+    if isinstance(value, bool):
+        return value
+    key = str(value).strip().lower() if isinstance(value, (str, int)) else None
+    if key in _TRUE or key in _FALSE:
+        report.coerced += 1
+        return key in _TRUE
+    report.problems.append((path, f"expected true or false, got {value!r}"))
+    return value
+
+
+def _check_any(value, path, report):
+    return value
+
+
+def _check_no_args(value, path, report):
+    for name in value or ():
+        report.problems.append((_join(path, name), "unexpected argument; takes no arguments"))
+    return {}
+
+
+def _compile_array(schema: Mapping[str, Any], path: str) -> Checker:
+    items = schema.get("items")
+    item_path = f"{path}[*]"
+    check_item = compile_schema(items, item_path) if items else None
+
+    def check_array(value, path, report):
+        if not isinstance(value, (list, tuple)):
+            report.problems.append((path, f"expected an array, got {type(value).__name__}"))
+            return value
+        if check_item is None:
+            return list(value)
+        return [check_item(item, item_path, report) for item in value]
+
+    return check_array
+
+
+def _compile_object(schema: Mapping[str, Any], path: str) -> Checker:
+    properties = schema.get("properties") or {}
+    if not properties:
+        # Free-form object: nothing to check inside
+        def check_mapping(value, path, report):
+            if value is None:
+                return {}
+            if not _is_mapping(value):
+                report.problems.append((path, f"expected an object, got {type(value).__name__}"))
+                return value
+            return dict(value)
+
+        return check_mapping
+
+    # Child paths are fixed by the schema, so they are built here, not per call
+    fields = {}
+    for name, field in properties.items():
+        field_path = _join(path, name)
+        fields[name] = (compile_schema(field, field_path), field_path)
+    required = tuple(schema.get("required") or ())
+    known = ", ".join(fields)
+
+    def check_object(value, path, report):
+        if value is None:
+            value = {}
+        elif not _is_mapping(value):
+            report.problems.append((path, f"expected an object, got {type(value).__name__}"))
+            return value
+        result = {}
+        for name, item in value.items():
+            field = fields.get(name)
+            if field is None:
+                report.problems.append(
+                    (_join(path, name), f"unexpected argument; expected only {known}")
+                )
+            elif item is not None:
+                result[name] = field[0](item, field[1], report)
+            else:
+                # Arguments sent as null fall back to the tool's default
+                report.coerced += 1
+        for name in required:
+            if name not in result:
+                report.problems.append((_join(path, name), "missing required argument"))
+        return result
+
+    return check_object
+
+
+_SCALARS: Dict[str, Checker] = {
+    "string": _check_string,
+    "number": _check_number,
+    "integer": _check_integer,
+    "boolean": _check_boolean,
+}
+
+
+def compile_schema(schema: Optional[Mapping[str, Any]], path: str = "") -> Checker:
+    """
+    Compile a declaration schema into a checker.
+
+    Args:
+        schema: A ``parameters`` schema (or any nested schema), or None for
+            a function without parameters
+        path (str): Where the schema sits in the arguments, used in problems
+
+    Returns:
+        Checker: ``check(value, path, report)`` returning the coerced value
+        and recording problems on ``report``
+    """
+    if schema is None:
+        return _check_no_args
+    if not isinstance(schema, Mapping):
+        # SDK Schema objects
+        schema = schema.model_dump(exclude_none=True)
+    kind = _type_name(schema)
+
+    if kind == "object":
+        check = _compile_object(schema, path)
+    elif kind == "array":
+        check = _compile_array(schema, path)
+    else:
+        check = _SCALARS.get(kind, _check_any)
+    if schema.get("enum"):
+        check = _compile_enum(list(schema["enum"]), check)
+    return check
+
+
+_EXACT_SCALARS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda value: type(value) is str,
+    "number": lambda value: type(value) is float or type(value) is int,
+    "integer": lambda value: type(value) is int,
+    "boolean": lambda value: type(value) is bool,
+}
+
+
+def compile_exact(schema: Optional[Mapping[str, Any]]) -> Optional[Callable[[Any], bool]]:
+    """
+    Compile a predicate for arguments that are valid exactly as sent.
+
+    Well-formed calls are the common case; the predicate lets them through
+    with a few type and set checks instead of a rebuilt copy. Only flat
+    objects of scalars get one.
+
+    Returns:
+        Optional[Callable[[Any], bool]]: The predicate, or None when the
+        schema is too complex and every call goes through the full checker
+    """
+    if schema is None:
+        return lambda value: not value
+    if not isinstance(schema, Mapping):
+        schema = schema.model_dump(exclude_none=True)
+    if _type_name(schema) != "object" or not schema.get("properties"):
+        return None
+
+    tests = {}
+    for name, field in schema["properties"].items():
+        if not isinstance(field, Mapping):
+            field = field.model_dump(exclude_none=True)
+        if field.get("enum"):
+            tests[name] = frozenset(field["enum"]).__contains__
+        elif _type_name(field) in _EXACT_SCALARS:
+            tests[name] = _EXACT_SCALARS[_type_name(field)]
+        else:
+            return None
+    known = frozenset(tests)
+    required = frozenset(schema.get("required") or ())
+
+    def exact(value):
+        if type(value) is not dict or not required <= value.keys() <= known:
+            return False
+        for name, item in value.items():
+            if not tests[name](item):
+                return False
+        return True
+
+    return exact
+
+
+class ToolValidator:
+    """
+    Validates and coerces tool call arguments before dispatch.
+
+    Example:
+        validator = ToolValidator(FUNCTION_DECLARATIONS)
+        args = validator.validate("convert_temperature", tool_call.args)
+    """
+
+    def __init__(self, declarations: Iterable[Any]):
+        """
+        Args:
+            declarations: Function declarations as passed to the model
+                (dicts or SDK ``FunctionDeclaration`` objects)
+        """
+        self._checkers: Dict[str, Checker] = {}
+        self._exact: Dict[str, Optional[Callable[[Any], bool]]] = {}
+        for declaration in declarations:
+            if not isinstance(declaration, Mapping):
+                declaration = declaration.model_dump(exclude_none=True)
+            name = declaration["name"]
+            self._checkers[name] = compile_schema(declaration.get("parameters"))
+            self._exact[name] = compile_exact(declaration.get("parameters"))
+        self.metrics: Dict[str, int] = {"calls": 0, "coerced": 0, "rejected": 0}
+
+    def __contains__(self, function_name: str) -> bool:
+        return function_name in self._checkers
+
+    def validate(self, function_name: str, args: Optional[Mapping[str, Any]]) -> Dict[str, Any]:
+        """
+        Check a call's arguments against its declaration.
+
+        Args:
+            function_name (str): Name of the function the model called
+            args: The call's arguments (None for functions without parameters)
+
+        Returns:
+            Dict[str, Any]: The arguments, coerced where that was unambiguous
+
+        Raises:
+            ToolArgumentError: If the function is unknown or the arguments are invalid
+        """
+        self.metrics["calls"] += 1
+        exact = self._exact.get(function_name)
+        try:
+            if exact is not None and exact(args):
+                return args if args is not None else {}
+        except TypeError:
+            pass  # an unhashable value where an enum was expected
+
+        check = self._checkers.get(function_name)
+        if check is None:
+            self.metrics["rejected"] += 1
+            raise ToolArgumentError(
+                function_name, [("", f"unknown function; expected one of {list(self._checkers)}")]
+            )
+        report = _Report()
+        result = check(args, "", report)
+        if report.problems:
+            self.metrics["rejected"] += 1
+            raise ToolArgumentError(function_name, report.problems)
+        if report.coerced:
+            self.metrics["coerced"] += 1
+        return result
@@ -0,0 +1,432 @@
+"""
+Request transports for ``generate_content``.
+
+The agents call ``models.generate_content(model=..., contents=..., config=...)``.
+By default ``models`` is simply ``client.models`` from the SDK, which converts
+and JSON-encodes the entire ``contents`` list on every call. In the function
+chaining loops only the last one or two messages are new, so
+``PrefixCachingModels`` keeps the encoded bytes of every message it has
+already sent and only encodes the new tail before posting the request body.
+
+``models_for`` is the single place the entry points get their ``models``
+object from; optional layers are switched on there with environment variables.
+``lazy_models`` wraps it so the client is only created on the first call.
+
+The SDK and httpx are imported lazily (see ``agentkit.startup``).
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import warnings
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from agentkit.compact_history import CompactHistory, Message
+from agentkit.env import env_flag
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import GenerateContentConfig, GenerateContentResponse
+
+httpx = lazy_import("httpx")
+errors = lazy_import("google.genai.errors")
+types = lazy_import("google.genai.types")
+
+API_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+# GenerateContentConfig fields that live at the top level of the REST request;
+# every other field goes into "generationConfig"
+_TOP_LEVEL_FIELDS = {
+    "system_instruction": "systemInstruction",
+    "tools": "tools",
+    "tool_config": "toolConfig",
+    "safety_settings": "safetySettings",
+    "cached_content": "cachedContent",
+}
+# Client-side only settings that are never sent
+_SKIPPED_FIELDS = {"http_options", "automatic_function_calling", "labels"}
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def _dump_model(value: Any) -> Any:
+    if hasattr(value, "model_dump"):
+        return value.model_dump(mode="json", exclude_none=True, by_alias=True)
+    if isinstance(value, list):
+        return [_dump_model(item) for item in value]
+    return value
+
+
+def encode_content(content: Any) -> bytes:
+    """Encode one ``Content`` (or compact ``Message``) in API wire format."""
+    if isinstance(content, Message):
+        return content.data
+    return _dumps(_dump_model(content))
+
+
+def encode_config(config: Optional[GenerateContentConfig]) -> bytes:
+    """
+    Encode the config part of a request body (everything except ``contents``).
+
+    Returns:
+        bytes: Comma-prefixed JSON members, or b"" if there is nothing to send
+    """
+    if config is None:
+        return b""
+
+    body: Dict[str, Any] = {}
+    generation_config: Dict[str, Any] = {}
+    for field in config.model_dump(exclude_none=True):
+        if field in _SKIPPED_FIELDS:
+            continue
+        value = _dump_model(getattr(config, field))
+        if field == "system_instruction" and isinstance(value, str):
+            value = {"parts": [{"text": value}]}
+
+        if field in _TOP_LEVEL_FIELDS:
+            body[_TOP_LEVEL_FIELDS[field]] = value
+        else:
+            generation_config[_to_camel(field)] = value
+
+    if generation_config:
+        body["generationConfig"] = generation_config
+    if not body:
+        return b""
+    return b"," + _dumps(body)[1:-1]
+
+
+def _to_camel(name: str) -> str:
+    head, *rest = name.split("_")
+    return head + "".join(word.title() for word in rest)
+
+
+class PrefixEncoder:
+    """
+    Incrementally encodes request bodies for a growing ``contents`` list.
+
+    Messages are matched by identity: the agents only ever append to their
+    history, so every ``Content`` already seen keeps its cached encoding and
+    only the new tail is serialized. Replacing or trimming the history simply
+    invalidates the cache from the first message that differs.
+    """
+
+    def __init__(self):
+        # (message object, encoded bytes); the reference keeps ids stable
+        self._prefix: List[Tuple[Any, bytes]] = []
+        self._config: Optional[Tuple[Any, bytes]] = None
+        self.encoded_messages = 0
+        self.reused_messages = 0
+
+    def encode_contents(self, contents: Any) -> List[bytes]:
+        if isinstance(contents, CompactHistory):
+            # Compact messages already carry their encoding
+            return [message.data for message in contents]
+        if not isinstance(contents, (list, tuple)):
+            contents = [contents]
+
+        prefix = self._prefix
+        keep = 0
+        limit = min(len(prefix), len(contents))
+        while keep < limit and prefix[keep][0] is contents[keep]:
+            keep += 1
+        del prefix[keep:]
+
+        for content in contents[keep:]:
+            prefix.append((content, encode_content(content)))
+
+        self.reused_messages += keep
+        self.encoded_messages += len(contents) - keep
+        return [encoded for _, encoded in prefix]
+
+    def encode_config(self, config: Optional[GenerateContentConfig]) -> bytes:
+        if self._config is None or self._config[0] is not config:
+            self._config = (config, encode_config(config))
+        return self._config[1]
+
+    def encode(self, contents: Any, config: Optional[GenerateContentConfig]) -> bytes:
+        """
+        Build the full ``generateContent`` request body.
+
+        Args:
+            contents: The conversation history (list of ``Content`` or ``CompactHistory``)
+            config: The generation config for the request
+
+        Returns:
+            bytes: The JSON request body
+        """
+        return (
+            b'{"contents":['
+            + b",".join(self.encode_contents(contents))
+            + b"]"
+            + self.encode_config(config)
+            + b"}"
+        )
+
+
+class PrefixCachingModels:
+    """
+    A drop-in for ``client.models`` that posts pre-encoded request bodies.
+
+    Only ``generate_content`` is provided; it returns a regular
+    ``GenerateContentResponse`` so ``response.text`` and
+    ``response.function_calls`` work exactly as with the SDK.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = API_BASE_URL,
+        timeout: float = 60.0,
+        http_client: Optional[httpx.Client] = None,
+    ):
+        """
+        Args:
+            api_key (str): Gemini API key
+            base_url (str): REST endpoint root
+            timeout (float): Request timeout in seconds
+            http_client (Optional[httpx.Client]): Client to reuse for connection pooling
+        """
+        self.base_url = base_url.rstrip("/")
+        self.http = http_client or httpx.Client(
+            timeout=timeout, headers={"x-goog-api-key": api_key}
+        )
+        self.encoder = PrefixEncoder()
+        # The encoder's prefix cache is shared by hedged requests on other threads
+        self._encode_lock = threading.Lock()
+
+    def generate_content(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> GenerateContentResponse:
+        with self._encode_lock:
+            body = self.encoder.encode(contents, config)
+        response = self.http.post(
+            f"{self.base_url}/models/{model}:generateContent",
+            content=body,
+            headers={"content-type": "application/json"},
+        )
+        errors.APIError.raise_for_response(response)
+        return types.GenerateContentResponse.model_validate(response.json())
+
+    def generate_content_stream(
+        self,
+        *,
+        model: str,
+        contents: Any,
+        config: Optional[GenerateContentConfig] = None,
+    ) -> Iterator[GenerateContentResponse]:
+        """Like ``generate_content``, yielding the response in chunks as they arrive (SSE)."""
+        with self._encode_lock:
+            body = self.encoder.encode(contents, config)
+        with self.http.stream(
+            "POST",
+            f"{self.base_url}/models/{model}:streamGenerateContent",
+            params={"alt": "sse"},
+            content=body,
+            headers={"content-type": "application/json"},
+        ) as response:
+            if response.status_code >= 400:
+                response.read()
+                errors.APIError.raise_for_response(response)
+            for line in response.iter_lines():
+                if line.startswith("data:"):
+                    yield types.GenerateContentResponse.model_validate_json(line[5:])
+
+
+def stream_content(
+    models: Any,
+    *,
+    model: str,
+    contents: Any,
+    config: Optional[GenerateContentConfig] = None,
+) -> Iterator[GenerateContentResponse]:
+    """
+    ``models.generate_content_stream`` if the models object streams, otherwise
+    one chunk holding the whole ``generate_content`` response (with a warning:
+    whatever reads the stream gains nothing).
+    """
+    # Looked up on the type: wrappers forward unknown attributes to the layer
+    # below, which would skip the wrapper itself
+    if getattr(type(models), "generate_content_stream", None) is None:
+        warnings.warn(
+            f"{type(models).__name__} has no generate_content_stream; "
+            "the response is read as a single chunk",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        yield models.generate_content(model=model, contents=contents, config=config)
+        return
+    yield from models.generate_content_stream(model=model, contents=contents, config=config)
+
+
+def join_chunks(chunks: List[GenerateContentResponse]) -> GenerateContentResponse:
+    """
+    The whole response of a stream: the parts of all chunks in streamed order,
+    with consecutive pieces of text joined back into one part each.
+    """
+    parts: List[Any] = []
+    texts: List[str] = []
+    for chunk in chunks:
+        candidate = chunk.candidates[0] if chunk.candidates else None
+        content = candidate.content if candidate is not None else None
+        for part in (content.parts if content is not None else None) or []:
+            if part.text is not None and not part.thought and not part.function_call:
+                texts.append(part.text)
+                continue
+            if texts:
+                parts.append(types.Part(text="".join(texts)))
+                texts = []
+            parts.append(part)
+    if texts:
+        parts.append(types.Part(text="".join(texts)))
+    last = chunks[-1] if chunks else None
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(
+                content=types.Content(role="model", parts=parts),
+                finish_reason=last.candidates[0].finish_reason
+                if last is not None and last.candidates
+                else None,
+            )
+        ],
+        usage_metadata=last.usage_metadata if last is not None else None,
+    )
+
+
+def _key_models(client: Any, api_key: str) -> Any:
+    """The layers that talk to the API with one key (see ``models_for``)."""
+    models = client.models
+    if env_flag("AGENT_PREFIX_CACHE"):
+        models = PrefixCachingModels(api_key)
+    if env_flag("AGENT_CONTEXT_CACHE"):
+        from agentkit.context_cache import ContextCachingModels
+
+        models = ContextCachingModels(models, client.caches)
+    return models
+
+
+def models_for(client: Any, api_key: str) -> Any:
+    """
+    Return the ``models`` object an entry point should call ``generate_content`` on.
+
+    Optional layers, each switched on by an environment variable:
+
+    - ``AGENT_PREFIX_CACHE=1``: post pre-encoded bodies via ``PrefixCachingModels``
+    - ``AGENT_CONTEXT_CACHE=1``: move the system prompt and tools into a cached
+      context via ``ContextCachingModels``
+    - ``API_KEYS=<key>,<key>``: spread requests over more API keys via
+      ``KeyPoolModels`` (see ``agentkit.key_pool``); each key gets its own
+      client and the two layers above
+    - ``AGENT_MODEL_FALLBACKS``, ``AGENT_HEDGE_PERCENTILE``,
+      ``AGENT_LATENCY_TARGET``: hedge slow requests and fall back to other
+      models via ``HedgedModels`` (see ``agentkit.hedging``)
+    - ``AGENT_CASSETTE=<file>``: record responses to, or replay them from, a
+      cassette via ``CassetteModels`` (see ``agentkit.cassette``)
+
+    With none of them set the SDK's ``client.models`` is returned unchanged.
+
+    Args:
+        client: The ``genai.Client`` created by the entry point
+        api_key (str): The API key the client was created with
+
+    Returns:
+        An object with a ``generate_content(model=, contents=, config=)`` method
+    """
+    from agentkit.cassette import cassette_for
+    from agentkit.hedging import hedged_models_for
+    from agentkit.key_pool import key_pool_for
+
+    def build(key: str) -> Any:
+        genai = lazy_import("google.genai")
+        return _key_models(genai.Client(api_key=key), key)
+
+    models = key_pool_for(api_key, _key_models(client, api_key), build)
+    models = hedged_models_for(models)
+
+    # Outermost, so cassette keys see the request as the agent made it
+    return cassette_for(models)
+
+
+class LazyModels:
+    """
+    The ``models`` object of the entry points.
+
+    The models stack (and with it the ``genai.Client`` and the SDK import) is
+    only built on the first ``generate_content`` call. Configs may be plain
+    dicts, so building them at start-up needs no SDK types; each dict is
+    validated into a ``GenerateContentConfig`` once and reused while the same
+    dict object is passed.
+    """
+
+    def __init__(self, build: Callable[[], Any]):
+        """
+        Args:
+            build: Returns the real ``models`` object (e.g. via ``models_for``)
+        """
+        self._build = build
+        self._models = None
+        self._lock = threading.Lock()
+        self._configs: Dict[int, Tuple[dict, GenerateContentConfig]] = {}
+
+    @property
+    def models(self) -> Any:
+        if self._models is None:
+            with self._lock:
+                if self._models is None:
+                    self._models = self._build()
+        return self._models
+
+    def _config(self, config: Any) -> Any:
+        if not isinstance(config, dict):
+            return config
+        cached = self._configs.get(id(config))
+        if cached is None or cached[0] is not config:
+            # Keep the dict referenced so its id() cannot be reused
+            cached = (config, types.GenerateContentConfig.model_validate(config))
+            self._configs[id(config)] = cached
+        return cached[1]
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None) -> Any:
+        return self.models.generate_content(
+            model=model, contents=contents, config=self._config(config)
+        )
+
+    def generate_content_stream(
+        self, *, model: str, contents: Any, config: Any = None
+    ) -> Iterator[GenerateContentResponse]:
+        return stream_content(
+            self.models, model=model, contents=contents, config=self._config(config)
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        # e.g. stats() of the wrapped layers
+        return getattr(self.models, name)
+
+
+def lazy_models(api_key: str) -> LazyModels:
+    """
+    Like ``models_for``, but create the ``genai.Client`` on the first call.
+
+    Args:
+        api_key (str): Gemini API key
+
+    Returns:
+        LazyModels: An object with ``generate_content(model=, contents=, config=)``
+    """
+
+    def build():
+        from agentkit.cassette import cassette_for, cassette_mode
+
+        if cassette_mode() == "replay":
+            # Everything comes from the cassette; no client is needed
+            return cassette_for(None)
+        genai = lazy_import("google.genai")
+        return models_for(genai.Client(api_key=api_key), api_key)
+
+    return LazyModels(build)
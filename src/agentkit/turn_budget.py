@@ -0,0 +1,239 @@
+"""
+Per-turn limits and cancellation for the function calling loops.
+
+Nothing stops a model that keeps asking for tools: every extra round trip
+re-sends the whole history and burns quota. A ``TurnBudget`` holds the limits
+for one agent; each turn gets a ``TurnGuard`` from ``budget.start()`` that the
+loop checks before every request and every tool call:
+
+- ``max_round_trips``: ``generate_content`` calls per turn
+- ``deadline_seconds``: wall-clock time per turn
+- ``max_tool_calls``: tools executed per turn
+- ``max_tokens``: total tokens reported by ``usage_metadata`` per turn
+
+Checks are cooperative: an in-flight request or tool call is not interrupted,
+the turn stops at the next check. ``guard.cancel()`` (from another thread, an
+API call or a Ctrl-C handler) stops it the same way.
+
+A stopped turn must not leave the history half-written, or the next request
+is rejected or confuses the model. ``end_stopped_turn`` answers any function
+call that has no response yet and closes the turn with a model message saying
+why it stopped.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from agentkit.startup import lazy_import
+
+if TYPE_CHECKING:
+    from google.genai.types import GenerateContentResponse
+
+types = lazy_import("google.genai.types")
+
+DEFAULT_MAX_ROUND_TRIPS = 20
+
+REASONS = ("round_trips", "deadline", "tool_calls", "tokens", "cancelled")
+
+_MESSAGES = {
+    "round_trips": "it reached the limit of {limit} model calls",
+    "deadline": "it ran past its {limit:g} second deadline",
+    "tool_calls": "it reached the limit of {limit} tool calls",
+    "tokens": "it used more than {limit:,} tokens",
+    "cancelled": "it was cancelled",
+}
+
+
+class TurnStopped(Exception):
+    """Raised by a ``TurnGuard`` check when the turn must stop."""
+
+    def __init__(self, reason: str, limit: Any = None):
+        self.reason = reason
+        self.limit = limit
+        super().__init__("Turn stopped because " + _MESSAGES[reason].format(limit=limit))
+
+
+class TurnGuard:
+    """The budget of one turn in progress."""
+
+    def __init__(self, budget: "TurnBudget"):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.round_trips = 0
+        self.tool_calls = 0
+        self.tokens = 0
+        self._cancelled = threading.Event()
+        self.stopped: Optional[TurnStopped] = None
+
+    def cancel(self) -> None:
+        """Ask the turn to stop at its next check; safe from any thread."""
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def _stop(self, reason: str, limit: Any = None) -> None:
+        self.stopped = TurnStopped(reason, limit)
+        self.budget.metrics[reason] += 1
+        raise self.stopped
+
+    def _check_common(self) -> None:
+        budget = self.budget
+        if self._cancelled.is_set():
+            self._stop("cancelled")
+        if budget.deadline_seconds is not None and self.elapsed() > budget.deadline_seconds:
+            self._stop("deadline", budget.deadline_seconds)
+        if budget.max_tokens is not None and self.tokens > budget.max_tokens:
+            self._stop("tokens", budget.max_tokens)
+
+    def before_request(self) -> None:
+        """
+        Check the budget before a ``generate_content`` call.
+
+        Raises:
+            TurnStopped: If the turn is over a limit or was cancelled
+        """
+        self._check_common()
+        budget = self.budget
+        if budget.max_round_trips is not None and self.round_trips >= budget.max_round_trips:
+            self._stop("round_trips", budget.max_round_trips)
+        self.round_trips += 1
+        budget.metrics["round_trips_total"] += 1
+
+    def after_response(self, response: GenerateContentResponse) -> None:
+        """Add the tokens a response reports to the turn's total."""
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and usage.total_token_count:
+            self.tokens += usage.total_token_count
+
+    def before_tool_call(self) -> None:
+        """
+        Check the budget before running a tool.
+
+        Raises:
+            TurnStopped: If the turn is over a limit or was cancelled
+        """
+        self._check_common()
+        budget = self.budget
+        if budget.max_tool_calls is not None and self.tool_calls >= budget.max_tool_calls:
+            self._stop("tool_calls", budget.max_tool_calls)
+        self.tool_calls += 1
+
+    def finish(self) -> None:
+        """Record a turn that ended normally."""
+        self.budget.metrics["completed"] += 1
+
+    def interrupted(self) -> TurnStopped:
+        """Record a Ctrl-C during the turn; returns the stop to report."""
+        self.stopped = TurnStopped("cancelled")
+        self.budget.metrics["cancelled"] += 1
+        return self.stopped
+
+
+class TurnBudget:
+    """
+    Limits applied to every turn of an agent, plus counts of how often each
+    one stopped a turn. ``None`` means no limit.
+    """
+
+    def __init__(
+        self,
+        max_round_trips: Optional[int] = DEFAULT_MAX_ROUND_TRIPS,
+        deadline_seconds: Optional[float] = None,
+        max_tool_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+    ):
+        """
+        Args:
+            max_round_trips (Optional[int]): Model calls per turn
+            deadline_seconds (Optional[float]): Wall-clock seconds per turn
+            max_tool_calls (Optional[int]): Tool calls per turn
+            max_tokens (Optional[int]): Total tokens per turn, from ``usage_metadata``
+        """
+        self.max_round_trips = max_round_trips
+        self.deadline_seconds = deadline_seconds
+        self.max_tool_calls = max_tool_calls
+        self.max_tokens = max_tokens
+        self.metrics: Dict[str, int] = {
+            "turns": 0,
+            "completed": 0,
+            "round_trips_total": 0,
+            **{reason: 0 for reason in REASONS},
+        }
+
+    def start(self) -> TurnGuard:
+        """Begin a turn."""
+        self.metrics["turns"] += 1
+        return TurnGuard(self)
+
+    def summary(self) -> str:
+        stopped = ", ".join(
+            f"{reason} {self.metrics[reason]}" for reason in REASONS if self.metrics[reason]
+        )
+        return (
+            f"{self.metrics['turns']} turns, {self.metrics['round_trips_total']} model calls, "
+            f"stopped: {stopped or 'none'}"
+        )
+
+
+def end_stopped_turn(contents: list, stopped: TurnStopped) -> str:
+    """
+    Leave the history consistent after a turn was stopped.
+
+    Answers function calls at the end of the history that have no response
+    yet, then closes the turn with a model message saying why it stopped.
+
+    Returns:
+        str: The closing message, to show to the user
+    """
+    last = contents[-1] if contents else None
+    if last is not None and last.role == "model":
+        calls = [part.function_call for part in last.parts or [] if part.function_call]
+        if calls:
+            contents.append(
+                types.Content(
+                    role="user",
+                    parts=[
+                        types.Part.from_function_response(
+                            name=call.name, response={"error": str(stopped)}
+                        )
+                        for call in calls
+                    ],
+                )
+            )
+    message = f"[{stopped}. Ask again to continue.]"
+    contents.append(types.Content(role="model", parts=[types.Part(text=message)]))
+    return message
+
+
+def _limit(name: str, cast, default=None):
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    value = cast(value)
+    return value if value > 0 else None
+
+
+def turn_budget_for() -> TurnBudget:
+    """
+    Build the per-turn budget from environment variables (0 disables a limit).
+
+    - ``AGENT_MAX_ROUND_TRIPS``: model calls per turn (default 20)
+    - ``AGENT_TURN_DEADLINE``: seconds per turn
+    - ``AGENT_MAX_TOOL_CALLS``: tool calls per turn
+    - ``AGENT_MAX_TURN_TOKENS``: total tokens per turn
+    """
+    return TurnBudget(
+        max_round_trips=_limit("AGENT_MAX_ROUND_TRIPS", int, DEFAULT_MAX_ROUND_TRIPS),
+        deadline_seconds=_limit("AGENT_TURN_DEADLINE", float),
+        max_tool_calls=_limit("AGENT_MAX_TOOL_CALLS", int),
+        max_tokens=_limit("AGENT_MAX_TURN_TOKENS", int),
+    )
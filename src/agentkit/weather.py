@@ -0,0 +1,352 @@
+"""
+Weather providers behind the ``get_weather`` tool.
+
+The workshop tools answer from mock data. Backed by a real service, every
+``get_weather`` call becomes an HTTP round trip inside the chaining loop, and
+a turn comparing four cities makes four of them. ``HttpWeatherProvider``
+keeps that cost down:
+
+- one pooled ``httpx.AsyncClient``: keep-alive connections, at most
+  ``max_connections`` of them
+- lookups that arrive within ``batch_window`` seconds of each other go out
+  as one upstream request for all their cities, and a city already being
+  fetched is not requested twice
+- a stale-while-revalidate cache: answers younger than ``fresh_for`` seconds
+  are served as they are; for ``stale_for`` seconds after that they are still
+  served at once while a background request refreshes them. When the service
+  fails or times out, a cached answer of any age (marked ``"stale": True``) is
+  returned rather than an error
+- every upstream request is given up after ``timeout`` seconds
+
+Providers are async (``fetch``). The synchronous tools call ``get``, which
+runs the lookup on a shared event loop thread, so the server's worker threads
+share one connection pool, one cache and the same batches.
+
+The upstream API is ``GET <url>/v1/current?city=a&city=b`` answering
+``{"weather": {"a": {...}, "b": {...}}}``; ``python -m agentkit.weather_stub``
+serves it locally. For another service, override ``HttpWeatherProvider.request``.
+
+Set ``WEATHER_API_URL`` to use the service; unset, the tools keep their mock
+data.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from agentkit.startup import lazy_import
+
+httpx = lazy_import("httpx")
+
+Weather = Dict[str, Any]
+
+
+class WeatherUnavailable(RuntimeError):
+    """The service gave no weather for a city and none is cached."""
+
+
+def normalize(location: str) -> str:
+    """Cache and request key of a city: lower case, single spaces."""
+    return " ".join(location.lower().split())
+
+
+_loop_lock = threading.Lock()
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """The event loop that runs ``WeatherProvider.get`` lookups, started on first use."""
+    global _loop, _loop_thread
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            _loop_thread = threading.Thread(
+                target=_loop.run_forever, name="weather-loop", daemon=True
+            )
+            _loop_thread.start()
+        return _loop
+
+
+class WeatherProvider:
+    """
+    Looks up the current weather of cities.
+
+    Subclasses implement ``fetch``. A provider belongs to one event loop:
+    either call ``get`` from threads, or ``await fetch`` from a single loop.
+    """
+
+    async def fetch(self, locations: Sequence[str]) -> Dict[str, Weather]:
+        """
+        Look up several cities at once.
+
+        Args:
+            locations (Sequence[str]): City names
+
+        Returns:
+            Dict[str, Weather]: Weather per ``normalize``-d city name
+
+        Raises:
+            WeatherUnavailable: If a city could not be looked up
+        """
+        raise NotImplementedError
+
+    def get(self, location: str) -> Weather:
+        """
+        Blocking lookup of one city, for the synchronous tools.
+
+        Args:
+            location (str): The city name
+
+        Returns:
+            Weather: A dictionary with temperature, condition, humidity, wind_speed and unit
+        """
+        if threading.current_thread() is _loop_thread:
+            raise RuntimeError("WeatherProvider.get blocks; await fetch() on the event loop")
+        key = normalize(location)
+        future = asyncio.run_coroutine_threadsafe(self.fetch([key]), _background_loop())
+        return future.result()[key]
+
+    async def aclose(self) -> None:
+        """Release connections; the provider is unusable afterwards."""
+
+    def close(self) -> None:
+        """``aclose`` for a provider used through ``get``."""
+        if _loop is not None:
+            asyncio.run_coroutine_threadsafe(self.aclose(), _loop).result()
+
+
+def _retrieve(future: asyncio.Future) -> None:
+    # Background refreshes are never awaited; keep their errors out of the loop's log
+    if not future.cancelled():
+        future.exception()
+
+
+class HttpWeatherProvider(WeatherProvider):
+    """
+    Weather from an HTTP service, with pooling, batching and a stale-while-revalidate cache.
+
+    Example:
+        provider = HttpWeatherProvider("http://127.0.0.1:8081")
+        provider.get("Auckland")          # from a thread
+        await provider.fetch(["Tokyo", "London"])  # from the provider's event loop
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 2.0,
+        max_connections: int = 16,
+        batch_window: float = 0.005,
+        max_batch: int = 25,
+        fresh_for: float = 300.0,
+        stale_for: float = 3600.0,
+        max_entries: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            base_url (str): Root of the weather service
+            timeout (float): Seconds before an upstream request is given up
+            max_connections (int): Size of the connection pool
+            batch_window (float): Seconds a lookup waits for others to share its request
+            max_batch (int): Most cities in one upstream request
+            fresh_for (float): Seconds an answer is served without asking again
+            stale_for (float): Seconds after that it is served while being refreshed
+            max_entries (int): Cities kept in the cache (oldest answers go first)
+            clock: Time source for the cache, e.g. a fake clock in tests
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.fresh_for = fresh_for
+        self.stale_for = stale_for
+        self.max_entries = max_entries
+        self.clock = clock
+
+        self._client: Optional[httpx.AsyncClient] = None
+        # city -> (fetched at, weather), oldest answer first
+        self._cache: Dict[str, Tuple[float, Weather]] = {}
+        # city -> outcome of the request it is queued for or in flight in
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._queued: List[str] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._requests: Set[asyncio.Task] = set()
+        self.metrics: Dict[str, int] = {
+            "lookups": 0,
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "upstream_requests": 0,
+            "upstream_cities": 0,
+            "timeouts": 0,
+            "errors": 0,
+            "stale_on_error": 0,
+        }
+
+    def _http(self) -> httpx.AsyncClient:
+        # Created on the loop that uses it; httpx ties its connections to that loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def request(self, cities: List[str]) -> Dict[str, Weather]:
+        """
+        One upstream request for ``cities``; override to talk to another service.
+
+        Args:
+            cities (List[str]): Normalized city names, at most ``max_batch``
+
+        Returns:
+            Dict[str, Weather]: Weather per city; missing cities count as unavailable
+        """
+        response = await self._http().get(
+            f"{self.base_url}/v1/current", params=[("city", city) for city in cities]
+        )
+        response.raise_for_status()
+        return response.json()["weather"]
+
+    async def fetch(self, locations: Sequence[str]) -> Dict[str, Weather]:
+        now = self.clock()
+        results: Dict[str, Weather] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        for location in locations:
+            key = normalize(location)
+            self.metrics["lookups"] += 1
+            cached = self._cache.get(key)
+            age = now - cached[0] if cached is not None else None
+            if age is not None and age < self.fresh_for:
+                self.metrics["fresh_hits"] += 1
+                results[key] = dict(cached[1])
+            elif age is not None and age < self.fresh_for + self.stale_for:
+                # Serve it now; a failed refresh leaves the stale answer in place
+                self.metrics["stale_hits"] += 1
+                results[key] = dict(cached[1])
+                self._lookup(key)
+            else:
+                self.metrics["misses"] += 1
+                waiting[key] = self._lookup(key)
+
+        for key, future in waiting.items():
+            try:
+                # Shielded: a caller that gives up does not fail the batch for the others
+                results[key] = dict(await asyncio.shield(future))
+            except WeatherUnavailable:
+                cached = self._cache.get(key)
+                if cached is None:
+                    raise
+                self.metrics["stale_on_error"] += 1
+                results[key] = {**cached[1], "stale": True}
+        return results
+
+    def _lookup(self, key: str) -> asyncio.Future:
+        """Queue ``key`` for the next upstream request, unless it is already on its way."""
+        future = self._pending.get(key)
+        if future is not None:
+            return future
+        loop = asyncio.get_running_loop()
+        future = self._pending[key] = loop.create_future()
+        future.add_done_callback(_retrieve)
+        self._queued.append(key)
+        if len(self._queued) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        cities, self._queued = self._queued, []
+        if cities:
+            task = asyncio.get_running_loop().create_task(self._request(cities))
+            self._requests.add(task)
+            task.add_done_callback(self._requests.discard)
+
+    async def _request(self, cities: List[str]) -> None:
+        self.metrics["upstream_requests"] += 1
+        self.metrics["upstream_cities"] += len(cities)
+        weather: Dict[str, Weather] = {}
+        error = "not in the response"
+        try:
+            weather = await asyncio.wait_for(self.request(cities), self.timeout)
+        except (asyncio.TimeoutError, httpx.TimeoutException):
+            self.metrics["timeouts"] += 1
+            error = f"timed out after {self.timeout:g}s"
+        except (httpx.HTTPError, ValueError, KeyError) as e:
+            self.metrics["errors"] += 1
+            error = f"{type(e).__name__}: {e}"
+
+        now = self.clock()
+        for city in cities:
+            future = self._pending.pop(city)
+            found = weather.get(city)
+            if found is None:
+                future.set_exception(WeatherUnavailable(f"No weather for {city!r}: {error}"))
+                continue
+            self._cache.pop(city, None)
+            self._cache[city] = (now, found)
+            future.set_result(found)
+        while len(self._cache) > self.max_entries:
+            del self._cache[next(iter(self._cache))]
+
+    async def aclose(self) -> None:
+        for task in list(self._requests):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def summary(self) -> str:
+        m = self.metrics
+        hits = m["fresh_hits"] + m["stale_hits"]
+        hit_rate = hits / m["lookups"] if m["lookups"] else 0.0
+        per_request = m["upstream_cities"] / m["upstream_requests"] if m["upstream_requests"] else 0.0
+        return (
+            f"{m['lookups']} lookups, {hit_rate:.0%} from cache ({m['stale_hits']} stale), "
+            f"{m['upstream_requests']} upstream requests ({per_request:.1f} cities each), "
+            f"{m['timeouts']} timeouts, {m['errors']} errors, "
+            f"{m['stale_on_error']} stale answers on failure"
+        )
+
+
+_providers_lock = threading.Lock()
+_providers: Dict[str, WeatherProvider] = {}
+
+
+def weather_provider_for() -> Optional[WeatherProvider]:
+    """
+    The ``HttpWeatherProvider`` configured by ``WEATHER_API_URL``, shared by every caller.
+
+    ``WEATHER_TIMEOUT`` (seconds, default 2), ``WEATHER_FRESH_SECONDS``
+    (default 300) and ``WEATHER_STALE_SECONDS`` (default 3600) tune it.
+
+    Returns:
+        Optional[WeatherProvider]: None when ``WEATHER_API_URL`` is unset
+    """
+    url = os.getenv("WEATHER_API_URL", "").strip()
+    if not url:
+        return None
+    with _providers_lock:
+        provider = _providers.get(url)
+        if provider is None:
+            provider = _providers[url] = HttpWeatherProvider(
+                url,
+                timeout=float(os.getenv("WEATHER_TIMEOUT", "2")),
+                fresh_for=float(os.getenv("WEATHER_FRESH_SECONDS", "300")),
+                stale_for=float(os.getenv("WEATHER_STALE_SECONDS", "3600")),
+            )
+        return provider
@@ -0,0 +1,228 @@
+"""
+A local stand-in for a weather service, for tests and benchmarks.
+
+Speaks the API ``agentkit.weather.HttpWeatherProvider`` expects::
+
+    GET /v1/current?city=auckland&city=tokyo -> {"weather": {"auckland": {...}, ...}}
+    GET /stats                               -> request, connection and city counts
+
+The workshop's cities (as "tokyo" or "tokyo, japan") answer with the tools'
+mock data; any other city, "london, canada" included, gets made-up but stable
+weather. A request takes ``latency`` seconds plus ``per_city`` per city, a new
+connection ``handshake`` seconds more (a TLS handshake to a remote service),
+and a ``fail_rate`` fraction of requests answers 503. Connections are kept
+alive, so a pooled client reuses them.
+
+Usage:
+    python -m agentkit.weather_stub [--port 8081] [--latency 0.05] [--handshake 0.02]
+
+then ``WEATHER_API_URL=http://127.0.0.1:8081`` for the agents.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+import zlib
+from typing import Any, Dict, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+KNOWN = {
+    "auckland, new zealand": (18, "sunny", 45, 8),
+    "wellington, new zealand": (15, "partly cloudy", 60, 12),
+    "sydney, australia": (25, "sunny", 50, 10),
+    "london, united kingdom": (10, "rainy", 85, 15),
+    "tokyo, japan": (22, "clear", 40, 5),
+}
+# Without a country, the cities people usually mean
+KNOWN.update({city.split(",")[0]: weather for city, weather in list(KNOWN.items())})
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    503: "Service Unavailable",
+}
+
+CONDITIONS = ["sunny", "clear", "partly cloudy", "cloudy", "rainy", "windy"]
+
+
+def stub_weather(city: str) -> Dict[str, Any]:
+    """The stub's weather for ``city``: mock data, or derived from the name."""
+    known = KNOWN.get(city)
+    if known is None:
+        seed = zlib.crc32(city.encode("utf-8"))
+        known = (seed % 35 - 5, CONDITIONS[seed % len(CONDITIONS)], 30 + seed % 60, seed % 25)
+    temperature, condition, humidity, wind_speed = known
+    return {
+        "temperature": temperature,
+        "condition": condition,
+        "humidity": humidity,
+        "wind_speed": wind_speed,
+        "unit": "celsius",
+    }
+
+
+class StubWeatherServer:
+    """
+    Serves ``stub_weather`` over HTTP/1.1 with keep-alive.
+
+    Example:
+        stub = StubWeatherServer(latency=0.05)
+        url = stub.start_in_thread()
+        ...
+        stub.stop()
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.05,
+        per_city: float = 0.0,
+        handshake: float = 0.0,
+        fail_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        """
+        Args:
+            latency (float): Seconds per request; may be changed while serving
+            per_city (float): Extra seconds per city in the request
+            handshake (float): Extra seconds before the first request of a connection
+            fail_rate (float): Fraction of requests answered with 503
+            seed (int): Seeds the failures
+        """
+        self.latency = latency
+        self.per_city = per_city
+        self.handshake = handshake
+        self.fail_rate = fail_rate
+        self._random = random.Random(seed)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._handlers: Set[asyncio.Task] = set()
+        self.metrics: Dict[str, int] = {"requests": 0, "connections": 0, "cities": 0, "failed": 0}
+
+    async def _respond(self, target: str) -> Tuple[int, Any]:
+        url = urlsplit(target)
+        if url.path == "/stats":
+            return 200, self.metrics
+        if url.path != "/v1/current":
+            return 404, {"error": f"No route for {url.path}"}
+        cities = parse_qs(url.query).get("city", [])
+        if not cities:
+            return 400, {"error": "Pass one or more ?city="}
+        self.metrics["requests"] += 1
+        self.metrics["cities"] += len(cities)
+        await asyncio.sleep(self.latency + self.per_city * len(cities))
+        if self.fail_rate and self._random.random() < self.fail_rate:
+            self.metrics["failed"] += 1
+            return 503, {"error": "Service unavailable"}
+        return 200, {"weather": {city: stub_weather(city) for city in cities}}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.metrics["connections"] += 1
+        self._handlers.add(asyncio.current_task())
+        try:
+            if self.handshake:
+                await asyncio.sleep(self.handshake)
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, target, _ = lines[0].split(" ", 2)
+                length = 0
+                for line in lines[1:]:
+                    if line.lower().startswith("content-length:"):
+                        length = int(line.split(":", 1)[1])
+                if length:
+                    await reader.readexactly(length)
+                if method.upper() == "GET":
+                    status, payload = await self._respond(target)
+                else:
+                    status, payload = 405, {"error": f"{method} not allowed"}
+                body = json.dumps(payload).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1")
+                    + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            # Stopped by close(); ending quietly keeps asyncio from logging it
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> int:
+        """Start listening; returns the bound port (useful with ``port=0``)."""
+        self._server = await asyncio.start_server(self._handle, host, port, backlog=1024)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            # Idle keep-alive connections would hold wait_closed() open
+            handlers = list(self._handlers)
+            for task in handlers:
+                task.cancel()
+            await asyncio.gather(*handlers, return_exceptions=True)
+            await self._server.wait_closed()
+
+    def start_in_thread(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """
+        Serve from a daemon thread with its own event loop.
+
+        Returns:
+            str: The base URL, e.g. for ``HttpWeatherProvider``
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="weather-stub", daemon=True
+        )
+        self._thread.start()
+        port = asyncio.run_coroutine_threadsafe(self.start(host, port), self._loop).result()
+        return f"http://{host}:{port}"
+
+    def stop(self) -> None:
+        """Stop a server started with ``start_in_thread``."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve stub weather for HttpWeatherProvider")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-city", type=float, default=0.0)
+    parser.add_argument("--handshake", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    stub = StubWeatherServer(args.latency, args.per_city, args.handshake, args.fail_rate)
+
+    async def serve():
+        port = await stub.start(args.host, args.port)
+        print(f"\n🌦️  Stub weather service on http://{args.host}:{port}")
+        try:
+            await stub._server.serve_forever()
+        finally:
+            await stub.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
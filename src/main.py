@@ -7,13 +7,23 @@ This script creates a basic chat agent using Google's Gemini API.
 import os
 import sys
 from dotenv import load_dotenv
-from google import genai
-from google.genai.types import Content, Part, GenerateContentConfig
+from agentkit.env import model_name_for
+from agentkit.profiling import profiled_input, session_profiler_for
+from agentkit.session_store import open_history
+from agentkit.startup import handle_startup_flags, lazy_import, stop_after_startup
+from agentkit.transport import lazy_models
 
-# Load environment variables
-load_dotenv()
+# The SDK is imported on first use, so the agent starts without waiting for it
+types = lazy_import("google.genai.types")
 
 def main():
+    # --profile-startup prints an import-time breakdown instead of chatting
+    if handle_startup_flags(__file__):
+        return
+
+    # Load environment variables
+    load_dotenv()
+
     # Get the API key from environment variables
     # Hint: Use os.getenv() to get the API_KEY environment variable
     # If it's not set, print an error message and exit
@@ -24,8 +34,10 @@ def main():
         sys.exit(1)
     
     # Initialize the Gemini client with your API key
-    # Hint: Use genai.Client() with the api_key field
-    client = genai.Client(api_key=api_key)  # Replace with your code
+    # genai.Client(api_key=api_key).models is what sends requests; lazy_models
+    # does exactly that, but only when the first message is sent, so the agent
+    # starts without waiting for the SDK to load
+    models = lazy_models(api_key)
     
     # Define a system prompt for your agent
     # This determines your agent's personality and capabilities
@@ -45,17 +57,21 @@ def main():
     # Create a configuration for the Gemini client
     # Hint: Use GenerateContentConfig with your system prompt
     # For safety settings, we recommend using the default values
-    config = GenerateContentConfig(
-        system_instruction=SYSTEM_PROMPT,
-    ) 
+    # (a plain dict works too and needs no SDK types at start-up)
+    config = {"system_instruction": SYSTEM_PROMPT}
     
     # Model name to use
-    model_name = "gemini-2.0-flash"  # A good default model for chat
+    model_name = model_name_for("gemini-2.0-flash")  # A good default model for chat
     
-    # Initialize the conversation history
-    contents = []
+    # Initialize the conversation history (resumed from disk if AGENT_SESSION_ID is set)
+    contents = open_history()
     
     print("\n🤖 Welcome to your Gemini Chat Agent! Type 'exit' to quit.")
+    if stop_after_startup():
+        return
+    
+    # --profile (or AGENT_PROFILE=1) records cProfile and tracemalloc data per turn
+    profiler = session_profiler_for(__file__)
     
     # Implement the chat loop
     # Hint: This should:
@@ -70,7 +86,7 @@ def main():
 
     while True:
         try:
-            user_input = input("\n👤 You: ").strip()
+            user_input = profiled_input("\n👤 You: ", profiler, contents).strip()
             
             if user_input.lower() in ["exit", "quit"]:
                 print("\n👋 Goodbye!")
@@ -81,22 +97,22 @@ def main():
                 continue
 
             # Add user input to conversation history
-            contents.append(Content(role="user", parts=[Part(text=user_input)]))
+            contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
             
             # Send the request to Gemini and get a response
-            response = client.models.generate_content(
+            response = models.generate_content(
                 model=model_name, contents=contents, config=config
             )
             
             # Add the response to conversation history
-            contents.append(Content(role="model", parts=[Part(text=response.text)]))
+            contents.append(types.Content(role="model", parts=[types.Part(text=response.text)]))
             
             # Print the response
             print(f"\n🤖 Gemini: {response.text.strip()}")
 
             # Clear the conversation history if it gets too long
             if len(contents) > 10:
-                contents = contents[-10:]
+                del contents[:-10]
             
         except Exception as e:
             print(f"\n❌ Error: {str(e)}")
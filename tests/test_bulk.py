@@ -0,0 +1,77 @@
+"""BulkRunner against FakeBatches: input order, resubmission and error records."""
+
+import io
+import json
+
+from google.genai import errors
+
+from agentkit.bulk import BulkRunner
+from agentkit.fake import FakeBatches, FakeModels, text_response
+
+MODEL = "gemini-2.0-flash"
+
+
+class Clock:
+    """Time that only moves when the runner sleeps."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def echo(contents, config):
+    prompt = contents[-1].parts[0].text
+    if prompt == "blocked":
+        raise errors.ClientError(400, {"error": {"code": 400, "message": "blocked prompt"}})
+    return text_response(f"Echo: {prompt}")
+
+
+def run(prompts, durations=None, fail_jobs=0, **kwargs):
+    clock = Clock()
+    batches = FakeBatches(
+        FakeModels(echo),
+        duration=(lambda: next(durations)) if durations else 1.0,
+        fail_jobs=fail_jobs,
+        clock=clock,
+    )
+    runner = BulkRunner(
+        batches, MODEL, poll_interval=1.0, sleep=clock.sleep, clock=clock, **kwargs
+    )
+    sink = io.StringIO()
+    metrics = runner.run(prompts, sink)
+    return [json.loads(line) for line in sink.getvalue().splitlines()], metrics, batches
+
+
+def test_records_are_written_in_input_order():
+    prompts = [f"prompt {i}" for i in range(10)]
+    # Later jobs finish first
+    records, metrics, _ = run(prompts, durations=iter([9.0, 5.0, 1.0, 3.0]), batch_size=3)
+    assert [record["index"] for record in records] == list(range(10))
+    assert [record["text"] for record in records] == [f"Echo: {p}" for p in prompts]
+    assert metrics["jobs"] == 4
+    assert metrics["errors"] == 0
+
+
+def test_failed_jobs_are_resubmitted():
+    records, metrics, batches = run(["a", "b", "c", "d"], fail_jobs=1, batch_size=2)
+    assert [record["text"] for record in records] == ["Echo: a", "Echo: b", "Echo: c", "Echo: d"]
+    assert metrics["resubmissions"] == 1
+    assert metrics["submissions"] == batches.created == 3
+
+
+def test_errors_become_records():
+    # One request the model refuses, and a job that fails on every attempt
+    records, metrics, _ = run(["a", "blocked", "c", "d"], fail_jobs=3, batch_size=2)
+    assert [record["index"] for record in records] == [0, 1, 2, 3]
+    assert records[0]["error"] == records[1]["error"] == "JOB_STATE_FAILED"
+    assert [records[2].get("text"), records[3].get("text")] == ["Echo: c", "Echo: d"]
+
+    records, metrics, _ = run(["a", "blocked", "c"])
+    assert [record.get("text") for record in records] == ["Echo: a", None, "Echo: c"]
+    assert "blocked prompt" in records[1]["error"]
+    assert metrics["errors"] == 1
@@ -0,0 +1,114 @@
+"""ContextCachingModels against the in-process fake API."""
+
+import pytest
+from google.genai import errors
+from google.genai.types import GenerateContentConfig
+
+from agentkit.context_cache import ContextCachingModels
+from agentkit.fake import FakeCaches, FakeModels, text_response
+
+MODEL = "gemini-2.0-flash"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FlakyCaches(FakeCaches):
+    """Fails ``create`` with the given status codes before behaving normally."""
+
+    def __init__(self, codes, **kwargs):
+        super().__init__(**kwargs)
+        self.codes = list(codes)
+        self.attempts = 0
+
+    def create(self, *, model, config):
+        self.attempts += 1
+        if self.codes:
+            code = self.codes.pop(0)
+            error = errors.ServerError if code >= 500 else errors.ClientError
+            raise error(code, {"error": {"code": code, "message": "fail", "status": "X"}})
+        return super().create(model=model, config=config)
+
+
+def config(words):
+    return GenerateContentConfig(system_instruction="word " * words)
+
+
+def session(caches, clock, **kwargs):
+    models = FakeModels(lambda contents, config: text_response("ok"), caches=caches)
+    return ContextCachingModels(models, caches, ttl_seconds=600, clock=clock, **kwargs)
+
+
+def send(cached, cfg, times=1):
+    for _ in range(times):
+        cached.generate_content(model=MODEL, contents=["hi"], config=cfg)
+
+
+def test_small_context_is_sent_unchanged_without_trying():
+    clock = Clock()
+    caches = FlakyCaches([], clock=clock)
+    cached = session(caches, clock)
+    send(cached, config(100), times=3)
+    assert caches.attempts == 0
+    assert cached.stats()["caches_created"] == 0
+    assert cached.stats()["cached_tokens"] == 0
+
+
+def test_large_context_is_cached_once_and_recreated_after_expiry():
+    clock = Clock()
+    caches = FakeCaches(clock=clock)
+    cached = session(caches, clock)
+    cfg = config(5000)
+    send(cached, cfg, times=3)
+    assert cached.caches_created == 1
+    assert cached.cached_tokens > 0
+    clock.now += 601
+    send(cached, cfg)
+    assert cached.caches_created == 2
+
+
+def test_fake_rejects_contexts_below_the_minimum():
+    with pytest.raises(errors.ClientError) as raised:
+        FakeCaches().create(model=MODEL, config=config(100))
+    assert raised.value.code == 400
+
+
+def test_transient_errors_are_retried_with_backoff():
+    clock = Clock()
+    caches = FlakyCaches([503, 429], clock=clock)
+    cached = session(caches, clock, retry_delay=1.0)
+    cfg = config(5000)
+
+    send(cached, cfg)
+    assert (caches.attempts, cached.caches_created) == (1, 0)
+    send(cached, cfg)  # still backing off: sent uncached, not tried
+    assert caches.attempts == 1
+
+    clock.now += 1.0
+    send(cached, cfg)  # 429: the delay doubles
+    assert caches.attempts == 2
+    clock.now += 1.0
+    send(cached, cfg)
+    assert caches.attempts == 2
+
+    clock.now += 1.0
+    send(cached, cfg)
+    assert (caches.attempts, cached.caches_created) == (3, 1)
+    assert cached.stats()["create_errors"] == 2
+
+
+def test_client_errors_are_permanent():
+    clock = Clock()
+    caches = FlakyCaches([400], clock=clock)
+    cached = session(caches, clock)
+    cfg = config(5000)
+    send(cached, cfg)
+    clock.now += 3600
+    send(cached, cfg, times=2)
+    assert caches.attempts == 1
+    assert cached.stats()["uncached_configs"] == 1
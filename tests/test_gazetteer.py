@@ -0,0 +1,47 @@
+"""Which city a place name resolves to, and the weather the tools return for it."""
+
+import importlib.util
+import os
+
+import pytest
+
+from agentkit.gazetteer import Gazetteer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def gazetteer():
+    return Gazetteer.bundled()
+
+
+def test_countries_pick_the_city(gazetteer):
+    assert str(gazetteer.resolve("London").place) == "London, United Kingdom"
+    assert str(gazetteer.resolve("London, Canada").place) == "London, Canada"
+    assert str(gazetteer.resolve("Paris, Texas, USA").place) == "Paris, United States"
+
+
+def test_a_qualifier_that_is_not_a_country_is_not_dropped(gazetteer):
+    resolution = gazetteer.resolve("Paris, Texas")
+    assert resolution.place is None
+    assert resolution.candidates == ["Paris, France", "Paris, United States"]
+
+
+@pytest.mark.parametrize("module", ["module2", "module3"])
+def test_weather_is_for_the_city_it_names(module, monkeypatch):
+    monkeypatch.delenv("WEATHER_API_URL", raising=False)
+    path = os.path.join(REPO_ROOT, "workshop", module, "solution", "tools.py")
+    spec = importlib.util.spec_from_file_location(f"{module}_tools", path)
+    tools = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(tools)
+
+    london = tools.get_weather("London")
+    assert london["location"] == "London, United Kingdom"
+    assert london["condition"] == "rainy"
+    # Not the mock data of London, United Kingdom under another name
+    canada = tools.get_weather("London, Canada")
+    assert canada["location"] == "London, Canada"
+    assert canada["condition"] != "rainy"
+    texas = tools.get_weather("Paris, Texas")
+    assert "location" not in texas
+    assert texas["did_you_mean"] == ["Paris, France", "Paris, United States"]
@@ -0,0 +1,65 @@
+"""HedgedModels routing of simple turns, and its counters under concurrency."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai import errors
+from google.genai.types import Content, FunctionResponse, Part
+
+from agentkit.compact_history import Message
+from agentkit.fake import FakeModels, text_response
+from agentkit.hedging import HedgedModels, simple_turn
+
+PRIMARY = "gemini-2.0-flash"
+LITE = "gemini-2.0-flash-lite"
+
+
+def user(text):
+    return Content(role="user", parts=[Part(text=text)])
+
+
+def test_simple_turns_are_short_user_texts():
+    assert simple_turn([user("Weather in Oslo?")])
+    assert simple_turn([Message.from_content(user("Weather in Oslo?"))])
+    assert not simple_turn([user("x" * 121)])
+    assert simple_turn([user("x" * 121)], max_chars=200)
+    tool_result = Content(
+        role="user",
+        parts=[Part(function_response=FunctionResponse(name="get_weather", response={}))],
+    )
+    assert not simple_turn([user("Weather in Oslo?"), tool_result])
+    assert not simple_turn([])
+
+
+def test_simple_turns_go_to_the_simple_model_first():
+    seen = []
+
+    class Models:
+        def generate_content(self, *, model, contents, config=None):
+            seen.append(model)
+            if model == LITE and len(seen) > 2:
+                raise errors.ServerError(503, {"error": {"message": "overloaded"}})
+            return text_response("Sunny")
+
+    models = HedgedModels(Models(), hedge_percentile=None, simple_model=LITE)
+    assert models.chain(PRIMARY) == [PRIMARY]
+    models.generate_content(model=PRIMARY, contents=[user("Weather in Oslo?")])
+    models.generate_content(model=PRIMARY, contents=[user("x" * 500)])
+    # The requested model is the simple model's fallback
+    models.generate_content(model=PRIMARY, contents=[user("And in Rome?")])
+    assert seen == [LITE, PRIMARY, LITE, PRIMARY]
+    assert models.metrics["simple_turns"] == 2
+    assert models.metrics["fallbacks"] == 1
+    models.shutdown()
+
+
+def test_counters_add_up_across_threads():
+    models = HedgedModels(
+        FakeModels(lambda contents, config: text_response("Sunny")),
+        hedge_percentile=None,
+        simple_model=LITE,
+    )
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        list(pool.map(lambda i: models.generate_content(model=PRIMARY, contents=[user("Hi")]),
+                      range(2000)))
+    assert models.metrics["requests"] == models.metrics["simple_turns"] == 2000
+    models.shutdown()
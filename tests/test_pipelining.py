@@ -0,0 +1,106 @@
+"""ToolPipeline responses match the non-streamed ones, through every models layer."""
+
+import warnings
+
+import pytest
+from google.genai.types import Content, FunctionCall, GenerateContentConfig, Part, Tool
+
+from agentkit.cassette import CassetteModels
+from agentkit.context_cache import ContextCachingModels
+from agentkit.fake import FakeCaches, FakeModels, parts_response, scripted, text_response
+from agentkit.hedging import HedgedModels
+from agentkit.pipelining import ToolPipeline
+from agentkit.transport import join_chunks
+
+MODEL = "gemini-2.5-flash"
+CONFIG = GenerateContentConfig(
+    system_instruction="You answer questions about the weather.",
+    tools=[Tool(function_declarations=[{"name": "get_weather", "description": "Weather"}])],
+)
+INTERLEAVED = parts_response(
+    Part(text="Checking Paris first."),
+    Part(function_call=FunctionCall(name="get_weather", args={"location": "Paris"})),
+    Part(text="Now Oslo."),
+    Part(function_call=FunctionCall(name="get_weather", args={"location": "Oslo"})),
+)
+
+
+def layers(tmp_path):
+    yield "fake", FakeModels(scripted([INTERLEAVED]))
+    caches = FakeCaches(min_tokens=1)
+    yield "context cache", ContextCachingModels(
+        FakeModels(scripted([INTERLEAVED]), caches=caches), caches, min_tokens=1
+    )
+    yield "cassette", CassetteModels(
+        FakeModels(scripted([INTERLEAVED])), str(tmp_path / "c.jsonl"), mode="record"
+    )
+    yield "hedged", HedgedModels(FakeModels(scripted([INTERLEAVED])), initial_delay=0.01)
+
+
+def dump(response):
+    return [
+        part.model_dump(exclude_none=True) for part in response.candidates[0].content.parts
+    ]
+
+
+def test_parts_keep_their_streamed_order(tmp_path):
+    expected = dump(INTERLEAVED)
+    contents = [Content(role="user", parts=[Part(text="Paris or Oslo?")])]
+    for name, models in layers(tmp_path):
+        pipeline = ToolPipeline(lambda call: {"weather": call.args["location"]})
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            response, pending = pipeline.generate_content(
+                models, model=MODEL, contents=contents, config=CONFIG
+            )
+        assert dump(response) == expected, name
+        assert [future.result() for future in pending] == [
+            {"weather": "Paris"},
+            {"weather": "Oslo"},
+        ], name
+        # Started while the stream was still running
+        assert pipeline.metrics["calls_started_early"] == 1, name
+        pipeline.shutdown()
+        if name == "context cache":
+            assert models.stats()["caches_created"] == 1
+
+
+def test_a_hedged_stream_takes_the_first_to_answer():
+    latencies = iter([1.0, 0.0])
+    models = HedgedModels(
+        FakeModels(scripted([INTERLEAVED]), latency=lambda model: next(latencies)),
+        initial_delay=0.05,
+    )
+    pipeline = ToolPipeline(lambda call: None)
+    response, _ = pipeline.generate_content(models, model=MODEL, contents=[], config=CONFIG)
+    assert dump(response) == dump(INTERLEAVED)
+    assert models.metrics["hedges"] == models.metrics["hedges_won"] == 1
+    pipeline.shutdown()
+    models.shutdown()
+
+
+def test_text_pieces_are_joined():
+    chunks = [
+        text_response("Checking "),
+        text_response("Paris."),
+        parts_response(Part(function_call=FunctionCall(name="get_weather", args={}))),
+        text_response("Done"),
+    ]
+    parts = join_chunks(chunks).candidates[0].content.parts
+    assert [part.text or part.function_call.name for part in parts] == [
+        "Checking Paris.",
+        "get_weather",
+        "Done",
+    ]
+
+
+def test_models_without_a_stream_warn():
+    class Plain:
+        def generate_content(self, **kwargs):
+            return INTERLEAVED
+
+    pipeline = ToolPipeline(lambda call: None)
+    with pytest.warns(RuntimeWarning, match="Plain has no generate_content_stream"):
+        response, _ = pipeline.generate_content(Plain(), model=MODEL, contents=[])
+    assert dump(response) == dump(INTERLEAVED)
+    pipeline.shutdown()
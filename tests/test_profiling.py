@@ -0,0 +1,78 @@
+"""collapsed_stacks on call graphs that cProfile cannot produce on demand."""
+
+import time
+from types import SimpleNamespace
+
+from agentkit.profiling import MAX_STACK_DEPTH, collapsed_stacks
+
+
+def graph(calls, self_time):
+    """
+    pstats-like stats for ``calls`` (caller -> callees), each call taking
+    ``self_time`` seconds of its own and spread evenly over its callers.
+    """
+    callers = {func: {} for func in self_time}
+    for caller, callees in calls.items():
+        for callee in callees:
+            callers[callee][caller] = None
+
+    total = {}
+
+    def cumulative(func):
+        if func not in total:
+            total[func] = self_time[func] + sum(
+                cumulative(callee) / len(callers[callee]) for callee in calls.get(func, ())
+            )
+        return total[func]
+
+    entries = {}
+    for func, seconds in self_time.items():
+        ct = cumulative(func)
+        edges = {
+            caller: (1, 1, seconds / len(callers[func]), ct / len(callers[func]))
+            for caller in callers[func]
+        }
+        entries[func] = (1, 1, seconds, ct, edges)
+    return SimpleNamespace(stats=entries)
+
+
+def key(name):
+    return ("agent.py", 1, name)
+
+
+def test_diamonds_are_walked_once():
+    # 40 layers of two functions, each called from both of the layer above:
+    # 2**40 paths from the root, far too many to walk one by one
+    layers = [[key(f"f{layer}_{i}") for i in range(2)] for layer in range(40)]
+    root = key("main")
+    calls = {root: layers[0]}
+    for upper, lower in zip(layers, layers[1:]):
+        for func in upper:
+            calls[func] = lower
+    self_time = {func: 0.01 for layer in layers for func in layer}
+    self_time[root] = 0.01
+
+    start = time.perf_counter()
+    stacks = collapsed_stacks(graph(calls, self_time), min_us=100)
+    assert time.perf_counter() - start < 5
+
+    assert stacks["agent.py:main:1"] == 10000
+    assert stacks["agent.py:main:1;agent.py:f0_0:1"] == 10000
+    assert stacks["agent.py:main:1;agent.py:f0_0:1;agent.py:f1_0:1"] == 5000
+    # Time below min_us is dropped, but what is kept never exceeds the profile
+    assert 0 < sum(stacks.values()) <= 810000
+
+
+def test_recursion_is_cut():
+    root, a, b = key("main"), key("a"), key("b")
+    stats = graph({root: [a], a: [b]}, {root: 0.001, a: 0.001, b: 0.001})
+    # b calls back into a
+    stats.stats[a][4][b] = (1, 1, 0.0, 0.0)
+
+    stacks = collapsed_stacks(stats)
+    assert all(len(stack.split(";")) <= MAX_STACK_DEPTH for stack in stacks)
+    assert stacks == {
+        "agent.py:main:1": 1000,
+        "agent.py:main:1;agent.py:a:1": 1000,
+        "agent.py:main:1;agent.py:a:1;agent.py:b:1": 1000,
+    }
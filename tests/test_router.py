@@ -0,0 +1,23 @@
+"""Fast-path answers name the city the weather lookup resolved."""
+
+from agentkit.router import WEATHER_ROUTES, FastPathRouter
+
+WEATHER = {"temperature": 18, "condition": "sunny", "humidity": 45, "wind_speed": 8,
+           "unit": "celsius"}
+
+
+def test_the_answer_names_the_resolved_city():
+    def dispatch(call):
+        assert call.args == {"location": "Aukland"}
+        return {"location": "Auckland, New Zealand", **WEATHER}
+
+    answer = FastPathRouter(WEATHER_ROUTES, dispatch).route("What's the weather in Aukland?")
+    assert answer == (
+        "It's currently 18°C and sunny in Auckland, New Zealand, "
+        "with 45% humidity and wind at 8 km/h."
+    )
+
+
+def test_unresolved_places_keep_the_users_spelling():
+    router = FastPathRouter(WEATHER_ROUTES, lambda call: dict(WEATHER))
+    assert " in Springfield, " in router.route("weather in springfield")
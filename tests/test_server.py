@@ -0,0 +1,74 @@
+"""AgentServer request parsing, and turns whose client is gone before they start."""
+
+import asyncio
+import json
+
+import pytest
+
+from agentkit import server as server_module
+from agentkit.agents import AgentSpec
+from agentkit.fake import FakeModels, text_response
+from agentkit.server import AgentServer
+
+
+def make_server():
+    models = FakeModels(lambda contents, config: text_response("Hi"))
+    return AgentServer(models, {"chat": AgentSpec("chat", None)}), models
+
+
+async def request(port, head, body=b""):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    response = await asyncio.wait_for(reader.read(), 5)
+    writer.close()
+    return response
+
+
+@pytest.mark.parametrize("length", ["abc", "-1", "+2", "1_0"])
+def test_bad_content_lengths_are_rejected(length):
+    async def run():
+        server, _ = make_server()
+        port = await server.start(port=0)
+        try:
+            head = f"POST /v1/chat/sessions HTTP/1.1\r\nContent-Length: {length}\r\n\r\n"
+            return await request(port, head, b"{}")
+        finally:
+            await server.close()
+
+    response = asyncio.run(run())
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert b"Invalid Content-Length" in response
+
+
+def test_no_turn_runs_when_the_stream_cannot_start(monkeypatch):
+    write_head = server_module._write_head
+
+    async def failing_write_head(writer, status, content_type, *args, **kwargs):
+        if content_type == "text/event-stream":
+            raise ConnectionResetError
+        await write_head(writer, status, content_type, *args, **kwargs)
+
+    monkeypatch.setattr(server_module, "_write_head", failing_write_head)
+
+    async def run():
+        server, models = make_server()
+        port = await server.start(port=0)
+        try:
+            response = await request(port, "POST /v1/chat/sessions HTTP/1.1\r\n\r\n")
+            session_id = json.loads(response.split(b"\r\n\r\n", 1)[1])["session_id"]
+            body = json.dumps({"message": "Hello"}).encode()
+            head = (
+                f"POST /v1/chat/sessions/{session_id}/messages HTTP/1.1\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n"
+            )
+            await request(port, head, body)
+            await asyncio.sleep(0.1)
+            return server, models
+        finally:
+            await server.close()
+
+    server, models = asyncio.run(run())
+    assert models.calls == 0
+    assert server.metrics["client_disconnects"] == 1
+    assert not any(session.busy for session in server.sessions.values())
@@ -0,0 +1,62 @@
+"""SessionStore and PersistentHistory round trips through the disk format."""
+
+import shutil
+
+from google.genai.types import Content, Part
+
+from agentkit.session_store import PersistentHistory, SessionStore
+
+
+def message(i):
+    return Content(role="user" if i % 2 == 0 else "model", parts=[Part(text=f"message {i}")])
+
+
+def texts(history):
+    return [content.parts[0].text for content in history]
+
+
+def test_trimming_is_persisted(tmp_path):
+    history = PersistentHistory(SessionStore("s", directory=str(tmp_path)))
+    history.extend(message(i) for i in range(14))
+    del history[:-10]
+    history.append(message(14))
+
+    resumed = PersistentHistory(SessionStore("s", directory=str(tmp_path)))
+    assert texts(resumed) == [f"message {i}" for i in range(4, 15)]
+
+
+def test_replacing_a_message_is_persisted(tmp_path):
+    history = PersistentHistory(SessionStore("s", directory=str(tmp_path)))
+    history.extend(message(i) for i in range(3))
+    history[1] = Content(role="model", parts=[Part(text="elided")])
+
+    resumed = SessionStore("s", directory=str(tmp_path)).load()
+    assert texts(resumed) == ["message 0", "elided", "message 2"]
+
+
+def test_old_log_is_ignored_after_a_crash_during_rewrite(tmp_path):
+    store = SessionStore("s", directory=str(tmp_path), snapshot_every=0)
+    store.extend(message(i) for i in range(12))
+    store.close()
+    old_log = tmp_path / "s" / "log.jsonl"
+    shutil.copy(old_log, tmp_path / "log.bak")
+
+    history = PersistentHistory(SessionStore("s", directory=str(tmp_path)))
+    del history[:-10]
+    history.store.close()
+    # The new snapshot is written but the old log was never emptied
+    shutil.copy(tmp_path / "log.bak", old_log)
+
+    resumed = SessionStore("s", directory=str(tmp_path)).load()
+    assert texts(resumed) == [f"message {i}" for i in range(2, 12)]
+
+
+def test_logs_without_generations_still_load(tmp_path):
+    session = tmp_path / "s"
+    session.mkdir()
+    (session / "log.jsonl").write_text(
+        '[0,{"role":"user","parts":[{"text":"hi"}]}]\n'
+        '[1,{"role":"model","parts":[{"text":"hello"}]}]\n',
+        encoding="utf-8",
+    )
+    assert texts(SessionStore("s", directory=str(tmp_path)).load()) == ["hi", "hello"]
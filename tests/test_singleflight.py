@@ -0,0 +1,23 @@
+"""Which tools AGENT_COALESCE_TOOLS coalesces."""
+
+from agentkit.singleflight import CoalescingDispatch, SingleFlight, coalescing_for
+
+
+def dispatch(function_call):
+    return {}
+
+
+def test_only_named_tools_are_coalesced(monkeypatch):
+    monkeypatch.setenv("AGENT_COALESCE_TOOLS", "get_weather, convert_temperature")
+    coalescing = coalescing_for(dispatch, SingleFlight())
+    assert isinstance(coalescing, CoalescingDispatch)
+    assert coalescing.tools == {"get_weather", "convert_temperature"}
+
+
+def test_a_wildcard_coalesces_nothing(monkeypatch, capsys):
+    monkeypatch.setenv("AGENT_COALESCE_TOOLS", "*")
+    assert coalescing_for(dispatch, SingleFlight()) is dispatch
+    assert "AGENT_COALESCE_TOOLS=* is not supported" in capsys.readouterr().out
+
+    monkeypatch.setenv("AGENT_COALESCE_TOOLS", "get_weather,*")
+    assert coalescing_for(dispatch, SingleFlight()).tools == {"get_weather"}
@@ -0,0 +1,128 @@
+"""When SpeculativeExecutor counts a prediction as a hit or a miss."""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.genai.types import FunctionCall
+
+from agentkit.speculation import Rule, SpeculativeExecutor
+
+
+def weather_after_location(prompt, result):
+    return [FunctionCall(name="get_weather", args={"location": result["city"]})]
+
+
+class Tools:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, function_call):
+        self.calls.append(function_call.name)
+        if function_call.name == "get_current_location":
+            return {"city": "Oslo"}
+        return {"location": function_call.args["location"], "temperature": 3}
+
+
+def executor(mode="attach"):
+    tools = Tools()
+    rule = Rule("weather-after-location", weather_after_location, after="get_current_location")
+    return SpeculativeExecutor(tools, [rule], mode=mode), rule, tools
+
+
+def location_turn(speculator):
+    call = FunctionCall(name="get_current_location", args={})
+    speculator.on_prompt("What's the weather here?")
+    return speculator.follow_ups(call, speculator.call(call))
+
+
+def test_attached_predictions_count_once_the_model_answers():
+    speculator, rule, _ = executor()
+    assert [call.name for call, _ in location_turn(speculator)] == ["get_weather"]
+    assert (rule.hits, rule.misses) == (0, 0)
+    speculator.finish_turn()
+    assert (rule.hits, rule.misses) == (1, 0)
+
+
+def test_other_arguments_are_a_miss():
+    speculator, rule, _ = executor()
+    location_turn(speculator)
+    speculator.call(FunctionCall(name="get_weather", args={"location": "Bergen"}))
+    speculator.finish_turn()
+    assert (rule.hits, rule.misses) == (0, 1)
+
+
+def test_asking_for_the_attached_call_reuses_its_result():
+    speculator, rule, tools = executor()
+    location_turn(speculator)
+    result = speculator.call(FunctionCall(name="get_weather", args={"location": "Oslo"}))
+    assert result == {"location": "Oslo", "temperature": 3}
+    assert tools.calls == ["get_current_location", "get_weather"]
+    speculator.finish_turn()
+    assert (rule.hits, rule.misses) == (1, 0)
+
+
+def test_stopped_turns_do_not_count():
+    speculator, rule, _ = executor()
+    location_turn(speculator)
+    speculator.finish_turn(answered=False)
+    assert (rule.hits, rule.misses) == (0, 0)
+
+
+def test_prefetches_count_when_the_model_asks():
+    speculator, rule, _ = executor(mode="prefetch")
+    assert location_turn(speculator) == []
+    assert (rule.hits, rule.misses) == (0, 0)
+    speculator.call(FunctionCall(name="get_weather", args={"location": "Oslo"}))
+    speculator.finish_turn()
+    assert (rule.hits, rule.misses) == (1, 0)
+    speculator.close()
+
+
+def test_calls_from_another_thread():
+    # As in a pipelined loop: the model's calls run on a worker thread while
+    # the loop attaches follow-ups
+    speculator, rule, _ = executor()
+    speculator.on_prompt("Weather?")
+    location = FunctionCall(name="get_current_location", args={})
+    names = ["get_weather", "get_current_location"] * 1000
+    with ThreadPoolExecutor(max_workers=1) as worker:
+        results = [
+            worker.submit(speculator.call, FunctionCall(name=name, args={"location": "Oslo"}))
+            for name in names
+        ]
+        for _ in range(1000):
+            speculator.follow_ups(location, {"city": "Oslo"})
+        for future in results:
+            future.result()
+    speculator.finish_turn()
+    assert sum(speculator.transitions.values()) == len(names) - 1
+    # Every attached prediction was counted exactly once
+    assert rule.hits + rule.misses == speculator.speculated
+
+
+def test_asking_for_a_prediction_that_is_still_running():
+    started = threading.Event()
+
+    class SlowTools(Tools):
+        def __call__(self, function_call):
+            if function_call.name == "get_weather":
+                started.set()
+                time.sleep(0.2)
+            return super().__call__(function_call)
+
+    tools = SlowTools()
+    rule = Rule("weather-after-location", weather_after_location, after="get_current_location")
+    speculator = SpeculativeExecutor(tools, [rule])
+    speculator.on_prompt("What's the weather here?")
+    location = FunctionCall(name="get_current_location", args={})
+    with ThreadPoolExecutor(max_workers=1) as loop:
+        # The loop attaches the follow-up while the model's call arrives on another thread
+        attaching = loop.submit(speculator.follow_ups, location, {"city": "Oslo"})
+        started.wait()
+        result = speculator.call(FunctionCall(name="get_weather", args={"location": "Oslo"}))
+        attaching.result()
+    assert result == {"location": "Oslo", "temperature": 3}
+    assert tools.calls == ["get_weather"]
+    speculator.finish_turn()
+    assert (rule.hits, rule.misses) == (1, 0)
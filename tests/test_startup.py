@@ -0,0 +1,38 @@
+"""Cold-start budget of the agent entry points (see agentkit.startup)."""
+
+import os
+import statistics
+
+import pytest
+
+from agentkit.startup import DEFERRED_MODULES, measure_startup
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Median time to prompt, under -X importtime; override on slow machines
+BUDGET_MS = float(os.getenv("AGENT_STARTUP_BUDGET_MS", "300"))
+RUNS = 3
+
+ENTRY_POINTS = [
+    "src/main.py",
+    "workshop/module1/solution/main.py",
+    "workshop/module2/solution/main.py",
+    "workshop/module3/solution/main.py",
+    "extra-for-experts/code-agent/solution/code_agent.py",
+]
+
+
+@pytest.mark.parametrize("path", ENTRY_POINTS)
+def test_entry_point_starts_within_budget(path, monkeypatch):
+    script = os.path.join(REPO_ROOT, path)
+    # Entry points import their tool modules relative to their own directory
+    monkeypatch.chdir(os.path.dirname(script))
+    src = os.path.join(REPO_ROOT, "src")
+    monkeypatch.setenv("PYTHONPATH", os.pathsep.join(filter(None, [src, os.getenv("PYTHONPATH")])))
+
+    profiles = [measure_startup(script) for _ in range(RUNS)]
+
+    assert all(profile["returncode"] == 0 for profile in profiles), profiles[-1]["stderr"]
+    loaded = {entry[0] for entry in profiles[-1]["imports"]}
+    assert not [module for module in DEFERRED_MODULES if module in loaded]
+    median = statistics.median(profile["wall_ms"] for profile in profiles)
+    assert median <= BUDGET_MS, f"median {median:.0f} ms is over the {BUDGET_MS:.0f} ms budget"
@@ -0,0 +1,78 @@
+"""ResultLimiter elides the messages it tracked, wherever they are now."""
+
+from google.genai.types import Content, FunctionCall, Part
+
+from agentkit.compact_history import CompactHistory, Message
+from agentkit.tool_results import ResultLimiter, result_size
+
+
+def add_result(contents, limiter, i):
+    call = FunctionCall(name="read_file", args={"path": f"file{i}.txt"})
+    result = f"contents of file {i}\n" * 100
+    contents.append(Content(role="model", parts=[Part(function_call=call)]))
+    response = Part.from_function_response(name="read_file", response={"result": result})
+    contents.append(Content(role="user", parts=[response]))
+    limiter.track(contents, call, result)
+
+
+def results(contents):
+    out = []
+    for content in contents:
+        if isinstance(content, Message):
+            content = content.to_content()
+        response = content.parts[0].function_response
+        if response is not None:
+            out.append(response.response["result"][:30])
+    return out
+
+
+def test_trimming_does_not_shift_what_is_elided():
+    limiter = ResultLimiter(keep_recent=2)
+    contents = []
+    for i in range(3):
+        add_result(contents, limiter, i)
+    # file0 was elided; now drop the oldest messages
+    del contents[:3]
+    for i in range(3, 5):
+        add_result(contents, limiter, i)
+    assert results(contents) == [
+        "[read_file(path='file1.txt') r",
+        "[read_file(path='file2.txt') r",
+        "contents of file 3\ncontents of",
+        "contents of file 4\ncontents of",
+    ]
+    assert limiter.metrics["elided"] == 3
+
+
+def test_compact_history():
+    limiter = ResultLimiter(keep_recent=1)
+    contents = CompactHistory()
+    for i in range(3):
+        add_result(contents, limiter, i)
+    assert results(contents)[:2] == [
+        "[read_file(path='file0.txt') r",
+        "[read_file(path='file1.txt') r",
+    ]
+
+
+def test_trimmed_results_no_longer_count_as_saved():
+    limiter = ResultLimiter(default_budget_bytes=512, keep_recent=1, elide_min_bytes=256)
+    contents = []
+    for i in range(3):
+        call = FunctionCall(name="read_file", args={"path": f"file{i}.txt"})
+        text = "".join(f"file {i} line {n:04}\n" for n in range(500))
+        result = limiter.limit("read_file", text)
+        contents.append(Content(role="model", parts=[Part(function_call=call)]))
+        response = Part.from_function_response(name="read_file", response={"result": result})
+        contents.append(Content(role="user", parts=[response]))
+        limiter.track(contents, call, result)
+    limiter.on_request()
+    # Two results elided, all three truncated first
+    assert limiter.metrics["elided"] == 2
+    saved = limiter.metrics["bytes_saved"]
+    assert saved > 2 * result_size(text)
+
+    # Only the last result is left, so only its truncation still saves anything
+    del contents[:-2]
+    limiter.on_request()
+    assert limiter.metrics["bytes_saved"] - saved == result_size(text) - result_size(result)
@@ -7,14 +7,31 @@ This script creates a basic chat agent using Google's Gemini API.
 import os
 import sys
 from dotenv import load_dotenv
-from google import genai
-from google.genai.types import Content, Part, GenerateContentConfig
+from agentkit.env import model_name_for
+from agentkit.profiling import profiled_input, session_profiler_for
+from agentkit.session_store import open_history
+from agentkit.startup import handle_startup_flags, lazy_import, stop_after_startup
+from agentkit.transport import lazy_models
 
-# Load environment variables
-load_dotenv()
+# The SDK is imported on first use, so the agent starts without waiting for it
+types = lazy_import("google.genai.types")
+
+# Define a system prompt for your agent
+SYSTEM_PROMPT = """You are a helpful, friendly, and knowledgeable assistant.
+    You provide accurate information and are good at having natural conversations.
+    If you don't know something, you'll admit it rather than making up an answer.
+    Try to be concise but informative in your responses.
+    """
 
 
 def main():
+    # --profile-startup prints an import-time breakdown instead of chatting
+    if handle_startup_flags(__file__):
+        return
+
+    # Load environment variables
+    load_dotenv()
+
     # Get the API key from environment variables
     api_key = os.getenv("API_KEY")
 
@@ -22,34 +39,30 @@ def main():
         print("Error: API key not found. Please add it to your .env file.")
         sys.exit(1)
 
-    # Initialize the Gemini client with your API key
-    client = genai.Client(api_key=api_key)
+    # Gemini models; the client is created when the first message is sent
+    models = lazy_models(api_key)
 
-    # Define a system prompt for your agent
-    SYSTEM_PROMPT = """You are a helpful, friendly, and knowledgeable assistant.
-    You provide accurate information and are good at having natural conversations.
-    If you don't know something, you'll admit it rather than making up an answer.
-    Try to be concise but informative in your responses.
-    """
-
-    # Create a configuration for the Gemini client
-    config = GenerateContentConfig(
-        system_instruction=SYSTEM_PROMPT,
-    )
+    # Create a configuration for the Gemini client (a dict needs no SDK types)
+    config = {"system_instruction": SYSTEM_PROMPT}
 
     # Model name to use
-    model_name = "gemini-2.0-flash"
+    model_name = model_name_for("gemini-2.0-flash")
 
-    # Initialize the conversation history
-    contents = []
+    # Initialize the conversation history (resumed from disk if AGENT_SESSION_ID is set)
+    contents = open_history()
 
     print("\n🤖 Welcome to your Gemini Chat Agent! Type 'exit' to quit.")
+    if stop_after_startup():
+        return
+
+    # --profile (or AGENT_PROFILE=1) records cProfile and tracemalloc data per turn
+    profiler = session_profiler_for(__file__)
 
     # Chat loop
     while True:
         try:
             # Get user input
-            user_input = input("\n👤 You: ").strip()
+            user_input = profiled_input("\n👤 You: ", profiler, contents).strip()
 
             # Check for exit command
             if user_input.lower() in ["exit", "quit"]:
@@ -61,15 +74,15 @@ def main():
                 continue
 
             # Add user message to conversation history
-            contents.append(Content(role="user", parts=[Part(text=user_input)]))
+            contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
 
             # Get response from Gemini
-            response = client.models.generate_content(
+            response = models.generate_content(
                 model=model_name, contents=contents, config=config
             )
 
             # Add response to conversation history
-            contents.append(Content(role="model", parts=[Part(text=response.text)]))
+            contents.append(types.Content(role="model", parts=[types.Part(text=response.text)]))
 
             # Print the response
             print(f"\n🤖 Gemini: {response.text.strip()}")
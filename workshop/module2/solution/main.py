@@ -5,11 +5,16 @@ This script demonstrates how to create a chat agent with Google's Gemini API
 that can call functions to retrieve information.
 """
 
+from __future__ import annotations
+
 import os
 import sys
 from dotenv import load_dotenv
-from google import genai
-from google.genai.types import Content, Part, FunctionCall, GenerateContentConfig, Tool
+from agentkit.env import model_name_for
+from agentkit.profiling import profiled_input, session_profiler_for
+from agentkit.session_store import open_history
+from agentkit.startup import handle_startup_flags, lazy_import, stop_after_startup
+from agentkit.transport import lazy_models
 
 # Import the function declarations and implementations
 from tools import (
@@ -17,11 +22,18 @@ from tools import (
     get_weather,
 )
 
-# Load environment variables
-load_dotenv()
+# The SDK is imported on first use, so the agent starts without waiting for it
+types = lazy_import("google.genai.types")
 
 
 def main():
+    # --profile-startup prints an import-time breakdown instead of chatting
+    if handle_startup_flags(__file__):
+        return
+
+    # Load environment variables
+    load_dotenv()
+
     # Get the API key from environment variables
     api_key = os.getenv("API_KEY")
 
@@ -29,8 +41,8 @@ def main():
         print("Error: API key not found. Please add it to your .env file.")
         sys.exit(1)
 
-    # Initialize the Gemini client
-    client = genai.Client(api_key=api_key)
+    # Gemini models; the client is created when the first message is sent
+    models = lazy_models(api_key)
 
     # Updated system prompt to guide Gemini on when to use functions
     SYSTEM_PROMPT = """You are a helpful, friendly assistant with access to real-time weather information.
@@ -45,25 +57,30 @@ def main():
     - When responding about weather, include details like temperature, conditions, humidity, etc.
     """
 
-    # Configuration with function declaration
-    config = GenerateContentConfig(
-        tools=[Tool(function_declarations=[get_weather_declaration])],
-        system_instruction=SYSTEM_PROMPT,
-    )
+    # Configuration with function declaration (a dict needs no SDK types)
+    config = {
+        "tools": [{"function_declarations": [get_weather_declaration]}],
+        "system_instruction": SYSTEM_PROMPT,
+    }
 
     # Model name to use
-    model_name = "gemini-2.0-flash"
+    model_name = model_name_for("gemini-2.0-flash")
 
-    # Initialize the conversation history
-    contents = []
+    # Initialize the conversation history (resumed from disk if AGENT_SESSION_ID is set)
+    contents = open_history()
 
     print("\n🤖 Welcome to your Gemini Function Calling Agent! Type 'exit' to quit.")
+    if stop_after_startup():
+        return
+
+    # --profile (or AGENT_PROFILE=1) records cProfile and tracemalloc data per turn
+    profiler = session_profiler_for(__file__)
 
     # Chat loop
     while True:
         try:
             # Get user input
-            user_input = input("\n👤 You: ").strip()
+            user_input = profiled_input("\n👤 You: ", profiler, contents).strip()
 
             # Check for exit command
             if user_input.lower() in ["exit", "quit"]:
@@ -75,10 +92,10 @@ def main():
                 continue
 
             # Add user message to conversation history
-            contents.append(Content(role="user", parts=[Part(text=user_input)]))
+            contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
 
             # Get response from Gemini
-            response = client.models.generate_content(
+            response = models.generate_content(
                 model=model_name, contents=contents, config=config
             )
 
@@ -93,17 +110,17 @@ def main():
 
                         # Add function call to conversation history
                         contents.append(
-                            Content(
-                                role="model", parts=[Part(function_call=function_call)]
+                            types.Content(
+                                role="model", parts=[types.Part(function_call=function_call)]
                             )
                         )
 
                         # Add function result to conversation history
                         contents.append(
-                            Content(
+                            types.Content(
                                 role="user",
                                 parts=[
-                                    Part.from_function_response(
+                                    types.Part.from_function_response(
                                         name=function_call.name,
                                         response={"result": result},
                                     )
@@ -112,13 +129,13 @@ def main():
                         )
 
                     # Get Gemini's final response after processing the function result
-                    final_response = client.models.generate_content(
+                    final_response = models.generate_content(
                         model=model_name, contents=contents, config=config
                     )
 
                     # Add response to conversation history
                     contents.append(
-                        Content(role="model", parts=[Part(text=final_response.text)])
+                        types.Content(role="model", parts=[types.Part(text=final_response.text)])
                     )
 
                     # Print the response
@@ -128,10 +145,10 @@ def main():
                     print(f"\n❌ Error executing function: {str(e)}")
                     # Add error message to conversation
                     contents.append(
-                        Content(
+                        types.Content(
                             role="user",
                             parts=[
-                                Part.from_function_response(
+                                types.Part.from_function_response(
                                     name=function_call.name, response={"error": str(e)}
                                 )
                             ],
@@ -139,7 +156,7 @@ def main():
                     )
             else:
                 # No function calls, add response to conversation history
-                contents.append(Content(role="model", parts=[Part(text=response.text)]))
+                contents.append(types.Content(role="model", parts=[types.Part(text=response.text)]))
 
                 # Print the response
                 print(f"\n🤖 Gemini: {response.text.strip()}")
@@ -149,7 +166,7 @@ def main():
             print(f"\n❌ Error: {str(e)}")
 
 
-def process_function_call(tool_call: FunctionCall) -> dict:
+def process_function_call(tool_call: types.FunctionCall) -> dict:
     """
     Process a function call from Gemini and return the result.
 
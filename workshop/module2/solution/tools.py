@@ -2,7 +2,10 @@
 This module contains function declarations and implementations for the Gemini function calling workshop.
 """
 
-from typing import Dict, Union
+from typing import Dict, List, Union
+
+from agentkit.gazetteer import resolve_location
+from agentkit.weather import weather_provider_for
 
 # Function declaration for get_weather
 get_weather_declaration = {
@@ -13,7 +16,7 @@ get_weather_declaration = {
         "properties": {
             "location": {
                 "type": "string",
-                "description": "The city name (e.g., 'San Francisco', 'New York', 'London')",
+                "description": "The city name, optionally with its country (e.g., 'San Francisco', 'New York', 'London, Canada')",
             }
         },
         "required": ["location"],
@@ -22,51 +25,67 @@ get_weather_declaration = {
 
 
 # Weather function implementation
-def get_weather(location: str) -> Dict[str, Union[int, str, float]]:
+def get_weather(location: str) -> Dict[str, Union[int, str, float, List[str]]]:
     """
     Gets the current weather for a given location.
 
+    Misspelled names, names without their accents and "City, Country" are
+    resolved to a known city first, and the result says which city it is for.
+    Other names are looked up as given.
+
     Args:
         location (str): The name of the city to get the weather for.
 
     Returns:
-        Dict[str, Union[int, str, float]]: A dictionary containing weather information
+        Dict[str, Union[int, str, float, List[str]]]: A dictionary containing weather
+        information
     """
+    # Find the city the model meant (see agentkit.gazetteer)
+    resolution = resolve_location(location)
+    if resolution.place is not None:
+        # With its country: "London, Canada" is not the London in the mock data
+        location = str(resolution.place)
+
+    # With WEATHER_API_URL set, ask the weather service (see agentkit.weather)
+    provider = weather_provider_for()
+    if provider is not None:
+        return resolution.annotate(provider.get(location))
+
     # In a real application, this would call a weather API
     # For this workshop, we'll use mock data
     location = location.lower()
 
     # Mock weather data for different cities (temperatures in Celsius)
     weather_data = {
-        "auckland": {
+        "auckland, new zealand": {
             "temperature": 18,
             "condition": "sunny",
             "humidity": 45,
             "wind_speed": 8,
             "unit": "celsius",
         },
-        "wellington": {
+        "wellington, new zealand": {
             "temperature": 15,
             "condition": "partly cloudy",
             "humidity": 60,
             "wind_speed": 12,
             "unit": "celsius",
         },
-        "sydney": {
+        "sydney, australia": {
             "temperature": 25,
             "condition": "sunny",
             "humidity": 50,
             "wind_speed": 10,
             "unit": "celsius",
         },
-        "london": {
+        "london, united kingdom": {
             "temperature": 10,
             "condition": "rainy",
             "humidity": 85,
             "wind_speed": 15,
             "unit": "celsius",
         },
-        "tokyo": {
+        "tokyo, japan": {
             "temperature": 22,
             "condition": "clear",
             "humidity": 40,
@@ -76,13 +95,15 @@ def get_weather(location: str) -> Dict[str, Union[int, str, float]]:
     }
 
     # Return weather data for the specified location, or a default if not found
-    return weather_data.get(
-        location,
-        {
-            "temperature": 20,
-            "condition": "clear",
-            "humidity": 50,
-            "wind_speed": 10,
-            "unit": "celsius",
-        },
+    return resolution.annotate(
+        weather_data.get(
+            location,
+            {
+                "temperature": 20,
+                "condition": "clear",
+                "humidity": 50,
+                "wind_speed": 10,
+                "unit": "celsius",
+            },
+        )
     )
@@ -5,11 +5,22 @@ This script demonstrates how to chain multiple function calls together
 using Google's Gemini API to solve complex queries.
 """
 
+from __future__ import annotations
+
 import os
 import sys
 from dotenv import load_dotenv
-from google import genai
-from google.genai.types import Content, Part, FunctionCall, GenerateContentConfig, Tool
+from agentkit.env import model_name_for
+from agentkit.pipelining import tool_pipeline_for
+from agentkit.profiling import profiled_input, session_profiler_for
+from agentkit.response_cache import response_cache_for
+from agentkit.router import router_for
+from agentkit.session_store import open_history
+from agentkit.speculation import WEATHER_RULES, speculation_for
+from agentkit.startup import handle_startup_flags, lazy_import, stop_after_startup
+from agentkit.tool_schema import ToolArgumentError, ToolValidator
+from agentkit.turn_budget import TurnStopped, end_stopped_turn, turn_budget_for
+from agentkit.transport import lazy_models
 
 # Import the function declarations and implementations
 from tools import (
@@ -21,23 +32,11 @@ from tools import (
     convert_temperature,
 )
 
-# Load environment variables
-load_dotenv()
-
+# The SDK is imported on first use, so the agent starts without waiting for it
+types = lazy_import("google.genai.types")
 
-def main():
-    # Get the API key from environment variables
-    api_key = os.getenv("API_KEY")
-
-    if not api_key:
-        print("Error: API key not found. Please add it to your .env file.")
-        sys.exit(1)
-
-    # Initialize the Gemini client
-    client = genai.Client(api_key=api_key)
-
-    # System prompt with instructions for function chaining
-    SYSTEM_PROMPT = """You are a helpful, friendly assistant with access to real-time weather information.
+# System prompt with instructions for function chaining
+SYSTEM_PROMPT = """You are a helpful, friendly assistant with access to real-time weather information.
 
     You have access to these functions:
     - get_current_location: Gets the user's current city and country
@@ -56,36 +55,87 @@ def main():
     - Chain functions together when needed to fully answer the user's query
     """
 
-    # Configuration with all function declarations
-    config = GenerateContentConfig(
-        tools=[
-            Tool(
-                function_declarations=[
-                    get_weather_declaration,
-                    get_current_location_declaration,
-                    convert_temperature_declaration,
-                ]
-            )
-        ],
-        system_instruction=SYSTEM_PROMPT,
+# All function declarations available to the model
+FUNCTION_DECLARATIONS = [
+    get_weather_declaration,
+    get_current_location_declaration,
+    convert_temperature_declaration,
+]
+
+# Argument checks compiled once from the declarations, run before every call
+TOOL_VALIDATOR = ToolValidator(FUNCTION_DECLARATIONS)
+
+
+def main():
+    # --profile-startup prints an import-time breakdown instead of chatting
+    if handle_startup_flags(__file__):
+        return
+
+    # Load environment variables
+    load_dotenv()
+
+    # Get the API key from environment variables
+    api_key = os.getenv("API_KEY")
+
+    if not api_key:
+        print("Error: API key not found. Please add it to your .env file.")
+        sys.exit(1)
+
+    # Gemini models; the client is created when the first message is sent
+    models = lazy_models(api_key)
+
+    # Configuration with all function declarations (a dict needs no SDK types)
+    config = {
+        "tools": [{"function_declarations": FUNCTION_DECLARATIONS}],
+        "system_instruction": SYSTEM_PROMPT,
+    }
+
+    # Optional local fast path for trivial conversions and lookups (AGENT_FAST_PATH)
+    router = router_for(process_function_call)
+
+    # Optional cache of final answers for repeated questions (AGENT_RESPONSE_CACHE)
+    response_cache = response_cache_for(SYSTEM_PROMPT, FUNCTION_DECLARATIONS)
+
+    # Optional speculative execution of predictable follow-up calls (AGENT_SPECULATE)
+    speculator = speculation_for(process_function_call, WEATHER_RULES)
+
+    # Per-turn limits on model calls, time, tool calls and tokens (AGENT_MAX_*)
+    turn_budget = turn_budget_for()
+
+    # Optional streaming that starts each tool as soon as its call arrives
+    # (AGENT_PIPELINE_TOOLS); one at a time with the speculator, which expects call order
+    pipeline = tool_pipeline_for(
+        speculator.call if speculator is not None else process_function_call,
+        max_workers=1 if speculator is not None else None,
     )
 
     # Model name to use
-    model_name = "gemini-2.0-flash"
+    model_name = model_name_for("gemini-2.0-flash")
 
-    # Initialize the conversation history
-    contents = []
+    # Initialize the conversation history (resumed from disk if AGENT_SESSION_ID is set)
+    contents = open_history()
 
     print("\n🤖 Welcome to your Gemini Function Chaining Agent! Type 'exit' to quit.")
+    if stop_after_startup():
+        return
+
+    # --profile (or AGENT_PROFILE=1) records cProfile and tracemalloc data per turn
+    profiler = session_profiler_for(__file__)
 
     # Chat loop
     while True:
         try:
             # Get user input
-            user_input = input("\n👤 You: ").strip()
+            user_input = profiled_input("\n👤 You: ", profiler, contents).strip()
 
             # Check for exit command
             if user_input.lower() in ["exit", "quit"]:
+                if turn_budget.metrics["completed"] < turn_budget.metrics["turns"]:
+                    print(f"\n⏱️  Turn budgets: {turn_budget.summary()}")
+                if pipeline is not None:
+                    if pipeline.metrics["responses"]:
+                        print(f"\n🚰 Tool pipeline: {pipeline.summary()}")
+                    pipeline.shutdown()
                 print("\n👋 Goodbye!")
                 break
 
@@ -93,79 +143,169 @@ def main():
             if not user_input:
                 continue
 
-            # Add user message to conversation history
-            contents.append(Content(role="user", parts=[Part(text=user_input)]))
-
-            # Function chaining loop - keep calling functions until we get a final response
-            function_calling_in_process = True
-            while function_calling_in_process:
-                # Get response from Gemini
-                response = client.models.generate_content(
-                    model=model_name, contents=contents, config=config
-                )
+            # Answer simple conversions and single-city lookups without the model
+            routed_answer = router.route(user_input) if router is not None else None
+            if routed_answer is not None:
+                contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
+                contents.append(types.Content(role="model", parts=[types.Part(text=routed_answer)]))
+                print(f"\n🤖 Gemini: {routed_answer}")
+                continue
 
-                # Check if Gemini wants to call a function
-                if response.function_calls:
-                    try:
-                        # Loop through all function calls
-                        for function_call in response.function_calls:
-                            print(f"\n🔧 Executing function: {function_call.name}")
-                            # Process the function call
-                            result = process_function_call(function_call)
+            # Only standalone questions are cached; follow-ups depend on the history,
+            # so "And in Tokyo?" is neither answered from nor stored in the cache
+            cacheable = response_cache is not None and not contents
 
-                            # Add function call to conversation history
-                            contents.append(
-                                Content(
-                                    role="model", parts=[Part(function_call=function_call)]
-                                )
-                            )
+            # Answer repeated questions from the cache without calling the model
+            cached_answer = response_cache.get(user_input) if cacheable else None
+            if cached_answer is not None:
+                contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
+                contents.append(types.Content(role="model", parts=[types.Part(text=cached_answer)]))
+                print(f"\n🤖 Gemini: {cached_answer.strip()}")
+                continue
 
-                            # Add function result to conversation history
+            # Add user message to conversation history
+            contents.append(types.Content(role="user", parts=[types.Part(text=user_input)]))
+
+            # Stops the turn when it runs over budget or on Ctrl-C
+            guard = turn_budget.start()
+            try:
+                # Run calls we can already predict from the prompt (e.g. "my location")
+                if speculator is not None:
+                    for function_call, result in speculator.on_prompt(user_input):
+                        print(f"\n⚡ Speculatively executed: {function_call.name}")
+                        add_function_result(contents, function_call, result)
+
+                # Function chaining loop - keep calling functions until we get a final response
+                function_calling_in_process = True
+                while function_calling_in_process:
+                    # Get response from Gemini
+                    guard.before_request()
+                    if pipeline is not None:
+                        # Tools start while the rest of the response is still streaming
+                        response, pending = pipeline.generate_content(
+                            models, model=model_name, contents=contents, config=config, guard=guard
+                        )
+                    else:
+                        response = models.generate_content(
+                            model=model_name, contents=contents, config=config
+                        )
+                        pending = None
+                    guard.after_response(response)
+
+                    # Check if Gemini wants to call a function
+                    if response.function_calls:
+                        try:
+                            # Loop through all function calls
+                            for i, function_call in enumerate(response.function_calls):
+                                if pending is None:
+                                    guard.before_tool_call()
+                                print(f"\n🔧 Executing function: {function_call.name}")
+                                # Process the function call
+                                try:
+                                    if pending is not None:
+                                        result = pending[i].result()
+                                    elif speculator is not None:
+                                        result = speculator.call(function_call)
+                                    else:
+                                        result = process_function_call(function_call)
+                                except ToolArgumentError as e:
+                                    # Rejected before running: tell the model what to fix
+                                    print(f"\n⚠️  {str(e)}")
+                                    add_function_result(
+                                        contents, function_call, error=e.to_response()
+                                    )
+                                    continue
+
+                                # Add function call and result to conversation history
+                                add_function_result(contents, function_call, result)
+
+                                # Attach follow-up calls the model is known to make next
+                                if speculator is not None:
+                                    for follow_up, follow_up_result in speculator.follow_ups(
+                                        function_call, result
+                                    ):
+                                        print(f"\n⚡ Speculatively executed: {follow_up.name}")
+                                        add_function_result(contents, follow_up, follow_up_result)
+
+                            # Continue the loop to check for more function calls
+                            continue
+
+                        except TurnStopped:
+                            raise
+                        except Exception as e:
+                            print(f"\n❌ Error executing function: {str(e)}")
+                            # Add error message to conversation
                             contents.append(
-                                Content(
+                                types.Content(
                                     role="user",
                                     parts=[
-                                        Part.from_function_response(
+                                        types.Part.from_function_response(
                                             name=function_call.name,
-                                            response={"result": result},
+                                            response={"error": str(e)},
                                         )
                                     ],
                                 )
                             )
-
-                        # Continue the loop to check for more function calls
-                        continue
-
-                    except Exception as e:
-                        print(f"\n❌ Error executing function: {str(e)}")
-                        # Add error message to conversation
+                            function_calling_in_process = False
+                            guard.finish()
+                            if speculator is not None:
+                                speculator.finish_turn(answered=False)
+                    else: # If there are no more function calls, add the response to the conversation history
                         contents.append(
-                            Content(
-                                role="user",
-                                parts=[
-                                    Part.from_function_response(
-                                        name=function_call.name,
-                                        response={"error": str(e)},
-                                    )
-                                ],
-                            )
+                            types.Content(role="model", parts=[types.Part(text=response.text)])
                         )
-                        function_calling_in_process = False
-                else: # If there are no more function calls, add the response to the conversation history
-                    contents.append(
-                        Content(role="model", parts=[Part(text=response.text)])
-                    )
 
-                    # Print the final response
-                    print(f"\n🤖 Gemini: {response.text.strip()}")
-                    function_calling_in_process = False
+                        # Print the final response
+                        print(f"\n🤖 Gemini: {response.text.strip()}")
+                        function_calling_in_process = False
+                        guard.finish()
+
+                        if cacheable:
+                            response_cache.put(user_input, response.text)
+                        if speculator is not None:
+                            speculator.finish_turn()
+            except (TurnStopped, KeyboardInterrupt) as e:
+                stopped = e if isinstance(e, TurnStopped) else guard.interrupted()
+                # Close the turn so the history stays valid for the next request
+                print(f"\n⏹️  {end_stopped_turn(contents, stopped)}")
+                if speculator is not None:
+                    speculator.finish_turn(answered=False)
 
         
         except Exception as e:
             print(f"\n❌ Error: {str(e)}")
 
 
-def process_function_call(tool_call: FunctionCall) -> dict:
+def add_function_result(
+    contents: list, function_call: types.FunctionCall, result=None, error: dict = None
+) -> None:
+    """
+    Append a function call and its result to the conversation history.
+
+    Args:
+        contents: The conversation history
+        function_call: The function call (from Gemini or predicted)
+        result: The value returned by the function
+        error: Sent instead of the result when the call was rejected
+    """
+    # Add function call to conversation history
+    contents.append(types.Content(role="model", parts=[types.Part(function_call=function_call)]))
+
+    # Add function result to conversation history
+    contents.append(
+        types.Content(
+            role="user",
+            parts=[
+                types.Part.from_function_response(
+                    name=function_call.name,
+                    response={"result": result} if error is None else error,
+                )
+            ],
+        )
+    )
+
+
+def process_function_call(tool_call: types.FunctionCall) -> dict:
     """
     Process a function call from Gemini and return the result.
 
@@ -174,10 +314,13 @@ def process_function_call(tool_call: FunctionCall) -> dict:
 
     Returns:
         dict: The result of the function call
+
+    Raises:
+        ToolArgumentError: If the arguments do not match the function's declaration
     """
-    # Get function name and arguments
+    # Get function name and arguments, checked and coerced against the declaration
     function_name = tool_call.name
-    args = tool_call.args
+    args = TOOL_VALIDATOR.validate(function_name, tool_call.args)
 
     # Call the appropriate function
     if function_name == "get_weather":